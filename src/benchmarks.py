@@ -0,0 +1,691 @@
+"""
+Benchmark suite with a JSON history and regression check.
+
+Times the main load, validation, deduplication and SQL paths on synthetic
+data of a given scale (see src/synthetic.py), records wall time, rows per
+second and peak RSS for each, and compares the results with a stored
+baseline. A benchmark regresses when its best time is slower than the
+baseline by more than the threshold (default 25%).
+
+Each timed run happens in a freshly spawned process, so peak RSS belongs to
+that benchmark alone (not to the runner or to setup work such as building a
+warehouse) and one benchmark's caches do not warm the next.
+Generated data, warehouses and Arrow cache files live under the work
+directory (default: .benchmarks/) and are reused between runs.
+
+History file layout:
+    {"runs": [{"timestamp": ..., "commit": ..., "baseline": true,
+               "results": [{"name": ..., "scale": ..., "seconds": ...,
+                            "rows": ..., "rows_per_sec": ...,
+                            "peak_rss_mb": ...}]}]}
+
+The baseline for a benchmark is the newest run marked as baseline that
+contains it, or else the newest run that contains it.
+
+Usage:
+    python -m src.benchmarks --scale 1 --scale 10
+    python -m src.benchmarks --only load_orders_csv --repeat 5
+    python -m src.benchmarks --save-baseline
+    python -m src.benchmarks --list
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from . import data_loader
+from .schemas import get_schema
+from .streaming import sum_by_day
+
+REPO_ROOT = Path(__file__).parent.parent
+
+DEFAULT_WORK_DIR = REPO_ROOT / ".benchmarks"
+
+DEFAULT_THRESHOLD = 0.25
+
+DEFAULT_REPEAT = 3
+
+# Tables generated for the benchmark data sets
+DATA_TABLES = [
+    "customers",
+    "orders",
+    "order_items",
+    "products",
+    "categories",
+    "website_sessions",
+]
+
+SQL_TABLES = ["customers", "orders", "order_items", "products", "categories"]
+
+# name -> {"group": str, "run": callable(data_dir) -> rows, "setup": callable}
+BENCHMARKS = {}
+
+
+def benchmark(name: str, group: str, setup=None):
+    """
+    Register a benchmark.
+
+    The decorated function receives the data directory and returns the
+    number of rows it processed. setup(data_dir), if given, runs once
+    before timing and is not measured.
+    """
+
+    def register(func):
+        BENCHMARKS[name] = {"group": group, "run": func, "setup": setup}
+        return func
+
+    return register
+
+
+def _path(data_dir: Path, table: str) -> Path:
+    return Path(data_dir) / get_schema(table)["file"]
+
+
+# Loaders
+
+
+@benchmark("load_orders_csv", "loaders")
+def _load_orders_csv(data_dir):
+    return len(data_loader.load_orders(_path(data_dir, "orders"), use_cache=False))
+
+
+@benchmark("load_customers_csv", "loaders")
+def _load_customers_csv(data_dir):
+    path = _path(data_dir, "customers")
+    return len(data_loader.load_customers(path, use_cache=False))
+
+
+def _warm_orders_cache(data_dir):
+    data_loader.load_orders(_path(data_dir, "orders"))
+
+
+@benchmark("load_orders_cached", "loaders", setup=_warm_orders_cache)
+def _load_orders_cached(data_dir):
+    return len(data_loader.load_orders(_path(data_dir, "orders")))
+
+
+def _warm_order_items_store(data_dir):
+    data_loader.load_columns("order_items", data_path=_path(data_dir, "order_items"))
+
+
+@benchmark("order_items_mmap_sum", "loaders", setup=_warm_order_items_store)
+def _order_items_mmap_sum(data_dir):
+    path = _path(data_dir, "order_items")
+    items = data_loader.load_columns("order_items", ["item_total"], data_path=path)
+    items["item_total"].sum()
+    return len(items)
+
+
+@benchmark("lazy_orders_month_country", "loaders")
+def _lazy_orders_month_country(data_dir):
+    col = data_loader.col
+    october_india = data_loader.scan("orders", _path(data_dir, "orders")).filter(
+        col("order_date").between("2024-10-01", "2024-10-31"),
+        col("shipping_country") == "India",
+    )
+    return len(october_india.select("order_id", "total").collect())
+
+
+def _build_partitions(data_dir):
+    from .partitioning import build_partitions
+
+    build_partitions(["orders"], data_dir=data_dir)
+
+
+@benchmark("partitioned_orders_month", "loaders", setup=_build_partitions)
+def _partitioned_orders_month(data_dir):
+    october = data_loader.load_partitioned(
+        "orders", "2024-10-01", "2024-10-31", data_dir=data_dir
+    )
+    return len(october)
+
+
+@benchmark("load_all_threads", "loaders")
+def _load_all_threads(data_dir):
+    data = data_loader.load_all(DATA_TABLES, data_dir=data_dir, use_cache=False)
+    return sum(len(df) for df in data.tables.values())
+
+
+@benchmark("iter_orders_sum_by_day", "loaders")
+def _iter_orders_sum_by_day(data_dir):
+    rows = 0
+
+    def counted(chunks):
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+    sum_by_day(counted(data_loader.iter_orders(_path(data_dir, "orders"))))
+    return rows
+
+
+# Validation
+
+
+def _validator():
+    """Import the DataValidator that lives next to the sample data."""
+    sys.path.insert(0, str(REPO_ROOT / "data"))
+    try:
+        import ai_generated_validator
+    finally:
+        sys.path.pop(0)
+    return ai_generated_validator
+
+
+def _customer_records(data_dir) -> pd.DataFrame:
+    customers = pd.read_csv(_path(data_dir, "customers"), dtype={"phone": str})
+    return pd.DataFrame(
+        {
+            "customer_id": customers["customer_id"],
+            "name": customers["first_name"] + " " + customers["last_name"],
+            "email": customers["email"],
+            "age": customers["age"],
+            "phone": customers["phone"],
+            "total_spent": customers["total_spent"],
+        }
+    )
+
+
+@benchmark("validate_records", "validation")
+def _validate_records(data_dir):
+    validator = _validator().DataValidator()
+    records = _customer_records(data_dir).to_dict("records")
+    for record in records:
+        validator.validate(record)
+    return len(records)
+
+
+@benchmark("validate_frame", "validation")
+def _validate_frame(data_dir):
+    records = _customer_records(data_dir)
+    _validator().validate_frame(records)
+    return len(records)
+
+
+@benchmark("validate_rules", "validation")
+def _validate_rules(data_dir):
+    from .validation import compile_rules
+
+    records = _customer_records(data_dir)
+    compile_rules("customer_records").validate(records)
+    return len(records)
+
+
+@benchmark("validate_tables", "validation")
+def _validate_tables(data_dir):
+    from .validation import validate_tables
+
+    reports = validate_tables(DATA_TABLES, data_dir=data_dir)
+    return sum(len(report.valid) for report in reports.values())
+
+
+@benchmark("profile_customers", "validation")
+def _profile_customers(data_dir):
+    from .profiler import profile_file
+
+    return profile_file(_path(data_dir, "customers")).rows
+
+
+# Deduplication
+
+
+@benchmark("dedup_customers_email", "dedup")
+def _dedup_customers_email(data_dir):
+    customers = data_loader.load_customers(
+        _path(data_dir, "customers"), use_cache=False
+    )
+    key = customers["email"].str.strip().str.lower()
+    customers.loc[~key.duplicated()]
+    return len(customers)
+
+
+@benchmark("dedup_customers_fuzzy", "dedup")
+def _dedup_customers_fuzzy(data_dir):
+    from .dedup import PRESETS, deduplicate
+
+    customers = data_loader.load_customers(
+        _path(data_dir, "customers"), use_cache=False
+    )
+    deduplicate(customers, **PRESETS["customers"])
+    return len(customers)
+
+
+# Analytics
+
+
+@benchmark("cohort_matrix_monthly", "analytics")
+def _cohort_matrix_monthly(data_dir):
+    from .cohorts import cohort_matrices
+
+    customers = data_loader.load_customers(
+        _path(data_dir, "customers"), use_cache=False
+    )
+    orders = data_loader.load_orders(_path(data_dir, "orders"), use_cache=False)
+    cohort_matrices(customers, orders)
+    return len(orders)
+
+
+@benchmark("feature_store_build", "analytics")
+def _feature_store_build(data_dir):
+    from .feature_store import FeatureStore
+
+    customers = data_loader.load_customers(
+        _path(data_dir, "customers"), use_cache=False
+    )
+    orders = data_loader.load_orders(_path(data_dir, "orders"), use_cache=False)
+    sessions = data_loader.load_website_sessions(
+        _path(data_dir, "website_sessions"), use_cache=False
+    )
+    FeatureStore.build(customers, orders, sessions).to_frame(as_of="2024-07-01")
+    return len(orders) + len(sessions)
+
+
+# SQL
+
+
+def _build_warehouse(data_dir):
+    from .warehouse import build_warehouse
+
+    build_warehouse(Path(data_dir) / "cartly.duckdb", data_dir, SQL_TABLES)
+
+
+def _run_sql(data_dir, sql_text: str) -> int:
+    from .warehouse import connect
+
+    conn = connect(Path(data_dir) / "cartly.duckdb", read_only=True)
+    try:
+        conn.execute(sql_text.strip().rstrip(";")).fetchall()
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _slow_query() -> str:
+    return (REPO_ROOT / "data" / "slow_query.sql").read_text()
+
+
+@benchmark("slow_query", "sql", setup=_build_warehouse)
+def _slow_query_benchmark(data_dir):
+    return _run_sql(data_dir, _slow_query())
+
+
+def _optimize_slow_query(data_dir):
+    """Build the warehouse and store the rewritten query next to it."""
+    from .query_optimizer import optimize_query
+    from .warehouse import connect
+
+    _build_warehouse(data_dir)
+    conn = connect(Path(data_dir) / "cartly.duckdb", read_only=True)
+    try:
+        sql_text = optimize_query(_slow_query(), conn)["sql"]
+    finally:
+        conn.close()
+    (Path(data_dir) / "slow_query_optimized.sql").write_text(sql_text)
+
+
+@benchmark("slow_query_optimized", "sql", setup=_optimize_slow_query)
+def _slow_query_optimized(data_dir):
+    sql_text = (Path(data_dir) / "slow_query_optimized.sql").read_text()
+    return _run_sql(data_dir, sql_text)
+
+
+@benchmark("dashboard_queries_cached", "sql", setup=_build_warehouse)
+def _dashboard_queries_cached(data_dir):
+    from .query_cache import (
+        DASHBOARD_PARAMS,
+        DASHBOARD_QUERIES,
+        QueryCache,
+        cached_query,
+    )
+
+    cache = QueryCache()
+    rows = 0
+    for _ in range(20):
+        for name in ("revenue_by_day", "top_products_by_category"):
+            result = cached_query(
+                DASHBOARD_QUERIES[name],
+                DASHBOARD_PARAMS.get(name),
+                db_path=Path(data_dir) / "cartly.duckdb",
+                data_dir=data_dir,
+                cache=cache,
+            )
+            rows += len(result)
+    return rows
+
+
+# Running
+
+
+def prepare_data(scale: float, work_dir: str = None) -> Path:
+    """
+    Generate (or reuse) benchmark CSVs at the given scale.
+
+    Each table is written as a single CSV named like the file in data/, so
+    loaders and build_warehouse() can read the directory directly.
+
+    Args:
+        scale: Size relative to the sample data.
+        work_dir: Benchmark work directory. If None, uses .benchmarks/.
+
+    Returns:
+        Directory holding the CSV files.
+    """
+    from .synthetic import generate
+
+    work_dir = Path(work_dir) if work_dir is not None else DEFAULT_WORK_DIR
+    data_dir = work_dir / "data" / f"scale-{scale:g}"
+    marker = data_dir / ".complete"
+    if marker.exists():
+        return data_dir
+
+    parts_dir = work_dir / "data" / f"scale-{scale:g}-parts"
+    generate(scale, parts_dir, fmt="csv", tables=DATA_TABLES)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for table in DATA_TABLES:
+        # Concatenate part files, keeping only the first header
+        with open(_path(data_dir, table), "w", newline="") as out:
+            for number, part in enumerate(sorted((parts_dir / table).iterdir())):
+                with open(part, newline="") as source:
+                    if number:
+                        source.readline()
+                    shutil.copyfileobj(source, out)
+    shutil.rmtree(parts_dir)
+    marker.touch()
+    return data_dir
+
+
+def _peak_rss_mb():
+    # VmHWM is this process's own peak; ru_maxrss carries over the peak of
+    # the process that started it, across fork and exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _measure(name: str, data_dir) -> tuple:
+    """Run one benchmark once; executed in a child process."""
+    start = time.perf_counter()
+    rows = BENCHMARKS[name]["run"](data_dir)
+    return time.perf_counter() - start, rows, _peak_rss_mb()
+
+
+def run_benchmark(name: str, data_dir, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Time a registered benchmark.
+
+    Args:
+        name: Key in BENCHMARKS.
+        data_dir: Directory from prepare_data().
+        repeat: Number of timed runs, each in a new process.
+
+    Returns:
+        dict with name, group, seconds (best run), mean_seconds, rows,
+        rows_per_sec and peak_rss_mb (largest over the runs)
+    """
+    if name not in BENCHMARKS:
+        raise KeyError(f"Unknown benchmark {name!r}. Known: {sorted(BENCHMARKS)}")
+    entry = BENCHMARKS[name]
+    if entry["setup"] is not None:
+        entry["setup"](data_dir)
+
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(_measure, name, data_dir).result())
+
+    seconds = [run[0] for run in runs]
+    rss = [run[2] for run in runs if run[2] is not None]
+    best = min(seconds)
+    return {
+        "name": name,
+        "group": entry["group"],
+        "seconds": best,
+        "mean_seconds": sum(seconds) / len(seconds),
+        "rows": runs[0][1],
+        "rows_per_sec": runs[0][1] / best if best else None,
+        "peak_rss_mb": max(rss) if rss else None,
+    }
+
+
+def run_benchmarks(
+    names: list = None,
+    scales: list = None,
+    repeat: int = DEFAULT_REPEAT,
+    work_dir: str = None,
+) -> list:
+    """
+    Run benchmarks at one or more scales.
+
+    Args:
+        names: Benchmarks to run. If None, runs all of BENCHMARKS.
+        scales: Data scales relative to the sample. If None, [1].
+        repeat: Timed runs per benchmark.
+        work_dir: Benchmark work directory. If None, uses .benchmarks/.
+
+    Returns:
+        List of result dicts (see run_benchmark()) with a "scale" key added.
+    """
+    names = list(BENCHMARKS) if names is None else names
+    work_dir = Path(work_dir) if work_dir is not None else DEFAULT_WORK_DIR
+    results = []
+    # Keep benchmark cache files out of data/.cache
+    with _environ("CARTLY_CACHE_DIR", str(work_dir / "cache")):
+        for scale in scales or [1]:
+            data_dir = prepare_data(scale, work_dir)
+            for name in names:
+                result = run_benchmark(name, data_dir, repeat)
+                results.append({"scale": scale, **result})
+    return results
+
+
+@contextlib.contextmanager
+def _environ(name: str, value: str):
+    """Set an environment variable for the block, then restore it."""
+    previous = os.environ.get(name)
+    os.environ[name] = value
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+
+
+def load_history(path: str) -> dict:
+    """Load a history file; a missing file is an empty history."""
+    path = Path(path)
+    if not path.exists():
+        return {"runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _git_commit():
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def save_history(path: str, history: dict, results: list, baseline: bool = False):
+    """
+    Append a run to the history file.
+
+    Args:
+        path: History JSON file; created if missing.
+        history: Output of load_history().
+        results: Output of run_benchmarks().
+        baseline: Mark this run as the baseline for later comparisons.
+    """
+    history["runs"].append(
+        {
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "baseline": baseline,
+            "results": results,
+        }
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+def find_baseline(history: dict, name: str, scale: float):
+    """Return the baseline result for a benchmark and scale, or None."""
+    runs = history["runs"]
+    for candidates in ([r for r in runs if r.get("baseline")], runs):
+        for run in reversed(candidates):
+            for result in run["results"]:
+                if result["name"] == name and result["scale"] == scale:
+                    return result
+    return None
+
+
+def compare(results: list, history: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compare results against their baselines.
+
+    Args:
+        results: Output of run_benchmarks().
+        history: Output of load_history(), before the new run is saved.
+        threshold: Allowed slowdown as a fraction (0.25 = 25% slower).
+
+    Returns:
+        List of dicts with name, scale, seconds, baseline_seconds, change
+        (fractional) and regressed, one per result that has a baseline.
+    """
+    comparisons = []
+    for result in results:
+        base = find_baseline(history, result["name"], result["scale"])
+        if base is None:
+            continue
+        change = result["seconds"] / base["seconds"] - 1
+        comparisons.append(
+            {
+                "name": result["name"],
+                "scale": result["scale"],
+                "seconds": result["seconds"],
+                "baseline_seconds": base["seconds"],
+                "change": change,
+                "regressed": change > threshold,
+            }
+        )
+    return comparisons
+
+
+def format_results(results: list, comparisons: list) -> str:
+    """Render results and baseline comparisons as a plain-text table."""
+    changes = {(c["name"], c["scale"]): c for c in comparisons}
+    header = (
+        f"{'benchmark':28s} {'scale':>6s} {'seconds':>9s} {'rows/s':>12s} "
+        f"{'peak MB':>8s} {'vs base':>9s}"
+    )
+    lines = [header]
+    for r in results:
+        change = changes.get((r["name"], r["scale"]))
+        versus = ""
+        if change:
+            versus = f"{change['change']:+.0%}" + (" !" if change["regressed"] else "")
+        rate = f"{r['rows_per_sec']:,.0f}" if r["rows_per_sec"] else "-"
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        lines.append(
+            f"{r['name']:28s} {r['scale']:>6g} {r['seconds']:>9.3f} {rate:>12s} "
+            f"{rss:>8s} {versus:>9s}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run Cartly performance benchmarks")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        action="append",
+        help="Data scale (repeatable; default 1)",
+    )
+    parser.add_argument(
+        "--only", action="append", help="Run only this benchmark (repeatable)"
+    )
+    parser.add_argument("--group", action="append", help="Run only this group")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed slowdown vs baseline as a fraction (default 0.25)",
+    )
+    parser.add_argument("--work-dir", default=str(DEFAULT_WORK_DIR))
+    parser.add_argument("--history", default=None, help="History JSON file")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Mark this run as the baseline"
+    )
+    parser.add_argument("--no-save", action="store_true", help="Do not record the run")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, entry in BENCHMARKS.items():
+            print(f"  {entry['group']:10s} {name}")
+        return 0
+
+    names = args.only or list(BENCHMARKS)
+    if args.group:
+        names = [n for n in names if BENCHMARKS[n]["group"] in args.group]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {sorted(unknown)}")
+
+    history_path = args.history or Path(args.work_dir) / "history.json"
+    history = load_history(history_path)
+    results = run_benchmarks(names, args.scale, args.repeat, args.work_dir)
+    comparisons = compare(results, history, args.threshold)
+    print(format_results(results, comparisons))
+
+    if not args.no_save:
+        save_history(history_path, history, results, baseline=args.save_baseline)
+
+    regressions = [c for c in comparisons if c["regressed"]]
+    for c in regressions:
+        print(
+            f"REGRESSION: {c['name']} at scale {c['scale']:g} took "
+            f"{c['seconds']:.3f}s vs {c['baseline_seconds']:.3f}s baseline "
+            f"({c['change']:+.0%}, threshold {args.threshold:+.0%})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+On-disk columnar cache for parsed CSV tables.
+
+Parsing the raw CSVs (especially the date columns) is the slowest part of
+loading Cartly data. This module stores the typed result of a parse as an
+uncompressed Arrow IPC file, so the next load can memory-map the columns
+instead of re-parsing the text.
+
+Cache entries are keyed on the source file's resolved path, size and
+modification time plus the options that were used to parse it. Editing the
+CSV or changing the parse options therefore produces a new key and the stale
+entry is replaced on the next write.
+
+Configuration:
+    CARTLY_CACHE_DIR: Directory for cache files (default: data/.cache).
+    CARTLY_DISABLE_CACHE: Set to "1" to bypass the cache entirely.
+
+Example:
+    >>> from src.cache import clear_cache
+    >>> clear_cache()  # force every loader to re-parse its CSV
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import parse_dates
+from .schemas import narrow_integers
+
+# Bump when the on-disk layout or the key format changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "data" / ".cache"
+
+
+def _pyarrow():
+    """Import pyarrow lazily; caching is skipped when it is not installed."""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError:
+        return None
+    return pa
+
+
+def cache_dir() -> Path:
+    """Return the directory that holds cache files."""
+    return Path(os.environ.get("CARTLY_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def cache_enabled() -> bool:
+    """Return True if caching is available and not disabled by environment."""
+    if os.environ.get("CARTLY_DISABLE_CACHE", "").lower() in ("1", "true", "yes"):
+        return False
+    return _pyarrow() is not None
+
+
+def _path_tag(source: Path) -> str:
+    """Short hash identifying a source file independent of its contents."""
+    return hashlib.sha256(str(source.resolve()).encode()).hexdigest()[:8]
+
+
+def cache_key(source: Path, options: dict = None) -> str:
+    """
+    Build the cache key for a source file and its parse options.
+
+    Args:
+        source: Path to the source CSV file.
+        options: Keyword arguments that affect how the file is parsed.
+
+    Returns:
+        Hex digest that changes whenever the file or the options change.
+    """
+    source = Path(source)
+    stat = source.stat()
+    payload = {
+        "version": CACHE_VERSION,
+        "path": str(source.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "options": options or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def cache_path(source: Path, options: dict = None) -> Path:
+    """Return the cache file location for a source file and parse options."""
+    source = Path(source)
+    key = cache_key(source, options)
+    return cache_dir() / f"{source.stem}-{_path_tag(source)}-{key}.arrow"
+
+
+def read_cached(source: Path, options: dict = None):
+    """
+    Read a cached table for the source file, if a fresh entry exists.
+
+    The Arrow file is memory-mapped, so columns are paged in on demand
+    rather than copied through Python.
+
+    Args:
+        source: Path to the source CSV file.
+        options: Parse options used when the entry was written.
+
+    Returns:
+        DataFrame from the cache, or None on a miss.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        return None
+
+    path = cache_path(source, options)
+    if not path.exists():
+        return None
+
+    try:
+        with pa.memory_map(str(path), "r") as source_map:
+            table = pa.ipc.open_file(source_map).read_all()
+        return table.to_pandas()
+    except (OSError, pa.ArrowInvalid):
+        # A truncated or corrupt entry is treated as a miss and overwritten
+        return None
+
+
+def write_cached(source: Path, df: pd.DataFrame, options: dict = None) -> Path:
+    """
+    Store a parsed table in the cache, replacing stale entries for the file.
+
+    Args:
+        source: Path to the source CSV file.
+        df: Parsed DataFrame to store.
+        options: Parse options used to produce df.
+
+    Returns:
+        Path of the written cache file, or None if caching is unavailable.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        return None
+
+    source = Path(source)
+    path = cache_path(source, options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with (
+        pa.OSFile(str(tmp_path), "wb") as sink,
+        pa.ipc.new_file(sink, table.schema) as writer,
+    ):
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    for stale in path.parent.glob(f"{source.stem}-{_path_tag(source)}-*.arrow"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+    return path
+
+
+def clear_cache(source: Path = None) -> int:
+    """
+    Remove cache entries so the next load re-parses from CSV.
+
+    Args:
+        source: Only invalidate entries for this CSV file. If None, the whole
+            cache directory is cleared.
+
+    Returns:
+        Number of cache files removed.
+    """
+    directory = cache_dir()
+    if not directory.exists():
+        return 0
+
+    if source is None:
+        pattern = "*.arrow"
+    else:
+        source = Path(source)
+        pattern = f"{source.stem}-{_path_tag(source)}-*.arrow"
+
+    removed = 0
+    for path in directory.glob(pattern):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def load_csv_cached(
+    source: Path,
+    use_cache: bool = True,
+    dates: dict = None,
+    integers: dict = None,
+    **options,
+) -> pd.DataFrame:
+    """
+    Parse a CSV with pandas, going through the cache when possible.
+
+    Args:
+        source: Path to the CSV file.
+        use_cache: Set to False to always parse the CSV and skip the cache.
+        dates: Columns to parse with src.date_parsing after reading, mapped
+            to their formats. The parsed result is what gets cached.
+        integers: 64-bit integer columns to narrow after reading, mapped to
+            their dtypes (see src.schemas.narrow_integers()).
+        **options: Keyword arguments forwarded to pd.read_csv.
+
+    Returns:
+        Parsed DataFrame.
+    """
+    key_options = dict(options)
+    if dates:
+        key_options["dates"] = dates
+    if integers:
+        key_options["integers"] = integers
+    if use_cache and cache_enabled():
+        df = read_cached(source, key_options)
+        if df is not None:
+            instrumentation.add("cache_hits")
+            return df
+        instrumentation.add("cache_misses")
+
+    if instrumentation.enabled():
+        instrumentation.add("bytes_read", Path(source).stat().st_size)
+    df = pd.read_csv(source, **options)
+    if dates:
+        parse_dates(df, dates)
+    if integers:
+        narrow_integers(df, integers)
+
+    if use_cache and cache_enabled():
+        try:
+            write_cached(source, df, key_options)
+        except OSError:
+            # A read-only data directory should never break loading
+            pass
+
+    return df
@@ -0,0 +1,267 @@
+"""
+Cohort retention, revenue and repeat-purchase matrices.
+
+Customers are grouped into cohorts by the month (or week) of their
+signup_date, and every order is placed in the period it falls on relative
+to its customer's cohort: period 0 is the signup month, period 1 the month
+after, and so on. From that single assignment the engine builds, for every
+cohort x period cell:
+
+- active: customers with at least one order in the period
+- retention: active / cohort size
+- orders and revenue (sum of orders.total)
+- revenue_per_customer: cumulative revenue / cohort size
+- repeat_rate: share of the cohort that has placed a second order by the
+  end of the period
+
+Everything is computed on integer codes in one pass over the orders:
+periods are integer month or week numbers, each (cohort, period) cell is a
+flat index, and the matrices are np.bincount() over those indices. Distinct
+customers per cell come from sorting (customer, period) codes once, so the
+cost is one sort of the orders and a few linear scans - a 3-year monthly
+matrix over tens of millions of orders takes seconds.
+
+Inputs can be pandas frames (e.g. from src.data_loader) or the DuckDB
+warehouse tables; the warehouse path reads only the needed columns and
+applies the filters in SQL.
+
+Example:
+    >>> from src.cohorts import cohort_matrices
+    >>> from src.data_loader import load_customers, load_orders
+    >>> result = cohort_matrices(load_customers(), load_orders(),
+    ...                          filters={"segment": ["VIP", "Active"]})
+    >>> result["retention"].round(2)
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import parse_column
+
+GRANULARITIES = ("month", "week")
+
+MATRICES = [
+    "active",
+    "retention",
+    "orders",
+    "revenue",
+    "revenue_per_customer",
+    "repeat_rate",
+]
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def _to_days(values: pd.Series) -> tuple:
+    """
+    Dates as int64 days since 1970-01-01.
+
+    Text is parsed as %Y-%m-%d. Returns (days, valid); missing or invalid
+    dates have valid False and day 0.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values, _ = parse_column(values.astype("str"), "%Y-%m-%d")
+    valid = values.notna().to_numpy()
+    days = values.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(valid, days, 0), valid
+
+
+def _first_of_runs(values: np.ndarray) -> np.ndarray:
+    """Mask of the first element of each run of equal sorted values."""
+    first = np.ones(len(values), dtype=bool)
+    first[1:] = values[1:] != values[:-1]
+    return first
+
+
+def period_codes(days: np.ndarray, granularity: str = "month") -> np.ndarray:
+    """
+    Integer period numbers for day numbers.
+
+    Args:
+        days: int64 days since 1970-01-01.
+        granularity: "month" or "week" (weeks start on Monday).
+
+    Returns:
+        int64 months since 1970-01 or weeks since the week of 1970-01-01.
+    """
+    if granularity == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if granularity == "week":
+        return (days + _WEEK_SHIFT) // 7
+    raise ValueError(f"granularity must be one of {GRANULARITIES}, got {granularity!r}")
+
+
+def period_starts(codes: np.ndarray, granularity: str = "month") -> pd.DatetimeIndex:
+    """First day of each period code from period_codes()."""
+    if granularity == "month":
+        return pd.DatetimeIndex(codes.astype("datetime64[M]").astype("datetime64[s]"))
+    days = codes * 7 - _WEEK_SHIFT
+    return pd.DatetimeIndex(days.astype("datetime64[D]").astype("datetime64[s]"))
+
+
+def _apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    for column, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        df = df[df[column].isin(values)]
+    return df
+
+
+@instrumentation.traced("stage")
+def cohort_matrices(
+    customers: pd.DataFrame,
+    orders: pd.DataFrame,
+    granularity: str = "month",
+    max_periods: int = None,
+    filters: dict = None,
+    statuses: list = None,
+) -> dict:
+    """
+    Build cohort x period matrices from customers and orders.
+
+    Args:
+        customers: Frame with customer_id, signup_date and any filter
+            columns. Rows with a missing or invalid signup_date are left
+            out of every cohort.
+        orders: Frame with customer_id, order_date, total and (if statuses
+            is given) status. Orders placed before their customer's cohort
+            period, by customers outside the cohorts, or without a valid
+            order_date are ignored.
+        granularity: "month" or "week".
+        max_periods: Number of periods (columns) to keep, starting at 0.
+            If None, up to the latest order.
+        filters: Mapping of customer column to a value or list of values,
+            e.g. {"segment": ["VIP"]}.
+        statuses: Only count orders with these statuses. If None, all.
+
+    Returns:
+        dict with "size" (Series: customers per cohort) and one DataFrame
+        per name in MATRICES, indexed by cohort start date with periods
+        0..n as columns, plus "ignored_orders" (int).
+    """
+    customers = _apply_filters(customers, filters)
+    if statuses is not None:
+        orders = orders[orders["status"].isin(statuses)]
+
+    signup_days, has_cohort = _to_days(customers["signup_date"])
+    signup = period_codes(signup_days[has_cohort], granularity)
+    customer_ids = pd.Index(customers["customer_id"][has_cohort])
+    cohort_codes, cohort_of_customer = np.unique(signup, return_inverse=True)
+    n_cohorts = len(cohort_codes)
+
+    # Order -> customer position; -1 for customers outside the cohorts
+    position = customer_ids.get_indexer(orders["customer_id"])
+    order_days, dated = _to_days(orders["order_date"])
+    known = (position >= 0) & dated
+    position = position[known]
+    age = period_codes(order_days[known], granularity) - signup[position]
+    valid = age >= 0
+    position, age = position[valid], age[valid]
+    revenue = orders["total"].to_numpy(dtype="float64")[known][valid]
+    ignored = int(len(orders) - len(age))
+
+    n_periods = int(age.max()) + 1 if len(age) else 1
+    if max_periods is not None:
+        n_periods = max_periods
+        keep = age < n_periods
+        position, age, revenue = position[keep], age[keep], revenue[keep]
+    cells = n_cohorts * n_periods
+
+    cohort = cohort_of_customer[position]
+    cell = cohort * n_periods + age
+    order_counts = np.bincount(cell, minlength=cells)
+    revenue_sums = np.bincount(cell, weights=revenue, minlength=cells)
+
+    # One sort by (customer, period) gives the distinct active customers
+    # per cell and each customer's second order
+    pair = np.sort(position.astype(np.int64) * n_periods + age)
+    pair_customer, pair_age = pair // n_periods, pair % n_periods
+    distinct = _first_of_runs(pair)
+    active = np.bincount(
+        cohort_of_customer[pair_customer[distinct]] * n_periods + pair_age[distinct],
+        minlength=cells,
+    )
+
+    first = np.flatnonzero(_first_of_runs(pair_customer))
+    first = first[first + 1 < len(pair)]
+    second = first[pair_customer[first + 1] == pair_customer[first]] + 1
+    repeats = np.bincount(
+        cohort_of_customer[pair_customer[second]] * n_periods + pair_age[second],
+        minlength=cells,
+    )
+
+    size = np.bincount(cohort_of_customer, minlength=n_cohorts)
+    index = period_starts(cohort_codes, granularity)
+    index.name = "cohort"
+    columns = pd.RangeIndex(n_periods, name="period")
+    shape = (n_cohorts, n_periods)
+
+    def frame(values):
+        return pd.DataFrame(values.reshape(shape), index, columns)
+
+    per_customer = np.maximum(size, 1)[:, None]
+    return {
+        "size": pd.Series(size, index, name="customers"),
+        "active": frame(active),
+        "retention": frame(active.reshape(shape) / per_customer),
+        "orders": frame(order_counts),
+        "revenue": frame(revenue_sums),
+        "revenue_per_customer": frame(
+            np.cumsum(revenue_sums.reshape(shape), axis=1) / per_customer
+        ),
+        "repeat_rate": frame(np.cumsum(repeats.reshape(shape), axis=1) / per_customer),
+        "ignored_orders": ignored,
+    }
+
+
+def _in_clause(column: str, value, params: list) -> str:
+    values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+    params.extend(values)
+    return f'"{column}" IN ({", ".join("?" for _ in values)})'
+
+
+def cohort_matrices_from_warehouse(
+    granularity: str = "month",
+    max_periods: int = None,
+    filters: dict = None,
+    statuses: list = None,
+    db_path: str = None,
+    conn=None,
+) -> dict:
+    """
+    Build cohort matrices from the DuckDB warehouse tables.
+
+    Reads only customer_id, signup_date, order_date and total, with the
+    customer filters and order statuses applied in SQL.
+
+    Args:
+        granularity, max_periods, filters, statuses: See cohort_matrices().
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        conn: Existing connection to use instead of opening one.
+
+    Returns:
+        Same as cohort_matrices().
+    """
+    from .warehouse import connect, query
+
+    customer_params, order_params = [], []
+    customer_sql = "SELECT customer_id, signup_date FROM customers"
+    clauses = [_in_clause(c, v, customer_params) for c, v in (filters or {}).items()]
+    if clauses:
+        customer_sql += " WHERE " + " AND ".join(clauses)
+    order_sql = "SELECT customer_id, order_date, total FROM orders"
+    if statuses is not None:
+        order_sql += " WHERE " + _in_clause("status", statuses, order_params)
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path, read_only=True)
+    try:
+        customers = query(customer_sql, customer_params, conn=conn)
+        orders = query(order_sql, order_params, conn=conn)
+    finally:
+        if own_conn:
+            conn.close()
+
+    return cohort_matrices(customers, orders, granularity, max_periods)
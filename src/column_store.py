@@ -0,0 +1,294 @@
+"""
+Memory-mapped NumPy column store for hot analytic columns.
+
+Numeric work on orders and order_items (totals, quantities, prices, IDs)
+only needs a handful of typed columns, yet every process that loads them
+parses the CSV or copies an Arrow table into its own memory. The column
+store writes each column once as a plain .npy file and opens it with
+np.load(mmap_mode="c"):
+
+- opening is instant and reads no data; pages are loaded when a column is
+  first touched, so a DataFrame over the store is materialized lazily
+- every process that opens the same store maps the same files, so the OS
+  keeps one copy in the page cache for all of them instead of one private
+  copy per process
+- arrays are mapped copy-on-write: assigning into a column copies only the
+  touched pages into the process and never changes the files
+
+Supported column types are numeric and boolean NumPy dtypes, datetime64 and
+timedelta64, nullable integer/boolean extension types (values plus a mask
+file) and categoricals (integer codes plus categories in the manifest).
+
+Layout of a store directory:
+    manifest.json   {"version", "table", "rows", "columns": {name: spec}}
+    c000.npy        first column (c000.mask.npy for nullable columns)
+    ...
+
+Stores built by src.data_loader.load_columns() live under the cache
+directory (see src/cache.py) and are keyed on the CSV's path, size and
+modification time, so editing the CSV rebuilds them.
+
+To share data with worker processes, pass the table name (or store
+directory) and let each worker open the store itself; pickling a memory-
+mapped DataFrame would copy its data into the pickle.
+
+Example:
+    >>> from src.data_loader import load_columns
+    >>> orders = load_columns("orders", ["customer_id", "total"])
+    >>> orders.groupby("customer_id")["total"].sum()
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import _path_tag, cache_dir, cache_key
+
+# Bump when the on-disk layout changes
+STORE_VERSION = 1
+
+MANIFEST = "manifest.json"
+
+# Columns stored by default; tables not listed store every supported column
+HOT_COLUMNS = {
+    "orders": [
+        "order_id",
+        "customer_id",
+        "subtotal",
+        "shipping",
+        "tax",
+        "total",
+        "items_count",
+        "status",
+        "payment_method",
+    ],
+    "order_items": [
+        "order_id",
+        "product_id",
+        "quantity",
+        "unit_price",
+        "discount_percent",
+        "item_total",
+    ],
+}
+
+# Nullable extension dtypes, stored as NumPy values plus a mask
+MASKED_DTYPES = {
+    "Int8",
+    "Int16",
+    "Int32",
+    "Int64",
+    "UInt8",
+    "UInt16",
+    "UInt32",
+    "UInt64",
+    "Float32",
+    "Float64",
+    "boolean",
+}
+
+
+def store_dir() -> Path:
+    """Return the directory that holds column stores."""
+    return cache_dir() / "columns"
+
+
+def store_path(source: Path, table: str, columns: list = None) -> Path:
+    """
+    Return the store directory for a source CSV and column selection.
+
+    Args:
+        source: Path to the source CSV file.
+        table: Table name, used in the directory name.
+        columns: Stored columns; part of the key.
+
+    Returns:
+        Path of the store directory (which may not exist yet).
+    """
+    source = Path(source)
+    key = cache_key(source, {"store": STORE_VERSION, "columns": columns})
+    return store_dir() / f"{table}-{_path_tag(source)}-{key}"
+
+
+def supports(dtype) -> bool:
+    """Return True if columns of this dtype can be stored."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return True
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return dtype.name in MASKED_DTYPES
+    return np.dtype(dtype).kind in "biufmM"
+
+
+def _column_files(series: pd.Series) -> tuple:
+    """Arrays to write for a column, and its manifest spec."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        spec = {
+            "kind": "category",
+            "categories": dtype.categories.tolist(),
+            "ordered": bool(dtype.ordered),
+        }
+        return {"": series.cat.codes.to_numpy()}, spec
+    if dtype.name in MASKED_DTYPES:
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        spec = {"kind": "masked", "dtype": dtype.name}
+        return {"": values, ".mask": series.isna().to_numpy()}, spec
+    return {"": series.to_numpy()}, {"kind": "numpy"}
+
+
+def write_store(df: pd.DataFrame, directory: Path, table: str = None) -> Path:
+    """
+    Write a DataFrame as a column store, replacing any existing one.
+
+    The store is written to a temporary directory and renamed into place,
+    so readers never see a partial store.
+
+    Args:
+        df: Columns to store; every dtype must pass supports().
+        directory: Store directory to create.
+        table: Table name recorded in the manifest.
+
+    Returns:
+        The store directory.
+
+    Raises:
+        TypeError: If a column has an unsupported dtype (e.g. text).
+    """
+    for column, dtype in df.dtypes.items():
+        if not supports(dtype):
+            raise TypeError(
+                f"Column '{column}' has dtype {dtype}; the column store holds "
+                "numeric, boolean, datetime and categorical columns"
+            )
+
+    directory = Path(directory)
+    tmp_dir = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    manifest = {"version": STORE_VERSION, "table": table, "rows": len(df)}
+    manifest["columns"] = {}
+    for position, column in enumerate(df.columns):
+        stem = f"c{position:03d}"
+        arrays, spec = _column_files(df[column])
+        for suffix, values in arrays.items():
+            np.save(tmp_dir / f"{stem}{suffix}.npy", np.ascontiguousarray(values))
+        manifest["columns"][column] = {"file": stem, **spec}
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, default=str))
+
+    shutil.rmtree(directory, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, directory)
+    except OSError:
+        # Another process finished the same store first; keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not (directory / MANIFEST).exists():
+            raise
+    return directory
+
+
+def build_store(
+    df: pd.DataFrame, source: Path, table: str, columns: list = None
+) -> Path:
+    """
+    Write the store for a source CSV and remove its stale stores.
+
+    Args:
+        df: Parsed table, already limited to the columns to store.
+        source: CSV the table was parsed from.
+        table: Table name.
+        columns: Column selection passed to store_path() (None for all).
+
+    Returns:
+        The store directory.
+    """
+    directory = write_store(df, store_path(source, table, columns), table)
+    for stale in store_dir().glob(f"{table}-{_path_tag(Path(source))}-*"):
+        if stale != directory and not stale.name.endswith(".tmp"):
+            shutil.rmtree(stale, ignore_errors=True)
+    return directory
+
+
+def read_manifest(directory: Path) -> dict:
+    """
+    Read a store's manifest.
+
+    Raises:
+        FileNotFoundError: If the directory holds no store.
+    """
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        raise FileNotFoundError(f"Column store not found: {directory}")
+    return json.loads(path.read_text())
+
+
+def _open_column(directory: Path, spec: dict):
+    values = np.load(directory / f"{spec['file']}.npy", mmap_mode="c")
+    if spec["kind"] == "category":
+        dtype = pd.CategoricalDtype(spec["categories"], ordered=spec["ordered"])
+        return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+    if spec["kind"] == "masked":
+        mask = np.load(directory / f"{spec['file']}.mask.npy", mmap_mode="c")
+        array_type = pd.api.types.pandas_dtype(spec["dtype"]).construct_array_type()
+        return array_type(values, mask, copy=False)
+    return values
+
+
+def open_store(directory: Path, columns: list = None) -> pd.DataFrame:
+    """
+    Open a column store as a DataFrame backed by memory-mapped files.
+
+    No column data is read here; the OS pages it in when it is used.
+
+    Args:
+        directory: Store directory.
+        columns: Columns to open. If None, all stored columns.
+
+    Returns:
+        DataFrame whose columns share memory with the .npy files.
+
+    Raises:
+        FileNotFoundError: If the directory holds no store.
+        KeyError: If a requested column is not stored.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    stored = manifest["columns"]
+    columns = list(stored) if columns is None else list(columns)
+    missing = [column for column in columns if column not in stored]
+    if missing:
+        raise KeyError(f"Columns not in store: {missing}. Available: {list(stored)}")
+
+    data = {
+        column: pd.Series(_open_column(directory, stored[column]), copy=False)
+        for column in columns
+    }
+    index = pd.RangeIndex(manifest["rows"])
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def clear_stores(source: Path = None, table: str = None) -> int:
+    """
+    Remove column stores.
+
+    Args:
+        source: Only remove stores built from this CSV (requires table).
+        table: Table name the stores were built for.
+
+    Returns:
+        Number of store directories removed.
+    """
+    directory = store_dir()
+    if not directory.exists():
+        return 0
+    pattern = "*" if source is None else f"{table}-{_path_tag(Path(source))}-*"
+    removed = 0
+    for path in directory.glob(pattern):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,374 @@
+"""
+Materialized revenue cubes in the DuckDB warehouse.
+
+Revenue investigations keep grouping orders joined to order_items, products
+and categories by day, category, payment method and city. This module
+stores those aggregates once, at the finest grain the dashboards need, and
+answers roll-ups from the stored cells:
+
+- cube_category_revenue: order_date x category x payment_method x
+  shipping_city, with item revenue (item_total), margin (item revenue times
+  categories.margin), units and category_orders (orders with at least one
+  item in the category)
+- cube_order_revenue: order_date x payment_method x shipping_city, with
+  orders and gross_revenue (orders.total, including tax and shipping)
+
+Order counts are kept in their own cube because they do not add up across
+categories: an order with items in two categories is counted in both.
+Rolling orders or aov up over category therefore raises instead of
+double counting; use category_orders for per-category counts.
+
+Both cubes are partitioned by order_date. update_cubes() loads new orders
+through src/incremental.py and recomputes only the days those orders (or
+the orders of new items) fall on. A full rebuild happens when a source
+table was rebuilt from scratch, e.g. after categories.csv changed.
+
+Usage:
+    python -m src.cubes build
+    python -m src.cubes update
+    python -m src.cubes rollup --by category --by month --measure revenue
+
+Example:
+    >>> from src.cubes import rollup
+    >>> rollup(["category"], ["revenue", "margin"], start="2024-10-01")
+"""
+
+import argparse
+import sys
+
+import pandas as pd
+
+from . import incremental, instrumentation, warehouse
+
+# Cube tables: dimension SQL and measure (SQL, DuckDB type) per cube
+CUBES = {
+    "cube_category_revenue": {
+        "dimensions": {
+            "order_date": "o.order_date",
+            "category": "c.name",
+            "payment_method": "o.payment_method",
+            "shipping_city": "o.shipping_city",
+        },
+        "measures": {
+            "revenue": ("SUM(i.item_total)", "DOUBLE"),
+            "margin": ("SUM(i.item_total * c.margin)", "DOUBLE"),
+            "units": ("SUM(i.quantity)", "BIGINT"),
+            "category_orders": ("COUNT(DISTINCT o.order_id)", "BIGINT"),
+        },
+        "source": """
+            orders o
+            JOIN order_items i ON i.order_id = o.order_id
+            LEFT JOIN products p ON p.id = i.product_id
+            LEFT JOIN categories c ON c.id = p.category_id
+        """,
+    },
+    "cube_order_revenue": {
+        "dimensions": {
+            "order_date": "o.order_date",
+            "payment_method": "o.payment_method",
+            "shipping_city": "o.shipping_city",
+        },
+        "measures": {
+            "orders": ("COUNT(*)", "BIGINT"),
+            "gross_revenue": ("SUM(o.total)", "DOUBLE"),
+        },
+        "source": "orders o",
+    },
+}
+
+# Warehouse tables the cubes are computed from
+SOURCE_TABLES = ["orders", "order_items", "products", "categories"]
+
+# Measures derived from stored ones at query time
+DERIVED_MEASURES = {
+    "aov": ("gross_revenue / orders", ["gross_revenue", "orders"]),
+    "margin_rate": ("margin / revenue", ["margin", "revenue"]),
+}
+
+# Time buckets accepted as roll-up dimensions (date_trunc parts)
+PERIODS = ("day", "week", "month", "quarter", "year")
+
+DEFAULT_MEASURES = ["revenue", "orders", "aov"]
+
+
+def _cube_select(name: str, where: str = None) -> str:
+    """Aggregation query that computes a cube, optionally for some rows."""
+    cube = CUBES[name]
+    dimensions = [f'{sql} AS "{d}"' for d, sql in cube["dimensions"].items()]
+    measures = [
+        f'CAST({sql} AS {duck_type}) AS "{m}"'
+        for m, (sql, duck_type) in cube["measures"].items()
+    ]
+    sql = f"SELECT {', '.join(dimensions + measures)} FROM {cube['source']}"
+    if where:
+        sql += f" WHERE {where}"
+    return sql + ' GROUP BY ALL ORDER BY "order_date"'
+
+
+@instrumentation.traced("stage")
+def build_cubes(conn, cubes: list = None) -> dict:
+    """
+    Compute cubes from scratch, replacing existing cube tables.
+
+    Args:
+        conn: Open warehouse connection holding SOURCE_TABLES.
+        cubes: Cube names. If None, every cube in CUBES.
+
+    Returns:
+        Dict mapping cube name to its number of cells.
+    """
+    counts = {}
+    for name in cubes or list(CUBES):
+        conn.execute(f"CREATE OR REPLACE TABLE {name} AS {_cube_select(name)}")
+        counts[name] = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    return counts
+
+
+def refresh_days(conn, days, cubes: list = None) -> int:
+    """
+    Recompute the cube partitions of the given order dates.
+
+    Args:
+        conn: Open warehouse connection with built cubes.
+        days: Iterable of dates (datetime.date or "YYYY-MM-DD").
+        cubes: Cube names. If None, every cube in CUBES.
+
+    Returns:
+        Number of days refreshed.
+    """
+    days = sorted({pd.Timestamp(day).date() for day in days})
+    if not days:
+        return 0
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute("CREATE OR REPLACE TEMP TABLE _days (day DATE)")
+        conn.executemany("INSERT INTO _days VALUES (?)", [[day] for day in days])
+        for name in cubes or list(CUBES):
+            conn.execute(
+                f"DELETE FROM {name} WHERE order_date IN (SELECT day FROM _days)"
+            )
+            where = "o.order_date IN (SELECT day FROM _days)"
+            conn.execute(f"INSERT INTO {name} {_cube_select(name, where)}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DROP TABLE IF EXISTS _days")
+    return len(days)
+
+
+def _existing_tables(conn) -> set:
+    rows = conn.execute("SELECT table_name FROM information_schema.tables")
+    return {row[0] for row in rows.fetchall()}
+
+
+@instrumentation.traced("stage")
+def update_cubes(db_path: str = None, data_dir: str = None) -> dict:
+    """
+    Bring the source tables and cubes up to date with the CSVs.
+
+    Reference tables are refreshed with build_warehouse(), new orders and
+    order items are loaded with src/incremental.py, and only the days they
+    fall on are recomputed. Cubes are rebuilt in full if a cube or order
+    table was missing, or products or categories were reloaded.
+
+    Args:
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+
+    Returns:
+        dict with "rebuilt" (bool) and "days" (number of days refreshed).
+    """
+    actions = warehouse.build_warehouse(db_path, data_dir, ["products", "categories"])
+    conn = warehouse.connect(db_path)
+    try:
+        needed = set(CUBES) | set(incremental.INCREMENTAL_TABLES)
+        rebuild = "built" in actions.values() or not needed <= _existing_tables(conn)
+    finally:
+        conn.close()
+
+    days = set()
+    for stats in incremental.refresh(db_path, data_dir).values():
+        days |= stats["order_dates"]
+
+    conn = warehouse.connect(db_path)
+    try:
+        if rebuild:
+            build_cubes(conn)
+            return {"rebuilt": True, "days": 0}
+        return {"rebuilt": False, "days": refresh_days(conn, days)}
+    finally:
+        conn.close()
+
+
+def _dimension_sql(dimension: str, cube: dict) -> str:
+    if dimension in PERIODS:
+        return f"date_trunc('{dimension}', order_date)::DATE"
+    if dimension not in cube["dimensions"]:
+        raise KeyError(f"Unknown dimension '{dimension}'")
+    return f'"{dimension}"'
+
+
+def _filter_sql(filters: dict, start, end) -> tuple:
+    """WHERE clause and parameters for dimension filters and a date range."""
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if column in PERIODS:
+            # Any date inside a bucket selects it, e.g. "2024-10" for a month
+            bucket = f"date_trunc('{column}', ?::DATE)::DATE"
+            placeholders = ", ".join(bucket for _ in values)
+            clauses.append(
+                f"date_trunc('{column}', order_date)::DATE IN ({placeholders})"
+            )
+            params.extend(pd.Timestamp(v).date() for v in values)
+            continue
+        placeholders = ", ".join("?" for _ in values)
+        clauses.append(f'"{column}" IN ({placeholders})')
+        params.extend(values)
+    if start is not None:
+        clauses.append("order_date >= ?")
+        params.append(pd.Timestamp(start).date())
+    if end is not None:
+        clauses.append("order_date < ?")
+        params.append(pd.Timestamp(end).date())
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+@instrumentation.traced("query")
+def rollup(
+    dimensions: list = None,
+    measures: list = None,
+    filters: dict = None,
+    start: str = None,
+    end: str = None,
+    db_path: str = None,
+    conn=None,
+) -> pd.DataFrame:
+    """
+    Aggregate the cubes to a coarser grain.
+
+    Args:
+        dimensions: Cube dimensions and/or time buckets from PERIODS
+            ("week", "month", ...), e.g. ["month", "category"]. None or []
+            gives grand totals.
+        measures: Stored measures of either cube or DERIVED_MEASURES.
+            Defaults to DEFAULT_MEASURES.
+        filters: Mapping of dimension to a value or list of values. A time
+            bucket from PERIODS takes dates inside the buckets wanted,
+            e.g. {"month": "2024-10"}.
+        start: First order date to include (inclusive).
+        end: Order date to stop at (exclusive).
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        conn: Existing connection to use instead of opening one.
+
+    Returns:
+        DataFrame with one row per combination of dimensions, sorted by
+        them, and one column per measure.
+
+    Raises:
+        KeyError: For an unknown dimension (grouped or filtered) or measure.
+        ValueError: If an order-level measure is grouped or filtered by
+            category.
+    """
+    dimensions = list(dimensions or [])
+    measures = list(measures or DEFAULT_MEASURES)
+    used = set(dimensions) | set(filters or {})
+    known = list(
+        dict.fromkeys(d for cube in CUBES.values() for d in cube["dimensions"])
+    )
+    known.extend(PERIODS)
+    unknown = sorted(used - set(known))
+    if unknown:
+        raise KeyError(f"Unknown dimension '{unknown[0]}'. Available: {known}")
+
+    stored = []
+    for measure in measures:
+        if measure in DERIVED_MEASURES:
+            stored.extend(DERIVED_MEASURES[measure][1])
+        elif any(measure in cube["measures"] for cube in CUBES.values()):
+            stored.append(measure)
+        else:
+            raise KeyError(f"Unknown measure '{measure}'")
+    stored = list(dict.fromkeys(stored))
+
+    own_conn = conn is None
+    if own_conn:
+        conn = warehouse.connect(db_path, read_only=True)
+    try:
+        result = None
+        for name, cube in CUBES.items():
+            wanted = [m for m in stored if m in cube["measures"]]
+            if not wanted:
+                continue
+            invalid = used - set(cube["dimensions"]) - set(PERIODS)
+            if invalid:
+                raise ValueError(
+                    f"Measures {wanted} cannot be split by {sorted(invalid)}; "
+                    "orders span several categories (use category_orders)"
+                )
+            keys = [f'{_dimension_sql(d, cube)} AS "{d}"' for d in dimensions]
+            sums = [
+                f'CAST(SUM("{m}") AS {cube["measures"][m][1]}) AS "{m}"' for m in wanted
+            ]
+            where, params = _filter_sql(filters, start, end)
+            sql = f"SELECT {', '.join(keys + sums)} FROM {name}{where}"
+            if dimensions:
+                sql += " GROUP BY ALL"
+            part = warehouse.query(sql, params, conn=conn)
+            if result is None:
+                result = part
+            elif dimensions:
+                result = result.merge(part, on=dimensions, how="outer")
+            else:
+                result = pd.concat([result, part], axis=1)
+    finally:
+        if own_conn:
+            conn.close()
+
+    for measure in measures:
+        if measure in DERIVED_MEASURES:
+            result[measure] = result.eval(DERIVED_MEASURES[measure][0])
+    if dimensions:
+        result = result.sort_values(dimensions, ignore_index=True)
+    return result[dimensions + measures]
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Build and query revenue cubes")
+    parser.add_argument("command", choices=["build", "update", "rollup"])
+    parser.add_argument("--db", default=None, help="Path to the .duckdb file")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    parser.add_argument("--by", action="append", help="Roll-up dimension")
+    parser.add_argument("--measure", action="append", help="Roll-up measure")
+    parser.add_argument("--start", default=None, help="First order date")
+    parser.add_argument("--end", default=None, help="End order date (exclusive)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        warehouse.build_warehouse(args.db, args.data_dir, SOURCE_TABLES)
+        conn = warehouse.connect(args.db)
+        try:
+            for name, cells in build_cubes(conn).items():
+                print(f"  {name}: {cells} cells")
+        finally:
+            conn.close()
+    elif args.command == "update":
+        result = update_cubes(args.db, args.data_dir)
+        action = (
+            "rebuilt" if result["rebuilt"] else f"{result['days']} day(s) refreshed"
+        )
+        print(f"  cubes {action}")
+    else:
+        print(
+            rollup(
+                args.by, args.measure, start=args.start, end=args.end, db_path=args.db
+            ).to_string(index=False)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,20 +4,134 @@ Data loading utilities for Cartly analytics.
 This module provides functions for loading data from CSV files with proper
 type handling and date parsing.
 
+Parsed tables are cached on disk in a columnar format (see src/cache.py), so
+repeated loads of an unchanged CSV skip parsing. Pass use_cache=False to a
+loader to bypass the cache, or call clear_cache() to force a refresh.
+
+Column dtypes come from the schema registry in src/schemas.py: repeated
+labels are loaded as categoricals and numeric columns use the narrowest
+type that fits, which keeps the loaded tables small.
+
+For files too large to hold in memory, iter_table() and the iter_* variants
+yield the same typed, date-parsed rows in fixed-size chunks. Reducers that
+consume those chunks live in src/streaming.py.
+
+load_all() reads several tables concurrently and returns them together as a
+Dataset, so loading the whole warehouse takes about as long as its largest
+file.
+
+Schema date columns are parsed with the vectorized fixed-layout parser in
+src/date_parsing.py rather than by read_csv; malformed values become NaT.
+
+load_columns() serves the hot numeric columns of a table from a
+memory-mapped NumPy column store (see src/column_store.py): the DataFrame
+it returns reads no data until used, and processes on the same machine
+share one page-cache copy of the columns.
+
+Once the DuckDB warehouse has been built (python -m src.warehouse),
+load_from_warehouse() serves typed tables from it without any CSV parsing.
+
+Date-bounded reads of orders, order_items and website_sessions can use
+load_partitioned(), which reads a Hive-style layout partitioned by month
+(and shipping country) and opens only the partitions a date range and
+country list can match (see src/partitioning.py).
+
+To read only part of a table, build a lazy query with scan() (or
+scan_warehouse()) and col(): filters and column selections are pushed down
+into the reader, and nothing runs until collect() (see src/lazy.py).
+
 NOTE: This file has an intentional bug in the date parsing!
 Task 1.3 asks students to fix this bug.
 """
 
-import pandas as pd
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import pandas as pd
+
+from . import column_store, instrumentation, partitioning
+from .cache import clear_cache, load_csv_cached  # noqa: F401 (re-exported)
+from .date_parsing import parse_dates
+from .lazy import col, scan, scan_warehouse  # noqa: F401 (re-exported)
+from .schemas import SCHEMAS, get_schema, integer_columns, narrow_integers, read_options
+from .warehouse import fetch_table
+
+DATA_DIR = Path(__file__).parent.parent / "data"
 
-def load_orders(data_path: str = None) -> pd.DataFrame:
+DEFAULT_CHUNKSIZE = 100_000
+
+# Date parsing for orders.csv, shared by load_orders() and iter_orders().
+# BUG: Wrong date format specified!
+# The actual data uses YYYY-MM-DD format, but we're specifying MM/DD/YYYY
+# This causes dates to be parsed incorrectly or as NaT
+# Students should fix this by using the correct format or letting pandas infer
+ORDERS_DATE_OPTIONS = {
+    "parse_dates": ["order_date"],
+    "date_format": "%m/%d/%Y",  # BUG: Should be '%Y-%m-%d' or removed entirely
+}
+
+
+def _resolve_path(table: str, data_path: str = None) -> Path:
+    """Return the CSV path for a table, checking that it exists."""
+    schema = get_schema(table)
+    if data_path is None:
+        # Default path relative to this file
+        data_path = DATA_DIR / schema["file"]
+    else:
+        data_path = Path(data_path)
+
+    if not data_path.exists():
+        raise FileNotFoundError(f"{schema['label']} file not found: {data_path}")
+
+    return data_path
+
+
+def _table_options(table: str) -> dict:
+    """Return the read_csv options used for a table by every loader."""
+    options = read_options(table)
+    if table == "orders":
+        options.update(ORDERS_DATE_OPTIONS)
+    else:
+        # Schema dates are parsed by src.date_parsing after reading instead
+        options.pop("parse_dates", None)
+        options.pop("date_format", None)
+    return options
+
+
+def _table_dates(table: str) -> dict:
+    """Return the date columns parsed with src.date_parsing, with formats."""
+    if table == "orders":
+        return {}
+    return get_schema(table)["dates"]
+
+
+def _load_table(
+    table: str, data_path: str = None, use_cache: bool = True
+) -> pd.DataFrame:
+    """Load a registered table with its schema applied at parse time."""
+    data_path = _resolve_path(table, data_path)
+    with instrumentation.span(f"data_loader.load_{table}", "loader") as record:
+        df = load_csv_cached(
+            data_path,
+            use_cache=use_cache,
+            dates=_table_dates(table),
+            integers=integer_columns(table),
+            **_table_options(table),
+        )
+        record["rows_out"] = len(df)
+    return df
+
+
+def load_orders(data_path: str = None, use_cache: bool = True) -> pd.DataFrame:
     """
     Load orders data from CSV with date parsing.
 
     Args:
         data_path: Path to the orders CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
 
     Returns:
         DataFrame with orders data, including parsed date columns.
@@ -27,34 +141,20 @@ def load_orders(data_path: str = None) -> pd.DataFrame:
         >>> orders['order_date'].dtype
         datetime64[ns]
     """
-    if data_path is None:
-        # Default path relative to this file
-        data_path = Path(__file__).parent.parent / "data" / "orders.csv"
-    else:
-        data_path = Path(data_path)
-
-    if not data_path.exists():
-        raise FileNotFoundError(f"Orders file not found: {data_path}")
-
-    # BUG: Wrong date format specified!
-    # The actual data uses YYYY-MM-DD format, but we're specifying MM/DD/YYYY
-    # This causes dates to be parsed incorrectly or as NaT
-    # Students should fix this by using the correct format or letting pandas infer
-    df = pd.read_csv(
-        data_path,
-        parse_dates=["order_date"],
-        date_format="%m/%d/%Y",  # BUG: Should be '%Y-%m-%d' or removed entirely
-    )
+    # Dates are parsed with ORDERS_DATE_OPTIONS (see the BUG note above)
+    df = _load_table("orders", data_path, use_cache=use_cache)
 
     return df
 
 
-def load_customers(data_path: str = None) -> pd.DataFrame:
+def load_customers(data_path: str = None, use_cache: bool = True) -> pd.DataFrame:
     """
     Load customers data from CSV.
 
     Args:
         data_path: Path to the customers CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
 
     Returns:
         DataFrame with customers data.
@@ -64,35 +164,429 @@ def load_customers(data_path: str = None) -> pd.DataFrame:
         >>> 'email' in customers.columns
         True
     """
-    if data_path is None:
-        data_path = Path(__file__).parent.parent / "data" / "customers.csv"
-    else:
-        data_path = Path(data_path)
+    return _load_table("customers", data_path, use_cache=use_cache)
 
-    if not data_path.exists():
-        raise FileNotFoundError(f"Customers file not found: {data_path}")
-
-    df = pd.read_csv(data_path)
-    return df
 
-
-def load_products(data_path: str = None) -> pd.DataFrame:
+def load_products(data_path: str = None, use_cache: bool = True) -> pd.DataFrame:
     """
     Load products data from CSV.
 
     Args:
         data_path: Path to the products CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
 
     Returns:
         DataFrame with products data.
     """
-    if data_path is None:
-        data_path = Path(__file__).parent.parent / "data" / "products.csv"
-    else:
-        data_path = Path(data_path)
+    return _load_table("products", data_path, use_cache=use_cache)
 
-    if not data_path.exists():
-        raise FileNotFoundError(f"Products file not found: {data_path}")
 
-    df = pd.read_csv(data_path)
-    return df
+def load_categories(data_path: str = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Load product categories (with margins) from CSV.
+
+    Args:
+        data_path: Path to the categories CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
+
+    Returns:
+        DataFrame with categories data.
+    """
+    return _load_table("categories", data_path, use_cache=use_cache)
+
+
+def load_order_items(data_path: str = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Load order line items from CSV.
+
+    Args:
+        data_path: Path to the order items CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
+
+    Returns:
+        DataFrame with one row per order line.
+    """
+    return _load_table("order_items", data_path, use_cache=use_cache)
+
+
+def load_website_sessions(
+    data_path: str = None, use_cache: bool = True
+) -> pd.DataFrame:
+    """
+    Load website sessions from CSV.
+
+    Args:
+        data_path: Path to the sessions CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
+
+    Returns:
+        DataFrame with sessions data, with session_date parsed.
+    """
+    return _load_table("website_sessions", data_path, use_cache=use_cache)
+
+
+def load_customer_support(
+    data_path: str = None, use_cache: bool = True
+) -> pd.DataFrame:
+    """
+    Load customer support tickets from CSV.
+
+    Args:
+        data_path: Path to the support CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
+
+    Returns:
+        DataFrame with tickets, with created_date and resolved_date parsed.
+    """
+    return _load_table("customer_support", data_path, use_cache=use_cache)
+
+
+def load_marketing_campaigns(
+    data_path: str = None, use_cache: bool = True
+) -> pd.DataFrame:
+    """
+    Load marketing campaign performance from CSV.
+
+    Args:
+        data_path: Path to the campaigns CSV file. If None, uses default location.
+        use_cache: Read the parsed table from the columnar cache when the CSV
+            is unchanged. Set to False to always re-parse.
+
+    Returns:
+        DataFrame with campaigns, with start_date and end_date parsed.
+    """
+    return _load_table("marketing_campaigns", data_path, use_cache=use_cache)
+
+
+def iter_table(
+    table: str, data_path: str = None, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a registered table from CSV in chunks.
+
+    Each chunk is parsed with the same schema and date options as the eager
+    loader, so code written against load_<table>() works per chunk.
+    Categorical columns are categorical in every chunk, but each chunk only
+    knows the categories it contains; combine chunks with pd.concat and
+    re-apply astype("category") if a single frame is needed.
+
+    Chunks are never cached; only one chunk is held in memory at a time.
+
+    Args:
+        table: Table name registered in src/schemas.py, e.g. "orders".
+        data_path: Path to the CSV file. If None, uses default location.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        Iterator of DataFrame chunks of at most chunksize rows.
+
+    Raises:
+        FileNotFoundError: If the CSV file does not exist.
+        ValueError: If chunksize is not positive.
+
+    Example:
+        >>> total = sum(len(chunk) for chunk in iter_table("orders"))
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be positive, got {chunksize}")
+
+    data_path = _resolve_path(table, data_path)
+    return _iter_chunks(
+        data_path,
+        chunksize,
+        _table_options(table),
+        _table_dates(table),
+        integer_columns(table),
+    )
+
+
+@instrumentation.traced("loader", name="data_loader.iter_table")
+def _iter_chunks(
+    data_path: Path, chunksize: int, options: dict, dates: dict, integers: dict
+):
+    """Yield parsed chunks; kept separate so iter_table() validates eagerly."""
+    instrumentation.add("bytes_read", data_path.stat().st_size)
+    with pd.read_csv(data_path, chunksize=chunksize, **options) as reader:
+        for chunk in reader:
+            parse_dates(chunk, dates)
+            narrow_integers(chunk, integers)
+            yield chunk
+
+
+def iter_orders(
+    data_path: str = None, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream orders from CSV in chunks typed like load_orders().
+
+    Args:
+        data_path: Path to the orders CSV file. If None, uses default location.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        Iterator of DataFrame chunks of orders.
+    """
+    return iter_table("orders", data_path, chunksize)
+
+
+def iter_order_items(
+    data_path: str = None, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream order line items from CSV in chunks typed like load_order_items().
+
+    Args:
+        data_path: Path to the order items CSV file. If None, uses default location.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        Iterator of DataFrame chunks of order items.
+    """
+    return iter_table("order_items", data_path, chunksize)
+
+
+def iter_website_sessions(
+    data_path: str = None, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream website sessions from CSV in chunks typed like load_website_sessions().
+
+    Args:
+        data_path: Path to the sessions CSV file. If None, uses default location.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        Iterator of DataFrame chunks of sessions.
+    """
+    return iter_table("website_sessions", data_path, chunksize)
+
+
+class Dataset:
+    """
+    A set of loaded Cartly tables, returned by load_all().
+
+    Tables are available by attribute or by key, e.g. data.orders or
+    data["orders"]. The seconds spent loading each table are kept in
+    data.timings.
+    """
+
+    def __init__(self, tables: dict, timings: dict = None):
+        self.tables = tables
+        self.timings = timings or {}
+
+    def __getattr__(self, name: str) -> pd.DataFrame:
+        tables = self.__dict__.get("tables", {})
+        if name in tables:
+            return tables[name]
+        raise AttributeError(f"Dataset has no table '{name}'")
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.tables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tables
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __repr__(self) -> str:
+        shapes = ", ".join(
+            f"{name}={len(df):,} rows" for name, df in self.tables.items()
+        )
+        return f"Dataset({shapes})"
+
+    def memory_usage(self) -> pd.Series:
+        """Return the deep memory usage of each table in bytes."""
+        return pd.Series(
+            {
+                name: int(df.memory_usage(deep=True).sum())
+                for name, df in self.tables.items()
+            }
+        )
+
+
+def _timed_load(table: str, data_path, use_cache: bool):
+    """Load one table and measure it; module-level so processes can run it."""
+    start = time.perf_counter()
+    df = _load_table(table, data_path, use_cache=use_cache)
+    return df, time.perf_counter() - start
+
+
+@instrumentation.traced("loader")
+def load_all(
+    tables: list = None,
+    workers: int = None,
+    data_dir: str = None,
+    use_cache: bool = True,
+    executor: str = "thread",
+) -> Dataset:
+    """
+    Load several tables concurrently.
+
+    Each table is loaded exactly as its load_<table>() function would load
+    it (same schema, date options and cache), so results are identical to
+    sequential loading. Threads suit warm loads, which are memory-mapped
+    cache reads; use executor="process" to spread cold CSV parses of large
+    files over CPU cores.
+
+    Args:
+        tables: Table names to load. If None, loads every table in
+            src/schemas.py.
+        workers: Maximum number of concurrent loads. If None, one per table.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        use_cache: Passed to each loader; see load_orders().
+        executor: "thread" or "process".
+
+    Returns:
+        Dataset with one DataFrame per table.
+
+    Example:
+        >>> data = load_all(["orders", "order_items", "products"])
+        >>> data.orders.shape
+        (7076, 13)
+    """
+    tables = list(SCHEMAS) if tables is None else list(tables)
+    for table in tables:
+        get_schema(table)  # fail fast on unknown names
+    if executor not in ("thread", "process"):
+        raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+
+    paths = {}
+    for table in tables:
+        if data_dir is not None:
+            paths[table] = Path(data_dir) / get_schema(table)["file"]
+        paths[table] = _resolve_path(table, paths.get(table))
+
+    workers = workers or len(tables) or 1
+    threads = executor == "thread"
+    pool_class = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        futures = {}
+        for table in tables:
+            # Loader spans in worker threads nest under this call's span
+            task = instrumentation.propagate(_timed_load) if threads else _timed_load
+            futures[table] = pool.submit(task, table, paths[table], use_cache)
+        results = {table: future.result() for table, future in futures.items()}
+
+    return Dataset(
+        tables={table: df for table, (df, _) in results.items()},
+        timings={table: seconds for table, (_, seconds) in results.items()},
+    )
+
+
+@instrumentation.traced("loader")
+def load_from_warehouse(
+    table: str, columns: list = None, where: str = None, db_path: str = None
+) -> pd.DataFrame:
+    """
+    Load a table from the DuckDB warehouse instead of its CSV.
+
+    The warehouse stores real DATE/TIMESTAMP columns, so order_date and
+    signup_date come back as datetimes. Only the requested columns and rows
+    are read.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        columns: Columns to read. If None, reads all columns.
+        where: Optional SQL predicate, e.g. "shipping_country = 'India'".
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+
+    Returns:
+        DataFrame typed like the CSV loaders.
+
+    Example:
+        >>> october = load_from_warehouse(
+        ...     "orders", where="order_date >= DATE '2024-10-01'"
+        ... )
+    """
+    return fetch_table(table, columns=columns, where=where, db_path=db_path)
+
+
+@instrumentation.traced("loader")
+def load_columns(
+    table: str, columns: list = None, data_path: str = None, rebuild: bool = False
+) -> pd.DataFrame:
+    """
+    Load columns from the memory-mapped column store, building it if needed.
+
+    The first call parses the CSV (through the regular loader) and writes
+    the table's HOT_COLUMNS to .npy files; later calls, in any process, only
+    map those files. The store is rebuilt when the CSV changes.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        columns: Columns to return. If None, every stored column.
+        data_path: Path to the CSV file. If None, uses default location.
+        rebuild: Rewrite the store even if it is up to date.
+
+    Returns:
+        DataFrame backed by copy-on-write memory-mapped arrays.
+
+    Raises:
+        KeyError: If a requested column is not in the store.
+
+    Example:
+        >>> items = load_columns("order_items", ["quantity", "item_total"])
+        >>> (items["item_total"] / items["quantity"]).mean()
+    """
+    data_path = _resolve_path(table, data_path)
+    stored = column_store.HOT_COLUMNS.get(table)
+    directory = column_store.store_path(data_path, table, stored)
+
+    if rebuild or not (directory / column_store.MANIFEST).exists():
+        df = _load_table(table, data_path)
+        if stored is None:
+            kept = [c for c, d in df.dtypes.items() if column_store.supports(d)]
+        else:
+            kept = stored
+        column_store.build_store(df[kept], data_path, table, stored)
+
+    return column_store.open_store(directory, columns)
+
+
+def load_partitioned(
+    table: str,
+    start=None,
+    end=None,
+    countries: list = None,
+    columns: list = None,
+    data_dir: str = None,
+    root: str = None,
+    by_country: bool = True,
+) -> pd.DataFrame:
+    """
+    Load the rows of a table in a date range, reading only their partitions.
+
+    The partitioned layout is built from the CSVs on first use and rebuilt
+    when they change; after that only the matching Parquet partitions are
+    read. Rows equal those of the CSV loader filtered to the same dates and
+    countries.
+
+    Args:
+        table: "orders", "order_items" or "website_sessions".
+        start: First date to include, e.g. "2024-10-01". None for no bound.
+        end: Last date to include (the whole day). None for no bound.
+        countries: Shipping countries to include (orders and order_items).
+        columns: Columns to return. If None, all columns.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        root: Layout root. If None, a directory under the cache directory.
+        by_country: Partition orders and their items by country as well.
+
+    Returns:
+        DataFrame typed like the CSV loaders.
+
+    Example:
+        >>> october = load_partitioned(
+        ...     "orders", "2024-10-01", "2024-10-31", countries=["India"]
+        ... )
+    """
+    root = partitioning.build_partitions([table], data_dir, root, by_country)
+    return partitioning.read_partitions(table, start, end, countries, columns, root)
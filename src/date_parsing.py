@@ -0,0 +1,394 @@
+"""
+Fast parsing of the fixed ISO date and time layouts used in the Cartly CSVs.
+
+Every date in the data uses one of a few fixed-width layouts
+("2024-01-31", "2024-01-31 14:00:00", "14:32:00"). Instead of running a
+general strptime per value, this module reads those layouts positionally
+with NumPy: strings are viewed as a matrix of code points, digits are
+checked and combined column-wise, and calendar validity (month lengths,
+leap years) is checked arithmetically. Anything that does not match the
+layout exactly becomes NaT and is counted, never raised.
+
+Date columns repeat the same few hundred days across millions of rows, so
+values are factorized first and only the distinct strings are parsed; the
+result is broadcast back through the codes. Categorical columns reuse
+their categories directly.
+
+Supported format directives: %Y %m %d %H %M %S, plus literal characters.
+
+Example:
+    >>> from src.date_parsing import parse_table
+    >>> orders = load_orders()
+    >>> report = parse_table(orders, "orders")
+    >>> orders["order_datetime"].dtype
+    dtype('<M8[us]')
+    >>> report
+    {'order_date': 0, 'order_time': 0}
+"""
+
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_UNIT = "us"
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIME_FORMAT = "%H:%M:%S"
+
+# Above this share of distinct values, parsing every row directly is
+# cheaper than factorizing first
+UNIQUE_RATIO = 0.5
+
+# Date columns of each table and derived timestamp columns:
+# "combine" maps new column -> (date column, time column, time unit)
+TABLE_DATES = {
+    "orders": {
+        "formats": {"order_date": DATE_FORMAT, "order_time": TIME_FORMAT},
+        "combine": {"order_datetime": ("order_date", "order_time", None)},
+    },
+    "customers": {
+        "formats": {"signup_date": DATE_FORMAT, "last_order_date": DATE_FORMAT},
+        "combine": {},
+    },
+    "website_sessions": {
+        "formats": {"session_date": DATE_FORMAT},
+        "combine": {"session_start": ("session_date", "session_hour", "h")},
+    },
+    "customer_support": {
+        "formats": {
+            "created_date": DATETIME_FORMAT,
+            "resolved_date": DATETIME_FORMAT,
+        },
+        "combine": {},
+    },
+    "marketing_campaigns": {
+        "formats": {"start_date": DATE_FORMAT, "end_date": DATE_FORMAT},
+        "combine": {},
+    },
+}
+
+_FIELDS = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+_FIELD_RANGES = {"m": (1, 12), "d": (1, 31), "H": (0, 23), "M": (0, 59), "S": (0, 59)}
+
+
+@cache
+def compile_layout(fmt: str) -> tuple:
+    """
+    Turn a fixed-width format into character positions.
+
+    Args:
+        fmt: Format string such as "%Y-%m-%d".
+
+    Returns:
+        (width, fields, literals) where fields maps directive letter to
+        (start, width) and literals is a tuple of (position, character).
+
+    Raises:
+        ValueError: If the format uses an unsupported directive.
+    """
+    fields, literals = {}, []
+    position, i = 0, 0
+    while i < len(fmt):
+        if fmt[i] == "%":
+            letter = fmt[i + 1 : i + 2]
+            if letter not in _FIELDS:
+                raise ValueError(f"Unsupported directive %{letter} in {fmt!r}")
+            fields[letter] = (position, _FIELDS[letter])
+            position += _FIELDS[letter]
+            i += 2
+        else:
+            literals.append((position, fmt[i]))
+            position += 1
+            i += 1
+    return position, fields, tuple(literals)
+
+
+def _days_from_civil(year, month, day):
+    """Days since 1970-01-01 for proleptic Gregorian dates (vectorized)."""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _days_in_month(year, month):
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    lengths = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    return lengths[month - 1] + (leap & (month == 2))
+
+
+def _pyarrow():
+    """Import pyarrow lazily; the NumPy path is used without it."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa
+
+
+def _arrow_char_matrix(values, width: int, pa):
+    """
+    Byte matrix read straight from an Arrow string buffer.
+
+    No Python string objects are created. When every string has the layout
+    width (the usual case) the data buffer is reshaped without copying;
+    otherwise rows of the right length are gathered through the offsets.
+    Non-ASCII text never matches because its byte length differs.
+    """
+    array = pa.array(values, from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.type not in (pa.string(), pa.large_string()):
+        return None
+
+    offset_type = np.int32 if array.type == pa.string() else np.int64
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=offset_type)
+    offsets = offsets[array.offset : array.offset + len(array) + 1]
+    if data is None:
+        data = np.zeros(0, dtype=np.uint8)
+    else:
+        data = np.frombuffer(data, dtype=np.uint8)
+
+    present = array.is_valid().to_numpy(zero_copy_only=False)
+    lengths = np.diff(offsets)
+    if (lengths == width).all():
+        chars = data[offsets[0] : offsets[0] + len(array) * width]
+        return chars.reshape(len(array), width), present, present
+
+    fits = present & (lengths == width)
+    chars = np.zeros((len(array), width), dtype=np.uint8)
+    chars[fits] = data[offsets[:-1][fits, None] + np.arange(width)]
+    return chars, fits, present
+
+
+def _char_matrix(values, width: int) -> tuple:
+    """
+    View strings as an (n, width) matrix of character codes.
+
+    Returns:
+        (chars, fits, present): fits marks values of exactly the layout
+        width and present marks non-missing values.
+    """
+    pa = _pyarrow()
+    if pa is not None:
+        try:
+            matrix = _arrow_char_matrix(values, width, pa)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            matrix = None
+        if matrix is not None:
+            return matrix
+
+    values = np.asarray(values, dtype=object)
+    present = pd.notna(values)
+    text = np.where(present, values, "").astype(str)
+    # One extra column so longer strings can be told apart
+    chars = text.astype(f"U{width + 1}").view(np.uint32).reshape(len(text), width + 1)
+    return chars[:, :width], present & (chars[:, width] == 0), present
+
+
+def parse_strings(values, fmt: str) -> tuple:
+    """
+    Parse strings that follow a fixed layout.
+
+    Args:
+        values: Sequence of str (None/NaN allowed).
+        fmt: Format string, see compile_layout().
+
+    Returns:
+        (seconds, valid, present): int64 seconds since the epoch (or since
+        midnight for time-only formats), a bool mask of values that matched
+        and a bool mask of non-missing values.
+    """
+    width, fields, literals = compile_layout(fmt)
+    chars, valid, present = _char_matrix(values, width)
+    valid = valid.copy()
+    n = len(valid)
+
+    for position, literal in literals:
+        valid &= chars[:, position] == ord(literal)
+
+    parts = {}
+    for letter, (start, size) in fields.items():
+        number = np.zeros(n, dtype=np.int64)
+        for column in range(start, start + size):
+            digit = chars[:, column].astype(np.int64) - ord("0")
+            valid &= (digit >= 0) & (digit <= 9)
+            number = number * 10 + digit
+        if letter in _FIELD_RANGES:
+            low, high = _FIELD_RANGES[letter]
+            valid &= (number >= low) & (number <= high)
+        parts[letter] = number
+
+    seconds = np.zeros(n, dtype=np.int64)
+    if "Y" in parts:
+        year = parts["Y"]
+        month = np.where(valid, parts.get("m", 1), 1)
+        day = np.where(valid, parts.get("d", 1), 1)
+        valid &= day <= _days_in_month(year, month)
+        seconds = _days_from_civil(year, month, day) * 86400
+    seconds = seconds + parts.get("H", 0) * 3600 + parts.get("M", 0) * 60
+    seconds = seconds + parts.get("S", 0)
+    return np.where(valid, seconds, 0), valid, present
+
+
+def _to_datetime(seconds, valid, unit: str) -> np.ndarray:
+    result = seconds.astype("datetime64[s]").astype(f"datetime64[{unit}]")
+    result[~valid] = np.datetime64("NaT")
+    return result
+
+
+def _to_timedelta(seconds, valid, unit: str) -> np.ndarray:
+    result = seconds.astype("timedelta64[s]").astype(f"timedelta64[{unit}]")
+    result[~valid] = np.timedelta64("NaT")
+    return result
+
+
+def _mostly_unique(values: pd.Series, sample_size: int = 10_000) -> bool:
+    """Estimate from a sample whether factorizing would save any work."""
+    if len(values) <= sample_size:
+        return False
+    sample = values.iloc[:: max(len(values) // sample_size, 1)]
+    return sample.nunique() > UNIQUE_RATIO * len(sample)
+
+
+def parse_column(values: pd.Series, fmt: str, unit: str = DEFAULT_UNIT) -> tuple:
+    """
+    Parse a column of date, datetime or time strings.
+
+    Formats with a year give datetime64 values; time-only formats give
+    timedelta64 values (time since midnight). Columns that already hold
+    datetimes are returned unchanged.
+
+    Args:
+        values: Series of strings (str, object or category dtype).
+        fmt: Fixed-width format, e.g. "%Y-%m-%d".
+        unit: Resolution of the result ("s", "ms", "us" or "ns").
+
+    Returns:
+        (parsed Series with the same index, number of malformed values).
+        Missing inputs become NaT but are not counted as malformed.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(
+        values
+    ) or pd.api.types.is_timedelta64_dtype(values):
+        return values, 0
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = values.cat.categories.to_numpy(dtype=object)
+    elif _mostly_unique(values):
+        codes, uniques = None, values
+    else:
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(uniques, dtype=object)
+
+    seconds, valid, present = parse_strings(uniques, fmt)
+    convert = _to_datetime if "Y" in compile_layout(fmt)[1] else _to_timedelta
+    parsed = convert(seconds, valid, unit)
+
+    if codes is not None:
+        # Missing values have code -1 and are not counted as malformed
+        known = codes >= 0
+        parsed = np.where(known, parsed[codes], parsed.dtype.type("NaT"))
+        malformed = int(np.count_nonzero(~valid[codes[known]]))
+    else:
+        malformed = int(np.count_nonzero(present & ~valid))
+
+    return pd.Series(parsed, index=values.index, name=values.name), malformed
+
+
+def combine_date_time(
+    dates: pd.Series, times: pd.Series, unit: str = None
+) -> pd.Series:
+    """
+    Add a time of day to a date column.
+
+    Args:
+        dates: datetime64 Series (midnight values).
+        times: timedelta64 Series, or numbers of the given unit
+            (e.g. session_hour with unit="h").
+        unit: Unit of numeric times; None if times is already timedelta64.
+
+    Returns:
+        datetime64 Series; NaT where either part is missing.
+    """
+    if unit is not None:
+        times = pd.to_timedelta(pd.Series(times).astype("float64"), unit=unit)
+    return dates + times
+
+
+def parse_dates(df: pd.DataFrame, formats: dict, unit: str = DEFAULT_UNIT) -> dict:
+    """
+    Parse several date columns of a DataFrame in place.
+
+    Args:
+        df: DataFrame to modify.
+        formats: Mapping of column name to format; missing columns are skipped.
+        unit: Resolution of the parsed columns.
+
+    Returns:
+        dict of column -> number of malformed values coerced to NaT.
+    """
+    report = {}
+    for column, fmt in formats.items():
+        if column not in df.columns:
+            continue
+        df[column], report[column] = parse_column(df[column], fmt, unit)
+    return report
+
+
+def parse_table(df: pd.DataFrame, table: str, unit: str = DEFAULT_UNIT) -> dict:
+    """
+    Parse all date and time columns of a Cartly table in place.
+
+    Also adds the combined timestamp columns in TABLE_DATES, e.g.
+    orders.order_datetime and website_sessions.session_start. The source
+    time columns (order_time, session_hour) are left as they were.
+
+    Args:
+        df: Table loaded from its CSV, e.g. with load_orders().
+        table: Table name in TABLE_DATES.
+        unit: Resolution of the parsed columns.
+
+    Returns:
+        dict of column -> number of malformed values coerced to NaT.
+
+    Raises:
+        KeyError: If the table has no date columns registered.
+    """
+    if table not in TABLE_DATES:
+        known = ", ".join(sorted(TABLE_DATES))
+        raise KeyError(
+            f"No date columns registered for '{table}'. Known tables: {known}"
+        )
+    spec = TABLE_DATES[table]
+
+    times = {}
+    dates = {}
+    for column, fmt in spec["formats"].items():
+        if column not in df.columns:
+            continue
+        if "Y" in compile_layout(fmt)[1]:
+            dates[column] = fmt
+        else:
+            times[column] = fmt
+
+    report = parse_dates(df, dates, unit)
+    parsed_times = {}
+    for column, fmt in times.items():
+        parsed_times[column], report[column] = parse_column(df[column], fmt, unit)
+
+    for target, (date_column, time_column, time_unit) in spec["combine"].items():
+        if date_column not in df.columns or time_column not in df.columns:
+            continue
+        time_values = parsed_times.get(time_column, df[time_column])
+        df[target] = combine_date_time(df[date_column], time_values, time_unit)
+
+    return report
@@ -0,0 +1,420 @@
+"""
+Fuzzy customer deduplication with blocking and configurable survivorship.
+
+Exact matching on a lower-cased email misses most real duplicates in
+marketing_customers_raw.csv: names are padded with spaces, phones appear as
+"+91...", "(0xx) ..." or "...x123", and the same person signs up with
+different email casing. This module finds those duplicates in four steps:
+
+1. Normalize: emails are stripped and lower-cased (gmail dots and +tags
+   removed), phones reduced to their last 10 digits without extensions,
+   names case-folded, accent-stripped and compared as sorted token sets.
+   Each distinct value is normalized once and broadcast back.
+2. Block: a sorted-neighbourhood index per blocking key (email, phone,
+   name + city, email local part). Rows are sorted by the key and only rows
+   within a small window of each other become candidate pairs, so the
+   number of comparisons grows linearly with the number of rows instead of
+   quadratically.
+3. Score: each candidate pair gets a weighted sum of field agreements
+   (email, phone, name, email local part, city, age). Pairs at or above the
+   threshold are matches.
+4. Resolve: matches are merged into clusters (union-find by label
+   propagation) and one survivor per cluster is chosen by ordered
+   survivorship rules, optionally filling its gaps from the other members.
+
+All steps work on integer codes and NumPy arrays; no Python code runs per
+row or per pair.
+
+Example:
+    >>> from src.dedup import deduplicate, PRESETS
+    >>> raw = pd.read_csv("data/marketing_customers_raw.csv")
+    >>> clean = deduplicate(raw, **PRESETS["marketing_customers_raw"])
+"""
+
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+
+DEFAULT_WINDOW = 4
+
+DEFAULT_THRESHOLD = 0.6
+
+# Contribution of each agreeing field to a pair's score. An email match
+# alone is enough; otherwise phone or email local part has to be backed up
+# by the name.
+DEFAULT_WEIGHTS = {
+    "email": 0.6,
+    "phone": 0.3,
+    "name": 0.3,
+    "email_local": 0.2,
+    "city": 0.1,
+    "age": 0.1,
+}
+
+# Sorted-neighbourhood passes; each is a list of normalized key columns
+DEFAULT_PASSES = [
+    ["email"],
+    ["phone"],
+    ["name", "city"],
+    ["email_local"],
+]
+
+# Record fields understood by prepare_keys()
+KEY_FIELDS = ["name", "email", "phone", "city", "age"]
+
+# Column mappings and survivorship rules for the Cartly tables
+PRESETS = {
+    "customers": {
+        "columns": {"name": ["first_name", "last_name"]},
+        "keep": [("total_orders", False), ("total_spent", False)],
+    },
+    "marketing_customers_raw": {
+        "columns": {
+            "name": "full_name",
+            "email": "email_address",
+            "phone": "phone_number",
+            "city": "location",
+        },
+        "keep": [("date_joined", False)],
+        "coalesce": True,
+    },
+}
+
+_GMAIL_DOMAINS = ("gmail.com", "googlemail.com")
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    """Apply a vectorized string function to each distinct value once."""
+    codes, uniques = pd.factorize(values)
+    mapped = func(pd.Series(uniques, dtype="str")).to_numpy(dtype=object)
+    # Missing values have code -1, which picks the trailing None
+    mapped = np.append(mapped, None)
+    return pd.Series(mapped[codes], index=values.index, dtype="str")
+
+
+def normalize_email(values: pd.Series) -> pd.Series:
+    """
+    Canonical form of email addresses.
+
+    Strips whitespace and lower-cases; for gmail addresses also drops dots
+    and "+tag" suffixes from the local part. Values without an "@" become
+    missing.
+    """
+
+    def normalize(emails):
+        emails = emails.str.strip().str.lower()
+        parts = emails.str.extract(r"^([^@\s]+)@([^@\s]+\.[^@\s]+)$")
+        local, domain = parts[0], parts[1]
+        gmail = domain.isin(_GMAIL_DOMAINS)
+        local = local.where(~gmail, local.str.replace(r"\+.*$|\.", "", regex=True))
+        return local + "@" + domain.replace("googlemail.com", "gmail.com")
+
+    return _map_unique(values, normalize)
+
+
+def normalize_phone(values: pd.Series, digits: int = 10) -> pd.Series:
+    """
+    Canonical form of phone numbers: the last `digits` digits.
+
+    Extensions ("x123", "ext. 4") are dropped first, then everything but
+    digits, so "+91 80101 24571", "080101-24571" and "8010124571" agree.
+    Numbers with fewer than 7 digits become missing.
+    """
+
+    def normalize(phones):
+        phones = phones.str.lower().str.replace(r"\s*(x|ext\.?)\s*\d+$", "", regex=True)
+        only_digits = phones.str.replace(r"\D", "", regex=True)
+        return only_digits.str[-digits:].where(only_digits.str.len() >= 7)
+
+    return _map_unique(values, normalize)
+
+
+def _fold(text):
+    if pd.isna(text):
+        return None
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    tokens = sorted(folded.casefold().replace(".", " ").replace("-", " ").split())
+    return " ".join(tokens) or None
+
+
+def normalize_name(values: pd.Series) -> pd.Series:
+    """
+    Canonical form of person names: accent-free, case-folded, sorted tokens.
+
+    "  José  García ", "garcia jose" and "GARCÍA, José" all become
+    "garcia jose" (commas are treated as spaces).
+    """
+
+    def normalize(names):
+        names = names.str.replace(",", " ")
+        return names.map(_fold, na_action="ignore")
+
+    return _map_unique(values, normalize)
+
+
+def prepare_keys(df: pd.DataFrame, columns: dict = None) -> pd.DataFrame:
+    """
+    Build the normalized comparison keys for each row.
+
+    Args:
+        df: Customer-like records.
+        columns: Mapping of KEY_FIELDS to DataFrame columns. A list of
+            columns for "name" is joined with spaces (e.g. first and last
+            name). Unmapped fields use their own name; fields without a
+            column are missing for every row.
+
+    Returns:
+        DataFrame aligned to df with integer-coded columns email, phone,
+        name, email_local, city (-1 = missing) and float column age.
+    """
+    columns = {**{field: field for field in KEY_FIELDS}, **(columns or {})}
+
+    def column(field):
+        source = columns[field]
+        if isinstance(source, (list, tuple)):
+            present = [df[c].astype("str") for c in source if c in df.columns]
+            if not present:
+                return pd.Series(None, index=df.index, dtype="str")
+            joined = present[0].fillna("")
+            for part in present[1:]:
+                joined = joined + " " + part.fillna("")
+            return joined
+        if source not in df.columns:
+            return pd.Series(None, index=df.index, dtype="str")
+        return df[source].astype("str")
+
+    email = normalize_email(column("email"))
+    keys = {
+        "email": email,
+        "phone": normalize_phone(column("phone")),
+        "name": normalize_name(column("name")),
+        "email_local": email.str.replace(r"@.*$", "", regex=True),
+        "city": column("city").str.strip().str.lower(),
+    }
+    # sort=True keeps codes in lexicographic order for sorted neighbourhoods
+    coded = {
+        field: pd.factorize(values, sort=True)[0] for field, values in keys.items()
+    }
+    age = pd.to_numeric(column("age"), errors="coerce").to_numpy(dtype="float64")
+    return pd.DataFrame({**coded, "age": age}, index=df.index)
+
+
+def candidate_pairs(
+    keys: pd.DataFrame, passes: list = None, window: int = DEFAULT_WINDOW
+) -> tuple:
+    """
+    Candidate pairs from sorted-neighbourhood blocking.
+
+    For each pass, rows with all pass keys present are sorted by those keys
+    and each row is paired with the next window - 1 rows.
+
+    Args:
+        keys: Output of prepare_keys().
+        passes: Lists of key columns; see DEFAULT_PASSES.
+        window: Sorted-neighbourhood window size (>= 2).
+
+    Returns:
+        (left, right) arrays of row positions with left < right, unique.
+    """
+    if window < 2:
+        raise ValueError(f"window must be at least 2, got {window}")
+    passes = DEFAULT_PASSES if passes is None else passes
+
+    lefts, rights = [], []
+    for fields in passes:
+        codes = keys[fields].to_numpy()
+        rows = np.flatnonzero((codes >= 0).all(axis=1))
+        if len(rows) < 2:
+            continue
+        # lexsort uses the last key as primary
+        order = rows[np.lexsort(codes[rows].T[::-1])]
+        for step in range(1, window):
+            lefts.append(order[:-step])
+            rights.append(order[step:])
+
+    if not lefts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    left = np.concatenate(lefts)
+    right = np.concatenate(rights)
+    left, right = np.minimum(left, right), np.maximum(left, right)
+    pairs = np.sort(left.astype(np.int64) * len(keys) + right)
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+    return pairs // len(keys), pairs % len(keys)
+
+
+def score_pairs(
+    keys: pd.DataFrame, left: np.ndarray, right: np.ndarray, weights: dict = None
+) -> np.ndarray:
+    """
+    Weighted field-agreement score of each candidate pair.
+
+    A field contributes its weight when both values are present and equal
+    (ages: within one year).
+
+    Args:
+        keys: Output of prepare_keys().
+        left, right: Row positions from candidate_pairs().
+        weights: Field weights; see DEFAULT_WEIGHTS.
+
+    Returns:
+        float array of scores.
+    """
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    score = np.zeros(len(left))
+    for field, weight in weights.items():
+        a = keys[field].to_numpy()[left]
+        b = keys[field].to_numpy()[right]
+        if field == "age":
+            agree = np.abs(a - b) <= 1
+        else:
+            agree = (a == b) & (a >= 0)
+        score += weight * agree
+    return score
+
+
+def connected_components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Cluster labels for n nodes joined by edges (left[i], right[i]).
+
+    Vectorized label propagation with pointer jumping; every node ends up
+    labelled with the smallest node index in its component.
+    """
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, low)
+        np.minimum.at(updated, right, low)
+        # Pointer jumping: follow labels to their own labels until stable
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def find_duplicates(
+    df: pd.DataFrame,
+    columns: dict = None,
+    threshold: float = DEFAULT_THRESHOLD,
+    window: int = DEFAULT_WINDOW,
+    weights: dict = None,
+    passes: list = None,
+) -> pd.Series:
+    """
+    Assign a cluster ID to every row; duplicates share an ID.
+
+    Args:
+        df: Customer-like records.
+        columns: Field-to-column mapping, see prepare_keys().
+        threshold: Minimum pair score for a match.
+        window: Sorted-neighbourhood window size.
+        weights: Field weights, see DEFAULT_WEIGHTS.
+        passes: Blocking passes, see DEFAULT_PASSES.
+
+    Returns:
+        int64 Series aligned to df.index. The ID is the position of the
+        cluster's first row, so unique rows keep their own position.
+    """
+    keys = prepare_keys(df, columns)
+    left, right = candidate_pairs(keys, passes, window)
+    matched = score_pairs(keys, left, right, weights) >= threshold
+    labels = connected_components(len(df), left[matched], right[matched])
+    return pd.Series(labels, index=df.index, name="cluster_id")
+
+
+def resolve_clusters(
+    df: pd.DataFrame, clusters: pd.Series, keep: list = None, coalesce: bool = False
+) -> pd.DataFrame:
+    """
+    Keep one survivor per cluster.
+
+    Args:
+        df: Records to resolve.
+        clusters: Cluster IDs from find_duplicates().
+        keep: Survivorship rules as (column, ascending) pairs, applied in
+            order; e.g. [("total_orders", False)] keeps the row with the
+            most orders. Ties, and rows with the rule column missing, fall
+            back to the earliest row. If None, the earliest row survives.
+        coalesce: Fill the survivor's missing values from the other
+            members of its cluster, in survivorship order.
+
+    Returns:
+        DataFrame with one row per cluster, in original row order, keeping
+        the survivor's index label.
+    """
+    keep = keep or []
+    for column, _ in keep:
+        if column not in df.columns:
+            raise KeyError(f"Survivorship column '{column}' not in DataFrame")
+
+    position = pd.Series(np.arange(len(df)), index=df.index, name="_position")
+    ranked = df.assign(_cluster=clusters.to_numpy(), _position=position.to_numpy())
+    by = ["_cluster"] + [c for c, _ in keep] + ["_position"]
+    ascending = [True] + [a for _, a in keep] + [True]
+    ranked = ranked.sort_values(
+        by, ascending=ascending, na_position="last", kind="stable"
+    )
+
+    survivors = ranked.drop_duplicates("_cluster")
+    if coalesce:
+        filled = ranked.groupby("_cluster", sort=False)[list(df.columns)].first()
+        filled = filled.loc[survivors["_cluster"]]
+        filled.index = survivors.index
+        survivors = survivors.assign(**{c: filled[c] for c in df.columns})
+
+    survivors = survivors.sort_values("_position")
+    return survivors[list(df.columns)].astype(df.dtypes.to_dict(), errors="ignore")
+
+
+@instrumentation.traced("stage")
+def deduplicate(
+    df: pd.DataFrame,
+    columns: dict = None,
+    keep: list = None,
+    coalesce: bool = False,
+    threshold: float = DEFAULT_THRESHOLD,
+    window: int = DEFAULT_WINDOW,
+    weights: dict = None,
+    passes: list = None,
+) -> pd.DataFrame:
+    """
+    Remove fuzzy duplicate customers.
+
+    Args:
+        df: Customer-like records.
+        columns, threshold, window, weights, passes: See find_duplicates().
+        keep, coalesce: See resolve_clusters().
+
+    Returns:
+        Deduplicated DataFrame.
+
+    Example:
+        >>> clean = deduplicate(customers, **PRESETS["customers"])
+    """
+    clusters = find_duplicates(df, columns, threshold, window, weights, passes)
+    return resolve_clusters(df, clusters, keep, coalesce)
+
+
+def duplicate_report(clusters: pd.Series) -> dict:
+    """
+    Summarize cluster assignments.
+
+    Returns:
+        dict with rows, clusters, duplicate_rows (rows that would be
+        removed) and largest_cluster.
+    """
+    sizes = clusters.value_counts()
+    return {
+        "rows": len(clusters),
+        "clusters": len(sizes),
+        "duplicate_rows": int(len(clusters) - len(sizes)),
+        "largest_cluster": int(sizes.max()) if len(sizes) else 0,
+    }
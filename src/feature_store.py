@@ -0,0 +1,571 @@
+"""
+Customer 360 feature store.
+
+Per-customer features from orders, website sessions and support tickets
+are kept in one array-backed table keyed by customer_id:
+
+    total_orders, total_spent, avg_order_value, first_order_date,
+    last_order_date                                      (orders)
+    sessions, pages_viewed, converted_sessions,
+    last_session_date                                    (website_sessions)
+    tickets, last_ticket_date, rated_tickets,
+    satisfaction_total, avg_satisfaction                 (customer_support)
+
+Each source row becomes an event with a customer, a timestamp and its
+values, and every feature is a count, sum, first or last timestamp over
+those events. A build is one np.bincount / ufunc.at pass per feature, so
+its cost grows linearly with the number of events.
+
+Events are stored too, which gives:
+
+- point-in-time lookups: get(..., as_of=...) and to_frame(as_of=...) only
+  use events known at that moment. An order is known from its order_date
+  and order_time, a session from its session_date and session_hour, a
+  ticket from its created_date, and a satisfaction score
+  from the ticket's resolved_date. This avoids label leakage when features
+  are joined to past outcomes.
+- incremental updates: update() aggregates only the new rows and adds them
+  to the stored features. A row whose ID was seen before (a re-sent or
+  corrected order, a ticket that got resolved) replaces the old event; its
+  old counts and sums are subtracted, and the first/last dates of the
+  customers involved are recomputed from their events.
+
+Current features are plain array reads through a hashed customer_id
+index, so get(customer_id) is O(1). Events without a customer or a valid
+timestamp are skipped.
+
+Usage:
+    python -m src.feature_store 10005 10006
+    python -m src.feature_store 10005 --as-of 2024-10-01
+
+Example:
+    >>> from src.feature_store import build_feature_store
+    >>> store = build_feature_store()
+    >>> store.get(10005)["total_spent"]
+    >>> store.get(10005, as_of="2024-01-01")["total_orders"]
+    >>> store.update(orders=todays_orders)
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import parse_column
+
+# Event sources: table, event ID column, timestamp columns (date, optional
+# time of day, and the unit of a numeric time such as an hour), value
+# columns, and columns that must be present
+SOURCES = {
+    "orders": {
+        "table": "orders",
+        "id": "order_id",
+        "time": ["order_date", "order_time"],
+        "values": ["total"],
+    },
+    "sessions": {
+        "table": "website_sessions",
+        "id": "session_id",
+        "time": ["session_date", "session_hour", "h"],
+        "values": ["pages_viewed", "converted"],
+    },
+    "tickets": {
+        "table": "customer_support",
+        "id": "ticket_id",
+        "time": ["created_date"],
+        "values": [],
+    },
+    # A satisfaction score is only known once the ticket is resolved
+    "ratings": {
+        "table": "customer_support",
+        "id": "ticket_id",
+        "time": ["resolved_date"],
+        "values": ["satisfaction_score"],
+        "required": ["satisfaction_score"],
+    },
+}
+
+# Tables accepted by FeatureStore.build() and update()
+TABLES = ["orders", "website_sessions", "customer_support"]
+
+# feature -> (source, aggregation, value column)
+FEATURES = {
+    "total_orders": ("orders", "count", None),
+    "total_spent": ("orders", "sum", "total"),
+    "first_order_date": ("orders", "first", None),
+    "last_order_date": ("orders", "last", None),
+    "sessions": ("sessions", "count", None),
+    "pages_viewed": ("sessions", "sum", "pages_viewed"),
+    "converted_sessions": ("sessions", "sum", "converted"),
+    "last_session_date": ("sessions", "last", None),
+    "tickets": ("tickets", "count", None),
+    "last_ticket_date": ("tickets", "last", None),
+    "rated_tickets": ("ratings", "count", None),
+    "satisfaction_total": ("ratings", "sum", "satisfaction_score"),
+}
+
+# feature -> (numerator, denominator, value when the denominator is 0)
+DERIVED = {
+    "avg_order_value": ("total_spent", "total_orders", 0.0),
+    "avg_satisfaction": ("satisfaction_total", "rated_tickets", np.nan),
+}
+
+# Empty values of first/last timestamps (int64 seconds since 1970)
+_NO_FIRST = np.iinfo(np.int64).max
+_NO_LAST = np.iinfo(np.int64).min
+
+_EMPTY = {"count": 0, "sum": 0.0, "first": _NO_FIRST, "last": _NO_LAST}
+
+_DTYPES = {"count": np.int64, "sum": np.float64, "first": np.int64, "last": np.int64}
+
+
+def _seconds(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """Event timestamps as int64 seconds; _NO_LAST where unknown."""
+    dates = df[columns[0]]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates, _ = parse_column(dates.astype("str"), "%Y-%m-%d")
+    valid = dates.notna().to_numpy()
+    seconds = dates.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    if len(columns) > 1 and columns[1] in df.columns:
+        if len(columns) > 2:
+            clock = pd.to_numeric(df[columns[1]], errors="coerce").astype("float64")
+            clock = pd.to_timedelta(clock, unit=columns[2])
+        else:
+            clock = pd.to_timedelta(df[columns[1]].astype("str"), errors="coerce")
+        seconds = seconds + clock.dt.total_seconds().fillna(0).to_numpy(np.int64)
+    return np.where(valid, seconds, _NO_LAST)
+
+
+def _ids(values: pd.Series) -> np.ndarray:
+    """Event IDs as int64 for integer columns, else as str objects.
+
+    One dtype per source keeps IDs from CSV loads, update() batches and
+    saved stores comparable.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return values.to_numpy(dtype=np.int64, na_value=0)
+    return values.astype("str").to_numpy(dtype=object)
+
+
+def _events(source: str, df: pd.DataFrame) -> dict:
+    """Turn source rows into event arrays: ids, customers, times, values."""
+    spec = SOURCES[source]
+    keep = df["customer_id"].notna().to_numpy() & df[spec["id"]].notna().to_numpy()
+    for column in spec.get("required", []):
+        keep = keep & df[column].notna().to_numpy()
+    times = _seconds(df, spec["time"])
+    keep = keep & (times != _NO_LAST)
+    # The last row wins when an ID repeats within a batch
+    ids = _ids(df[spec["id"]])
+    keep = keep & ~pd.Series(ids).duplicated(keep="last").to_numpy()
+    return {
+        "ids": ids[keep],
+        "customers": df["customer_id"].to_numpy(dtype=np.int64, na_value=0)[keep],
+        "times": times[keep],
+        "values": {
+            column: df[column].to_numpy(dtype=np.float64, na_value=0.0)[keep]
+            for column in spec["values"]
+        },
+    }
+
+
+def _aggregate(how: str, rows, times, values, n: int) -> np.ndarray:
+    """One feature for n customers from event rows, vectorized."""
+    if how == "count":
+        return np.bincount(rows, minlength=n).astype(np.int64)
+    if how == "sum":
+        return np.bincount(rows, weights=values, minlength=n)
+    result = np.full(n, _EMPTY[how], dtype=np.int64)
+    (np.minimum if how == "first" else np.maximum).at(result, rows, times)
+    return result
+
+
+def _combine(how: str, current: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    if how in ("count", "sum"):
+        return current + delta
+    return (np.minimum if how == "first" else np.maximum)(current, delta)
+
+
+def _as_seconds(as_of) -> int:
+    return int(
+        pd.Timestamp(as_of).to_datetime64().astype("datetime64[s]").astype(np.int64)
+    )
+
+
+class FeatureStore:
+    """
+    Array-backed per-customer features with point-in-time lookups.
+
+    Build one with FeatureStore.build() or build_feature_store(); see the
+    module docstring for the features and how updates work.
+
+    Args:
+        customer_ids: Customers to hold features for. Customers seen in
+            events are added automatically.
+    """
+
+    def __init__(self, customer_ids=None):
+        ids = pd.Index([] if customer_ids is None else customer_ids, dtype=np.int64)
+        self._index = ids.drop_duplicates()
+        n = len(self._index)
+        self._features = {
+            name: np.full(n, _EMPTY[how], dtype=_DTYPES[how])
+            for name, (_, how, _) in FEATURES.items()
+        }
+        # source -> concatenated event arrays plus an alive flag per event
+        self._events = {source: None for source in SOURCES}
+        # source -> {event id: position in the source's event arrays}
+        self._positions = {source: {} for source in SOURCES}
+        self._by_customer = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, customer_id) -> bool:
+        return customer_id in self._index
+
+    @property
+    def customer_ids(self) -> pd.Index:
+        return self._index
+
+    @classmethod
+    @instrumentation.traced("stage", name="feature_store.build")
+    def build(
+        cls,
+        customers: pd.DataFrame = None,
+        orders: pd.DataFrame = None,
+        website_sessions: pd.DataFrame = None,
+        customer_support: pd.DataFrame = None,
+    ) -> "FeatureStore":
+        """
+        Compute every feature from full source tables.
+
+        Args:
+            customers: Customers table; its customer_ids get rows even
+                without any events.
+            orders, website_sessions, customer_support: Source tables as
+                returned by src.data_loader.
+
+        Returns:
+            FeatureStore.
+        """
+        ids = None if customers is None else customers["customer_id"].dropna()
+        store = cls(ids)
+        store.update(
+            orders=orders,
+            website_sessions=website_sessions,
+            customer_support=customer_support,
+        )
+        return store
+
+    def _rows(self, customer_ids: np.ndarray) -> np.ndarray:
+        """Positions of customers, adding rows for new ones."""
+        rows = self._index.get_indexer(customer_ids)
+        new = rows == -1
+        if new.any():
+            added = pd.Index(customer_ids[new]).drop_duplicates()
+            self._index = self._index.append(added)
+            for name, (_, how, _) in FEATURES.items():
+                grown = np.full(len(added), _EMPTY[how], dtype=_DTYPES[how])
+                self._features[name] = np.concatenate([self._features[name], grown])
+            rows[new] = self._index.get_indexer(customer_ids[new])
+        return rows
+
+    @instrumentation.traced("stage", name="feature_store.update")
+    def update(
+        self,
+        orders: pd.DataFrame = None,
+        website_sessions: pd.DataFrame = None,
+        customer_support: pd.DataFrame = None,
+    ) -> dict:
+        """
+        Add new source rows and update the features from them alone.
+
+        Args:
+            orders, website_sessions, customer_support: New or corrected
+                rows. Rows whose ID is already stored replace the old event.
+
+        Returns:
+            Dict of source -> {"inserted": n, "replaced": n}.
+        """
+        tables = {
+            "orders": orders,
+            "website_sessions": website_sessions,
+            "customer_support": customer_support,
+        }
+        counts = {}
+        for source, spec in SOURCES.items():
+            df = tables[spec["table"]]
+            if df is not None:
+                counts[source] = self._add_events(source, _events(source, df))
+        self._by_customer = {}
+        return counts
+
+    def _add_events(self, source: str, batch: dict) -> dict:
+        rows = self._rows(batch["customers"])
+        positions = self._positions[source]
+        stored = self._events[source]
+        start = 0 if stored is None else len(stored["rows"])
+
+        old = np.array(
+            [positions.get(event_id, -1) for event_id in batch["ids"]], dtype=np.int64
+        )
+        old = old[old >= 0]
+        if len(old):
+            stored["alive"][old] = False
+            self._apply(source, stored["rows"][old], stored, old, sign=-1)
+            # First/last dates cannot be un-combined; recompute them
+            self._recompute_dates(source, np.unique(stored["rows"][old]))
+
+        events = {
+            "ids": batch["ids"],
+            "rows": rows,
+            "times": batch["times"],
+            "alive": np.ones(len(rows), dtype=bool),
+            "values": batch["values"],
+        }
+        self._apply(source, rows, events, slice(None), sign=1)
+        positions.update(zip(batch["ids"].tolist(), range(start, start + len(rows))))
+        if stored is None:
+            self._events[source] = events
+        else:
+            self._events[source] = {
+                key: np.concatenate([stored[key], events[key]])
+                for key in ("ids", "rows", "times", "alive")
+            }
+            self._events[source]["values"] = {
+                column: np.concatenate([stored["values"][column], values])
+                for column, values in events["values"].items()
+            }
+        return {"inserted": len(rows) - len(old), "replaced": len(old)}
+
+    def _apply(self, source, rows, events, selection, sign: int) -> None:
+        """Combine the selected events into the features (sign -1 removes)."""
+        n = len(self._index)
+        for name, (feature_source, how, column) in FEATURES.items():
+            if feature_source != source or (sign < 0 and how in ("first", "last")):
+                continue
+            values = events["values"][column][selection] if column else None
+            delta = _aggregate(how, rows, events["times"][selection], values, n)
+            if sign < 0:
+                delta = -delta
+            self._features[name] = _combine(how, self._features[name], delta)
+
+    def _recompute_dates(self, source: str, affected: np.ndarray) -> None:
+        events = self._events[source]
+        mask = events["alive"] & np.isin(events["rows"], affected)
+        n = len(self._index)
+        for name, (feature_source, how, _) in FEATURES.items():
+            if feature_source == source and how in ("first", "last"):
+                fresh = _aggregate(
+                    how, events["rows"][mask], events["times"][mask], None, n
+                )
+                self._features[name][affected] = fresh[affected]
+
+    def _frame(self, features: dict, positions) -> pd.DataFrame:
+        data = {}
+        for name, (_, how, _) in FEATURES.items():
+            values = features[name][positions]
+            if how in ("first", "last"):
+                missing = values == _EMPTY[how]
+                values = np.where(missing, 0, values).astype("datetime64[s]")
+                values[missing] = np.datetime64("NaT")
+            data[name] = values
+        for name, (numerator, denominator, default) in DERIVED.items():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = data[numerator] / data[denominator]
+            data[name] = np.where(data[denominator] > 0, ratio, default)
+        index = pd.Index(self._index[positions], name="customer_id")
+        return pd.DataFrame(data, index=index)
+
+    def _features_as_of(self, as_of) -> dict:
+        """Every feature recomputed from the events known at as_of."""
+        cutoff = _as_seconds(as_of)
+        n = len(self._index)
+        features = {}
+        for name, (source, how, column) in FEATURES.items():
+            events = self._events[source]
+            if events is None:
+                features[name] = np.full(n, _EMPTY[how], dtype=_DTYPES[how])
+                continue
+            mask = events["alive"] & (events["times"] <= cutoff)
+            values = events["values"][column][mask] if column else None
+            features[name] = _aggregate(
+                how, events["rows"][mask], events["times"][mask], values, n
+            )
+        return features
+
+    def _customer_events(self, source: str, row: int):
+        """Positions of a customer's events, via a cached per-customer index."""
+        if source not in self._by_customer:
+            rows = self._events[source]["rows"]
+            order = np.argsort(rows, kind="stable")
+            offsets = np.searchsorted(rows[order], np.arange(len(self._index) + 1))
+            self._by_customer[source] = (order, offsets)
+        order, offsets = self._by_customer[source]
+        return order[offsets[row] : offsets[row + 1]]
+
+    def _row(self, customer_id) -> int:
+        try:
+            return self._index.get_loc(customer_id)
+        except KeyError:
+            raise KeyError(f"Unknown customer_id: {customer_id}") from None
+
+    def get(self, customer_id, as_of=None) -> dict:
+        """
+        Features of one customer.
+
+        Args:
+            customer_id: Customer to look up.
+            as_of: Timestamp or date string; only events known at that
+                moment are used. If None, the current features (O(1)).
+
+        Returns:
+            Dict of feature name -> value.
+
+        Raises:
+            KeyError: If the customer is unknown.
+        """
+        row = self._row(customer_id)
+        if as_of is None:
+            return self._frame(self._features, [row]).iloc[0].to_dict()
+        cutoff = _as_seconds(as_of)
+        features = {}
+        for name, (source, how, column) in FEATURES.items():
+            events = self._events[source]
+            value = _EMPTY[how]
+            if events is not None:
+                mine = self._customer_events(source, row)
+                mine = mine[events["alive"][mine] & (events["times"][mine] <= cutoff)]
+                values = events["values"][column][mine] if column else None
+                value = _aggregate(
+                    how,
+                    np.zeros(len(mine), dtype=np.int64),
+                    events["times"][mine],
+                    values,
+                    1,
+                )[0]
+            features[name] = np.array([value], dtype=_DTYPES[how])
+        return self._frame(features, [0]).iloc[0].to_dict()
+
+    def lookup(self, customer_ids, as_of=None) -> pd.DataFrame:
+        """
+        Features of several customers, one row each.
+
+        Raises:
+            KeyError: If any customer is unknown.
+        """
+        positions = self._index.get_indexer(pd.Index(customer_ids))
+        if (positions < 0).any():
+            unknown = list(pd.Index(customer_ids)[positions < 0])
+            raise KeyError(f"Unknown customer_ids: {unknown[:10]}")
+        features = self._features if as_of is None else self._features_as_of(as_of)
+        return self._frame(features, positions)
+
+    def to_frame(self, as_of=None) -> pd.DataFrame:
+        """All customers' features, current or as of a moment."""
+        features = self._features if as_of is None else self._features_as_of(as_of)
+        return self._frame(features, np.arange(len(self._index)))
+
+    def save(self, path) -> Path:
+        """
+        Write the store (customer index, features and events) to a .npz file.
+
+        Returns:
+            The path written.
+        """
+        path = Path(path)
+        arrays = {"customer_ids": self._index.to_numpy(dtype=np.int64)}
+        arrays.update({f"feature:{k}": v for k, v in self._features.items()})
+        for source, events in self._events.items():
+            if events is None:
+                continue
+            alive = events["alive"]
+            ids = events["ids"][alive]
+            # String IDs are saved as fixed-width text: .npz has no objects
+            arrays[f"{source}:ids"] = ids if ids.dtype == np.int64 else ids.astype(str)
+            arrays[f"{source}:rows"] = events["rows"][alive]
+            arrays[f"{source}:times"] = events["times"][alive]
+            for column, values in events["values"].items():
+                arrays[f"{source}:value:{column}"] = values[alive]
+        arrays["meta"] = np.array(json.dumps({"sources": list(SOURCES)}))
+        with open(path, "wb") as handle:
+            np.savez(handle, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path) -> "FeatureStore":
+        """
+        Read a store written by save().
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Feature store file not found: {path}")
+        with np.load(path, allow_pickle=False) as data:
+            store = cls(data["customer_ids"])
+            for name in FEATURES:
+                store._features[name] = data[f"feature:{name}"]
+            for source, spec in SOURCES.items():
+                if f"{source}:ids" not in data:
+                    continue
+                ids = data[f"{source}:ids"]
+                if ids.dtype != np.int64:
+                    ids = ids.astype(object)
+                store._events[source] = {
+                    "ids": ids,
+                    "rows": data[f"{source}:rows"],
+                    "times": data[f"{source}:times"],
+                    "alive": np.ones(len(ids), dtype=bool),
+                    "values": {
+                        column: data[f"{source}:value:{column}"]
+                        for column in spec["values"]
+                    },
+                }
+                store._positions[source] = dict(zip(ids.tolist(), range(len(ids))))
+        return store
+
+
+def build_feature_store(data_dir: str = None) -> FeatureStore:
+    """
+    Build the feature store from the CSVs (through src.data_loader).
+
+    Args:
+        data_dir: Directory holding the CSV files. If None, uses data/.
+
+    Returns:
+        FeatureStore.
+    """
+    from .data_loader import load_all
+
+    data = load_all(["customers"] + TABLES, data_dir=data_dir)
+    return FeatureStore.build(
+        data["customers"],
+        data["orders"],
+        data["website_sessions"],
+        data["customer_support"],
+    )
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Look up customer features")
+    parser.add_argument("customer_ids", nargs="+", type=int)
+    parser.add_argument("--as-of", default=None, help="Point-in-time date")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    args = parser.parse_args(argv)
+
+    store = build_feature_store(args.data_dir)
+    features = store.lookup(args.customer_ids, as_of=args.as_of)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(features.T.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Session funnels and first/last-touch attribution over website_sessions.
+
+Sessions are streamed in chunks (see src.data_loader.iter_website_sessions)
+and joined to orders by customer_id and time with sorted as-of merges
+(pd.merge_asof), never with a cartesian join. For every chunk:
+
+- each session is matched forward to its customer's next order within the
+  attribution window, which gives the "ordered" funnel stage
+- each order is matched backward to its customer's latest session in the
+  window (last touch) and forward from the start of the window to the
+  earliest one (first touch); the best match per order is kept across
+  chunks, so sessions do not need to be sorted
+
+Funnel counts are summed per chunk into one small table per dimension.
+Memory is one chunk of sessions plus a few numbers per order (the orders
+themselves are held in memory as compact arrays), whatever the number of
+sessions. If the session file is in time order, each chunk only merges
+against the orders in its own time range.
+
+Funnel stages per session:
+    sessions   every session
+    engaged    not bounced
+    converted  the session's own converted flag
+    ordered    the customer placed an order within the window after the
+               session started (anonymous sessions never match)
+
+Usage:
+    python -m src.funnels
+    python -m src.funnels --window-days 3 --chunksize 200000
+
+Example:
+    >>> from src.funnels import analyze_sessions
+    >>> from src.data_loader import iter_website_sessions, load_orders
+    >>> result = analyze_sessions(iter_website_sessions(), load_orders())
+    >>> result["funnels"]["traffic_source"]
+    >>> result["attribution"]
+"""
+
+import argparse
+import sys
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import combine_date_time, parse_column
+
+DEFAULT_DIMENSIONS = ["traffic_source", "device", "landing_page"]
+
+DEFAULT_WINDOW = pd.Timedelta(days=7)
+
+STAGES = ["sessions", "engaged", "converted", "ordered"]
+
+# Attribution label of orders without a session in the window
+UNATTRIBUTED = "(none)"
+
+_NO_TIME = np.iinfo(np.int64).min
+
+
+def _order_frame(orders: pd.DataFrame) -> pd.DataFrame:
+    """Compact orders sorted by time: customer_id, order_ts, total."""
+    if "order_datetime" in orders.columns:
+        timestamps = orders["order_datetime"]
+    else:
+        dates, _ = parse_column(orders["order_date"].astype("str"), "%Y-%m-%d")
+        times, _ = parse_column(orders["order_time"].astype("str"), "%H:%M:%S")
+        timestamps = combine_date_time(dates, times)
+    frame = pd.DataFrame(
+        {
+            "customer_id": orders["customer_id"].astype("float64").to_numpy(),
+            "order_ts": timestamps.to_numpy(dtype="datetime64[us]"),
+            "total": orders["total"].to_numpy(dtype="float64"),
+        }
+    )
+    frame = frame.dropna(subset=["customer_id", "order_ts"])
+    frame["customer_id"] = frame["customer_id"].astype(np.int64)
+    return frame.sort_values("order_ts", kind="stable", ignore_index=True)
+
+
+def _session_frame(chunk: pd.DataFrame, labels: dict, by: str) -> pd.DataFrame:
+    """Identified sessions of a chunk sorted by start, with touch codes."""
+    if "session_start" in chunk.columns:
+        start = chunk["session_start"]
+    else:
+        date = chunk["session_date"]
+        if not pd.api.types.is_datetime64_any_dtype(date):
+            date, _ = parse_column(date.astype("str"), "%Y-%m-%d")
+        start = date + pd.to_timedelta(chunk["session_hour"].astype("int64"), "h")
+
+    touch = chunk[by].astype("str").fillna(UNATTRIBUTED)
+    codes, uniques = pd.factorize(touch)
+    for label in uniques:
+        labels.setdefault(label, len(labels))
+    global_codes = np.array([labels[label] for label in uniques], dtype=np.int32)
+
+    frame = pd.DataFrame(
+        {
+            "customer_id": chunk["customer_id"].astype("float64").to_numpy(),
+            "session_ts": start.to_numpy(dtype="datetime64[us]"),
+            "touch": global_codes[codes],
+            "_row": np.arange(len(chunk)),
+        }
+    )
+    frame = frame.dropna(subset=["customer_id", "session_ts"])
+    frame["customer_id"] = frame["customer_id"].astype(np.int64)
+    return frame.sort_values("session_ts", kind="stable", ignore_index=True)
+
+
+class _Attribution:
+    """Best first and last touch per order, combined across chunks."""
+
+    def __init__(self, orders: pd.DataFrame, window: pd.Timedelta):
+        self.orders = orders.assign(_order=np.arange(len(orders)))
+        self.window = window
+        self.first_ts = np.full(len(orders), np.iinfo(np.int64).max)
+        self.first_touch = np.full(len(orders), -1, dtype=np.int32)
+        self.last_ts = np.full(len(orders), _NO_TIME)
+        self.last_touch = np.full(len(orders), -1, dtype=np.int32)
+
+    def _slice(self, low, high) -> pd.DataFrame:
+        """Orders with order_ts in [low, high]; uses the sort by time."""
+        times = self.orders["order_ts"].to_numpy()
+        lo = np.searchsorted(times, np.datetime64(low, "us"), side="left")
+        hi = np.searchsorted(times, np.datetime64(high, "us"), side="right")
+        return self.orders.iloc[lo:hi]
+
+    def ordered_flags(self, sessions: pd.DataFrame) -> np.ndarray:
+        """For each session: did its customer order within the window?"""
+        if sessions.empty:
+            return np.zeros(0, dtype=bool)
+        start = sessions["session_ts"].iloc[0]
+        end = sessions["session_ts"].iloc[-1] + self.window
+        matched = pd.merge_asof(
+            sessions[["session_ts", "customer_id"]],
+            self._slice(start, end)[["order_ts", "customer_id"]],
+            left_on="session_ts",
+            right_on="order_ts",
+            by="customer_id",
+            direction="forward",
+            tolerance=self.window,
+        )
+        return matched["order_ts"].notna().to_numpy()
+
+    def update(self, sessions: pd.DataFrame) -> None:
+        """Improve first/last touches with the sessions of one chunk."""
+        if sessions.empty:
+            return
+        start = sessions["session_ts"].iloc[0]
+        end = sessions["session_ts"].iloc[-1] + self.window
+        orders = self._slice(start, end)
+        right = sessions[["session_ts", "customer_id", "touch"]]
+
+        last = pd.merge_asof(
+            orders,
+            right,
+            left_on="order_ts",
+            right_on="session_ts",
+            by="customer_id",
+            direction="backward",
+            tolerance=self.window,
+        )
+        self._keep(last, self.last_ts, self.last_touch, np.greater)
+
+        window_start = orders.assign(order_ts=orders["order_ts"] - self.window)
+        first = pd.merge_asof(
+            window_start,
+            right,
+            left_on="order_ts",
+            right_on="session_ts",
+            by="customer_id",
+            direction="forward",
+            tolerance=self.window,
+        )
+        self._keep(first, self.first_ts, self.first_touch, np.less)
+
+    @staticmethod
+    def _keep(matched, best_ts, best_touch, better) -> None:
+        hit = matched["session_ts"].notna().to_numpy()
+        position = matched["_order"].to_numpy()[hit]
+        ts = matched["session_ts"].to_numpy(dtype="datetime64[us]")[hit]
+        ts = ts.astype(np.int64)
+        improved = better(ts, best_ts[position])
+        best_ts[position[improved]] = ts[improved]
+        best_touch[position[improved]] = matched["touch"].to_numpy()[hit][improved]
+
+    def report(self, labels: dict) -> pd.DataFrame:
+        names = np.array(list(labels) + [UNATTRIBUTED], dtype=object)
+        total = self.orders["total"].to_numpy()
+        columns = {}
+        for model, touch in (
+            ("first_touch", self.first_touch),
+            ("last_touch", self.last_touch),
+        ):
+            codes = np.where(touch < 0, len(labels), touch)
+            columns[f"{model}_orders"] = np.bincount(codes, minlength=len(names))
+            columns[f"{model}_revenue"] = np.bincount(
+                codes, weights=total, minlength=len(names)
+            )
+        report = pd.DataFrame(columns, index=pd.Index(names, name="touch"))
+        report = report.groupby(level=0, sort=False).sum()
+        report = report[report.sum(axis=1) > 0]
+        return report.sort_values("last_touch_revenue", ascending=False)
+
+
+def _funnel_counts(chunk: pd.DataFrame, ordered: np.ndarray, dimension: str):
+    stages = pd.DataFrame(
+        {
+            dimension: chunk[dimension].astype("str").fillna("(missing)").to_numpy(),
+            "sessions": 1,
+            "engaged": ~chunk["bounced"].astype(bool).to_numpy(),
+            "converted": chunk["converted"].astype(bool).to_numpy(),
+            "ordered": ordered,
+        }
+    )
+    return stages.groupby(dimension, sort=False).sum()
+
+
+def _finish_funnel(counts: pd.DataFrame) -> pd.DataFrame:
+    funnel = counts.astype("int64").sort_values("sessions", ascending=False)
+    sessions = funnel["sessions"].where(funnel["sessions"] > 0)
+    for stage in STAGES[1:]:
+        funnel[f"{stage}_rate"] = (funnel[stage] / sessions).fillna(0.0)
+    return funnel
+
+
+@instrumentation.traced("stage")
+def analyze_sessions(
+    sessions: Iterable[pd.DataFrame],
+    orders: pd.DataFrame,
+    dimensions: list = None,
+    window: pd.Timedelta = DEFAULT_WINDOW,
+    attribution_by: str = "traffic_source",
+) -> dict:
+    """
+    Build conversion funnels and first/last-touch attribution.
+
+    Args:
+        sessions: Iterable of session chunks with customer_id,
+            session_date (or session_start), session_hour, bounced,
+            converted, the funnel dimensions and attribution_by.
+        orders: Orders with customer_id, total and order_datetime, or
+            order_date and order_time.
+        dimensions: Session columns to build funnels by. Defaults to
+            DEFAULT_DIMENSIONS.
+        window: How long after a session an order still counts for it.
+        attribution_by: Session column that names a touch.
+
+    Returns:
+        dict with "funnels" (dimension -> DataFrame of STAGES counts and
+        rates), "attribution" (DataFrame of first/last-touch orders and
+        revenue per touch, including UNATTRIBUTED) and "sessions" (int).
+    """
+    dimensions = list(dimensions or DEFAULT_DIMENSIONS)
+    window = pd.Timedelta(window)
+    attribution = _Attribution(_order_frame(orders), window)
+    labels = {}
+    counts = {dimension: None for dimension in dimensions}
+    total_sessions = 0
+
+    for chunk in sessions:
+        total_sessions += len(chunk)
+        identified = _session_frame(chunk, labels, attribution_by)
+        ordered = np.zeros(len(chunk), dtype=bool)
+        ordered[identified["_row"].to_numpy()] = attribution.ordered_flags(identified)
+        attribution.update(identified)
+
+        for dimension in dimensions:
+            part = _funnel_counts(chunk, ordered, dimension)
+            previous = counts[dimension]
+            counts[dimension] = (
+                part if previous is None else previous.add(part, fill_value=0)
+            )
+
+    funnels = {
+        dimension: _finish_funnel(
+            frame if frame is not None else pd.DataFrame(columns=STAGES)
+        )
+        for dimension, frame in counts.items()
+    }
+    return {
+        "funnels": funnels,
+        "attribution": attribution.report(labels),
+        "sessions": total_sessions,
+    }
+
+
+def main(argv: list = None) -> int:
+    from .data_loader import iter_website_sessions, load_orders
+
+    parser = argparse.ArgumentParser(description="Session funnels and attribution")
+    parser.add_argument("--sessions", default=None, help="Sessions CSV path")
+    parser.add_argument("--orders", default=None, help="Orders CSV path")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--window-days", type=float, default=DEFAULT_WINDOW.days)
+    args = parser.parse_args(argv)
+
+    result = analyze_sessions(
+        iter_website_sessions(args.sessions, args.chunksize),
+        load_orders(args.orders),
+        window=pd.Timedelta(days=args.window_days),
+    )
+    print(f"{result['sessions']} sessions")
+    for dimension, funnel in result["funnels"].items():
+        print(f"\nFunnel by {dimension}:\n{funnel.to_string()}")
+    print(f"\nAttribution:\n{result['attribution'].to_string()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+"""
+Incremental (append-only) ingestion of orders and order_items.
+
+build_warehouse() rebuilds a table whenever its CSV changes, so a day's new
+orders cost a full reload of the history. This module instead treats the
+order CSVs as append-only logs and loads only what was added since the last
+run:
+
+- every source file has a byte offset in the _cartly_watermarks table;
+  a run reads the file from that offset to its last complete line, so
+  refresh cost follows the size of the new data, not of the history
+- new files dropped into data/incoming/<table>/*.csv are picked up
+  automatically (they start at offset 0)
+- a file that shrank, or whose bytes before the offset changed, is treated
+  as rewritten and read again from the start
+- new rows are upserted on the table's primary key, so re-sent or
+  corrected rows replace the stored ones instead of failing
+- the high-watermark (largest order_id and order_date) of each table is
+  stored next to the offsets for monitoring and downstream jobs
+
+Loading orders also updates the per-customer aggregates in the customers
+table (total_orders, total_spent, avg_order_value, last_order_date) from the
+new rows alone: the batch's totals are added and the old values of replaced
+orders are subtracted. A correction never moves last_order_date backwards.
+
+Usage:
+    python -m src.incremental                 # refresh orders and order_items
+    python -m src.incremental --table orders
+
+Example:
+    >>> from src.incremental import refresh
+    >>> refresh()
+    {'orders': {'files': 1, 'rows': 120, 'inserted': 118, 'replaced': 2, ...}}
+"""
+
+import argparse
+import hashlib
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from . import instrumentation, warehouse
+from .schemas import get_schema
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Extra source files are picked up from <data_dir>/<INCOMING_DIR>/<table>/
+INCOMING_DIR = "incoming"
+
+WATERMARK_TABLE = "_cartly_watermarks"
+
+# High-watermark columns per table: (ID column, date column or None)
+WATERMARK_COLUMNS = {
+    "orders": ("order_id", "order_date"),
+    "order_items": ("order_id", None),
+}
+
+# Tables refreshed by default, in dependency order
+INCREMENTAL_TABLES = list(WATERMARK_COLUMNS)
+
+# Bytes before the stored offset that must be unchanged for an append
+CHECK_BYTES = 256
+
+
+def _ensure_watermarks(conn) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            table_name VARCHAR,
+            source_path VARCHAR,
+            byte_offset BIGINT,
+            check_hash VARCHAR,
+            high_water_id BIGINT,
+            high_water_date DATE,
+            row_count BIGINT,
+            loaded_at TIMESTAMP DEFAULT current_timestamp,
+            PRIMARY KEY (table_name, source_path)
+        )
+    """)
+
+
+def source_files(table: str, data_dir: str = None) -> list:
+    """
+    List the source CSVs of a table: its main file, then incoming files.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+
+    Returns:
+        List of Paths; incoming files are sorted by name.
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    files = []
+    main_file = data_dir / get_schema(table)["file"]
+    if main_file.exists():
+        files.append(main_file)
+    files.extend(sorted((data_dir / INCOMING_DIR / table).glob("*.csv")))
+    return files
+
+
+def _check_hash(path: Path, offset: int) -> str:
+    """Hash of the bytes just before offset, to detect rewritten files."""
+    with open(path, "rb") as f:
+        f.seek(max(offset - CHECK_BYTES, 0))
+        return hashlib.sha1(f.read(min(offset, CHECK_BYTES))).hexdigest()
+
+
+def get_watermark(conn, table: str, path: Path = None) -> dict:
+    """
+    Return the stored watermark of a table or of one of its source files.
+
+    Args:
+        conn: Open warehouse connection.
+        table: Table name.
+        path: Source file. If None, combines all sources of the table.
+
+    Returns:
+        dict with byte_offset (per file only), high_water_id,
+        high_water_date and row_count; None if nothing was loaded yet.
+    """
+    _ensure_watermarks(conn)
+    if path is not None:
+        row = conn.execute(
+            f"SELECT byte_offset, check_hash, high_water_id, high_water_date, "
+            f"row_count FROM {WATERMARK_TABLE} "
+            "WHERE table_name = ? AND source_path = ?",
+            [table, str(Path(path).resolve())],
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ["byte_offset", "check_hash", "high_water_id", "high_water_date"]
+        return dict(zip(keys + ["row_count"], row))
+
+    row = conn.execute(
+        f"SELECT MAX(high_water_id), MAX(high_water_date), SUM(row_count), "
+        f"COUNT(*) FROM {WATERMARK_TABLE} WHERE table_name = ?",
+        [table],
+    ).fetchone()
+    if not row[3]:
+        return None
+    return {
+        "high_water_id": row[0],
+        "high_water_date": row[1],
+        "row_count": int(row[2]),
+    }
+
+
+def _start_offset(conn, table: str, path: Path) -> int:
+    """Byte offset to resume reading a source file from."""
+    size = path.stat().st_size
+    mark = get_watermark(conn, table, path)
+    if mark is None:
+        # A main CSV already loaded by build_warehouse() needs no re-read
+        is_main = path.name == get_schema(table)["file"]
+        if is_main and _table_exists(conn, table):
+            return 0 if warehouse.is_stale(conn, table, path) else size
+        return 0
+
+    offset = mark["byte_offset"]
+    if offset > size or _check_hash(path, offset) != mark["check_hash"]:
+        return 0
+    return offset
+
+
+def _table_exists(conn, table: str) -> bool:
+    return bool(
+        conn.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+            [table],
+        ).fetchone()[0]
+    )
+
+
+def read_new_rows(path: Path, offset: int) -> tuple:
+    """
+    Read the complete lines of a CSV after a byte offset.
+
+    A trailing line without a newline is left for the next run, since the
+    writer may still be appending to it.
+
+    Args:
+        path: CSV file with a header row.
+        offset: Byte offset of the first unread line; 0 reads the whole
+            file.
+
+    Returns:
+        (DataFrame of text columns, new byte offset).
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        data = f.read()
+
+    end = data.rfind(b"\n") + 1
+    names = header.decode("utf-8").strip().split(",")
+    new_offset = max(offset, len(header)) + end
+    if end == 0:
+        return pd.DataFrame(columns=names, dtype="str"), new_offset
+
+    rows = pd.read_csv(io.BytesIO(data[:end]), header=None, names=names, dtype="str")
+    return rows, new_offset
+
+
+# Per-customer changes caused by upserting the _batch orders
+_CUSTOMER_DELTAS = """
+    SELECT customer_id,
+           SUM(orders) AS orders,
+           SUM(spent) AS spent,
+           MAX(last_date) AS last_date
+    FROM (
+        SELECT customer_id, 1 AS orders, total AS spent,
+               order_date AS last_date
+        FROM _batch
+        UNION ALL
+        SELECT o.customer_id, -1, -o.total, NULL
+        FROM orders o
+        JOIN _batch b ON o.order_id = b.order_id
+    )
+    GROUP BY customer_id
+"""
+
+
+def _update_customers(conn) -> int:
+    """Apply the _deltas table to the customers aggregates."""
+    if not _table_exists(conn, "customers"):
+        return 0
+    updated = conn.execute("""
+        UPDATE customers AS c
+        SET total_orders = c.total_orders + d.orders,
+            total_spent = ROUND(c.total_spent + d.spent, 2),
+            avg_order_value = CASE
+                WHEN c.total_orders + d.orders > 0
+                THEN ROUND((c.total_spent + d.spent) / (c.total_orders + d.orders), 2)
+                ELSE 0 END,
+            last_order_date = CASE
+                WHEN d.last_date IS NULL THEN c.last_order_date
+                ELSE GREATEST(COALESCE(c.last_order_date, d.last_date), d.last_date)
+                END
+        FROM _deltas AS d
+        WHERE c.customer_id = d.customer_id
+    """).fetchone()[0]
+    return int(updated)
+
+
+def _affected_dates(conn, table: str) -> set:
+    """Order dates touched by upserting _batch, before the upsert."""
+    if table == "orders":
+        sql = """
+            SELECT order_date FROM _batch
+            UNION
+            SELECT o.order_date FROM orders o JOIN _batch b USING (order_id)
+        """
+    elif _table_exists(conn, "orders"):
+        sql = """
+            SELECT DISTINCT o.order_date FROM orders o
+            WHERE o.order_id IN (SELECT order_id FROM _batch)
+        """
+    else:
+        return set()
+    return {row[0] for row in conn.execute(sql).fetchall()}
+
+
+@instrumentation.traced("stage")
+def ingest_file(conn, table: str, path: Path) -> dict:
+    """
+    Upsert the rows added to one source file since its last load.
+
+    Args:
+        conn: Open warehouse connection, not inside a transaction.
+        table: "orders" or "order_items".
+        path: Source CSV.
+
+    Returns:
+        dict with rows (read), inserted, replaced, customers_updated and
+        order_dates (set of order dates whose orders or items changed).
+    """
+    if table not in WATERMARK_COLUMNS:
+        raise KeyError(
+            f"No incremental ingestion for '{table}'. "
+            f"Available: {INCREMENTAL_TABLES}"
+        )
+    path = Path(path)
+    id_column, date_column = WATERMARK_COLUMNS[table]
+    key = warehouse.PRIMARY_KEYS[table]
+
+    offset = _start_offset(conn, table, path)
+    rows, new_offset = read_new_rows(path, offset)
+    stats = {
+        "rows": len(rows),
+        "inserted": 0,
+        "replaced": 0,
+        "customers_updated": 0,
+        "order_dates": set(),
+    }
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        if not _table_exists(conn, table):
+            warehouse.create_table(conn, table, path)
+
+        if len(rows):
+            # Within a batch, the last version of a key wins
+            rows = rows.drop_duplicates(key, keep="last")
+            conn.register("_incoming", rows)
+            conn.execute(
+                "CREATE OR REPLACE TEMP TABLE _batch AS "
+                + warehouse.typed_select(table, "_incoming", path)
+            )
+            conn.unregister("_incoming")
+
+            stats["replaced"] = conn.execute(
+                f'SELECT COUNT(*) FROM {table} t JOIN _batch b USING ("{key}")'
+            ).fetchone()[0]
+            stats["order_dates"] = _affected_dates(conn, table)
+            if table == "orders":
+                conn.execute(
+                    "CREATE OR REPLACE TEMP TABLE _deltas AS " + _CUSTOMER_DELTAS
+                )
+
+            order = ", ".join(f'"{c}"' for c in warehouse.SORT_KEYS.get(table, [key]))
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} SELECT * FROM _batch ORDER BY {order}"
+            )
+            stats["inserted"] = len(rows) - stats["replaced"]
+
+            if table == "orders":
+                stats["customers_updated"] = _update_customers(conn)
+
+        _save_watermark(conn, table, path, new_offset, id_column, date_column)
+        if path.name == get_schema(table)["file"]:
+            # Keep build_warehouse() from reloading the whole file
+            warehouse.record_source(conn, table, path)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DROP TABLE IF EXISTS _batch")
+        conn.execute("DROP TABLE IF EXISTS _deltas")
+
+    return stats
+
+
+def _save_watermark(
+    conn, table: str, path: Path, offset: int, id_column: str, date_column: str
+) -> None:
+    """Store the new offset and raise the high-watermark of a source file."""
+    previous = get_watermark(conn, table, path) or {}
+    high_id, high_date = previous.get("high_water_id"), previous.get("high_water_date")
+    if _table_exists(conn, "_batch"):
+        date_sql = f'MAX("{date_column}")' if date_column else "NULL"
+        batch_id, batch_date = conn.execute(
+            f'SELECT MAX("{id_column}"), {date_sql} FROM _batch'
+        ).fetchone()
+        if batch_id is not None:
+            high_id = batch_id if high_id is None else max(high_id, batch_id)
+        if batch_date is not None:
+            high_date = batch_date if high_date is None else max(high_date, batch_date)
+
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.execute(
+        f"INSERT OR REPLACE INTO {WATERMARK_TABLE} "
+        "(table_name, source_path, byte_offset, check_hash, high_water_id, "
+        "high_water_date, row_count, loaded_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, current_timestamp)",
+        [
+            table,
+            str(path.resolve()),
+            offset,
+            _check_hash(path, offset),
+            high_id,
+            high_date,
+            rows,
+        ],
+    )
+
+
+@instrumentation.traced("stage")
+def refresh(db_path: str = None, data_dir: str = None, tables: list = None) -> dict:
+    """
+    Load the new rows of every source file into the warehouse.
+
+    Args:
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        tables: Tables to refresh. If None, INCREMENTAL_TABLES.
+
+    Returns:
+        Dict mapping table name to summed ingest_file() stats (order_dates
+        is the union over files) plus the number of files read and the
+        table's high-watermark.
+    """
+    results = {}
+    conn = warehouse.connect(db_path)
+    try:
+        _ensure_watermarks(conn)
+        for table in tables or INCREMENTAL_TABLES:
+            files = source_files(table, data_dir)
+            if not files:
+                raise FileNotFoundError(
+                    f"{get_schema(table)['label']} file not found in: "
+                    f"{data_dir or DATA_DIR}"
+                )
+            totals = {"files": 0, "order_dates": set()}
+            for path in files:
+                stats = ingest_file(conn, table, path)
+                totals["files"] += 1 if stats["rows"] else 0
+                totals["order_dates"] |= stats.pop("order_dates")
+                for name, value in stats.items():
+                    totals[name] = totals.get(name, 0) + value
+            totals.update(get_watermark(conn, table) or {})
+            results[table] = totals
+    finally:
+        conn.close()
+
+    return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Load new orders and order items into the Cartly warehouse"
+    )
+    parser.add_argument("--db", default=None, help="Path to the .duckdb file")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    parser.add_argument("--table", action="append", help="Only refresh this table")
+    args = parser.parse_args(argv)
+
+    for table, stats in refresh(args.db, args.data_dir, args.table).items():
+        print(
+            f"  {table}: {stats['rows']} new rows from {stats['files']} file(s), "
+            f"{stats['inserted']} inserted, {stats['replaced']} replaced, "
+            f"watermark {stats['high_water_id']} / {stats['high_water_date']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+"""
+Opt-in timing and resource instrumentation for loaders and pipeline stages.
+
+Loaders in src.data_loader, the warehouse and the analysis stages
+(cohorts, funnels, cubes, dedup, incremental ingestion) are wrapped with
+@traced or span(). While instrumentation is enabled, every call records:
+
+    name, category   e.g. "data_loader.load_orders", "loader"
+    wall_s, cpu_s    wall-clock time and CPU time of the calling thread
+    self_s           wall time not covered by nested traced calls
+    rows_in          rows of the first DataFrame argument, if any
+    rows_out         rows returned (summed over chunks for iterators)
+    bytes_read       size of the files the call read
+    cache_hits, cache_misses
+                     lookups in the parsed-table cache (src/cache.py)
+    peak_rss_delta_mb
+                     how much the call raised the process's peak RSS
+    depth, parent    nesting under other traced calls; worker threads
+                     started through propagate() nest under the caller
+    error            exception type, if the call raised
+
+Records are kept in memory for summary() and, optionally, written as JSON
+lines (one object per call, as it finishes) or as a Chrome trace-event file
+(written on disable() or at exit; open it in chrome://tracing or Perfetto).
+
+When disabled (the default), a traced call costs one global flag check.
+
+Configuration:
+    CARTLY_TRACE: Enable at import. "1" or "stderr" writes JSON lines to
+        stderr; a path ending in .json writes a Chrome trace; any other
+        path appends JSON lines to that file.
+    CARTLY_TRACE_SUMMARY: Set to "1" to print summary() to stderr at exit.
+
+Usage:
+    CARTLY_TRACE=trace.jsonl python -m src.cohorts ...
+    python -m src.instrumentation trace.jsonl     # per-stage summary table
+
+Example:
+    >>> from src import instrumentation
+    >>> from src.data_loader import load_orders
+    >>> instrumentation.enable("trace.json")
+    >>> with instrumentation.span("monthly_report"):
+    ...     orders = load_orders()
+    >>> instrumentation.disable()
+    >>> instrumentation.summary()
+"""
+
+import argparse
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+COUNTERS = ["rows_in", "rows_out", "bytes_read", "cache_hits", "cache_misses"]
+
+SUMMARY_COLUMNS = [
+    "calls",
+    "wall_s",
+    "self_s",
+    "cpu_s",
+    "mean_wall_s",
+    *COUNTERS,
+    "peak_rss_delta_mb",
+    "errors",
+]
+
+# Recorder while enabled, None while disabled
+_recorder = None
+
+# Open spans of the current thread or task, innermost last
+_stack = contextvars.ContextVar("instrumentation_stack", default=())
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def count_rows(value):
+    """Rows in a DataFrame, Series, array, dict of frames or Dataset."""
+    if isinstance(value, (pd.DataFrame, pd.Series)) or getattr(value, "ndim", 0):
+        return len(value)
+    tables = getattr(value, "tables", value)
+    if isinstance(tables, dict) and tables:
+        counts = [count_rows(v) for v in tables.values()]
+        if all(c is not None for c in counts):
+            return sum(counts)
+    return None
+
+
+class _Recorder:
+    """Collects finished spans and writes them to the configured output."""
+
+    def __init__(self, output=None, fmt: str = None):
+        self.records = []
+        self.lock = threading.Lock()
+        self.output = output
+        self.fmt = fmt
+        self.stream = None
+        if output in ("1", "-", "stderr"):
+            self.fmt = "jsonl"
+            self.stream = sys.stderr
+        elif output is not None:
+            self.output = Path(output)
+            if self.fmt is None:
+                self.fmt = "chrome" if self.output.suffix == ".json" else "jsonl"
+            if self.fmt == "jsonl":
+                self.output.parent.mkdir(parents=True, exist_ok=True)
+                # Kept open across add() calls; close() closes it
+                self.stream = open(self.output, "a", encoding="utf-8")  # noqa: SIM115
+        if self.fmt not in (None, "jsonl", "chrome"):
+            raise ValueError(f"fmt must be 'jsonl' or 'chrome', got {fmt!r}")
+
+    def add(self, record: dict) -> None:
+        with self.lock:
+            self.records.append(record)
+            if self.stream is not None:
+                self.stream.write(json.dumps(record, default=str) + "\n")
+                self.stream.flush()
+
+    def close(self) -> None:
+        if self.fmt == "chrome" and self.output is not None:
+            write_chrome_trace(self.records, self.output)
+        if self.stream is not None and self.stream is not sys.stderr:
+            self.stream.close()
+        self.stream = None
+
+
+class _NullRecord(dict):
+    """Record handed out while disabled; drops every write."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _NullSpan:
+    def __enter__(self):
+        return _NullRecord()
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _covered(segments: list, intervals: list) -> float:
+    """Time within segments covered by at least one of intervals."""
+    merged = []
+    for start, stop in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return sum(
+        max(0.0, min(stop, end) - max(start, begin))
+        for start, stop in segments
+        for begin, end in merged
+    )
+
+
+def _pop(span) -> None:
+    # A plain span held open across a yield can leave spans out of order
+    _stack.set(tuple(open_span for open_span in _stack.get() if open_span is not span))
+
+
+class _Span:
+    def __init__(self, recorder: _Recorder, name: str, category: str, fields: dict):
+        self.recorder = recorder
+        self.record = {"name": name, "category": category, **fields}
+        # perf_counter intervals this span ran, and those of its children;
+        # children in worker threads may overlap each other
+        self.segments = []
+        self.children = []
+
+    def __enter__(self):
+        stack = _stack.get()
+        self.parent = stack[-1] if stack else None
+        self.record["depth"] = len(stack)
+        _stack.set((*stack, self))
+        self.record["ts"] = time.time()
+        self.peak_before = _peak_rss_mb()
+        self.cpu_before = 0.0
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self.record
+
+    def suspend(self) -> None:
+        """Stop the clocks and leave the stack, e.g. while a generator yields."""
+        self.segments.append((self.start, time.perf_counter()))
+        self.cpu_before += time.thread_time() - self.cpu_start
+        _pop(self)
+
+    def resume(self) -> None:
+        """Re-enter the stack and restart the clocks after suspend()."""
+        _stack.set((*_stack.get(), self))
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.segments.append((self.start, time.perf_counter()))
+        wall = sum(stop - start for start, stop in self.segments)
+        record = self.record
+        record["wall_s"] = wall
+        record["self_s"] = wall - _covered(self.segments, self.children)
+        record["cpu_s"] = self.cpu_before + time.thread_time() - self.cpu_start
+        if self.peak_before is not None:
+            record["peak_rss_delta_mb"] = _peak_rss_mb() - self.peak_before
+        # A consumer stopping early closes the generator; that is no error
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            record["error"] = exc_type.__name__
+        record["pid"] = os.getpid()
+        record["tid"] = threading.get_ident()
+        if self.parent is not None:
+            record["parent"] = self.parent.record["name"]
+            self.parent.children.extend(self.segments)
+        _pop(self)
+        self.recorder.add(record)
+        return False
+
+
+def propagate(func):
+    """
+    Wrap func so spans it opens in another thread nest under the current one.
+
+    Worker threads start with no open spans; call this once per task when
+    submitting it, e.g. pool.submit(instrumentation.propagate(load), table).
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def enabled() -> bool:
+    """Return True if calls are being recorded."""
+    return _recorder is not None
+
+
+def enable(output=None, fmt: str = None) -> None:
+    """
+    Start recording, replacing any current recorder.
+
+    Args:
+        output: None to keep records in memory only, "stderr" for JSON
+            lines on stderr, or a file path (.json for a Chrome trace,
+            anything else for JSON lines).
+        fmt: "jsonl" or "chrome", to override the choice by extension.
+    """
+    global _recorder
+    if _recorder is not None:
+        disable()
+    _recorder = _Recorder(output, fmt)
+
+
+def disable() -> list:
+    """
+    Stop recording and write any pending output.
+
+    Returns:
+        The records made since enable().
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None:
+        return []
+    recorder.close()
+    return recorder.records
+
+
+def records() -> list:
+    """Records made so far by the current recorder."""
+    return list(_recorder.records) if _recorder is not None else []
+
+
+def span(name: str, category: str = "stage", **fields):
+    """
+    Context manager that records the enclosed block as one call.
+
+    The record dict is returned by __enter__, so the block can fill in
+    counters such as rows_out; while disabled, writes to it are dropped.
+
+    Example:
+        >>> with span("clean_orders", rows_in=len(orders)) as record:
+        ...     cleaned = clean(orders)
+        ...     record["rows_out"] = len(cleaned)
+    """
+    if _recorder is None:
+        return _NULL_SPAN
+    return _Span(_recorder, name, category, fields)
+
+
+def add(field: str, amount=1) -> None:
+    """Add to a counter (e.g. bytes_read, cache_hits) of the innermost span."""
+    if _recorder is None:
+        return
+    stack = _stack.get()
+    if stack:
+        record = stack[-1].record
+        record[field] = record.get(field, 0) + amount
+
+
+def _rows_in(args, kwargs):
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, pd.DataFrame):
+            return len(value)
+    return None
+
+
+def traced(category: str = "stage", name: str = None):
+    """
+    Decorator that records every call of a function while enabled.
+
+    rows_in is taken from the first DataFrame argument and rows_out from
+    the return value. For generator functions the span times only the
+    work inside the generator, not the consumer's between chunks, and
+    rows_out sums the yielded chunks; stopping early is not an error.
+
+    Args:
+        category: Record category, e.g. "loader" or "stage".
+        name: Record name. Defaults to "<module>.<function>".
+    """
+
+    def decorate(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _recorder is None:
+                    yield from func(*args, **kwargs)
+                    return
+                active = span(label, category, rows_in=_rows_in(args, kwargs))
+                with active as record:
+                    rows = 0
+                    iterator = func(*args, **kwargs)
+                    try:
+                        for item in iterator:
+                            rows += count_rows(item) or 0
+                            record["rows_out"] = rows
+                            # The consumer's work between chunks is not ours
+                            active.suspend()
+                            try:
+                                yield item
+                            finally:
+                                active.resume()
+                    finally:
+                        iterator.close()
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with span(label, category, rows_in=_rows_in(args, kwargs)) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = count_rows(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def write_chrome_trace(records: list, path) -> Path:
+    """
+    Write records as a Chrome trace-event file (complete "X" events).
+
+    Args:
+        records: Records from disable() or records().
+        path: Output .json path.
+
+    Returns:
+        The written path.
+    """
+    events = []
+    for record in records:
+        args = {
+            k: v
+            for k, v in record.items()
+            if k not in ("name", "category", "ts", "wall_s", "pid", "tid")
+        }
+        events.append(
+            {
+                "name": record["name"],
+                "cat": record.get("category", "stage"),
+                "ph": "X",
+                "ts": record["ts"] * 1e6,
+                "dur": record["wall_s"] * 1e6,
+                "pid": record.get("pid", 0),
+                "tid": record.get("tid", 0),
+                "args": args,
+            }
+        )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"traceEvents": events}, default=str))
+    return path
+
+
+def read_records(path) -> list:
+    """Read records back from a JSON lines file or a Chrome trace."""
+    text = Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith('{"traceEvents"'):
+        return [
+            {
+                "name": event["name"],
+                "category": event.get("cat"),
+                "ts": event["ts"] / 1e6,
+                "wall_s": event["dur"] / 1e6,
+                **event.get("args", {}),
+            }
+            for event in json.loads(text)["traceEvents"]
+        ]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def summary(recorded: list = None) -> pd.DataFrame:
+    """
+    Per-name totals of the records, slowest first.
+
+    Args:
+        recorded: Records to summarize. If None, the current recorder's.
+
+    Returns:
+        DataFrame indexed by name with SUMMARY_COLUMNS. Times and counters
+        are totals over calls, except mean_wall_s and peak_rss_delta_mb
+        (the largest delta of any call).
+    """
+    recorded = records() if recorded is None else recorded
+    frame = pd.DataFrame(recorded)
+    if frame.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS, index=pd.Index([], name="name"))
+    for column in ["self_s", "cpu_s", "peak_rss_delta_mb", "error", *COUNTERS]:
+        if column not in frame.columns:
+            frame[column] = None
+    for column in ["wall_s", "self_s", "cpu_s", "peak_rss_delta_mb", *COUNTERS]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+
+    grouped = frame.groupby("name", sort=False)
+    result = grouped.agg(
+        calls=("wall_s", "size"),
+        wall_s=("wall_s", "sum"),
+        self_s=("self_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        mean_wall_s=("wall_s", "mean"),
+        **{counter: (counter, "sum") for counter in COUNTERS},
+        peak_rss_delta_mb=("peak_rss_delta_mb", "max"),
+        errors=("error", "count"),
+    )
+    return result.sort_values("wall_s", ascending=False)
+
+
+def format_summary(table: pd.DataFrame) -> str:
+    """Render summary() as a fixed-width text table."""
+    if table.empty:
+        return "No instrumented calls recorded."
+    shown = table.copy()
+    for column in COUNTERS:
+        shown[column] = shown[column].astype("int64")
+    return shown.to_string(float_format=lambda v: f"{v:.3f}")
+
+
+def _configure_from_env() -> None:
+    # atexit runs handlers in reverse order: summary first, then disable()
+    atexit.register(disable)
+    output = os.environ.get("CARTLY_TRACE", "").strip()
+    if output and output.lower() not in ("0", "false", "no"):
+        enable(output)
+    if os.environ.get("CARTLY_TRACE_SUMMARY", "").lower() in ("1", "true", "yes"):
+        if _recorder is None:
+            enable()
+        atexit.register(_print_summary)
+
+
+def _print_summary() -> None:
+    print(format_summary(summary()), file=sys.stderr)
+
+
+_configure_from_env()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize an instrumentation trace")
+    parser.add_argument("trace", help="JSON lines file or Chrome trace (.json)")
+    args = parser.parse_args(argv)
+
+    print(format_summary(summary(read_records(args.trace))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,739 @@
+"""
+Lazy queries over the Cartly tables with predicate and projection pushdown.
+
+load_orders() and friends parse every column and every row before the caller
+filters down to, say, one month of orders in one country. A LazyFrame
+instead records the operations as a plan and runs nothing until collect():
+
+    scan()/scan_warehouse() -> filter() -> select() -> join() -> groupby().agg()
+
+The plan is compiled to a single DuckDB query in which
+
+- each scan only reads and casts the columns the rest of the plan uses
+  (projection pushdown: untouched CSV columns are never converted, and
+  untouched warehouse columns are never read)
+- filters are SQL predicates that DuckDB pushes into the scan, so rows are
+  dropped before they are typed, joined or aggregated; on warehouse tables
+  the min/max zone maps skip whole row groups (orders are stored sorted by
+  order_date, see src/warehouse.py)
+- only the final result is converted to pandas, with the CSV loaders'
+  categorical and integer dtypes
+
+Predicates are built with col() and Python operators (use & and |, not
+and/or), or given as SQL text. Values are inlined as escaped SQL literals.
+
+Column types follow the warehouse (src/warehouse.py): order_date and
+signup_date are real dates, and invalid signup dates are NULL.
+
+Example:
+    >>> from src.lazy import col, scan
+    >>> october_india = (
+    ...     scan("orders")
+    ...     .filter(col("order_date").between("2024-10-01", "2024-10-31"))
+    ...     .filter(col("shipping_country") == "India")
+    ...     .select("order_id", "customer_id", "total")
+    ... )
+    >>> print(october_india.to_sql())
+    >>> october_india.collect()
+    >>> (scan("orders")
+    ...  .join(scan("customers").select("customer_id", "segment"),
+    ...        on="customer_id")
+    ...  .groupby("segment")
+    ...  .agg(revenue=("total", "sum"), orders=("order_id", "count"))
+    ...  .collect())
+"""
+
+import datetime
+import math
+import numbers
+from pathlib import Path
+
+import pandas as pd
+
+from . import instrumentation
+from .schemas import get_schema
+from .warehouse import (
+    COLUMN_OVERRIDES,
+    DATA_DIR,
+    DEFAULT_DB_PATH,
+    _duckdb,
+    _fetch_arrow,
+    column_types,
+    connect,
+    csv_source,
+    typed_select,
+)
+
+# Aggregation names accepted by agg(), as SQL templates
+AGGREGATES = {
+    "sum": "SUM({})",
+    "mean": "AVG({})",
+    "median": "MEDIAN({})",
+    "min": "MIN({})",
+    "max": "MAX({})",
+    "std": "STDDEV_SAMP({})",
+    "count": "COUNT({})",
+    "nunique": "COUNT(DISTINCT {})",
+    "size": "COUNT(*)",
+}
+
+JOIN_TYPES = {
+    "inner": "INNER JOIN",
+    "left": "LEFT JOIN",
+    "right": "RIGHT JOIN",
+    "outer": "FULL OUTER JOIN",
+    "semi": "SEMI JOIN",
+    "anti": "ANTI JOIN",
+}
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value) -> str:
+    """Render a Python value as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return repr(value) if math.isfinite(value) else f"CAST('{value}' AS DOUBLE)"
+    if isinstance(value, datetime.datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, datetime.date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Cannot use {type(value).__name__} value {value!r} in a query")
+
+
+class Expr:
+    """
+    A SQL expression over columns, built with col() and Python operators.
+
+    Comparisons return new expressions, so `col("total") > 100` can be
+    passed to LazyFrame.filter(). Combine conditions with &, | and ~.
+    """
+
+    __hash__ = None
+
+    def __init__(self, sql: str, columns=frozenset()):
+        self.sql = sql
+        self.columns = frozenset(columns)
+
+    def _binary(self, op: str, other, reverse: bool = False) -> "Expr":
+        other = _as_expr(other)
+        left, right = (other, self) if reverse else (self, other)
+        return Expr(f"({left.sql} {op} {right.sql})", left.columns | right.columns)
+
+    def __eq__(self, other):
+        if other is None:
+            return self.is_null()
+        return self._binary("=", other)
+
+    def __ne__(self, other):
+        if other is None:
+            return self.not_null()
+        return self._binary("<>", other)
+
+    def __lt__(self, other):
+        return self._binary("<", other)
+
+    def __le__(self, other):
+        return self._binary("<=", other)
+
+    def __gt__(self, other):
+        return self._binary(">", other)
+
+    def __ge__(self, other):
+        return self._binary(">=", other)
+
+    def __and__(self, other):
+        return self._binary("AND", other)
+
+    def __rand__(self, other):
+        return self._binary("AND", other, reverse=True)
+
+    def __or__(self, other):
+        return self._binary("OR", other)
+
+    def __ror__(self, other):
+        return self._binary("OR", other, reverse=True)
+
+    def __invert__(self):
+        return Expr(f"(NOT {self.sql})", self.columns)
+
+    def __add__(self, other):
+        return self._binary("+", other)
+
+    def __radd__(self, other):
+        return self._binary("+", other, reverse=True)
+
+    def __sub__(self, other):
+        return self._binary("-", other)
+
+    def __rsub__(self, other):
+        return self._binary("-", other, reverse=True)
+
+    def __mul__(self, other):
+        return self._binary("*", other)
+
+    def __rmul__(self, other):
+        return self._binary("*", other, reverse=True)
+
+    def __truediv__(self, other):
+        return self._binary("/", other)
+
+    def __rtruediv__(self, other):
+        return self._binary("/", other, reverse=True)
+
+    def __bool__(self):
+        raise TypeError(
+            "An Expr has no truth value; combine conditions with & and | "
+            "instead of and/or, and avoid chained comparisons"
+        )
+
+    def isin(self, values) -> "Expr":
+        """True where the value is one of values."""
+        values = list(values)
+        if not values:
+            return Expr("FALSE", self.columns)
+        listed = ", ".join(_literal(v) for v in values)
+        return Expr(f"({self.sql} IN ({listed}))", self.columns)
+
+    def between(self, low, high) -> "Expr":
+        """True where low <= value <= high."""
+        low, high = _as_expr(low), _as_expr(high)
+        return Expr(
+            f"({self.sql} BETWEEN {low.sql} AND {high.sql})",
+            self.columns | low.columns | high.columns,
+        )
+
+    def is_null(self) -> "Expr":
+        return Expr(f"({self.sql} IS NULL)", self.columns)
+
+    def not_null(self) -> "Expr":
+        return Expr(f"({self.sql} IS NOT NULL)", self.columns)
+
+    def __repr__(self):
+        return f"Expr({self.sql})"
+
+
+def col(name: str) -> Expr:
+    """Reference a column by name."""
+    return Expr(_quote(name), {name})
+
+
+def lit(value) -> Expr:
+    """A literal value, e.g. lit("2024-10-01")."""
+    return Expr(_literal(value))
+
+
+def _as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else lit(value)
+
+
+def _check_columns(names, available: list) -> None:
+    missing = [name for name in names if name not in available]
+    if missing:
+        raise KeyError(f"Unknown columns: {missing}. Available: {available}")
+
+
+def _pick(columns: list, needed) -> list:
+    """columns limited to needed (None: all), in plan order."""
+    return list(columns) if needed is None else [c for c in columns if c in needed]
+
+
+def _select_list(columns: list) -> str:
+    # DuckDB needs at least one column; COUNT(*)-only plans need none
+    return ", ".join(_quote(c) for c in columns) if columns else "1 AS _row"
+
+
+# Plan nodes. Each has .columns (output names, in order), .origins
+# (output name -> (table, source column) for columns passed through
+# unchanged), .databases() and .compile(needed), which returns a SELECT
+# producing only the needed columns (None for all of them).
+
+
+class _Scan:
+    def __init__(self, table: str, path: Path = None, db_path: Path = None):
+        self.table = table
+        self.path = path
+        self.db_path = db_path
+        self.columns = list(column_types(table, path))
+        self.origins = {c: (table, c) for c in self.columns}
+
+    def databases(self) -> set:
+        return set() if self.db_path is None else {self.db_path}
+
+    def compile(self, needed) -> str:
+        columns = _pick(self.columns, needed)
+        if self.db_path is not None:
+            return f"SELECT {_select_list(columns)} FROM {self.table}"
+        source = csv_source(self.path)
+        if not columns:
+            return f"SELECT 1 AS _row FROM {source}"
+        return typed_select(self.table, source, self.path, columns)
+
+    def describe(self) -> str:
+        where = self.path if self.db_path is None else f"{self.db_path}"
+        return f"scan {self.table} ({where})"
+
+
+class _Filter:
+    def __init__(self, child, predicate):
+        self.child = child
+        self.predicate = predicate
+        self.columns = child.columns
+        self.origins = child.origins
+
+    def databases(self) -> set:
+        return self.child.databases()
+
+    def _sql(self) -> str:
+        if isinstance(self.predicate, Expr):
+            return self.predicate.sql
+        return self.predicate
+
+    def compile(self, needed) -> str:
+        columns = _pick(self.columns, needed)
+        if isinstance(self.predicate, Expr) and needed is not None:
+            child_needed = set(columns) | self.predicate.columns
+        else:
+            # SQL text may reference any column
+            child_needed = None
+        return (
+            f"SELECT {_select_list(columns)} "
+            f"FROM ({self.child.compile(child_needed)}) WHERE {self._sql()}"
+        )
+
+    def describe(self) -> str:
+        return f"filter {self._sql()}"
+
+
+class _Select:
+    def __init__(self, child, columns: list):
+        self.child = child
+        self.columns = list(columns)
+        self.origins = {c: child.origins[c] for c in columns if c in child.origins}
+
+    def databases(self) -> set:
+        return self.child.databases()
+
+    def compile(self, needed) -> str:
+        columns = _pick(self.columns, needed)
+        return f"SELECT {_select_list(columns)} FROM ({self.child.compile(columns)})"
+
+    def describe(self) -> str:
+        return f"select {', '.join(self.columns)}"
+
+
+class _Join:
+    def __init__(self, left, right, on: list, how: str, suffix: str):
+        self.left = left
+        self.right = right
+        self.on = on
+        self.how = how
+        # Right-side output name for every right column
+        self.renamed = {}
+        if how not in ("semi", "anti"):
+            for column in right.columns:
+                if column not in on:
+                    clash = column in left.columns
+                    self.renamed[column] = column + suffix if clash else column
+        self.columns = list(left.columns) + list(self.renamed.values())
+        self.origins = dict(left.origins)
+        for column, name in self.renamed.items():
+            if column in right.origins:
+                self.origins[name] = right.origins[column]
+
+    def databases(self) -> set:
+        return self.left.databases() | self.right.databases()
+
+    def _key(self, column: str) -> str:
+        key = _quote(column)
+        if self.how == "right":
+            return f"r.{key}"
+        if self.how == "outer":
+            return f"COALESCE(l.{key}, r.{key}) AS {key}"
+        return f"l.{key}"
+
+    def compile(self, needed) -> str:
+        columns = _pick(self.columns, needed)
+        left_needed = set(self.on) | {c for c in columns if c in self.left.columns}
+        right_needed = set(self.on) | {
+            column for column, name in self.renamed.items() if name in columns
+        }
+        names = {name: column for column, name in self.renamed.items()}
+
+        select = []
+        for column in columns:
+            if column in self.on:
+                select.append(self._key(column))
+            elif column in names:
+                select.append(f"r.{_quote(names[column])} AS {_quote(column)}")
+            else:
+                select.append(f"l.{_quote(column)}")
+        condition = " AND ".join(f"l.{_quote(c)} = r.{_quote(c)}" for c in self.on)
+        return (
+            f"SELECT {', '.join(select) or '1 AS _row'} "
+            f"FROM ({self.left.compile(_pick(self.left.columns, left_needed))}) AS l "
+            f"{JOIN_TYPES[self.how]} "
+            f"({self.right.compile(_pick(self.right.columns, right_needed))}) AS r "
+            f"ON {condition}"
+        )
+
+    def describe(self) -> str:
+        return f"{self.how} join on {', '.join(self.on)}"
+
+
+class _Aggregate:
+    def __init__(self, child, keys: list, aggregations: dict):
+        self.child = child
+        self.keys = keys
+        self.aggregations = aggregations
+        self.columns = list(keys) + list(aggregations)
+        self.origins = {k: child.origins[k] for k in keys if k in child.origins}
+
+    def databases(self) -> set:
+        return self.child.databases()
+
+    def compile(self, needed) -> str:
+        outputs = [c for c in _pick(self.columns, needed) if c not in self.keys]
+        inputs = set(self.keys) | {
+            self.aggregations[name][0]
+            for name in outputs
+            if self.aggregations[name][1] != "size"
+        }
+        select = [_quote(k) for k in self.keys]
+        for name in outputs:
+            column, func = self.aggregations[name]
+            select.append(
+                f"{AGGREGATES[func].format(_quote(column))} AS {_quote(name)}"
+            )
+        sql = (
+            f"SELECT {', '.join(select) or 'COUNT(*) AS _rows'} "
+            f"FROM ({self.child.compile(_pick(self.child.columns, inputs))})"
+        )
+        if self.keys:
+            keys = ", ".join(_quote(k) for k in self.keys)
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        return sql
+
+    def describe(self) -> str:
+        outputs = ", ".join(f"{n}={f}({c})" for n, (c, f) in self.aggregations.items())
+        return f"groupby {', '.join(self.keys)} agg {outputs}"
+
+
+class _Sort:
+    def __init__(self, child, by: list, descending: list):
+        self.child = child
+        self.by = by
+        self.descending = descending
+        self.columns = child.columns
+        self.origins = child.origins
+
+    def databases(self) -> set:
+        return self.child.databases()
+
+    def compile(self, needed) -> str:
+        columns = _pick(self.columns, needed)
+        order = ", ".join(
+            f"{_quote(c)} {'DESC' if d else 'ASC'}"
+            for c, d in zip(self.by, self.descending)
+        )
+        child_needed = set(columns) | set(self.by)
+        return (
+            f"SELECT {_select_list(columns)} "
+            f"FROM ({self.child.compile(child_needed)}) ORDER BY {order}"
+        )
+
+    def describe(self) -> str:
+        return f"sort {', '.join(self.by)}"
+
+
+class _Limit:
+    def __init__(self, child, n: int):
+        self.child = child
+        self.n = n
+        self.columns = child.columns
+        self.origins = child.origins
+
+    def databases(self) -> set:
+        return self.child.databases()
+
+    def compile(self, needed) -> str:
+        return f"SELECT * FROM ({self.child.compile(needed)}) LIMIT {int(self.n)}"
+
+    def describe(self) -> str:
+        return f"limit {self.n}"
+
+
+def _nodes(node) -> list:
+    """Plan nodes from the scans upward, for LazyFrame.plan()."""
+    children = [
+        getattr(node, name)
+        for name in ("child", "left", "right")
+        if hasattr(node, name)
+    ]
+    return [n for child in children for n in _nodes(child)] + [node]
+
+
+def _dtypes(origins: dict, df: pd.DataFrame) -> dict:
+    """CSV-loader dtypes for the result columns passed through from tables."""
+    dtypes = {}
+    for name, (table, column) in origins.items():
+        if name not in df.columns or column in COLUMN_OVERRIDES.get(table, {}):
+            continue
+        dtype = get_schema(table)["dtype"].get(column)
+        if dtype is None:
+            continue
+        if df[name].isna().any():
+            # Outer joins can add missing values to non-nullable columns
+            if dtype.startswith(("int", "uint")):
+                dtype = dtype.capitalize().replace("Uint", "UInt")
+            elif dtype == "bool":
+                dtype = "boolean"
+        dtypes[name] = dtype
+    return dtypes
+
+
+def _to_pandas(arrow_table, origins: dict) -> pd.DataFrame:
+    import pyarrow as pa
+
+    # DuckDB sums integers to HUGEINT, which Arrow sees as a decimal
+    for position, field in enumerate(arrow_table.schema):
+        if pa.types.is_decimal(field.type):
+            target = pa.int64() if field.type.scale == 0 else pa.float64()
+            arrow_table = arrow_table.set_column(
+                position, field.name, arrow_table.column(position).cast(target)
+            )
+    df = arrow_table.to_pandas(date_as_object=False)
+    return df.astype(_dtypes(origins, df))
+
+
+class LazyGroupBy:
+    """Result of LazyFrame.groupby(); call agg() to get a LazyFrame."""
+
+    def __init__(self, frame: "LazyFrame", keys: list):
+        self._frame = frame
+        self._keys = keys
+
+    def agg(self, **aggregations) -> "LazyFrame":
+        """
+        Aggregate each group.
+
+        Args:
+            **aggregations: output name -> (column, function), with the
+                function one of AGGREGATES, as in pandas named aggregation.
+
+        Returns:
+            LazyFrame with the group keys and one column per aggregation,
+            sorted by the keys.
+
+        Example:
+            >>> scan("orders").groupby("status").agg(
+            ...     revenue=("total", "sum"), orders=("order_id", "size"))
+        """
+        if not aggregations:
+            raise ValueError("agg() needs at least one aggregation")
+        node = self._frame._node
+        for name, (column, func) in aggregations.items():
+            if func not in AGGREGATES:
+                raise KeyError(
+                    f"Unknown aggregation '{func}' for '{name}'. "
+                    f"Available: {list(AGGREGATES)}"
+                )
+            _check_columns([column], node.columns)
+        return LazyFrame(_Aggregate(node, self._keys, dict(aggregations)))
+
+
+class LazyFrame:
+    """
+    A query plan over Cartly tables, executed by collect().
+
+    Every method returns a new LazyFrame; nothing is read until collect(),
+    head() or explain() is called.
+    """
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def columns(self) -> list:
+        """Output column names."""
+        return list(self._node.columns)
+
+    def filter(self, *predicates) -> "LazyFrame":
+        """
+        Keep rows matching every predicate.
+
+        Args:
+            *predicates: Expr objects built with col(), or SQL text such as
+                "shipping_country = 'India'".
+
+        Raises:
+            KeyError: If an Expr references an unknown column.
+        """
+        node = self._node
+        for predicate in predicates:
+            if isinstance(predicate, Expr):
+                _check_columns(sorted(predicate.columns), node.columns)
+            elif not isinstance(predicate, str):
+                raise TypeError(
+                    f"filter() takes Expr or SQL text, got {type(predicate).__name__}"
+                )
+            node = _Filter(node, predicate)
+        return LazyFrame(node)
+
+    def select(self, *columns) -> "LazyFrame":
+        """Keep only the given columns, in the given order."""
+        if len(columns) == 1 and isinstance(columns[0], (list, tuple)):
+            columns = columns[0]
+        _check_columns(columns, self._node.columns)
+        return LazyFrame(_Select(self._node, list(columns)))
+
+    def join(
+        self, other: "LazyFrame", on, how: str = "inner", suffix: str = "_right"
+    ) -> "LazyFrame":
+        """
+        Join with another LazyFrame on equal key columns.
+
+        Args:
+            other: Right-hand side.
+            on: Key column name or list of names, present on both sides.
+            how: One of JOIN_TYPES. "semi" and "anti" keep only this
+                frame's columns.
+            suffix: Added to right-hand columns whose names clash.
+        """
+        if how not in JOIN_TYPES:
+            raise KeyError(f"Unknown join type '{how}'. Available: {list(JOIN_TYPES)}")
+        on = [on] if isinstance(on, str) else list(on)
+        _check_columns(on, self._node.columns)
+        _check_columns(on, other._node.columns)
+        return LazyFrame(_Join(self._node, other._node, on, how, suffix))
+
+    def groupby(self, *keys) -> LazyGroupBy:
+        """Group by key columns; follow with .agg()."""
+        if len(keys) == 1 and isinstance(keys[0], (list, tuple)):
+            keys = keys[0]
+        _check_columns(keys, self._node.columns)
+        return LazyGroupBy(self, list(keys))
+
+    def sort(self, by, descending=False) -> "LazyFrame":
+        """Sort by one or more columns."""
+        by = [by] if isinstance(by, str) else list(by)
+        if isinstance(descending, bool):
+            descending = [descending] * len(by)
+        _check_columns(by, self._node.columns)
+        return LazyFrame(_Sort(self._node, by, list(descending)))
+
+    def limit(self, n: int) -> "LazyFrame":
+        """Keep the first n rows."""
+        return LazyFrame(_Limit(self._node, n))
+
+    def to_sql(self) -> str:
+        """The DuckDB query collect() would run."""
+        return self._node.compile(None)
+
+    def plan(self) -> str:
+        """The recorded operations, one per line, from the scans up."""
+        return "\n".join(node.describe() for node in _nodes(self._node))
+
+    def _connect(self):
+        databases = self._node.databases()
+        if len(databases) > 1:
+            raise ValueError(
+                f"Cannot query more than one warehouse at once: {sorted(databases)}"
+            )
+        if databases:
+            return connect(databases.pop(), read_only=True)
+        return _duckdb().connect()
+
+    def _execute(self, sql: str, conn):
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            return _fetch_arrow(conn.execute(sql))
+        finally:
+            if own_conn:
+                conn.close()
+
+    @instrumentation.traced("query")
+    def collect(self, conn=None) -> pd.DataFrame:
+        """
+        Run the plan and return the result.
+
+        Args:
+            conn: DuckDB connection to use. If None, an in-memory connection
+                (or, for warehouse scans, a read-only connection to the
+                warehouse) is opened and closed.
+
+        Returns:
+            DataFrame. Columns taken unchanged from a table keep the CSV
+            loaders' dtypes.
+        """
+        return _to_pandas(self._execute(self.to_sql(), conn), self._node.origins)
+
+    def head(self, n: int = 5, conn=None) -> pd.DataFrame:
+        """Collect the first n rows."""
+        return self.limit(n).collect(conn)
+
+    def explain(self, conn=None) -> str:
+        """DuckDB's physical plan for the query, showing pushed-down filters."""
+        result = self._execute(f"EXPLAIN {self.to_sql()}", conn)
+        return "\n".join(result.column(result.num_columns - 1).to_pylist())
+
+    def __repr__(self):
+        return f"LazyFrame[{', '.join(self.columns)}]\n{self.plan()}"
+
+
+def scan(table: str, data_path: str = None) -> LazyFrame:
+    """
+    Start a lazy query over a table's CSV.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        data_path: Path to the CSV file. If None, uses the file in data/.
+
+    Returns:
+        LazyFrame over every column of the table.
+
+    Raises:
+        KeyError: If the table is not registered.
+        FileNotFoundError: If the CSV does not exist.
+    """
+    schema = get_schema(table)
+    path = Path(data_path) if data_path is not None else DATA_DIR / schema["file"]
+    if not path.exists():
+        raise FileNotFoundError(f"{schema['label']} file not found: {path}")
+    return LazyFrame(_Scan(table, path=path))
+
+
+def scan_warehouse(table: str, db_path: str = None) -> LazyFrame:
+    """
+    Start a lazy query over a table of the DuckDB warehouse.
+
+    Warehouse tables are typed and sorted, so filters on the sort column
+    (e.g. orders.order_date) skip row groups without reading them.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+
+    Returns:
+        LazyFrame over every column of the table.
+
+    Raises:
+        FileNotFoundError: If the warehouse file does not exist.
+    """
+    get_schema(table)
+    db_path = Path(db_path) if db_path is not None else DEFAULT_DB_PATH
+    if not db_path.exists():
+        raise FileNotFoundError(f"Warehouse file not found: {db_path}")
+    return LazyFrame(_Scan(table, db_path=db_path))
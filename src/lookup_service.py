@@ -0,0 +1,449 @@
+"""
+Async batch lookup service over the Cartly tables.
+
+Support tooling and campaign targeting need "orders for customer X" or
+"ticket T" answers in milliseconds, and calling load_orders() and filtering
+per request re-reads a whole table every time. A LookupService loads the
+tables once at startup and answers lookups from memory:
+
+- hash indexes on customer_id, order_id and ticket_id (see INDEXES) map each
+  key to the positions of its rows, so a lookup never scans a table
+- concurrent lookups are coalesced: requests for the same index arriving
+  in the same event loop iteration (or within batch_window seconds) are
+  answered together with one vectorized index probe and one row gather,
+  and identical keys in a batch share a single result
+- lookups on other columns, and arbitrary SQL, go to the DuckDB warehouse
+  (src/warehouse.py) through a SQLAlchemy connection pool, in a thread pool
+  so the event loop keeps serving indexed lookups meanwhile
+
+Lookups return lists of row dicts (column -> value) with the CSV loaders'
+values: each batch converts its rows column by column once, which is far
+cheaper than slicing a DataFrame per request. query() returns DataFrames.
+Lookup counts, batch sizes and latency percentiles are in stats().
+
+Usage:
+    python -m src.lookup_service orders customer_id 10005
+    python -m src.lookup_service --bench 20000
+
+Example:
+    >>> import asyncio
+    >>> from src.lookup_service import LookupService
+    >>> async def main():
+    ...     async with LookupService() as service:
+    ...         orders = await service.orders_for_customer(10005)
+    ...         many = await asyncio.gather(
+    ...             *(service.ticket(t) for t in ["TKT100000", "TKT100001"])
+    ...         )
+    ...         top = await service.query(
+    ...             "SELECT customer_id, SUM(total) AS spent FROM orders "
+    ...             "GROUP BY 1 ORDER BY 2 DESC LIMIT 5"
+    ...         )
+    >>> asyncio.run(main())
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Self
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .warehouse import _fetch_arrow, build_warehouse, connect, to_frame
+
+# table -> columns with an in-memory hash index
+INDEXES = {
+    "customers": ["customer_id"],
+    "orders": ["customer_id", "order_id"],
+    "customer_support": ["customer_id", "ticket_id"],
+}
+
+DEFAULT_POOL_SIZE = 4
+
+# Latencies kept for stats() percentiles
+LATENCY_WINDOW = 10_000
+
+
+def _queue_pool():
+    """Import SQLAlchemy's QueuePool lazily; only SQL lookups need it."""
+    from sqlalchemy.pool import QueuePool
+
+    return QueuePool
+
+
+def _records(df: pd.DataFrame) -> list:
+    """Rows of a DataFrame as dicts, converting each column once."""
+    columns = [df[column].tolist() for column in df.columns]
+    return [dict(zip(df.columns, values)) for values in zip(*columns)]
+
+
+def _object_columns(df: pd.DataFrame) -> dict:
+    """Columns as object arrays of Python values, for cheap row gathers."""
+    columns = {}
+    for column in df.columns:
+        values = np.empty(len(df), dtype=object)
+        values[:] = df[column].tolist()
+        columns[column] = values
+    return columns
+
+
+class HashIndex:
+    """
+    Key -> row positions for one column, with vectorized batch probes.
+
+    Rows are grouped by key (CSR layout): positions of the rows with the
+    i-th distinct key are order[offsets[i]:offsets[i + 1]]. Missing keys
+    are not indexed.
+
+    Args:
+        values: Column to index.
+    """
+
+    def __init__(self, values: pd.Series):
+        codes, uniques = pd.factorize(values)
+        self.slots = dict(zip(uniques.tolist(), range(len(uniques))))
+        self.order = np.argsort(codes, kind="stable")
+        self.offsets = np.searchsorted(codes[self.order], np.arange(len(uniques) + 1))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def positions(self, keys) -> tuple:
+        """
+        Row positions for several keys at once.
+
+        Returns:
+            Tuple (positions, bounds): positions of every matching row, and
+            for each key i its rows are positions[bounds[i]:bounds[i + 1]].
+        """
+        slots = np.array([self.slots.get(key, -1) for key in keys], dtype=np.int64)
+        found = slots >= 0
+        starts = np.where(found, self.offsets[slots], 0)
+        counts = np.where(found, self.offsets[slots + 1] - starts, 0)
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        # Gather every key's run of self.order in one vectorized step
+        runs = np.repeat(starts - bounds[:-1], counts) + np.arange(bounds[-1])
+        return self.order[runs], bounds
+
+
+class LookupService:
+    """
+    In-memory indexed lookups with request coalescing and a pooled SQL
+    fallback. Use as an async context manager, or call start() and close().
+
+    Args:
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        db_path: Warehouse file for SQL lookups. If None, uses
+            data/cartly.duckdb. It is built or refreshed on first use.
+        pool_size: Pooled warehouse connections (and SQL worker threads).
+        batch_window: Seconds to wait for more requests before answering a
+            batch. 0 answers at the next event loop iteration.
+        max_batch: Answer a batch at once when it reaches this many keys.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = None,
+        db_path: str = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        batch_window: float = 0.0,
+        max_batch: int = 1024,
+    ):
+        self.data_dir = data_dir
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.tables = {}
+        self.indexes = {}
+        self._columns = {}
+        self._pending = {}
+        self._scheduled = {}
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._base = None
+        self._executor = None
+        self._counts = collections.Counter()
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    @instrumentation.traced("stage", name="lookup_service.build_indexes")
+    def build_indexes(self) -> dict:
+        """Load the indexed tables and build their hash indexes."""
+        from .data_loader import load_all
+
+        data = load_all(list(INDEXES), data_dir=self.data_dir)
+        for table, columns in INDEXES.items():
+            self.tables[table] = data[table]
+            self._columns[table] = _object_columns(data[table])
+            for column in columns:
+                self.indexes[table, column] = HashIndex(data[table][column])
+        return {key: len(index) for key, index in self.indexes.items()}
+
+    async def start(self) -> None:
+        """Build the indexes without blocking the event loop."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.pool_size, thread_name_prefix="lookup"
+        )
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.build_indexes)
+
+    def close(self) -> None:
+        """Release the connection pool and worker threads."""
+        if self._pool is not None:
+            self._pool.dispose()
+            self._base.close()
+            self._pool = self._base = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # Indexed lookups
+
+    async def lookup(self, table: str, column: str, key) -> list:
+        """
+        Rows of table whose column equals key.
+
+        Indexed columns are answered from memory in coalesced batches;
+        other columns are queried in the warehouse.
+
+        Returns:
+            List of row dicts, in table order; empty if none match.
+
+        Raises:
+            KeyError: If the table is not served, or has no such column.
+        """
+        if (table, column) not in self.indexes:
+            if table not in INDEXES:
+                raise KeyError(f"Unknown table: {table}. Available: {list(INDEXES)}")
+            if table not in self.tables:
+                raise RuntimeError("LookupService is not started")
+            columns = list(self.tables[table].columns)
+            if column not in columns:
+                raise KeyError(f"Unknown column: {column}. Available: {columns}")
+            rows = await self.query(
+                f'SELECT * FROM {table} WHERE "{column}" = ?', [key], table=table
+            )
+            return _records(rows)
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault((table, column), {})
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = loop.create_future()
+        else:
+            self._counts["coalesced"] += 1
+        self._counts["lookups"] += 1
+
+        if len(pending) >= self.max_batch:
+            self._flush(table, column)
+        elif (table, column) not in self._scheduled:
+            if self.batch_window > 0:
+                handle = loop.call_later(self.batch_window, self._flush, table, column)
+            else:
+                handle = loop.call_soon(self._flush, table, column)
+            self._scheduled[table, column] = handle
+
+        # Callers coalesced onto one key share the future; shield it so a
+        # cancelled caller does not cancel the others
+        result = await asyncio.shield(future)
+        self._latencies.append(time.perf_counter() - started)
+        return result
+
+    def _flush(self, table: str, column: str) -> None:
+        """Answer every pending lookup on one index with one probe."""
+        handle = self._scheduled.pop((table, column), None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop((table, column), {})
+        if not pending:
+            return
+        self._counts["batches"] += 1
+
+        keys = list(pending)
+        positions, bounds = self.indexes[table, column].positions(keys)
+        columns = self._columns[table]
+        gathered = [values[positions].tolist() for values in columns.values()]
+        records = [dict(zip(columns, row)) for row in zip(*gathered)]
+        for i, key in enumerate(keys):
+            future = pending[key]
+            if not future.done():
+                future.set_result(records[bounds[i] : bounds[i + 1]])
+
+    async def lookup_many(self, table: str, column: str, keys: list) -> list:
+        """Row lists for each key, in order; the keys form one batch."""
+        return await asyncio.gather(*(self.lookup(table, column, k) for k in keys))
+
+    async def customer(self, customer_id) -> dict:
+        """The customer's record, or None if unknown."""
+        rows = await self.lookup("customers", "customer_id", customer_id)
+        return rows[0] if rows else None
+
+    async def order(self, order_id) -> dict:
+        """The order's record, or None if unknown."""
+        rows = await self.lookup("orders", "order_id", order_id)
+        return rows[0] if rows else None
+
+    async def ticket(self, ticket_id) -> dict:
+        """The support ticket's record, or None if unknown."""
+        rows = await self.lookup("customer_support", "ticket_id", ticket_id)
+        return rows[0] if rows else None
+
+    async def orders_for_customer(self, customer_id) -> list:
+        return await self.lookup("orders", "customer_id", customer_id)
+
+    async def tickets_for_customer(self, customer_id) -> list:
+        return await self.lookup("customer_support", "customer_id", customer_id)
+
+    # Warehouse queries
+
+    def _connection(self):
+        """Check out a pooled warehouse connection, creating the pool once."""
+        with self._pool_lock:
+            if self._pool is None:
+                build_warehouse(self.db_path, self.data_dir)
+                self._base = connect(self.db_path, read_only=True)
+                # DuckDB cursors are independent connections to the same
+                # database; read-only queries leave no transaction to reset
+                self._pool = _queue_pool()(
+                    self._base.cursor,
+                    pool_size=self.pool_size,
+                    max_overflow=0,
+                    reset_on_return=None,
+                )
+        return self._pool.connect()
+
+    def _run_sql(self, sql: str, params: list, table: str) -> pd.DataFrame:
+        connection = self._connection()
+        try:
+            result = connection.driver_connection.execute(sql, params or [])
+            return to_frame(_fetch_arrow(result), table)
+        finally:
+            connection.close()
+
+    async def query(
+        self, sql: str, params: list = None, table: str = None
+    ) -> pd.DataFrame:
+        """
+        Run SQL against the warehouse on a pooled connection.
+
+        Args:
+            sql: SQL text, with ? placeholders for params.
+            params: Query parameters.
+            table: Source table, to restore the CSV loaders' dtypes.
+
+        Returns:
+            Query result as a DataFrame.
+        """
+        if self._executor is None:
+            raise RuntimeError("LookupService is not started")
+        self._counts["queries"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._run_sql, sql, params, table
+        )
+
+    def stats(self) -> dict:
+        """Lookup and batch counts, and latency percentiles in milliseconds."""
+        stats = {
+            name: self._counts[name]
+            for name in ("lookups", "coalesced", "batches", "queries")
+        }
+        stats["mean_batch"] = stats["lookups"] / max(stats["batches"], 1)
+        latencies = np.array(self._latencies) * 1000
+        for q in (50, 99):
+            stats[f"p{q}_ms"] = (
+                float(np.percentile(latencies, q)) if len(latencies) else None
+            )
+        return stats
+
+
+async def run_load(service: LookupService, requests: int, concurrency: int = 64):
+    """
+    Fire random indexed lookups from concurrent clients.
+
+    Args:
+        service: Started service.
+        requests: Total lookups.
+        concurrency: Clients issuing lookups one after another.
+
+    Returns:
+        Dict with requests, seconds and requests_per_sec.
+    """
+    targets = [
+        ("orders", "customer_id", service.tables["customers"]["customer_id"]),
+        ("orders", "order_id", service.tables["orders"]["order_id"]),
+        (
+            "customer_support",
+            "ticket_id",
+            service.tables["customer_support"]["ticket_id"],
+        ),
+        ("customer_support", "customer_id", service.tables["customers"]["customer_id"]),
+    ]
+    rng = random.Random(0)
+    work = [
+        (table, column, keys.iat[rng.randrange(len(keys))])
+        for table, column, keys in (rng.choice(targets) for _ in range(requests))
+    ]
+
+    async def client(share):
+        for table, column, key in share:
+            await service.lookup(table, column, key)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(work[i::concurrency]) for i in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "seconds": seconds,
+        "requests_per_sec": requests / seconds,
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Look up Cartly rows by key")
+    parser.add_argument("table", nargs="?", help="Table, e.g. orders")
+    parser.add_argument("column", nargs="?", help="Key column, e.g. customer_id")
+    parser.add_argument("key", nargs="?", help="Key value")
+    parser.add_argument("--bench", type=int, default=None, help="Run N lookups")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    args = parser.parse_args(argv)
+    if args.bench is None and args.key is None:
+        parser.error("give TABLE COLUMN KEY, or --bench N")
+
+    async def run():
+        async with LookupService(args.data_dir) as service:
+            if args.bench is not None:
+                load = await run_load(service, args.bench, args.concurrency)
+                stats = service.stats()
+                print(
+                    f"{load['requests']:,} lookups in {load['seconds']:.2f}s "
+                    f"({load['requests_per_sec']:,.0f}/s), "
+                    f"p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+                    f"mean batch {stats['mean_batch']:.1f}"
+                )
+                return
+            key = int(args.key) if args.key.lstrip("-").isdigit() else args.key
+            rows = await service.lookup(args.table, args.column, key)
+            print(pd.DataFrame(rows).to_string(index=False) if rows else "No rows")
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,541 @@
+"""
+Hive-style partitioned layout for the large fact tables.
+
+write_partitions() splits a table into Parquet files by month of its date
+column and, for orders, optionally by shipping country:
+
+    <root>/orders/year_month=2024-10/shipping_country=India/part-0.parquet
+    <root>/order_items/year_month=2024-10/shipping_country=India/part-0.parquet
+    <root>/website_sessions/year_month=2024-10/part-0.parquet
+    <root>/<table>/_manifest.json
+
+order_items is co-partitioned with orders through order_id: each item is
+stored in its order's partition, so a month of orders and its items are
+read from matching directories. Rows with a missing or malformed partition
+date go to year_month=unknown.
+
+The manifest lists every partition with its key values, row count, file
+size and min/max statistics of its numeric and date columns.
+read_partitions() prunes on it: partitions outside the requested months or
+countries, or whose date statistics do not overlap the requested dates,
+are never opened. The rows that are read are then filtered exactly, so the
+result equals filtering the full table. With about 40 months of orders,
+one month reads about 1/40th of the data.
+
+build_partitions() writes the layout from the CSVs and skips tables whose
+CSVs have not changed since the last build. Layouts built with the default
+root live under the cache directory (see src/cache.py).
+src.data_loader.load_partitioned() builds on first use and then reads.
+
+Usage:
+    python -m src.partitioning                      # all partitioned tables
+    python -m src.partitioning orders order_items --root /data/cartly
+    python -m src.partitioning --no-country --rebuild
+
+Example:
+    >>> from src.data_loader import load_partitioned
+    >>> october = load_partitioned("orders", "2024-10-01", "2024-10-31")
+    >>> items = load_partitioned(
+    ...     "order_items", "2024-10-01", "2024-10-31", countries=["India"]
+    ... )
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .cache import _path_tag, cache_dir, cache_key
+from .date_parsing import parse_column
+from .schemas import get_schema
+
+# Bump when the on-disk layout changes
+PARTITION_VERSION = 1
+
+MANIFEST = "_manifest.json"
+
+MONTH_KEY = "year_month"
+
+COUNTRY_KEY = "shipping_country"
+
+# Partition value for rows without a usable date or parent row
+UNKNOWN = "unknown"
+
+# table -> how it is partitioned: by the month of "date" (and by "country"
+# if enabled), or into its "parent" table's partitions through "key"
+PARTITION_SPECS = {
+    "orders": {"date": "order_date", "country": "shipping_country"},
+    "order_items": {"parent": "orders", "key": "order_id"},
+    "website_sessions": {"date": "session_date"},
+}
+
+
+def _pyarrow():
+    """Import pyarrow and its Parquet module, which the layout requires."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Partitioned tables require pyarrow") from error
+    return pa, pq
+
+
+def _spec(table: str) -> dict:
+    if table not in PARTITION_SPECS:
+        raise KeyError(
+            f"Table '{table}' is not partitioned. Available: {list(PARTITION_SPECS)}"
+        )
+    return PARTITION_SPECS[table]
+
+
+def default_root(data_dir: Path) -> Path:
+    """Return the layout root used for CSVs in data_dir."""
+    return cache_dir() / "partitions" / _path_tag(Path(data_dir))
+
+
+def _dates(values: pd.Series) -> pd.Series:
+    """Partition dates as datetimes, whether loaded as text or as dates."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed, _ = parse_column(values, "%Y-%m-%d")
+    return parsed
+
+
+def month_keys(values: pd.Series) -> np.ndarray:
+    """
+    Return the year_month partition value ("2024-10") of each date.
+
+    Missing and malformed dates get UNKNOWN.
+    """
+    dates = _dates(values)
+    months = dates.dt.year * 100 + dates.dt.month
+    codes, uniques = pd.factorize(months)
+    labels = [f"{int(m) // 100:04d}-{int(m) % 100:02d}" for m in uniques]
+    return np.array(labels + [UNKNOWN], dtype=object)[codes]
+
+
+def partition_keys(
+    df: pd.DataFrame, table: str, by_country: bool = True, parent: pd.DataFrame = None
+) -> pd.DataFrame:
+    """
+    Return the partition key columns for each row of a table.
+
+    Args:
+        df: Table rows.
+        table: Table name in PARTITION_SPECS.
+        by_country: Also partition by country where the table has one.
+        parent: Parent table rows, required for co-partitioned tables.
+
+    Returns:
+        DataFrame of string key columns aligned to df.
+    """
+    spec = _spec(table)
+    if "parent" in spec:
+        if parent is None:
+            raise ValueError(f"{table} is co-partitioned; pass its {spec['parent']}")
+        key = spec["key"]
+        parent_keys = partition_keys(parent, spec["parent"], by_country)
+        parent_keys.index = parent[key].to_numpy()
+        parent_keys = parent_keys[~parent_keys.index.duplicated()]
+        keys = parent_keys.reindex(df[key].to_numpy()).fillna(UNKNOWN)
+        keys.index = df.index
+        return keys
+    keys = pd.DataFrame({MONTH_KEY: month_keys(df[spec["date"]])}, index=df.index)
+    if by_country and "country" in spec:
+        country = df[spec["country"]].astype(object)
+        keys[COUNTRY_KEY] = country.where(country.notna(), UNKNOWN).astype(str)
+    return keys
+
+
+def _json_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _stats(df: pd.DataFrame, date_column: str = None) -> dict:
+    """Min/max of the numeric and date columns of one partition."""
+    stats = {}
+    for column in df.columns:
+        values = df[column]
+        if column == date_column:
+            values = _dates(values)
+        elif isinstance(values.dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(values)
+            or pd.api.types.is_datetime64_any_dtype(values)
+        ):
+            continue
+        if pd.api.types.is_bool_dtype(values) or values.isna().all():
+            continue
+        stats[column] = [_json_value(values.min()), _json_value(values.max())]
+    return stats
+
+
+def source_key(table: str, data_dir: Path, by_country: bool = True) -> str:
+    """
+    Key of the CSVs a table's partitions are built from.
+
+    Changes whenever the table's CSV (or its parent's) changes.
+
+    Raises:
+        FileNotFoundError: If a CSV does not exist.
+    """
+    spec = _spec(table)
+    options = {"partitions": PARTITION_VERSION, "by_country": by_country}
+    if "parent" in spec:
+        options["parent"] = source_key(spec["parent"], data_dir, by_country)
+    schema = get_schema(table)
+    path = Path(data_dir) / schema["file"]
+    if not path.exists():
+        raise FileNotFoundError(f"{schema['label']} file not found: {path}")
+    return cache_key(path, options)
+
+
+def write_partitions(
+    df: pd.DataFrame,
+    table: str,
+    root: str,
+    by_country: bool = True,
+    parent: pd.DataFrame = None,
+    source: str = None,
+) -> dict:
+    """
+    Write a table as Hive-style Parquet partitions, replacing any old ones.
+
+    The table directory is written under a temporary name and renamed into
+    place, so readers never see a partial layout.
+
+    Args:
+        df: Table rows, typed like the loaders return them.
+        table: Table name in PARTITION_SPECS.
+        root: Layout root; the table goes to <root>/<table>.
+        by_country: Also partition by country where the table has one.
+        parent: Parent table rows, required for co-partitioned tables.
+        source: Source key recorded in the manifest (see source_key()).
+
+    Returns:
+        The manifest.
+    """
+    pa, pq = _pyarrow()
+    keys = partition_keys(df, table, by_country, parent)
+    names = list(keys.columns)
+    date_column = _spec(table).get("date")
+
+    directory = Path(root) / table
+    tmp_dir = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    partitions = []
+    groups = df.groupby([keys[name] for name in names], sort=True, observed=True)
+    for values, rows in groups:
+        values = dict(zip(names, values))
+        relative = "/".join(f"{k}={quote(v, safe='')}" for k, v in values.items())
+        relative += "/part-0.parquet"
+        path = tmp_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), path)
+        partitions.append(
+            {
+                "path": relative,
+                "values": values,
+                "rows": len(rows),
+                "bytes": path.stat().st_size,
+                "stats": _stats(rows, date_column),
+            }
+        )
+
+    manifest = {
+        "version": PARTITION_VERSION,
+        "table": table,
+        "by": names,
+        "source": source,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "categories": {
+            column: dtype.categories.tolist()
+            for column, dtype in df.dtypes.items()
+            if isinstance(dtype, pd.CategoricalDtype)
+        },
+        "partitions": partitions,
+    }
+    if partitions:
+        # Kept so that reads selecting no partition still get the dtypes
+        manifest["schema_path"] = partitions[0]["path"]
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, default=str))
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return manifest
+
+
+def read_manifest(table: str, root: str) -> dict:
+    """
+    Read a partitioned table's manifest.
+
+    Raises:
+        FileNotFoundError: If the table has not been partitioned under root.
+    """
+    path = Path(root) / table / MANIFEST
+    if not path.exists():
+        raise FileNotFoundError(f"Partitions not found: {path.parent}")
+    return json.loads(path.read_text())
+
+
+def _bounds(start, end) -> tuple:
+    """Inclusive start and end dates as [start, stop) timestamps."""
+    start = pd.Timestamp(start).normalize() if start is not None else None
+    stop = pd.Timestamp(end).normalize() + pd.Timedelta(days=1) if end else None
+    return start, stop
+
+
+def select_partitions(
+    manifest: dict, start=None, end=None, countries: list = None
+) -> list:
+    """
+    Return the manifest entries a query has to read.
+
+    Args:
+        manifest: Manifest from read_manifest().
+        start: First date to include, or None.
+        end: Last date to include (the whole day), or None.
+        countries: Countries to include, or None for all.
+
+    Returns:
+        List of partition entries.
+    """
+    start, stop = _bounds(start, end)
+    date_column = _spec(manifest["table"]).get("date")
+    selected = []
+    for partition in manifest["partitions"]:
+        values = partition["values"]
+        month = values[MONTH_KEY]
+        if start is not None or stop is not None:
+            if month == UNKNOWN:
+                continue
+            if start is not None and month < start.strftime("%Y-%m"):
+                continue
+            if stop is not None and month > (stop - pd.Timedelta(days=1)).strftime(
+                "%Y-%m"
+            ):
+                continue
+        if (
+            countries is not None
+            and COUNTRY_KEY in values
+            and values[COUNTRY_KEY] not in countries
+        ):
+            continue
+        if date_column in partition["stats"]:
+            low, high = map(pd.Timestamp, partition["stats"][date_column])
+            if (start is not None and high < start) or (
+                stop is not None and low >= stop
+            ):
+                continue
+        selected.append(partition)
+    return selected
+
+
+@instrumentation.traced("loader")
+def read_partitions(
+    table: str,
+    start=None,
+    end=None,
+    countries: list = None,
+    columns: list = None,
+    root: str = None,
+) -> pd.DataFrame:
+    """
+    Read rows of a partitioned table, opening only the partitions needed.
+
+    Args:
+        table: Table name in PARTITION_SPECS.
+        start: First date to include (e.g. "2024-10-01"), or None.
+        end: Last date to include, or None.
+        countries: Shipping countries to include, or None for all.
+        columns: Columns to return. If None, all columns.
+        root: Layout root.
+
+    Returns:
+        DataFrame typed like the loaders, with rows grouped by partition.
+
+    Raises:
+        FileNotFoundError: If the table has not been partitioned.
+        KeyError: If a requested column does not exist.
+        ValueError: If countries is given for a table without a country.
+    """
+    pa, pq = _pyarrow()
+    spec = _spec(table)
+    manifest = read_manifest(table, root)
+    directory = Path(root) / table
+    date_column = spec.get("date")
+    country_column = spec.get("country")
+    filter_dates = start is not None or end is not None
+    if countries is not None and country_column is None and "parent" not in spec:
+        raise ValueError(f"{table} has no country column to filter on")
+
+    columns = manifest["columns"] if columns is None else list(columns)
+    missing = [c for c in columns if c not in manifest["columns"]]
+    if missing:
+        raise KeyError(
+            f"Columns not found: {missing}. Available: {manifest['columns']}"
+        )
+    needed = list(columns)
+    for column, used in (
+        (date_column, filter_dates),
+        (country_column, countries is not None),
+        (spec.get("key"), filter_dates or countries is not None),
+    ):
+        if used and column and column not in needed:
+            needed.append(column)
+
+    selected = select_partitions(manifest, start, end, countries)
+    instrumentation.add("bytes_read", sum(p["bytes"] for p in selected))
+    paths = [p["path"] for p in selected] or [manifest.get("schema_path")]
+    tables = [pq.read_table(directory / path, columns=needed) for path in paths if path]
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    data = pa.concat_tables(tables).to_pandas()
+    if not selected:
+        data = data.iloc[:0]
+    for column, categories in manifest["categories"].items():
+        if column in data.columns:
+            data[column] = data[column].astype(pd.CategoricalDtype(categories))
+
+    keep = pd.Series(True, index=data.index)
+    if filter_dates and date_column:
+        begin, stop = _bounds(start, end)
+        dates = _dates(data[date_column])
+        if begin is not None:
+            keep &= dates >= begin
+        if stop is not None:
+            keep &= dates < stop
+    if countries is not None and country_column:
+        keep &= data[country_column].isin(countries)
+    if "parent" in spec and (filter_dates or countries is not None):
+        # Semi-join with the parent rows that pass the same filters
+        parents = read_partitions(
+            spec["parent"], start, end, countries, [spec["key"]], root
+        )
+        keep &= data[spec["key"]].isin(parents[spec["key"]])
+
+    return data.loc[keep.to_numpy(), columns].reset_index(drop=True)
+
+
+def partition_stats(table: str, root: str) -> pd.DataFrame:
+    """
+    One row per partition: key values, rows, bytes and min/max statistics.
+
+    Statistics appear as "<column>_min" and "<column>_max" columns.
+    """
+    rows = []
+    for partition in read_manifest(table, root)["partitions"]:
+        row = {**partition["values"], "rows": partition["rows"]}
+        row["bytes"] = partition["bytes"]
+        for column, (low, high) in partition["stats"].items():
+            row[f"{column}_min"] = low
+            row[f"{column}_max"] = high
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@instrumentation.traced("stage")
+def build_partitions(
+    tables: list = None,
+    data_dir: str = None,
+    root: str = None,
+    by_country: bool = True,
+    rebuild: bool = False,
+) -> Path:
+    """
+    Partition tables from their CSVs, skipping those that are up to date.
+
+    Co-partitioned tables also (re)build their parent table.
+
+    Args:
+        tables: Tables to partition. If None, every table in PARTITION_SPECS.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        root: Layout root. If None, a directory under the cache directory.
+        by_country: Also partition orders (and their items) by country.
+        rebuild: Rewrite the partitions even if they are up to date.
+
+    Returns:
+        The layout root.
+    """
+    from .data_loader import DATA_DIR, load_all
+
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    root = Path(root) if root is not None else default_root(data_dir)
+    tables = list(PARTITION_SPECS) if tables is None else list(tables)
+    for table in list(tables):
+        parent = _spec(table).get("parent")
+        if parent and parent not in tables:
+            tables.insert(0, parent)
+
+    stale = {}
+    for table in tables:
+        key = source_key(table, data_dir, by_country)
+        try:
+            current = read_manifest(table, root).get("source")
+        except FileNotFoundError:
+            current = None
+        if rebuild or current != key:
+            stale[table] = key
+    if not stale:
+        return root
+
+    parents = {PARTITION_SPECS[t].get("parent") for t in stale} - {None}
+    data = load_all(
+        [t for t in PARTITION_SPECS if t in stale or t in parents], data_dir=data_dir
+    )
+    for table, key in stale.items():
+        parent = PARTITION_SPECS[table].get("parent")
+        write_partitions(
+            data[table],
+            table,
+            root,
+            by_country,
+            parent=data[parent] if parent else None,
+            source=key,
+        )
+    return root
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Write partitioned tables")
+    parser.add_argument("tables", nargs="*", help="Tables to partition (default: all)")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    parser.add_argument("--root", default=None, help="Layout root directory")
+    parser.add_argument(
+        "--no-country", action="store_true", help="Partition by month only"
+    )
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args(argv)
+
+    root = build_partitions(
+        args.tables or None,
+        args.data_dir,
+        args.root,
+        by_country=not args.no_country,
+        rebuild=args.rebuild,
+    )
+    for table in args.tables or PARTITION_SPECS:
+        manifest = read_manifest(table, root)
+        size = sum(p["bytes"] for p in manifest["partitions"])
+        print(
+            f"{table}: {manifest['rows']:,} rows in {len(manifest['partitions'])} "
+            f"partitions ({size / 1e6:.1f} MB) at {root / table}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
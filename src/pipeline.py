@@ -0,0 +1,584 @@
+"""
+Multi-process cleaning pipeline for raw CSV feeds.
+
+The Week 2 cleaning of marketing_customers_raw.csv (trim names and
+locations, normalize phones, parse date_joined, map lead_source and utm_*,
+drop notes) used to be a single-threaded script. Here the steps are
+declared as stages and composed into a Pipeline that runs them chunk by
+chunk in a process pool:
+
+- stages are registered functions (see STAGES and @stage) configured with
+  keyword arguments, e.g. Stage("trim", columns=["full_name"]); pipelines
+  compose with + or then()
+- the parent process only splits the file into line-aligned byte ranges;
+  each worker reads and parses its own range, so CSV parsing scales with
+  the workers too
+- workers hand numeric, boolean and datetime columns (including nullable
+  Int/boolean columns) back through one shared memory block per chunk
+  instead of pickling them; only text columns travel through the pipe
+- at most max_pending chunks are in flight, so a fast reader cannot run
+  ahead of the workers and fill memory (backpressure)
+- results are yielded in input order, so the output is identical to a
+  single-process run whatever the number of workers
+
+Stages see one chunk at a time and must not depend on other chunks (no
+cross-chunk deduplication; see src/dedup.py for that). Custom stages must
+be module-level functions so worker processes can import them. Byte-range
+splitting assumes no newlines inside quoted fields.
+
+Usage:
+    python -m src.pipeline data/marketing_customers_raw.csv -o clean.csv
+    python -m src.pipeline feed.csv -o clean.csv --workers 8 --chunk-mb 64
+
+Example:
+    >>> from src.pipeline import Pipeline, Stage, marketing_pipeline
+    >>> pipeline = marketing_pipeline() + Stage("drop", columns=["gender"])
+    >>> clean = pipeline.read_clean("data/marketing_customers_raw.csv")
+    >>> pipeline.clean_file("feed.csv", "clean.csv", workers=8)
+"""
+
+import argparse
+import collections
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import DATE_FORMAT, parse_column
+from .dedup import normalize_phone
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+RAW_MARKETING_PATH = (
+    Path(__file__).parent.parent / "data" / "marketing_customers_raw.csv"
+)
+
+LEAD_SOURCES = {
+    "email_capture": "Email Capture",
+    "facebook_lead": "Facebook",
+    "google_form": "Google Form",
+    "partner_import": "Partner",
+    "webinar_signup": "Webinar",
+}
+
+UTM_MEDIUMS = {
+    "cpc": "cpc",
+    "email": "email",
+    "organic": "organic",
+    "social": "social",
+}
+
+# name -> function(chunk, **params) -> chunk
+STAGES = {}
+
+# Nullable arrays rebuilt from shared values and masks, by NumPy kind
+_MASKED_ARRAYS = {
+    "i": pd.arrays.IntegerArray,
+    "u": pd.arrays.IntegerArray,
+    "f": pd.arrays.FloatingArray,
+    "b": pd.arrays.BooleanArray,
+}
+
+
+def stage(name: str):
+    """Register a stage function in STAGES under a name."""
+
+    def register(func):
+        STAGES[name] = func
+        return func
+
+    return register
+
+
+@stage("trim")
+def trim(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Strip and collapse whitespace; empty strings become missing."""
+    for column in columns:
+        text = df[column].str.strip().str.replace(r"\s+", " ", regex=True)
+        df[column] = text.mask(text == "")
+    return df
+
+
+@stage("phone")
+def phone(df: pd.DataFrame, columns: list, digits: int = 10) -> pd.DataFrame:
+    """Normalize phone numbers to their last digits (see src/dedup.py)."""
+    for column in columns:
+        df[column] = normalize_phone(df[column], digits)
+    return df
+
+
+@stage("dates")
+def dates(df: pd.DataFrame, formats: dict) -> pd.DataFrame:
+    """Parse date columns; malformed values become NaT."""
+    for column, fmt in formats.items():
+        df[column], _ = parse_column(df[column], fmt)
+    return df
+
+
+@stage("map")
+def map_values(
+    df: pd.DataFrame, column: str, mapping: dict, other: str = "other"
+) -> pd.DataFrame:
+    """
+    Map codes to labels as a categorical with fixed categories.
+
+    Values missing from mapping become other; missing values stay missing.
+    The categories are the same in every chunk, so chunks concatenate
+    without falling back to object dtype.
+    """
+    labels = sorted(set(mapping.values()) | {other})
+    mapped = df[column].map(mapping)
+    mapped = mapped.mask(mapped.isna() & df[column].notna(), other)
+    df[column] = pd.Categorical(mapped, categories=labels)
+    return df
+
+
+@stage("extract")
+def extract(
+    df: pd.DataFrame, column: str, pattern: str, dtype: str = "Int32"
+) -> pd.DataFrame:
+    """Replace a column with the first group of a regex, cast to dtype."""
+    df[column] = pd.to_numeric(df[column].str.extract(pattern)[0]).astype(dtype)
+    return df
+
+
+@stage("number")
+def number(
+    df: pd.DataFrame,
+    column: str,
+    lower: float = None,
+    upper: float = None,
+    dtype: str = "Float64",
+) -> pd.DataFrame:
+    """Parse numbers; unparseable or out-of-range values become missing."""
+    values = pd.to_numeric(df[column], errors="coerce")
+    if lower is not None:
+        values = values.mask(values < lower)
+    if upper is not None:
+        values = values.mask(values > upper)
+    df[column] = values.astype(dtype)
+    return df
+
+
+@stage("boolean")
+def boolean(
+    df: pd.DataFrame,
+    columns: list,
+    true_values: tuple = ("true", "yes", "1"),
+    false_values: tuple = ("false", "no", "0"),
+) -> pd.DataFrame:
+    """Parse booleans case-insensitively; other values become missing."""
+    for column in columns:
+        text = df[column].str.strip().str.lower()
+        values = pd.Series(pd.NA, index=df.index, dtype="boolean")
+        values[text.isin(true_values)] = True
+        values[text.isin(false_values)] = False
+        df[column] = values
+    return df
+
+
+@stage("drop")
+def drop(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Remove columns; columns that are not present are ignored."""
+    return df.drop(columns=[c for c in columns if c in df.columns])
+
+
+class Stage:
+    """
+    One configured cleaning step.
+
+    Args:
+        func: Registered stage name or a module-level function taking a
+            DataFrame (and the params) and returning a DataFrame.
+        **params: Keyword arguments passed to the function.
+
+    Raises:
+        KeyError: If func names an unregistered stage.
+    """
+
+    def __init__(self, func, **params):
+        if isinstance(func, str):
+            if func not in STAGES:
+                raise KeyError(f"Unknown stage: {func}. Available: {list(STAGES)}")
+            self.name, self.func = func, STAGES[func]
+        else:
+            self.name, self.func = getattr(func, "__name__", repr(func)), func
+        self.params = params
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.func(df, **self.params)
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v!r}" for k, v in self.params.items())
+        return f"Stage({self.name!r}{', ' if params else ''}{params})"
+
+
+class Pipeline:
+    """
+    Ordered stages applied to each chunk of a feed.
+
+    Args:
+        stages: Stage objects or other Pipelines (their stages are inlined).
+    """
+
+    def __init__(self, stages: list = None):
+        self.stages = []
+        for item in stages or []:
+            self.stages.extend(item.stages if isinstance(item, Pipeline) else [item])
+
+    def __add__(self, other) -> "Pipeline":
+        return Pipeline([self, other])
+
+    def then(self, func, **params) -> "Pipeline":
+        """A new pipeline with one more stage at the end."""
+        return self + Stage(func, **params)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def __repr__(self) -> str:
+        return "Pipeline([\n" + "".join(f"    {s!r},\n" for s in self.stages) + "])"
+
+    def run_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply every stage to one chunk (a copy; the input is unchanged)."""
+        df = df.copy()
+        for step in self.stages:
+            df = step(df)
+        return df
+
+    def map(
+        self, chunks, workers: int = None, max_pending: int = None
+    ) -> "collections.abc.Iterator":
+        """
+        Clean DataFrame chunks in a process pool, yielding them in order.
+
+        Args:
+            chunks: Iterable of DataFrames.
+            workers: Worker processes. If None, one per CPU; 1 runs in-process.
+            max_pending: Chunks in flight at once. If None, twice the workers.
+
+        Returns:
+            Iterator of cleaned DataFrames, in the order of chunks.
+        """
+        return _ordered(self, _clean_frame, chunks, workers, max_pending)
+
+    def iter_file(
+        self,
+        path,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        workers: int = None,
+        max_pending: int = None,
+    ) -> "collections.abc.Iterator":
+        """
+        Clean a CSV file in line-aligned byte ranges read by the workers.
+
+        Every value is read as text (missing values as NA), so stages decide
+        all parsing.
+
+        Args:
+            path: CSV file.
+            chunk_bytes: Approximate bytes per chunk.
+            workers: Worker processes. If None, one per CPU; 1 runs in-process.
+            max_pending: Chunks in flight at once. If None, twice the workers.
+
+        Returns:
+            Iterator of cleaned DataFrames, in file order.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"CSV file not found: {path}")
+        ranges = byte_ranges(path, chunk_bytes)
+        return _ordered(self, _clean_range, ranges, workers, max_pending)
+
+    @instrumentation.traced("stage", name="pipeline.read_clean")
+    def read_clean(self, path, **options) -> pd.DataFrame:
+        """
+        Clean a CSV file into one DataFrame.
+
+        Takes the options of iter_file(). Categorical columns whose
+        categories differ between chunks are re-categorized after concat.
+        A file with only a header gives an empty, cleaned frame.
+        """
+        chunks = list(self.iter_file(path, **options)) or [self._empty(path)]
+        df = pd.concat(chunks, ignore_index=True)
+        for column in chunks[0].columns:
+            first = chunks[0][column].dtype
+            if isinstance(first, pd.CategoricalDtype) and df[column].dtype != first:
+                df[column] = df[column].astype("category")
+        return df
+
+    def _empty(self, path) -> pd.DataFrame:
+        """The cleaned, empty frame of a CSV that has no rows."""
+        return self.run_chunk(pd.read_csv(path, dtype=str, nrows=0))
+
+    @instrumentation.traced("stage", name="pipeline.clean_file")
+    def clean_file(self, path, output, **options) -> dict:
+        """
+        Clean a CSV file into another CSV, chunk by chunk.
+
+        The output is written to a temporary file and moved into place when
+        complete. Takes the options of iter_file().
+
+        Returns:
+            Dict with rows, chunks, seconds and rows_per_sec.
+        """
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        started = time.perf_counter()
+        rows = chunks = 0
+        try:
+            with open(tmp_path, "w", encoding="utf-8", newline="") as sink:
+                for chunk in self.iter_file(path, **options):
+                    chunk.to_csv(sink, header=chunks == 0, index=False)
+                    rows += len(chunk)
+                    chunks += 1
+                if not chunks:
+                    self._empty(path).to_csv(sink, index=False)
+            os.replace(tmp_path, output)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        seconds = time.perf_counter() - started
+        return {
+            "rows": rows,
+            "chunks": chunks,
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds else None,
+        }
+
+
+def marketing_pipeline() -> Pipeline:
+    """The Week 2 cleaning of marketing_customers_raw.csv."""
+    return Pipeline(
+        [
+            Stage("trim", columns=["full_name", "location"]),
+            Stage("phone", columns=["phone_number"]),
+            Stage("dates", formats={"date_joined": DATE_FORMAT}),
+            Stage("map", column="lead_source", mapping=LEAD_SOURCES),
+            Stage("map", column="utm_medium", mapping=UTM_MEDIUMS),
+            Stage("extract", column="utm_campaign", pattern=r"^camp_(\d+)$"),
+            Stage("number", column="age", lower=0, upper=120, dtype="Int16"),
+            Stage("boolean", columns=["is_subscribed"]),
+            Stage("drop", columns=["notes"]),
+        ]
+    )
+
+
+def clean_marketing_customers(path=None, **options) -> pd.DataFrame:
+    """
+    Clean marketing_customers_raw.csv with marketing_pipeline().
+
+    Args:
+        path: Raw CSV. If None, uses data/marketing_customers_raw.csv.
+        **options: Options of Pipeline.iter_file(), e.g. workers.
+    """
+    path = path if path is not None else RAW_MARKETING_PATH
+    return marketing_pipeline().read_clean(path, **options)
+
+
+def byte_ranges(path, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+    """
+    Split a CSV into line-aligned byte ranges after its header.
+
+    Yields:
+        (path, header, start, end) with header the header line as bytes.
+    """
+    if chunk_bytes < 1:
+        raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}")
+    size = Path(path).stat().st_size
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            yield path, header, start, end
+            start = end
+
+
+def _read_range(task) -> pd.DataFrame:
+    path, header, start, end = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if instrumentation.enabled():
+        instrumentation.add("bytes_read", len(data))
+    return pd.read_csv(io.BytesIO(header + data), dtype=str)
+
+
+# Shared memory handoff
+
+
+def _share(df: pd.DataFrame) -> tuple:
+    """
+    Move a chunk's fixed-width columns into one shared memory block.
+
+    Returns:
+        (block name or None, layout, DataFrame of the remaining columns,
+        column order).
+    """
+    arrays = []
+    for column in df.columns:
+        values = df[column].array
+        dtype = df[column].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "biufmM":
+            arrays.append((column, "values", df[column].to_numpy()))
+        elif isinstance(values, tuple(_MASKED_ARRAYS.values())):
+            mask = np.asarray(values.isna())
+            filled = values.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            arrays.append((column, "values", filled))
+            arrays.append((column, "mask", mask))
+    shared = {column for column, _, _ in arrays}
+    rest = df[[c for c in df.columns if c not in shared]]
+    if not arrays:
+        return None, [], rest, list(df.columns)
+
+    layout, offset = [], 0
+    for column, part, array in arrays:
+        layout.append((column, part, array.dtype.str, offset, len(array)))
+        # Keep every array 8-byte aligned
+        offset += -(-array.nbytes // 8) * 8
+    block = SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for (column, part, array), (*_, start, length) in zip(arrays, layout):
+            view = np.ndarray(length, array.dtype, buffer=block.buf, offset=start)
+            view[:] = array
+            del view
+        return block.name, layout, rest, list(df.columns)
+    finally:
+        block.close()
+
+
+def _unshare(payload) -> pd.DataFrame:
+    """Rebuild a chunk from _share() output and free its block."""
+    name, layout, rest, columns = payload
+    if name is None:
+        return rest
+    block = SharedMemory(name=name)
+    try:
+        parts = {}
+        for column, part, dtype, start, length in layout:
+            view = np.ndarray(length, np.dtype(dtype), buffer=block.buf, offset=start)
+            parts[column, part] = view.copy()
+            del view
+    finally:
+        block.close()
+        block.unlink()
+
+    data = {}
+    for column in columns:
+        if (column, "mask") in parts:
+            values = parts[column, "values"]
+            data[column] = _MASKED_ARRAYS[values.dtype.kind](
+                values, parts[column, "mask"]
+            )
+        elif (column, "values") in parts:
+            data[column] = parts[column, "values"]
+        else:
+            data[column] = rest[column]
+    return pd.DataFrame(data, index=rest.index)
+
+
+def _release(payload) -> None:
+    """Free the block of a result that will not be consumed."""
+    if payload[0] is not None:
+        block = SharedMemory(name=payload[0])
+        block.close()
+        block.unlink()
+
+
+# Workers
+
+
+_worker_pipeline = None
+
+
+def _init_worker(pipeline: Pipeline) -> None:
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def _clean_frame(df: pd.DataFrame):
+    return _share(_worker_pipeline.run_chunk(df))
+
+
+def _clean_range(task):
+    return _share(_worker_pipeline.run_chunk(_read_range(task)))
+
+
+def _ordered(pipeline, work, items, workers: int = None, max_pending: int = None):
+    """
+    Run work over items in a process pool, yielding results in input order.
+
+    At most max_pending items are submitted ahead of the oldest result, so
+    items are pulled from the iterable only as fast as results are consumed.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(pipeline)
+        for item in items:
+            yield _unshare(work(item))
+        return
+
+    max_pending = max_pending or 2 * workers
+    # Workers must share the parent's resource tracker, so the blocks they
+    # create are released by the parent's unlink() without warnings
+    resource_tracker.ensure_running()
+    pending = collections.deque()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(pipeline,)
+    ) as pool:
+        try:
+            for item in items:
+                pending.append(pool.submit(work, item))
+                if len(pending) >= max_pending:
+                    yield _unshare(pending.popleft().result())
+            while pending:
+                yield _unshare(pending.popleft().result())
+        finally:
+            # The consumer stopped early or a chunk failed: free the rest
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                if not future.cancelled() and future.exception() is None:
+                    _release(future.result())
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Clean a raw marketing CSV feed")
+    parser.add_argument("path", nargs="?", default=str(RAW_MARKETING_PATH))
+    parser.add_argument("-o", "--output", required=True, help="Cleaned CSV to write")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / 2**20)
+    parser.add_argument("--max-pending", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    summary = marketing_pipeline().clean_file(
+        args.path,
+        args.output,
+        chunk_bytes=int(args.chunk_mb * 2**20),
+        workers=args.workers,
+        max_pending=args.max_pending,
+    )
+    print(
+        f"{summary['rows']:,} rows in {summary['chunks']} chunks, "
+        f"{summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
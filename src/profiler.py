@@ -0,0 +1,480 @@
+"""
+Single-pass, constant-memory data quality profiles of CSV feeds.
+
+profile_file() reads a CSV in chunks as raw text (nothing is coerced or
+stripped, so padding and mixed formats stay visible) and keeps, per column,
+only fixed-size state:
+
+    null rate            exact counts
+    type inference       share of values that look like boolean, integer,
+                         float, date or free text; the inferred type is the
+                         most common one and its share is the confidence
+    min / max            numeric for numeric columns, else lexicographic
+    distinct values      HyperLogLog (src.streaming)
+    quantiles            KLL sketch over the numeric values
+    top values           Misra-Gries summary
+    pattern signatures   shape of each value, e.g. "  Isaac Bakshi  " ->
+                         " Aa Aa " and "+49(0)4332181960" -> "+9(9)9"
+    padding / length     values with leading or trailing whitespace
+
+Per-chunk work is done once per distinct value and weighted by its count.
+Every piece of state is mergeable, so profiles of chunks, files or worker
+processes combine with Profile.merge() into the profile of their union;
+profile_files() profiles several files in parallel that way.
+
+Usage:
+    python -m src.profiler data/marketing_customers_raw.csv
+    python -m src.profiler data/*.csv --workers 4 --top 3
+    python -m src.profiler feed_part1.csv feed_part2.csv --merge
+
+Example:
+    >>> from src.profiler import profile_file
+    >>> profile = profile_file("data/marketing_customers_raw.csv")
+    >>> profile.to_frame()[["null_rate", "type", "type_confidence", "distinct"]]
+"""
+
+import argparse
+import sys
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .data_loader import DEFAULT_CHUNKSIZE
+from .streaming import HyperLogLog, QuantileSketch, TopK
+
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+TYPES = ["boolean", "integer", "float", "date", "string"]
+
+BOOLEAN_VALUES = {"true", "false", "yes", "no"}
+
+DATE_PATTERN = (
+    r"\d{4}-\d{1,2}-\d{1,2}([ T]\d{1,2}:\d{2}(:\d{2})?)?"
+    r"|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}"
+    r"|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}"
+    r"|\d{1,2} [A-Za-z]{3,9},? \d{4}"
+)
+
+MAX_PATTERN_LENGTH = 40
+
+# Letters other than "A" (upper-case runs are replaced first), per regex
+# engine: Arrow strings use RE2, Python strings use re
+_OTHER_LETTERS = {"pyarrow": r"[^\PLA]+", "python": r"[^\W\dA_]+"}
+
+
+def _text_dtype() -> pd.StringDtype:
+    """Arrow-backed strings when pyarrow is installed: vectorized regexes."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.StringDtype("python")
+    return pd.StringDtype("pyarrow")
+
+
+def pattern_signature(values: pd.Series) -> pd.Series:
+    """
+    Reduce values to their shape.
+
+    Runs of digits become "9", runs of upper-case ASCII letters "A", runs of
+    other letters "a" and runs of whitespace a single space; punctuation is
+    kept. Signatures longer than MAX_PATTERN_LENGTH are cut.
+
+    Example:
+        >>> pattern_signature(pd.Series(["2024-01-05", " Ravi K "])).tolist()
+        ['9-9-9', ' Aa A ']
+    """
+    text = pd.Series(values).astype(_text_dtype())
+    signature = (
+        text.str.replace(r"[0-9]+", "9", regex=True)
+        .str.replace(r"[A-Z]+", "A", regex=True)
+        .str.replace(_OTHER_LETTERS[text.dtype.storage], "a", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+    )
+    return signature.str.slice(0, MAX_PATTERN_LENGTH)
+
+
+def infer_types(values: pd.Series) -> pd.Series:
+    """
+    Name the type each text value looks like: one of TYPES.
+
+    Values are classified as they are; strip them first to ignore padding.
+    """
+    text = pd.Series(values).astype(_text_dtype())
+    is_boolean = text.str.lower().isin(BOOLEAN_VALUES).to_numpy(dtype=bool)
+    is_integer = text.str.fullmatch(r"[+-]?\d+").to_numpy(dtype=bool, na_value=False)
+    is_float = pd.to_numeric(text, errors="coerce").notna().to_numpy()
+    is_date = text.str.fullmatch(DATE_PATTERN).to_numpy(dtype=bool, na_value=False)
+    kinds = np.select(
+        [is_boolean, is_integer, is_float, is_date], TYPES[:4], default="string"
+    )
+    return pd.Series(kinds, index=text.index)
+
+
+class ColumnProfile:
+    """
+    Mergeable profile of one column.
+
+    Args:
+        name: Column name.
+        precision: HyperLogLog precision for the distinct count.
+        k: KLL sketch size for the quantiles.
+        capacity: Number of counters kept for top values and patterns.
+    """
+
+    def __init__(
+        self, name: str, precision: int = 14, k: int = 200, capacity: int = 100
+    ):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.types = dict.fromkeys(TYPES, 0)
+        self.padded = 0
+        self.length_total = 0
+        self.text_min = None
+        self.text_max = None
+        self.distinct = HyperLogLog(precision)
+        self.numbers = QuantileSketch(k)
+        self.values = TopK(capacity)
+        self.patterns = TopK(capacity)
+
+    def update(self, values: pd.Series) -> None:
+        """Add one chunk of the column."""
+        self.count += len(values)
+        present = values.dropna()
+        self.nulls += len(values) - len(present)
+        if present.empty:
+            return
+        self.distinct.add(present)
+
+        if pd.api.types.is_bool_dtype(present):
+            self.types["boolean"] += len(present)
+            self.values.add(present)
+            return
+        if pd.api.types.is_numeric_dtype(present):
+            kind = "integer" if present.dtype.kind in "iu" else "float"
+            self.types[kind] += len(present)
+            self.numbers.add(present)
+            self.values.add(present)
+            return
+        if pd.api.types.is_datetime64_any_dtype(present):
+            self.types["date"] += len(present)
+            self._update_range(present.min().isoformat(), present.max().isoformat())
+            self.values.add(present)
+            return
+        self._update_text(present.astype(str).value_counts())
+
+    def _update_text(self, counts: pd.Series) -> None:
+        # All work below is per distinct value, weighted by its count
+        counts = counts[counts > 0]
+        weights = counts.to_numpy(dtype="int64")
+        text = pd.Series(counts.index).astype(_text_dtype())
+        stripped = text.str.strip()
+
+        self.values.add_counts(counts)
+        self.padded += int(weights[(stripped != text).to_numpy(dtype=bool)].sum())
+        self.length_total += int((text.str.len().to_numpy() * weights).sum())
+        self._update_range(stripped.min(), stripped.max())
+
+        kinds = infer_types(stripped).to_numpy()
+        for kind in TYPES:
+            self.types[kind] += int(weights[kinds == kind].sum())
+        numeric = np.isin(kinds, ["integer", "float"])
+        if numeric.any():
+            numbers = pd.to_numeric(stripped[numeric], errors="coerce").to_numpy(
+                dtype="float64", na_value=np.nan
+            )
+            self.numbers.add(np.repeat(numbers, weights[numeric]))
+
+        signatures = pattern_signature(text)
+        self.patterns.add_counts(
+            pd.Series(weights).groupby(signatures.to_numpy()).sum()
+        )
+
+    def _update_range(self, low, high) -> None:
+        if self.text_min is None or low < self.text_min:
+            self.text_min = low
+        if self.text_max is None or high > self.text_max:
+            self.text_max = high
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        """
+        Fold another profile of the same column into this one.
+
+        Returns:
+            This profile, for chaining.
+        """
+        self.count += other.count
+        self.nulls += other.nulls
+        for kind in TYPES:
+            self.types[kind] += other.types[kind]
+        self.padded += other.padded
+        self.length_total += other.length_total
+        if other.text_min is not None:
+            self._update_range(other.text_min, other.text_max)
+        self.distinct.merge(other.distinct)
+        self.numbers.merge(other.numbers)
+        self.values.merge(other.values)
+        self.patterns.merge(other.patterns)
+        return self
+
+    @property
+    def inferred_type(self) -> str:
+        """Most common type; integers count as floats if any float is seen."""
+        if not any(self.types.values()):
+            return None
+        types = dict(self.types)
+        if types["float"]:
+            types["float"] += types.pop("integer")
+        return max(types, key=types.get)
+
+    @property
+    def type_confidence(self) -> float:
+        """Share of non-null values that match the inferred type."""
+        present = self.count - self.nulls
+        kind = self.inferred_type
+        if not present or kind is None:
+            return np.nan
+        matches = self.types[kind]
+        if kind == "float":
+            matches += self.types["integer"]
+        return matches / present
+
+    def summary(self, quantiles: list = None, top: int = 5) -> dict:
+        """
+        Describe the column.
+
+        Args:
+            quantiles: Quantiles to estimate; defaults to QUANTILES.
+            top: Number of top values and patterns to list.
+
+        Returns:
+            Dict with count, nulls, null_rate, type, type_confidence,
+            distinct, min, max, one "p<q>" entry per quantile, mean_length,
+            padded, top_values and top_patterns.
+        """
+        quantiles = QUANTILES if quantiles is None else quantiles
+        present = self.count - self.nulls
+        kind = self.inferred_type
+        if kind in ("integer", "float") and self.numbers.count:
+            low, high = self.numbers.minimum, self.numbers.maximum
+        else:
+            low, high = self.text_min, self.text_max
+        summary = {
+            "count": self.count,
+            "nulls": self.nulls,
+            "null_rate": self.nulls / self.count if self.count else np.nan,
+            "type": kind,
+            "type_confidence": self.type_confidence,
+            "distinct": min(round(self.distinct.count()), present),
+            "min": low,
+            "max": high,
+        }
+        for q, value in zip(quantiles, self.numbers.quantiles(quantiles)):
+            summary[f"p{q * 100:g}"] = value
+        summary["mean_length"] = self.length_total / present if present else np.nan
+        summary["padded"] = self.padded
+        summary["top_values"] = list(self.values.top(top).items())
+        summary["top_patterns"] = list(self.patterns.top(top).items())
+        return summary
+
+
+class Profile:
+    """
+    Mergeable profile of a table: row count plus one ColumnProfile per column.
+
+    Args:
+        source: Label for where the data came from, e.g. a file path.
+        **options: Passed to each ColumnProfile (precision, k, capacity).
+    """
+
+    def __init__(self, source: str = None, **options):
+        self.source = source
+        self.rows = 0
+        self.columns = {}
+        self.options = options
+
+    def _column(self, name: str) -> ColumnProfile:
+        if name not in self.columns:
+            self.columns[name] = ColumnProfile(name, **self.options)
+        return self.columns[name]
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Add one chunk of rows."""
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            self._column(name).update(chunk[name])
+
+    def merge(self, other: "Profile") -> "Profile":
+        """
+        Fold another profile into this one.
+
+        A column missing from one side counts as all-null there, so files
+        whose columns differ still merge.
+
+        Returns:
+            This profile, for chaining.
+        """
+        for name in self.columns.keys() - other.columns.keys():
+            self.columns[name].count += other.rows
+            self.columns[name].nulls += other.rows
+        for name, column in other.columns.items():
+            if name not in self.columns:
+                empty = self._column(name)
+                empty.count = empty.nulls = self.rows
+            self.columns[name].merge(column)
+        self.rows += other.rows
+        return self
+
+    def to_frame(self, quantiles: list = None, top: int = 5) -> pd.DataFrame:
+        """One row per column; see ColumnProfile.summary() for the fields."""
+        return pd.DataFrame.from_dict(
+            {
+                name: column.summary(quantiles, top)
+                for name, column in self.columns.items()
+            },
+            orient="index",
+        )
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], source: str = None, **options):
+    """
+    Profile an iterable of DataFrame chunks, e.g. from iter_table().
+
+    Typed chunks are profiled by dtype; text columns get the full text
+    profile (types, patterns, padding).
+
+    Returns:
+        Profile.
+    """
+    profile = Profile(source, **options)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
+
+
+@instrumentation.traced("stage")
+def profile_file(path: str, chunksize: int = DEFAULT_CHUNKSIZE, **options) -> Profile:
+    """
+    Profile a CSV file as raw text in one pass.
+
+    Only one chunk is held in memory at a time; the rest of the state is
+    fixed-size, so memory does not grow with the file.
+
+    Args:
+        path: Path to the CSV file.
+        chunksize: Number of rows per chunk.
+        **options: Passed to each ColumnProfile (precision, k, capacity).
+
+    Returns:
+        Profile.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"CSV file not found: {path}")
+    instrumentation.add("bytes_read", path.stat().st_size)
+    with pd.read_csv(path, dtype=str, chunksize=chunksize) as reader:
+        return profile_chunks(reader, str(path), **options)
+
+
+def profile_files(
+    paths: list,
+    workers: int = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    executor: str = "process",
+    **options,
+) -> dict:
+    """
+    Profile several CSV files in parallel.
+
+    Args:
+        paths: CSV file paths.
+        workers: Maximum number of concurrent profiles. If None, one per file.
+        chunksize: Number of rows per chunk.
+        executor: "process" (default; profiling is CPU-bound) or "thread".
+        **options: Passed to each ColumnProfile.
+
+    Returns:
+        Dict of path -> Profile, in the order given. Combine them with
+        merge_profiles() if the files are parts of one feed.
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+    paths = [str(path) for path in paths]
+    for path in paths:
+        if not Path(path).exists():
+            raise FileNotFoundError(f"CSV file not found: {path}")
+    pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    with pool_class(max_workers=workers or len(paths) or 1) as pool:
+        futures = {
+            path: pool.submit(profile_file, path, chunksize, **options)
+            for path in paths
+        }
+        return {path: future.result() for path, future in futures.items()}
+
+
+def merge_profiles(profiles: Iterable[Profile]) -> Profile:
+    """Merge profiles of parts of one feed into a single profile."""
+    profiles = list(profiles)
+    if not profiles:
+        raise ValueError("No profiles to merge")
+    merged = Profile(" + ".join(str(p.source) for p in profiles), **profiles[0].options)
+    for profile in profiles:
+        merged.merge(profile)
+    return merged
+
+
+def format_profile(profile: Profile, top: int = 3) -> str:
+    """Render a profile as a fixed-width text table."""
+    table = profile.to_frame(top=top)
+    table["null_rate"] = table["null_rate"].map("{:.1%}".format)
+    table["type_confidence"] = table["type_confidence"].map("{:.1%}".format)
+    for column in ("top_values", "top_patterns"):
+        table[column] = table[column].map(
+            lambda pairs: ", ".join(f"{value!r}:{count}" for value, count in pairs)
+        )
+    columns = [
+        "null_rate",
+        "type",
+        "type_confidence",
+        "distinct",
+        "min",
+        "p50",
+        "max",
+        "padded",
+        "top_values",
+        "top_patterns",
+    ]
+    header = f"{profile.source}: {profile.rows:,} rows"
+    return header + "\n" + table[columns].to_string()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile CSV feeds in one pass")
+    parser.add_argument("paths", nargs="+", help="CSV files to profile")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=3, help="Top values to show")
+    parser.add_argument(
+        "--merge", action="store_true", help="Treat the files as parts of one feed"
+    )
+    args = parser.parse_args(argv)
+
+    profiles = profile_files(args.paths, args.workers, args.chunksize)
+    if args.merge:
+        profiles = {"merged": merge_profiles(profiles.values())}
+    with pd.option_context("display.width", 250, "display.max_colwidth", 60):
+        for profile in profiles.values():
+            print(format_profile(profile, args.top))
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
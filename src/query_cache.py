@@ -0,0 +1,530 @@
+"""
+Bounded in-process cache for repeated analytical query results.
+
+Dashboards re-issue the same few aggregates (revenue by day, top products
+per category, campaign ROAS) many times a minute, and each one re-reads and
+re-aggregates the same tables. A QueryCache keeps their results in memory:
+
+- keys are a hash of the normalized query (SQL re-printed by sqlglot, so
+  whitespace and keyword case do not matter; or a function name and its
+  arguments), the parameters, and the size and modification time of every
+  source CSV the query reads
+- entries expire after a TTL, and the least recently used entries are
+  evicted once the total size (DataFrame memory usage) exceeds max_bytes
+- when a source CSV changes, its fingerprint no longer matches, so the next
+  lookup misses, and every entry built from the old file is dropped
+- hits, misses, evictions, expirations and invalidations are counted in
+  stats()
+
+cached_query() wraps SQL against the DuckDB warehouse (src/warehouse.py),
+refreshing the warehouse tables the query reads before computing a miss.
+cached_call(), the cached() decorator and cached_load() wrap pandas code
+and the CSV loaders. Callers get a copy of the cached result, so mutating
+it never changes what the next caller sees.
+
+Usage:
+    python -m src.query_cache revenue_by_day --repeat 10
+    python -m src.query_cache campaign_roas top_products_by_category
+
+Example:
+    >>> from src.query_cache import cached, cached_load, cached_query
+    >>> cached_query("SELECT order_date, SUM(total) FROM orders GROUP BY 1")
+    >>> cached_load("orders")
+    >>> @cached(tables=["orders"])
+    ... def revenue_by_country(data_dir=None):
+    ...     orders = load_all(["orders"], data_dir=data_dir)["orders"]
+    ...     return orders.groupby("shipping_country")["total"].sum()
+"""
+
+import argparse
+import collections
+import functools
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from . import instrumentation, warehouse
+from .schemas import SCHEMAS, get_schema
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Seconds an entry stays valid; None keeps entries until evicted
+DEFAULT_TTL = 300.0
+
+# Aggregates the dashboards poll
+DASHBOARD_QUERIES = {
+    "revenue_by_day": """
+        SELECT order_date, COUNT(*) AS orders, SUM(total) AS revenue
+        FROM orders
+        GROUP BY order_date
+        ORDER BY order_date
+    """,
+    "top_products_by_category": """
+        SELECT category_id, product_id, name, revenue, units
+        FROM (
+            SELECT p.category_id, i.product_id, p.name,
+                   SUM(i.item_total) AS revenue, SUM(i.quantity) AS units,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY p.category_id ORDER BY SUM(i.item_total) DESC
+                   ) AS rank
+            FROM order_items i
+            JOIN products p ON p.id = i.product_id
+            GROUP BY p.category_id, i.product_id, p.name
+        )
+        WHERE rank <= ?
+        ORDER BY category_id, revenue DESC
+    """,
+    "campaign_roas": """
+        SELECT channel, SUM(spend) AS spend, SUM(revenue) AS revenue,
+               SUM(revenue) / NULLIF(SUM(spend), 0) AS roas
+        FROM marketing_campaigns
+        GROUP BY channel
+        ORDER BY roas DESC
+    """,
+}
+
+# Default parameters of the dashboard queries
+DASHBOARD_PARAMS = {"top_products_by_category": [5]}
+
+_WORD = re.compile(r"\w+")
+
+
+def _sqlglot():
+    """Import sqlglot lazily; without it SQL is only whitespace-normalized."""
+    try:
+        import sqlglot
+    except ImportError:
+        return None
+    return sqlglot
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_sql(sql: str) -> tuple:
+    """
+    Canonical text of a SQL query and the registered tables it reads.
+
+    Results are memoized, so polling the same SQL parses it once.
+
+    Args:
+        sql: SQL text.
+
+    Returns:
+        Tuple (normalized_sql, tables), tables a sorted tuple.
+    """
+    sqlglot = _sqlglot()
+    if sqlglot is not None:
+        try:
+            tree = sqlglot.parse_one(sql, read="duckdb")
+        except sqlglot.errors.ParseError:
+            tree = None
+        if tree is not None:
+            names = {table.name for table in tree.find_all(sqlglot.exp.Table)}
+            tables = tuple(sorted(names & set(SCHEMAS)))
+            return tree.sql(dialect="duckdb"), tables
+    tables = tuple(sorted(set(_WORD.findall(sql)) & set(SCHEMAS)))
+    return " ".join(sql.split()), tables
+
+
+def source_fingerprints(tables: list, data_dir: str = None) -> dict:
+    """
+    Size and modification time of each table's CSV.
+
+    Args:
+        tables: Table names registered in src/schemas.py.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+
+    Returns:
+        Dict of resolved CSV path -> [size, mtime_ns], or None if missing.
+    """
+    data_dir = Path(data_dir) if data_dir is not None else warehouse.DATA_DIR
+    fingerprints = {}
+    for table in tables:
+        path = (data_dir / get_schema(table)["file"]).resolve()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            fingerprints[str(path)] = None
+        else:
+            fingerprints[str(path)] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprints
+
+
+def _nbytes(value) -> int:
+    """Approximate memory held by a cached result."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    return value.copy() if hasattr(value, "copy") else value
+
+
+class _Entry:
+    __slots__ = ("expires", "nbytes", "sources", "value")
+
+    def __init__(self, value, nbytes: int, expires: float, sources: list):
+        self.value = value
+        self.nbytes = nbytes
+        self.expires = expires
+        self.sources = sources
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results, bounded by size and age.
+
+    Args:
+        max_bytes: Total size of cached results before LRU eviction.
+        ttl: Default seconds an entry stays valid; None for no expiry.
+        clock: Function returning the current time in seconds.
+    """
+
+    def __init__(
+        self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL, clock=None
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock or time.monotonic
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        # source path -> last fingerprint seen, and keys built from it
+        self._fingerprints = {}
+        self._keys_by_source = collections.defaultdict(set)
+        self._counts = collections.Counter()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires > self.clock()
+
+    @staticmethod
+    def make_key(kind: str, query: str, params=None, sources: dict = None) -> str:
+        """Hex digest of a normalized query, its parameters and sources."""
+        payload = [kind, query, params, sorted((sources or {}).items())]
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.nbytes
+        for source in entry.sources:
+            self._keys_by_source[source].discard(key)
+
+    def get(self, key, default=None):
+        """
+        Cached value for key, or default if missing or expired.
+
+        Counts a hit or a miss and marks the entry as recently used.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                self._drop(key)
+                self._counts["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counts["misses"] += 1
+                instrumentation.add("cache_misses")
+                return default
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            instrumentation.add("cache_hits")
+            return _copy(entry.value)
+
+    def put(self, key, value, sources: dict = None, ttl: float = None) -> bool:
+        """
+        Store a value, evicting least recently used entries to fit.
+
+        Args:
+            key: Cache key, usually from make_key().
+            value: Result to store.
+            sources: Source path -> fingerprint the value was built from.
+            ttl: Seconds the entry stays valid. If None, uses the default.
+
+        Returns:
+            False if the value alone exceeds max_bytes and was not stored.
+        """
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        expires = float("inf") if ttl is None else self.clock() + ttl
+        with self._lock:
+            self.check_sources(sources or {})
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self.nbytes + nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counts["evictions"] += 1
+            self._entries[key] = _Entry(
+                _copy(value), nbytes, expires, list(sources or {})
+            )
+            self.nbytes += nbytes
+            for source in sources or {}:
+                self._keys_by_source[source].add(key)
+        return True
+
+    def check_sources(self, sources: dict) -> int:
+        """
+        Drop entries built from older versions of the given sources.
+
+        Args:
+            sources: Source path -> current fingerprint.
+
+        Returns:
+            Number of entries dropped.
+        """
+        dropped = 0
+        with self._lock:
+            for source, fingerprint in sources.items():
+                previous = self._fingerprints.get(source, fingerprint)
+                self._fingerprints[source] = fingerprint
+                if previous != fingerprint:
+                    dropped += self.invalidate(source)
+        return dropped
+
+    def invalidate(self, source: str = None) -> int:
+        """
+        Drop every entry built from a source, or every entry if None.
+
+        Returns:
+            Number of entries dropped.
+        """
+        with self._lock:
+            if source is None:
+                keys = list(self._entries)
+            else:
+                keys = list(self._keys_by_source.pop(str(source), ()))
+            for key in keys:
+                self._drop(key)
+            self._counts["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_source.clear()
+            self._fingerprints.clear()
+            self._counts.clear()
+            self.nbytes = 0
+
+    def get_or_compute(self, key, compute, sources: dict = None, ttl: float = None):
+        """
+        Cached value for key, or compute() stored under key on a miss.
+
+        Args:
+            key: Cache key, usually from make_key().
+            compute: Function with no arguments returning the value.
+            sources: Source path -> fingerprint, used for invalidation.
+            ttl: Seconds the entry stays valid. If None, uses the default.
+        """
+        self.check_sources(sources or {})
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value, sources, ttl)
+        return value
+
+    def stats(self) -> dict:
+        """Counters, entry count, bytes held and hit rate."""
+        with self._lock:
+            stats = {
+                name: self._counts[name]
+                for name in (
+                    "hits",
+                    "misses",
+                    "evictions",
+                    "expirations",
+                    "invalidations",
+                )
+            }
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self.nbytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> QueryCache:
+    """The process-wide cache used when no cache is passed."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = QueryCache()
+        return _default_cache
+
+
+def cached_query(
+    sql: str,
+    params: list = None,
+    db_path: str = None,
+    data_dir: str = None,
+    cache: QueryCache = None,
+    ttl: float = None,
+    refresh: bool = True,
+) -> pd.DataFrame:
+    """
+    Run SQL against the warehouse, answering repeats from the cache.
+
+    Args:
+        sql: SQL text, with ? placeholders for params.
+        params: Query parameters.
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        cache: Cache to use. If None, uses default_cache().
+        ttl: Seconds the result stays valid. If None, the cache default.
+        refresh: On a miss, first rebuild the warehouse tables the query
+            reads whose CSV changed (see build_warehouse()).
+
+    Returns:
+        Query result as a DataFrame.
+    """
+    if cache is None:
+        cache = default_cache()
+    normalized, tables = normalize_sql(sql)
+    sources = source_fingerprints(tables, data_dir)
+    db_path = Path(db_path) if db_path is not None else warehouse.DEFAULT_DB_PATH
+    key = cache.make_key(f"sql:{db_path.resolve()}", normalized, params, sources)
+
+    def compute():
+        if refresh and tables:
+            warehouse.build_warehouse(db_path, data_dir, tables)
+        return warehouse.query(sql, params, db_path)
+
+    return cache.get_or_compute(key, compute, sources, ttl)
+
+
+def cached_call(
+    func,
+    args: tuple = (),
+    kwargs: dict = None,
+    tables: list = None,
+    data_dir: str = None,
+    cache: QueryCache = None,
+    ttl: float = None,
+):
+    """
+    Call func(*args, **kwargs), answering repeats from the cache.
+
+    Args:
+        func: Function computing a result from the tables' CSVs.
+        args, kwargs: Arguments for func; they must be JSON-serializable
+            or have a stable str().
+        tables: Tables func reads; their CSV fingerprints are part of the key.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        cache: Cache to use. If None, uses default_cache().
+        ttl: Seconds the result stays valid. If None, the cache default.
+
+    Returns:
+        The (possibly cached) result of func.
+    """
+    if cache is None:
+        cache = default_cache()
+    kwargs = kwargs or {}
+    sources = source_fingerprints(tables or [], data_dir)
+    name = f"{func.__module__}.{func.__qualname__}"
+    key = cache.make_key("call", name, [list(args), kwargs], sources)
+    return cache.get_or_compute(
+        key, functools.partial(func, *args, **kwargs), sources, ttl
+    )
+
+
+def cached(tables: list, ttl: float = None, cache: QueryCache = None):
+    """
+    Decorator caching a function's results with cached_call().
+
+    A data_dir keyword argument of the function, if given, is also where
+    the source CSVs are fingerprinted.
+
+    Args:
+        tables: Tables the function reads.
+        ttl: Seconds results stay valid. If None, the cache default.
+        cache: Cache to use. If None, uses default_cache() at call time.
+    """
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached_call(
+                func, args, kwargs, tables, kwargs.get("data_dir"), cache, ttl
+            )
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorate
+
+
+def _load(table: str, data_dir: str = None) -> pd.DataFrame:
+    from .data_loader import load_all
+
+    return load_all([table], data_dir=data_dir)[table]
+
+
+def cached_load(
+    table: str, data_dir: str = None, cache: QueryCache = None, ttl: float = None
+) -> pd.DataFrame:
+    """
+    Load a table through src.data_loader, keeping the result in memory.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        cache: Cache to use. If None, uses default_cache().
+        ttl: Seconds the result stays valid. If None, the cache default.
+    """
+    get_schema(table)
+    return cached_call(_load, (table, data_dir), None, [table], data_dir, cache, ttl)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run cached dashboard queries")
+    parser.add_argument("queries", nargs="+", choices=sorted(DASHBOARD_QUERIES))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query")
+    parser.add_argument("--db", default=None, help="Path to the .duckdb file")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    args = parser.parse_args(argv)
+
+    cache = QueryCache()
+    for name in args.queries:
+        for run in range(args.repeat):
+            started = time.perf_counter()
+            result = cached_query(
+                DASHBOARD_QUERIES[name],
+                DASHBOARD_PARAMS.get(name),
+                db_path=args.db,
+                data_dir=args.data_dir,
+                cache=cache,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{name} run {run + 1}: {len(result):,} rows in {elapsed:.2f} ms")
+    stats = cache.stats()
+    print(
+        f"hits {stats['hits']}, misses {stats['misses']}, "
+        f"{stats['entries']} entries, {stats['bytes']:,} bytes"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
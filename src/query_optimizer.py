@@ -0,0 +1,665 @@
+"""
+Rule-based SQL rewriter and before/after benchmark for DuckDB queries.
+
+data/slow_query.sql shows the patterns that make warehouse queries slow:
+chains of IN subqueries, a correlated SUM evaluated per output row, DATE()
+wrapped around filter columns and SELECT *. This module rewrites those
+patterns, checks that the rewritten query returns the same rows, and
+compares timings and EXPLAIN ANALYZE operator trees of both versions.
+
+Rewrite rules (each can be switched off):
+
+- sargable_dates: DATE(col) >= DATE('2023-01-01') becomes a plain range
+  predicate on col, so zone maps can prune row groups. Only applied to
+  columns stored as DATE or TIMESTAMP.
+- preaggregate: a correlated aggregate such as
+  (SELECT SUM(o.total) FROM orders o WHERE o.customer_id = c.customer_id)
+  becomes a CTE grouped by the correlation key, LEFT JOINed once.
+- semi_joins: x IN (SELECT y FROM ...) in a WHERE conjunction becomes
+  SEMI JOIN (SELECT y FROM ...) ON x = y, innermost first.
+- prune_projection: SELECT * is replaced by the columns the caller needs
+  (only when columns are given).
+
+SQL is parsed with sqlglot, so the rules work on syntax trees rather than
+text and compose with each other.
+
+Usage:
+    python -m src.query_optimizer data/slow_query.sql --scale 50
+    python -m src.query_optimizer query.sql --db data/cartly.duckdb --show-sql
+
+Example:
+    >>> from src.query_optimizer import optimize_query, benchmark_rewrite
+    >>> rewrite = optimize_query(sql, conn)
+    >>> report = benchmark_rewrite(conn, sql)
+    >>> print(format_report(report))
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+
+from .warehouse import connect, load_scaled
+
+DIALECT = "duckdb"
+
+RULES = ["sargable_dates", "preaggregate", "semi_joins", "prune_projection"]
+
+DATE_TYPES = {"DATE", "TIMESTAMP", "TIMESTAMP WITH TIME ZONE", "TIMESTAMP_NS"}
+
+AGGREGATES = (exp.Sum, exp.Avg, exp.Min, exp.Max, exp.Count)
+
+
+def _parse(sql_text: str):
+    return sqlglot.parse_one(sql_text, read=DIALECT)
+
+
+def _sql(node) -> str:
+    return node.sql(dialect=DIALECT)
+
+
+def column_types(conn) -> dict:
+    """
+    Map each column name to the set of DuckDB types it has across tables.
+
+    Args:
+        conn: DuckDB connection.
+
+    Returns:
+        Dict of column name to set of type names.
+    """
+    types = defaultdict(set)
+    rows = conn.execute(
+        "SELECT column_name, data_type FROM information_schema.columns"
+    ).fetchall()
+    for column, data_type in rows:
+        types[column].add(data_type.upper())
+    return dict(types)
+
+
+def _conjuncts(condition) -> list:
+    """Split a predicate into its top-level AND terms."""
+    if isinstance(condition, exp.And):
+        return _conjuncts(condition.left) + _conjuncts(condition.right)
+    if isinstance(condition, exp.Paren):
+        return _conjuncts(condition.this)
+    return [condition]
+
+
+def _set_where(select, conjuncts: list) -> None:
+    """Replace a SELECT's WHERE clause with the AND of conjuncts."""
+    if conjuncts:
+        select.set("where", exp.Where(this=exp.and_(*conjuncts)))
+    else:
+        select.set("where", None)
+
+
+def _from(select):
+    """FROM clause of a SELECT (the arg was renamed from_ in newer sqlglot)."""
+    return select.args.get("from_") or select.args.get("from")
+
+
+def _source_aliases(select) -> set:
+    """Aliases (or names) of the tables a SELECT reads directly."""
+    aliases = set()
+    sources = [_from(select)] + list(select.args.get("joins") or [])
+    for source in sources:
+        if source is None:
+            continue
+        node = source.this
+        aliases.add(node.alias_or_name)
+    return aliases
+
+
+def _date_column(node):
+    """Return the column inside DATE(col) / CAST(col AS DATE), else None."""
+    if isinstance(node, exp.Date) and isinstance(node.this, exp.Column):
+        return node.this
+    if (
+        isinstance(node, exp.Cast)
+        and node.to.is_type("date")
+        and isinstance(node.this, exp.Column)
+    ):
+        return node.this
+    return None
+
+
+def _date_literal(node):
+    """Return the ISO string of a date literal expression, else None."""
+    if isinstance(node, exp.Literal) and node.is_string:
+        return node.this
+    if (
+        isinstance(node, (exp.Date, exp.Cast))
+        and isinstance(node.this, exp.Literal)
+        and (isinstance(node, exp.Date) or node.to.is_type("date"))
+    ):
+        return node.this.this
+    return None
+
+
+_FLIPPED = {exp.GTE: exp.LTE, exp.LTE: exp.GTE, exp.GT: exp.LT, exp.LT: exp.GT}
+
+
+def sargable_dates(tree, types: dict) -> bool:
+    """
+    Rewrite DATE(col) <op> <date> into a range predicate on col.
+
+    Args:
+        tree: Parsed query, modified in place.
+        types: Output of column_types().
+
+    Returns:
+        True if anything was rewritten.
+    """
+    changed = False
+    comparisons = (exp.GTE, exp.GT, exp.LTE, exp.LT, exp.EQ)
+    for node in list(tree.find_all(*comparisons)):
+        kind = type(node)
+        column, literal = _date_column(node.this), _date_literal(node.expression)
+        if column is None:
+            column, literal = _date_column(node.expression), _date_literal(node.this)
+            kind = _FLIPPED.get(kind, kind)
+        if column is None or literal is None:
+            continue
+        if not types.get(column.name) or not types[column.name] <= DATE_TYPES:
+            continue
+
+        col = _sql(column)
+        day = f"CAST('{literal}' AS DATE)"
+        next_day = f"{day} + INTERVAL 1 DAY"
+        replacement = {
+            exp.GTE: f"{col} >= {day}",
+            exp.LT: f"{col} < {day}",
+            exp.GT: f"{col} >= {next_day}",
+            exp.LTE: f"{col} < {next_day}",
+            exp.EQ: f"({col} >= {day} AND {col} < {next_day})",
+        }[kind]
+        node.replace(_parse(replacement))
+        changed = True
+    return changed
+
+
+def _correlation(subquery_select):
+    """
+    Split a correlated aggregate subquery into its parts.
+
+    Returns (aggregate, table, inner_key, outer_column, local_filters), or
+    None if the subquery is not a single-table aggregate correlated on one
+    equality.
+    """
+    projections = subquery_select.expressions
+    if len(projections) != 1 or not isinstance(projections[0], AGGREGATES):
+        return None
+    if subquery_select.args.get("joins") or subquery_select.args.get("group"):
+        return None
+    source = _from(subquery_select)
+    if source is None or not isinstance(source.this, exp.Table):
+        return None
+
+    inner_alias = source.this.alias_or_name
+    where = subquery_select.args.get("where")
+    if where is None:
+        return None
+
+    correlation, local = None, []
+    for term in _conjuncts(where.this):
+        tables = {c.table for c in term.find_all(exp.Column)}
+        if tables <= {inner_alias}:
+            local.append(term)
+            continue
+        if correlation is not None or not isinstance(term, exp.EQ):
+            return None
+        left, right = term.this, term.expression
+        if not (isinstance(left, exp.Column) and isinstance(right, exp.Column)):
+            return None
+        if left.table == inner_alias and right.table != inner_alias:
+            correlation = (left, right)
+        elif right.table == inner_alias and left.table != inner_alias:
+            correlation = (right, left)
+        else:
+            return None
+    if correlation is None:
+        return None
+
+    inner_key, outer_column = correlation
+    return projections[0], source.this, inner_key, outer_column, local
+
+
+def preaggregate(tree) -> bool:
+    """
+    Replace correlated scalar aggregates with a grouped CTE and a LEFT JOIN.
+
+    Args:
+        tree: Parsed query, modified in place.
+
+    Returns:
+        True if anything was rewritten.
+    """
+    changed = False
+    for index, subquery in enumerate(list(tree.find_all(exp.Subquery))):
+        inner = subquery.this
+        if not isinstance(inner, exp.Select) or subquery.find_ancestor(exp.In):
+            continue
+        parts = _correlation(inner)
+        if parts is None:
+            continue
+        aggregate, table, inner_key, outer_column, local = parts
+
+        # The SELECT that defines the outer alias receives the join
+        outer = subquery.parent_select
+        while outer is not None and outer_column.table not in _source_aliases(outer):
+            outer = outer.parent_select
+        if outer is None or outer.args.get("group"):
+            continue
+        other_joins = [
+            j for j in outer.args.get("joins") or [] if j.args.get("kind") != "SEMI"
+        ]
+        stars = [e for e in outer.expressions if isinstance(e, exp.Star)]
+        if stars and other_joins:
+            continue
+
+        name = f"_agg{index}"
+        cte = exp.select(
+            exp.alias_(inner_key.copy(), "agg_key"),
+            exp.alias_(aggregate.copy(), "agg_value"),
+        ).from_(table.copy())
+        _set_where(cte, [t.copy() for t in local])
+        cte = cte.group_by(inner_key.copy())
+
+        value = f"{name}.agg_value"
+        if isinstance(aggregate, exp.Count):
+            value = f"COALESCE({value}, 0)"
+        subquery.replace(_parse(value))
+
+        if stars:
+            outer_alias = _from(outer).this.alias_or_name
+            outer.set(
+                "expressions",
+                [
+                    (
+                        exp.Column(
+                            this=exp.Star(), table=exp.to_identifier(outer_alias)
+                        )
+                        if isinstance(e, exp.Star)
+                        else e
+                    )
+                    for e in outer.expressions
+                ],
+            )
+        outer.join(
+            name,
+            on=f"{name}.agg_key = {_sql(outer_column)}",
+            join_type="LEFT",
+            copy=False,
+        )
+        tree.with_(name, as_=cte, copy=False)
+        changed = True
+    return changed
+
+
+def _is_correlated(select) -> bool:
+    """True if a subquery references tables it does not define itself."""
+    defined = set()
+    for node in select.find_all(exp.Select):
+        defined |= _source_aliases(node)
+    return any(c.table and c.table not in defined for c in select.find_all(exp.Column))
+
+
+def semi_joins(tree) -> bool:
+    """
+    Turn `x IN (SELECT y ...)` conjuncts into SEMI JOINs, innermost first.
+
+    Args:
+        tree: Parsed query, modified in place.
+
+    Returns:
+        True if anything was rewritten.
+    """
+    changed = False
+    selects = sorted(tree.find_all(exp.Select), key=lambda s: -s.depth)
+    counter = 0
+    for select in selects:
+        where = select.args.get("where")
+        if where is None or _from(select) is None:
+            continue
+
+        kept = []
+        for term in _conjuncts(where.this):
+            query = term.args.get("query") if isinstance(term, exp.In) else None
+            inner = query.this if isinstance(query, exp.Subquery) else query
+            if (
+                not isinstance(inner, exp.Select)
+                or len(inner.expressions) != 1
+                or _is_correlated(inner)
+            ):
+                kept.append(term)
+                continue
+
+            counter += 1
+            name = f"_semi{counter}"
+            projection = inner.expressions[0]
+            if not projection.alias_or_name or isinstance(projection, AGGREGATES):
+                projection.replace(exp.alias_(projection.copy(), "semi_key"))
+            key = inner.expressions[0].alias_or_name
+
+            select.join(
+                exp.alias_(exp.Subquery(this=inner.copy()), name),
+                on=f"{_sql(term.this)} = {name}.{key}",
+                join_type="SEMI",
+                copy=False,
+            )
+            changed = True
+        _set_where(select, kept)
+    return changed
+
+
+def prune_projection(tree, columns: list) -> bool:
+    """
+    Replace the outermost SELECT * with the given columns.
+
+    Args:
+        tree: Parsed query, modified in place.
+        columns: Column names the caller actually needs.
+
+    Returns:
+        True if anything was rewritten.
+    """
+    if not columns or not isinstance(tree, exp.Select):
+        return False
+    stars = [
+        e
+        for e in tree.expressions
+        if isinstance(e, exp.Star)
+        or (isinstance(e, exp.Column) and isinstance(e.this, exp.Star))
+    ]
+    if len(stars) != 1 or len(tree.expressions) != 1:
+        return False
+
+    qualifier = stars[0].table if isinstance(stars[0], exp.Column) else None
+    if qualifier is None:
+        qualifier = _from(tree).this.alias_or_name
+    tree.set(
+        "expressions",
+        [exp.column(column, table=qualifier) for column in columns],
+    )
+    return True
+
+
+def optimize_query(
+    sql_text: str, conn=None, rules: list = None, columns: list = None
+) -> dict:
+    """
+    Apply rewrite rules to a query.
+
+    Args:
+        sql_text: Original SQL.
+        conn: DuckDB connection, used to look up column types for
+            sargable_dates. Without it that rule is skipped.
+        rules: Rule names to apply, in RULES order. If None, all rules.
+        columns: Output columns for prune_projection.
+
+    Returns:
+        dict with 'sql' (rewritten SQL) and 'applied' (names of rules that
+        changed the query)
+    """
+    rules = RULES if rules is None else rules
+    unknown = set(rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"Unknown rules: {sorted(unknown)}. Known: {RULES}")
+
+    tree = _parse(sql_text)
+    applied = []
+    for rule in RULES:
+        if rule not in rules:
+            continue
+        if rule == "sargable_dates":
+            changed = conn is not None and sargable_dates(tree, column_types(conn))
+        elif rule == "preaggregate":
+            changed = preaggregate(tree)
+        elif rule == "semi_joins":
+            changed = semi_joins(tree)
+        else:
+            changed = prune_projection(tree, columns)
+        if changed:
+            applied.append(rule)
+
+    return {"sql": tree.sql(dialect=DIALECT, pretty=True), "applied": applied}
+
+
+def _strip_semicolon(sql_text: str) -> str:
+    return sql_text.strip().rstrip(";")
+
+
+def time_query(conn, sql_text: str, repeat: int = 3) -> float:
+    """
+    Return the best wall time in seconds over several runs, after a warm-up.
+
+    Args:
+        conn: DuckDB connection.
+        sql_text: Query to run; results are fetched in full.
+        repeat: Number of timed runs.
+    """
+    sql_text = _strip_semicolon(sql_text)
+    conn.execute(sql_text).fetchall()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql_text).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def explain_analyze(conn, sql_text: str) -> pd.DataFrame:
+    """
+    Run EXPLAIN ANALYZE and flatten the operator tree.
+
+    Args:
+        conn: DuckDB connection.
+        sql_text: Query to profile.
+
+    Returns:
+        DataFrame with one row per operator: operator, depth, rows, seconds.
+    """
+    result = conn.execute(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {_strip_semicolon(sql_text)}"
+    ).fetchall()
+    tree = json.loads(result[0][1])
+
+    rows = []
+
+    def walk(node, depth):
+        name = node.get("operator_name")
+        if name and name != "EXPLAIN_ANALYZE":
+            rows.append(
+                {
+                    "operator": name.strip(),
+                    "depth": depth,
+                    "rows": node.get("operator_cardinality", 0),
+                    "seconds": node.get("operator_timing", 0.0),
+                }
+            )
+            depth += 1
+        for child in node.get("children", []):
+            walk(child, depth)
+
+    walk(tree, 0)
+    return pd.DataFrame(rows, columns=["operator", "depth", "rows", "seconds"])
+
+
+def plan_diff(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare two flattened plans operator type by operator type.
+
+    Args:
+        before: explain_analyze() output for the original query.
+        after: explain_analyze() output for the rewritten query.
+
+    Returns:
+        DataFrame indexed by operator with count, rows and seconds before
+        and after, sorted by time saved.
+    """
+
+    def summarize(plan):
+        return plan.groupby("operator").agg(
+            count=("operator", "size"), rows=("rows", "sum"), seconds=("seconds", "sum")
+        )
+
+    diff = summarize(before).join(
+        summarize(after), how="outer", lsuffix="_before", rsuffix="_after"
+    )
+    diff = diff.fillna(0)
+    for column in ["count_before", "count_after", "rows_before", "rows_after"]:
+        diff[column] = diff[column].astype("int64")
+    diff["seconds_saved"] = diff["seconds_before"] - diff["seconds_after"]
+    columns = [
+        "count_before",
+        "count_after",
+        "rows_before",
+        "rows_after",
+        "seconds_before",
+        "seconds_after",
+        "seconds_saved",
+    ]
+    return diff[columns].sort_values("seconds_saved", ascending=False)
+
+
+def results_match(conn, original_sql: str, rewritten_sql: str) -> bool:
+    """
+    Check that two queries return the same multiset of rows and columns.
+
+    Row order is not compared, because ORDER BY keys with ties may come back
+    in a different order after a rewrite.
+    """
+    left = conn.execute(_strip_semicolon(original_sql)).df()
+    right = conn.execute(_strip_semicolon(rewritten_sql)).df()
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+
+    def canonical(df):
+        return df.sort_values(list(df.columns), kind="stable").reset_index(drop=True)
+
+    try:
+        pd.testing.assert_frame_equal(
+            canonical(left), canonical(right), check_dtype=False
+        )
+    except AssertionError:
+        return False
+    return True
+
+
+def benchmark_rewrite(
+    conn, sql_text: str, rules: list = None, columns: list = None, repeat: int = 3
+) -> dict:
+    """
+    Rewrite a query, verify the result and compare timings and plans.
+
+    Args:
+        conn: DuckDB connection holding the tables the query reads.
+        sql_text: Original SQL.
+        rules: Rule names to apply. If None, all rules.
+        columns: Output columns for prune_projection. Result verification
+            is skipped when columns are pruned, since the outputs differ.
+        repeat: Timed runs per query.
+
+    Returns:
+        dict with original_sql, optimized_sql, applied, identical,
+        original_seconds, optimized_seconds, speedup and plan_diff.
+    """
+    rewrite = optimize_query(sql_text, conn, rules, columns)
+
+    if "prune_projection" in rewrite["applied"]:
+        unpruned = optimize_query(
+            sql_text, conn, [r for r in (rules or RULES) if r != "prune_projection"]
+        )
+        identical = results_match(conn, sql_text, unpruned["sql"])
+    else:
+        identical = results_match(conn, sql_text, rewrite["sql"])
+
+    original_seconds = time_query(conn, sql_text, repeat)
+    optimized_seconds = time_query(conn, rewrite["sql"], repeat)
+
+    return {
+        "original_sql": sql_text,
+        "optimized_sql": rewrite["sql"],
+        "applied": rewrite["applied"],
+        "identical": identical,
+        "original_seconds": original_seconds,
+        "optimized_seconds": optimized_seconds,
+        "speedup": original_seconds / optimized_seconds if optimized_seconds else None,
+        "plan_diff": plan_diff(
+            explain_analyze(conn, sql_text), explain_analyze(conn, rewrite["sql"])
+        ),
+    }
+
+
+def format_report(report: dict, show_sql: bool = False) -> str:
+    """Render a benchmark_rewrite() report as plain text."""
+    lines = [
+        f"Rules applied:   {', '.join(report['applied']) or 'none'}",
+        f"Results match:   {'yes' if report['identical'] else 'NO'}",
+        f"Original:        {report['original_seconds'] * 1000:9.1f} ms",
+        f"Optimized:       {report['optimized_seconds'] * 1000:9.1f} ms",
+    ]
+    if report["speedup"]:
+        lines.append(f"Speedup:         {report['speedup']:9.2f}x")
+    lines += ["", "Operator differences:", report["plan_diff"].to_string()]
+    if show_sql:
+        lines += ["", "Optimized SQL:", report["optimized_sql"]]
+    return "\n".join(lines)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rewrite a slow DuckDB query and compare before/after plans"
+    )
+    parser.add_argument("sql_file", help="File containing the query")
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="DuckDB file to query (default: scaled in-memory data)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=50,
+        help="Copies of the sample data when --db is not given",
+    )
+    parser.add_argument(
+        "--rule", action="append", choices=RULES, help="Only apply this rule"
+    )
+    parser.add_argument(
+        "--columns", help="Comma-separated output columns for prune_projection"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument(
+        "--show-sql", action="store_true", help="Print the rewritten SQL"
+    )
+    args = parser.parse_args(argv)
+
+    sql_text = Path(args.sql_file).read_text()
+    if args.db:
+        conn = connect(args.db, read_only=True)
+    else:
+        import duckdb
+
+        conn = duckdb.connect()
+        load_scaled(conn, args.scale)
+
+    try:
+        columns = args.columns.split(",") if args.columns else None
+        report = benchmark_rewrite(conn, sql_text, args.rule, columns, args.repeat)
+    finally:
+        conn.close()
+
+    print(format_report(report, show_sql=args.show_sql))
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Column type schemas for the Cartly CSV tables.
+
+Left to itself, pd.read_csv infers every column: low-cardinality text such as
+order status or traffic source becomes a Python string per row and every
+integer becomes int64. The registry below declares compact dtypes for each
+table so loaders can apply them while parsing:
+
+- "category" for repeated labels (status, country, segment, channel, ...)
+- a compact signed integer type with headroom for dirty values (negative
+  fees, counts in the thousands); integers are read as 64-bit and narrowed
+  by narrow_integers(), which keeps a column wide when a value does not fit
+  instead of letting it wrap around (uint16 "-5" would read as 65531)
+- "Int32" (nullable) for foreign keys with missing values
+- float32 only for ratios and scores; money stays float64 to keep cents exact
+- bool for True/False flags
+
+Date columns are listed separately because pandas parses them through
+parse_dates rather than dtype. Orders dates are handled in data_loader.
+
+Example:
+    >>> from src.schemas import read_options
+    >>> read_options("website_sessions")["dtype"]["device"]
+    'category'
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+SCHEMAS = {
+    "orders": {
+        "file": "orders.csv",
+        "label": "Orders",
+        "dtype": {
+            "order_id": "int32",
+            "customer_id": "Int32",
+            "order_time": "category",
+            "status": "category",
+            "payment_method": "category",
+            "subtotal": "float64",
+            "shipping": "int32",
+            "tax": "float64",
+            "total": "float64",
+            "items_count": "int16",
+            "shipping_city": "category",
+            "shipping_country": "category",
+        },
+        "dates": {},
+    },
+    "customers": {
+        "file": "customers.csv",
+        "label": "Customers",
+        "dtype": {
+            "customer_id": "int32",
+            "first_name": "category",
+            "last_name": "category",
+            "email": "str",
+            "phone": "str",
+            "age": "int16",
+            "gender": "category",
+            "country": "category",
+            "city": "category",
+            # Contains placeholder strings like "invalid-date"; kept as text
+            # for the data cleaning tasks
+            "signup_date": "str",
+            "signup_source": "category",
+            "segment": "category",
+            "is_subscribed": "bool",
+            "total_orders": "int32",
+            "total_spent": "float64",
+            "avg_order_value": "float64",
+        },
+        "dates": {"last_order_date": "%Y-%m-%d"},
+    },
+    "products": {
+        "file": "products.csv",
+        "label": "Products",
+        "dtype": {
+            "id": "str",
+            "name": "str",
+            "category_id": "category",
+            "base_price": "int32",
+            "cost": "int32",
+        },
+        "dates": {},
+    },
+    "categories": {
+        "file": "categories.csv",
+        "label": "Categories",
+        "dtype": {
+            "id": "str",
+            "name": "str",
+            "margin": "float64",
+        },
+        "dates": {},
+    },
+    "order_items": {
+        "file": "order_items.csv",
+        "label": "Order items",
+        "dtype": {
+            "order_item_id": "str",
+            "order_id": "int32",
+            "product_id": "category",
+            "quantity": "int16",
+            "unit_price": "float64",
+            "discount_percent": "float32",
+            "item_total": "float64",
+        },
+        "dates": {},
+    },
+    "website_sessions": {
+        "file": "website_sessions.csv",
+        "label": "Website sessions",
+        "dtype": {
+            "session_id": "str",
+            "customer_id": "Int32",
+            "session_hour": "int16",
+            "device": "category",
+            "browser": "category",
+            "traffic_source": "category",
+            "landing_page": "category",
+            "pages_viewed": "int32",
+            "time_on_site_seconds": "int32",
+            "bounced": "bool",
+            "converted": "bool",
+        },
+        "dates": {"session_date": "%Y-%m-%d"},
+    },
+    "customer_support": {
+        "file": "customer_support.csv",
+        "label": "Customer support",
+        "dtype": {
+            "ticket_id": "str",
+            "customer_id": "int32",
+            "category": "category",
+            "priority": "category",
+            "status": "category",
+            "resolution_hours": "float32",
+            "satisfaction_score": "float32",
+            "agent_id": "category",
+        },
+        "dates": {
+            "created_date": "%Y-%m-%d %H:%M:%S",
+            "resolved_date": "%Y-%m-%d %H:%M:%S",
+        },
+    },
+    "marketing_campaigns": {
+        "file": "marketing_campaigns.csv",
+        "label": "Marketing campaigns",
+        "dtype": {
+            "campaign_id": "str",
+            "campaign_name": "str",
+            "channel": "category",
+            "campaign_type": "category",
+            "budget": "int64",
+            "spend": "float64",
+            "impressions": "int64",
+            "clicks": "int64",
+            "ctr": "float32",
+            "conversions": "int64",
+            "conversion_rate": "float32",
+            "revenue": "float64",
+            "roas": "float32",
+            "cpa": "float32",
+        },
+        "dates": {"start_date": "%Y-%m-%d", "end_date": "%Y-%m-%d"},
+    },
+}
+
+
+def get_schema(table: str) -> dict:
+    """
+    Return the schema definition for a table.
+
+    Args:
+        table: Table name, e.g. "orders" or "website_sessions".
+
+    Returns:
+        Copy of the schema dict with "file", "label", "dtype" and "dates".
+
+    Raises:
+        KeyError: If the table is not registered.
+    """
+    if table not in SCHEMAS:
+        known = ", ".join(sorted(SCHEMAS))
+        raise KeyError(f"Unknown table '{table}'. Known tables: {known}")
+    return copy.deepcopy(SCHEMAS[table])
+
+
+def read_options(table: str) -> dict:
+    """
+    Build pd.read_csv keyword arguments that apply a table's schema.
+
+    Tables whose date columns share one format get parse_dates and
+    date_format; mixed formats are left to the caller. Integer columns
+    are read as 64-bit; pass the result to narrow_integers().
+
+    Args:
+        table: Table name registered in SCHEMAS.
+
+    Returns:
+        Dict of read_csv keyword arguments.
+    """
+    schema = get_schema(table)
+    dtype = schema["dtype"]
+    # Parse integers at full width; narrow_integers() narrows them safely
+    for column, narrow in integer_columns(table).items():
+        dtype[column] = "Int64" if narrow.startswith(("Int", "UInt")) else "int64"
+    options = {"dtype": dtype}
+
+    dates = schema["dates"]
+    if dates:
+        formats = set(dates.values())
+        options["parse_dates"] = list(dates)
+        if len(formats) == 1:
+            options["date_format"] = formats.pop()
+
+    return options
+
+
+def integer_columns(table: str) -> dict:
+    """Integer columns of a table declared narrower than 64 bits, with dtypes."""
+    return {
+        column: dtype
+        for column, dtype in get_schema(table)["dtype"].items()
+        if dtype.lower() in ("int8", "int16", "int32", "uint8", "uint16", "uint32")
+    }
+
+
+def narrow_integers(df: pd.DataFrame, dtypes: dict) -> dict:
+    """
+    Cast 64-bit integer columns to their declared narrower dtypes in place.
+
+    A cast by read_csv wraps values that do not fit, so a dirty value would
+    pass as a plausible number. Here a column with any value outside the
+    declared range keeps its 64-bit dtype instead.
+
+    Args:
+        df: DataFrame to modify.
+        dtypes: Mapping of column name to dtype (see integer_columns());
+            missing columns are skipped.
+
+    Returns:
+        dict of column -> number of out-of-range values, for columns kept
+        at 64 bits.
+    """
+    report = {}
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        target = pd.api.types.pandas_dtype(dtype)
+        limits = np.iinfo(getattr(target, "numpy_dtype", target))
+        values = df[column]
+        outside = int(((values < limits.min) | (values > limits.max)).sum())
+        if outside:
+            report[column] = outside
+        else:
+            df[column] = values.astype(target)
+    return report
@@ -0,0 +1,383 @@
+"""
+Constant-memory reducers over chunked DataFrames.
+
+These functions consume the chunk iterators from src.data_loader (iter_orders,
+iter_website_sessions, iter_table) and keep only a small running state, so
+they work on files far larger than memory. Memory use depends on the size of
+the result (e.g. number of distinct days), never on the number of rows.
+
+HyperLogLog (distinct counts), QuantileSketch (quantiles) and TopK
+(frequent values) are fixed-size sketches that can be merged, so partial
+results from chunks, files or processes combine exactly as if the data had
+been read in one pass.
+
+Example:
+    >>> from src.data_loader import iter_orders
+    >>> from src.streaming import distinct_count
+    >>> customers = distinct_count(iter_orders(chunksize=50_000), "customer_id")
+"""
+
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact vectorized bit length of unsigned 64-bit integers."""
+    values = values.copy()
+    length = np.zeros(values.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= (np.uint64(1) << np.uint64(shift))
+        values[wide] >>= np.uint64(shift)
+        length[wide] += shift
+    length[values > 0] += 1
+    return length
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch for approximate distinct counts.
+
+    Uses 2**precision one-byte registers (16 KiB at the default precision of
+    14) and has a typical relative error of about 1.04 / sqrt(2**precision),
+    i.e. under 1% by default. Sketches with the same precision can be merged,
+    so partial counts from different chunks, files or processes combine into
+    the count of their union.
+
+    Example:
+        >>> sketch = HyperLogLog()
+        >>> sketch.add(pd.Series(["a", "b", "a"]))
+        >>> round(sketch.count())
+        2
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values) -> None:
+        """
+        Add values to the sketch. Missing values are ignored.
+
+        Args:
+            values: Series, Index or array of hashable values.
+        """
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return
+
+        array = values.to_numpy()
+        if array.dtype.kind in "iub":
+            # Hash all integer widths alike so int32 and int64 sources merge
+            array = array.astype(np.int64)
+        hashes = pd.util.hash_array(array)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        remainder = hashes & ((np.uint64(1) << (np.uint64(64) - p)) - np.uint64(1))
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = (64 - self.precision + 1 - _bit_length(remainder)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other: Sketch built with the same precision.
+
+        Returns:
+            This sketch, for chaining.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        """Return the estimated number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting is more accurate here
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+def count_rows(chunks: Iterable[pd.DataFrame]) -> int:
+    """
+    Count rows across chunks.
+
+    Args:
+        chunks: Iterable of DataFrames.
+
+    Returns:
+        Total number of rows.
+    """
+    return sum(len(chunk) for chunk in chunks)
+
+
+def sum_by_day(
+    chunks: Iterable[pd.DataFrame],
+    date_column: str = "order_date",
+    value_column: str = "total",
+) -> pd.Series:
+    """
+    Sum a value column per calendar day across chunks.
+
+    With the defaults this gives daily revenue from iter_orders(). Rows with
+    a missing or unparseable date are dropped.
+
+    Args:
+        chunks: Iterable of DataFrames with date_column and value_column.
+        date_column: Column holding dates or datetimes.
+        value_column: Numeric column to sum.
+
+    Returns:
+        Series indexed by day (datetime64), sorted by date.
+    """
+    totals = pd.Series(dtype="float64")
+    for chunk in chunks:
+        days = pd.to_datetime(chunk[date_column], errors="coerce").dt.normalize()
+        partial = chunk[value_column].groupby(days).sum()
+        totals = totals.add(partial, fill_value=0)
+
+    totals.index = pd.DatetimeIndex(totals.index, name=date_column)
+    return totals.sort_index().rename(value_column)
+
+
+def distinct_sketch(
+    chunks: Iterable[pd.DataFrame], column: str, precision: int = 14
+) -> HyperLogLog:
+    """
+    Build a HyperLogLog sketch of a column across chunks.
+
+    Keep the sketch instead of the count when results from several files or
+    workers need to be merged later.
+
+    Args:
+        chunks: Iterable of DataFrames containing column.
+        column: Column to count distinct values of.
+        precision: HyperLogLog precision (registers = 2**precision).
+
+    Returns:
+        HyperLogLog sketch of the column.
+    """
+    sketch = HyperLogLog(precision)
+    for chunk in chunks:
+        sketch.add(chunk[column])
+    return sketch
+
+
+def distinct_count(
+    chunks: Iterable[pd.DataFrame], column: str, precision: int = 14
+) -> int:
+    """
+    Approximate the number of distinct values in a column across chunks.
+
+    Args:
+        chunks: Iterable of DataFrames containing column.
+        column: Column to count distinct values of, e.g. "customer_id".
+        precision: HyperLogLog precision; higher is more accurate.
+
+    Returns:
+        Estimated distinct count, rounded to an integer.
+    """
+    return round(distinct_sketch(chunks, column, precision).count())
+
+
+class QuantileSketch:
+    """
+    KLL sketch for approximate quantiles of a numeric stream.
+
+    Keeps a few hundred values in a stack of compactors: when a level
+    overflows, it is sorted and every other value is promoted to the next
+    level with twice the weight. Memory grows with log(n / k), and the rank
+    error is about 1.7 / k (under 1% at the default k of 200). Sketches with
+    the same k can be merged, so partial sketches from chunks, files or
+    processes combine into the sketch of their union.
+
+    Example:
+        >>> sketch = QuantileSketch()
+        >>> sketch.add(np.arange(100_000))
+        >>> sketch.quantile(0.5)  # within about 1% of 50_000
+    """
+
+    def __init__(self, k: int = 200):
+        if k < 8:
+            raise ValueError(f"k must be at least 8, got {k}")
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self._compactions = 0
+
+    def add(self, values) -> None:
+        """
+        Add values to the sketch. Missing and non-numeric values are ignored.
+
+        Args:
+            values: Series, Index or array of numbers.
+        """
+        array = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan
+        )
+        array = array[np.isfinite(array)]
+        if array.size == 0:
+            return
+        self.count += array.size
+        self.minimum = min(self.minimum, float(array.min()))
+        self.maximum = max(self.maximum, float(array.max()))
+        self.levels[0] = np.concatenate([self.levels[0], array])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other: Sketch built with the same k.
+
+        Returns:
+            This sketch, for chaining.
+        """
+        if other.k != self.k:
+            raise ValueError("Cannot merge sketches with different k")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+        return self
+
+    def _capacity(self, level: int) -> int:
+        # Lower levels get geometrically smaller buffers
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd value out stays behind at this level
+                keep, items = items[len(items) // 2 * 2 :], items[: len(items) // 2 * 2]
+                # Alternate which half survives so the errors cancel out
+                promoted = items[self._compactions % 2 :: 2]
+                self._compactions += 1
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+                # Capacities shrink when a level is added; recheck from 0
+                level = 0
+                continue
+            level += 1
+
+    def quantiles(self, qs) -> list:
+        """
+        Estimate several quantiles at once.
+
+        Args:
+            qs: Quantiles between 0 and 1.
+
+        Returns:
+            List of estimates (NaN for each q if the sketch is empty).
+        """
+        if self.count == 0:
+            return [np.nan for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(items), 2.0**level) for level, items in enumerate(self.levels)]
+        )
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        estimates = []
+        for q in qs:
+            if q <= 0:
+                estimates.append(self.minimum)
+            elif q >= 1:
+                estimates.append(self.maximum)
+            else:
+                index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+                estimates.append(float(items[min(index, len(items) - 1)]))
+        return estimates
+
+    def quantile(self, q: float) -> float:
+        """Estimate a single quantile, e.g. 0.5 for the median."""
+        return self.quantiles([q])[0]
+
+
+class TopK:
+    """
+    Misra-Gries summary of the most frequent values in a stream.
+
+    Keeps at most capacity counters. Any value more frequent than
+    n / (capacity + 1) is guaranteed to be kept, and each reported count
+    undercounts by at most error. Summaries can be merged.
+
+    Example:
+        >>> top = TopK(capacity=10)
+        >>> top.add(pd.Series(["a", "b", "a"]))
+        >>> top.top(1).to_dict()
+        {'a': 2}
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.error = 0
+
+    def add(self, values) -> None:
+        """Add values to the summary. Missing values are ignored."""
+        self.add_counts(pd.Series(values).value_counts(dropna=True))
+
+    def add_counts(self, counts: pd.Series) -> None:
+        """
+        Add pre-aggregated counts.
+
+        Args:
+            counts: Series of value -> count, e.g. from value_counts().
+        """
+        counts = counts[counts > 0]
+        if counts.empty:
+            return
+        counts = pd.Series(
+            counts.to_numpy(dtype="int64"), index=counts.index.astype(object)
+        )
+        merged = self.counts.add(counts, fill_value=0).astype("int64")
+        if len(merged) > self.capacity:
+            threshold = int(merged.nlargest(self.capacity + 1).iloc[-1])
+            merged = merged - threshold
+            merged = merged[merged > 0]
+            self.error += threshold
+        self.counts = merged
+
+    def merge(self, other: "TopK") -> "TopK":
+        """
+        Fold another summary into this one.
+
+        Returns:
+            This summary, for chaining.
+        """
+        self.add_counts(other.counts)
+        self.error += other.error
+        return self
+
+    def top(self, n: int = 10) -> pd.Series:
+        """Return the n most frequent values with their (lower-bound) counts."""
+        return self.counts.sort_values(ascending=False, kind="stable").head(n)
@@ -0,0 +1,618 @@
+"""
+Synthetic Cartly data at 1x-1000x the size of the sample CSVs.
+
+The generator fits simple empirical distributions from the sample data in
+data/ (attribute rows, orders per customer, items per order, product
+popularity, days from signup to order, sessions and tickets per customer)
+and draws new rows from them. Event dates stay inside the sample's date
+range and on or after the customer's signup:
+
+- a customer's order count is drawn together with their signup date, and
+  order lags are drawn from the lags that end by the sample's last order
+- session and ticket dates are drawn from the sample's dates on or after
+  the signup; customers who signed up after the sample's sessions or
+  tickets get dates from the whole range, like those in the sample
+
+Keys are generated so every foreign key points at a row that exists:
+
+- orders.customer_id, website_sessions.customer_id and
+  customer_support.customer_id point at generated customers
+- order_items.order_id points at generated orders and product_id at the
+  sample products
+- order totals are the sum of their items plus shipping and tax, and the
+  customer summary columns (total_orders, total_spent, ...) are computed
+  from the customer's orders
+
+Output is written customer batch by customer batch, so memory use depends
+on batch_size and not on scale. Each table becomes a directory of part
+files:
+
+    out_dir/
+        customers/part-00000.parquet
+        orders/part-00000.parquet
+        ...
+
+Names, cities and email local parts come from per-country Faker pools
+built once per run; all other sampling is vectorized with numpy.
+
+Usage:
+    python -m src.synthetic --scale 100 --out data/synthetic
+    python -m src.synthetic --scale 10 --format csv --batch-size 20000
+
+Example:
+    >>> from src.synthetic import generate
+    >>> counts = generate(50, "data/synthetic")
+    >>> counts["orders"]
+    353584
+"""
+
+import argparse
+import shutil
+import sys
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .schemas import get_schema
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+DEFAULT_BATCH_SIZE = 50_000
+
+FORMATS = ["parquet", "csv"]
+
+# Tables written by generate(); products and categories are copied as-is
+TABLES = [
+    "customers",
+    "orders",
+    "order_items",
+    "website_sessions",
+    "customer_support",
+    "marketing_campaigns",
+    "products",
+    "categories",
+]
+
+# Faker locale used for names and cities of each sample country
+COUNTRY_LOCALES = {
+    "India": "en_IN",
+    "USA": "en_US",
+    "UK": "en_GB",
+    "Germany": "de_DE",
+    "Canada": "en_CA",
+    "Australia": "en_AU",
+    "Singapore": "en_US",
+}
+
+POOL_SIZE = 500
+
+# First generated ID of each table, matching the sample numbering
+ID_START = {
+    "customers": 10001,
+    "orders": 100001,
+    "website_sessions": 1000000,
+    "customer_support": 100000,
+    "marketing_campaigns": 10000,
+}
+
+
+def _read_sample(table: str, data_dir: Path) -> pd.DataFrame:
+    path = data_dir / get_schema(table)["file"]
+    if not path.exists():
+        raise FileNotFoundError(f"{get_schema(table)['label']} file not found: {path}")
+    return pd.read_csv(path)
+
+
+def _per_key_counts(keys: pd.Series, population: pd.Series) -> np.ndarray:
+    """Number of rows per member of population, including zeros."""
+    counts = keys.value_counts()
+    return population.map(counts).fillna(0).to_numpy(dtype=np.int64)
+
+
+def _days(dates: pd.Series) -> np.ndarray:
+    """Sample date strings as datetime64[D], dropping unparsable ones."""
+    parsed = pd.to_datetime(dates, format="ISO8601", errors="coerce").dropna()
+    return parsed.to_numpy().astype("datetime64[D]")
+
+
+def fit_profile(data_dir: str = None) -> dict:
+    """
+    Fit the empirical distributions the generator samples from.
+
+    Args:
+        data_dir: Directory holding the sample CSVs. If None, uses data/.
+
+    Returns:
+        dict of sample attribute frames and count arrays, passed to
+        generate_batch()
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    customers = _read_sample("customers", data_dir)
+    customer_columns = list(customers.columns)
+    sample_customers = len(customers)
+    orders = _read_sample("orders", data_dir)
+    items = _read_sample("order_items", data_dir)
+    products = _read_sample("products", data_dir)
+    sessions = _read_sample("website_sessions", data_dir)
+    tickets = _read_sample("customer_support", data_dir)
+    campaigns = _read_sample("marketing_campaigns", data_dir)
+
+    signup = pd.to_datetime(
+        customers["signup_date"], format="%Y-%m-%d", errors="coerce"
+    )
+    customers = customers.assign(signup_date=signup).dropna(subset=["signup_date"])
+
+    order_dates = pd.to_datetime(
+        orders["order_date"], format="%Y-%m-%d", errors="coerce"
+    )
+    signup_of_order = orders["customer_id"].map(
+        customers.set_index("customer_id")["signup_date"]
+    )
+    lag_days = (order_dates - signup_of_order).dt.days.dropna().clip(lower=0)
+    # Order counts are kept with the signup date they go with, so customers
+    # who signed up after the last sample order get none
+    order_counts = _per_key_counts(orders["customer_id"], customers["customer_id"])
+
+    priced = items.merge(products, left_on="product_id", right_on="id")
+    popularity = items["product_id"].value_counts()
+    popularity = popularity.reindex(products["id"], fill_value=0) + 1
+
+    paid = orders[orders["shipping"] > 0]
+    anonymous = sessions["customer_id"].isna()
+
+    return {
+        "customers": customers[
+            [
+                "age",
+                "gender",
+                "country",
+                "signup_date",
+                "signup_source",
+                "segment",
+                "is_subscribed",
+            ]
+        ]
+        .assign(order_count=order_counts)
+        .reset_index(drop=True),
+        "email_domains": customers["email"].str.split("@").str[1].dropna().to_numpy(),
+        "order_attributes": orders[
+            ["status", "payment_method", "order_time"]
+        ].reset_index(drop=True),
+        "order_lag_days": np.sort(lag_days.to_numpy(dtype=np.int64)),
+        "last_order_date": order_dates.max().to_datetime64().astype("datetime64[D]"),
+        "items_per_order": orders["items_count"].clip(lower=1).to_numpy(dtype=np.int64),
+        "item_attributes": items[["quantity", "discount_percent"]].reset_index(
+            drop=True
+        ),
+        "price_ratio": (priced["unit_price"] / priced["base_price"]).to_numpy(),
+        "products": products,
+        "product_weights": (popularity / popularity.sum()).to_numpy(),
+        "shipping_fees": np.sort(paid["shipping"].unique()),
+        "free_shipping_above": float(paid["subtotal"].max()),
+        "tax_rate": float((orders["tax"] / orders["subtotal"]).median()),
+        "sessions_per_customer": _per_key_counts(
+            sessions["customer_id"], customers["customer_id"].astype("float64")
+        ),
+        "anonymous_session_ratio": float(anonymous.sum() / max((~anonymous).sum(), 1)),
+        "session_attributes": sessions.drop(columns=["session_id", "customer_id"]),
+        "session_dates": np.sort(_days(sessions["session_date"])),
+        "tickets_per_customer": _per_key_counts(
+            tickets["customer_id"], customers["customer_id"]
+        ),
+        "ticket_attributes": tickets.drop(columns=["ticket_id", "customer_id"]),
+        "ticket_dates": np.sort(_days(tickets["created_date"])),
+        "sample_customers": sample_customers,
+        "campaigns_per_customer": len(campaigns) / sample_customers,
+        "campaign_attributes": campaigns.drop(columns=["campaign_id"]),
+        "columns": {
+            "customers": customer_columns,
+            "orders": list(orders.columns),
+            "order_items": list(items.columns),
+            "website_sessions": list(sessions.columns),
+            "customer_support": list(tickets.columns),
+            "marketing_campaigns": list(campaigns.columns),
+        },
+    }
+
+
+def _ascii(text: str) -> str:
+    """Lowercase ASCII letters of a name, for building email addresses."""
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return "".join(ch for ch in folded.lower() if ch.isalnum())
+
+
+def build_name_pools(seed: int = 0, size: int = POOL_SIZE) -> dict:
+    """
+    Build per-country pools of first names, last names and cities.
+
+    Args:
+        seed: Faker seed.
+        size: Number of values drawn per pool.
+
+    Returns:
+        dict of country -> dict of numpy arrays (first_M, first_F, last, city)
+    """
+    from faker import Faker
+
+    pools = {}
+    for country, locale in COUNTRY_LOCALES.items():
+        fake = Faker(locale)
+        fake.seed_instance(seed)
+        pools[country] = {
+            "first_M": np.array([fake.first_name_male() for _ in range(size)]),
+            "first_F": np.array([fake.first_name_female() for _ in range(size)]),
+            "last": np.array([fake.last_name() for _ in range(size)]),
+            "city": np.array([fake.city() for _ in range(size)]),
+        }
+    return pools
+
+
+def _sample_rows(frame: pd.DataFrame, n: int, rng) -> pd.DataFrame:
+    """Draw n rows with replacement, keeping columns jointly distributed."""
+    return frame.iloc[rng.integers(0, len(frame), n)].reset_index(drop=True)
+
+
+def _draw(values: np.ndarray, n: int, rng) -> np.ndarray:
+    return values[rng.integers(0, len(values), n)]
+
+
+def _draw_between(values: np.ndarray, low, high, rng) -> np.ndarray:
+    """
+    Draw from sorted values, each between its low and high bound.
+
+    Where no value lies in the bounds, draws from all values instead.
+    """
+    first = np.searchsorted(values, low, side="left")
+    last = np.searchsorted(values, high, side="right")
+    empty = first >= last
+    first = np.where(empty, 0, first)
+    last = np.where(empty, len(values), last)
+    return values[first + (rng.random(len(first)) * (last - first)).astype(np.int64)]
+
+
+def _identities(attributes: pd.DataFrame, ids: np.ndarray, profile, pools, rng):
+    """Names, email, phone and city for a batch of customers."""
+    n = len(attributes)
+    first = np.empty(n, dtype=object)
+    last = np.empty(n, dtype=object)
+    city = np.empty(n, dtype=object)
+    for country, positions in attributes.groupby("country").indices.items():
+        pool = pools.get(country, pools["USA"])
+        genders = attributes["gender"].to_numpy()[positions]
+        male = _draw(pool["first_M"], len(positions), rng)
+        female = _draw(pool["first_F"], len(positions), rng)
+        first[positions] = np.where(genders == "F", female, male)
+        last[positions] = _draw(pool["last"], len(positions), rng)
+        city[positions] = _draw(pool["city"], len(positions), rng)
+
+    domains = profile["email_domains"][
+        rng.integers(0, len(profile["email_domains"]), n)
+    ]
+    # The customer ID keeps addresses unique at any scale
+    email = [
+        f"{_ascii(f)}.{_ascii(s)}{i}@{d}"
+        for f, s, i, d in zip(first, last, ids, domains)
+    ]
+    phone = rng.integers(2_000_000_000, 10_000_000_000, n).astype(str)
+    return first, last, email, phone, city
+
+
+def _line_numbers(counts: np.ndarray) -> np.ndarray:
+    """1-based position of each row within its group, for grouped repeats."""
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(counts.sum()) - starts + 1
+
+
+def generate_batch(
+    profile: dict, pools: dict, rng, n_customers: int, next_ids: dict
+) -> dict:
+    """
+    Generate one batch of customers and everything that references them.
+
+    Args:
+        profile: Output of fit_profile().
+        pools: Output of build_name_pools().
+        rng: numpy Generator.
+        n_customers: Customers in this batch.
+        next_ids: Next free ID per table (see ID_START); advanced in place.
+
+    Returns:
+        dict of table name -> DataFrame, columns in sample CSV order
+    """
+    # Customers
+    customer_ids = next_ids["customers"] + np.arange(n_customers)
+    attributes = _sample_rows(profile["customers"], n_customers, rng)
+    first, last, email, phone, city = _identities(
+        attributes, customer_ids, profile, pools, rng
+    )
+
+    # Orders: dated between the customer's signup and the last sample order
+    signup = attributes["signup_date"].to_numpy().astype("datetime64[D]")
+    order_counts = attributes["order_count"].to_numpy()
+    owner = np.repeat(np.arange(n_customers), order_counts)
+    n_orders = len(owner)
+    order_ids = next_ids["orders"] + np.arange(n_orders)
+    window = (profile["last_order_date"] - signup[owner]).astype(np.int64)
+    lag = _draw_between(profile["order_lag_days"], 0, window, rng)
+    order_dates = signup[owner] + lag.astype("timedelta64[D]")
+    items_count = rng.choice(profile["items_per_order"], n_orders)
+
+    # Order items: popular products more often, prices near the list price
+    products = profile["products"]
+    item_order = np.repeat(np.arange(n_orders), items_count)
+    n_items = len(item_order)
+    product_index = rng.choice(len(products), n_items, p=profile["product_weights"])
+    item_attributes = _sample_rows(profile["item_attributes"], n_items, rng)
+    ratio = rng.choice(profile["price_ratio"], n_items)
+    unit_price = np.round(products["base_price"].to_numpy()[product_index] * ratio, 2)
+    quantity = item_attributes["quantity"].to_numpy()
+    discount = item_attributes["discount_percent"].to_numpy()
+    item_total = np.round(unit_price * quantity * (1 - discount / 100), 2)
+
+    subtotal = np.round(np.bincount(item_order, item_total, minlength=n_orders), 2)
+    fees = rng.choice(profile["shipping_fees"], n_orders)
+    shipping = np.where(subtotal > profile["free_shipping_above"], 0, fees)
+    tax = np.round(subtotal * profile["tax_rate"], 2)
+    total = np.round(subtotal + shipping + tax, 2)
+
+    order_attributes = _sample_rows(profile["order_attributes"], n_orders, rng)
+    orders = pd.DataFrame(
+        {
+            "order_id": order_ids,
+            "customer_id": customer_ids[owner],
+            "order_date": pd.DatetimeIndex(order_dates).strftime("%Y-%m-%d"),
+            "order_time": order_attributes["order_time"],
+            "status": order_attributes["status"],
+            "payment_method": order_attributes["payment_method"],
+            "subtotal": subtotal,
+            "shipping": shipping,
+            "tax": tax,
+            "total": total,
+            "items_count": items_count,
+            "shipping_city": city[owner],
+            "shipping_country": attributes["country"].to_numpy()[owner],
+        }
+    )
+
+    order_items = pd.DataFrame(
+        {
+            "order_item_id": [
+                f"{o}-{n}"
+                for o, n in zip(order_ids[item_order], _line_numbers(items_count))
+            ],
+            "order_id": order_ids[item_order],
+            "product_id": products["id"].to_numpy()[product_index],
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "discount_percent": discount,
+            "item_total": item_total,
+        }
+    )
+
+    # Customer summary columns derived from their orders
+    spent = np.round(np.bincount(owner, total, minlength=n_customers), 2)
+    last_order = (
+        pd.Series(order_dates, dtype="datetime64[s]")
+        .groupby(owner)
+        .max()
+        .reindex(range(n_customers))
+    )
+    customers = pd.DataFrame(
+        {
+            "customer_id": customer_ids,
+            "first_name": first,
+            "last_name": last,
+            "email": email,
+            "phone": phone,
+            "age": attributes["age"],
+            "gender": attributes["gender"],
+            "country": attributes["country"],
+            "city": city,
+            "signup_date": attributes["signup_date"].dt.strftime("%Y-%m-%d"),
+            "signup_source": attributes["signup_source"],
+            "segment": attributes["segment"],
+            "is_subscribed": attributes["is_subscribed"],
+            "total_orders": order_counts,
+            "total_spent": spent,
+            "avg_order_value": np.round(
+                np.divide(
+                    spent,
+                    order_counts,
+                    out=np.zeros(n_customers),
+                    where=order_counts > 0,
+                ),
+                2,
+            ),
+            "last_order_date": last_order.dt.strftime("%Y-%m-%d").to_numpy(),
+        }
+    )
+
+    # Website sessions: known customers plus anonymous visitors, shuffled
+    session_counts = rng.choice(profile["sessions_per_customer"], n_customers)
+    known_owner = np.repeat(np.arange(n_customers), session_counts)
+    known = customer_ids[known_owner]
+    n_anonymous = round(len(known) * profile["anonymous_session_ratio"])
+    visitor = pd.array(
+        np.concatenate([known, np.zeros(n_anonymous, dtype=np.int64)]), dtype="Int64"
+    )
+    visitor[len(known) :] = pd.NA
+    shuffle = rng.permutation(len(visitor))
+    visitor = visitor[shuffle]
+    sessions = _sample_rows(profile["session_attributes"], len(visitor), rng)
+    # Known customers' sessions fall on or after their signup
+    is_known = shuffle < len(known)
+    session_dates = profile["session_dates"]
+    sessions.loc[is_known, "session_date"] = pd.DatetimeIndex(
+        _draw_between(
+            session_dates,
+            signup[known_owner[shuffle[is_known]]],
+            session_dates[-1],
+            rng,
+        )
+    ).strftime("%Y-%m-%d")
+    sessions.insert(0, "customer_id", visitor)
+    sessions.insert(
+        0,
+        "session_id",
+        [f"S{i}" for i in next_ids["website_sessions"] + np.arange(len(visitor))],
+    )
+
+    # Support tickets
+    ticket_counts = rng.choice(profile["tickets_per_customer"], n_customers)
+    ticket_index = np.repeat(np.arange(n_customers), ticket_counts)
+    ticket_owner = customer_ids[ticket_index]
+    tickets = _sample_rows(profile["ticket_attributes"], len(ticket_owner), rng)
+    # Created on or after the signup; resolution keeps the sampled duration
+    ticket_dates = profile["ticket_dates"]
+    created = pd.to_datetime(tickets["created_date"], format="ISO8601")
+    moved = _draw_between(ticket_dates, signup[ticket_index], ticket_dates[-1], rng)
+    shift = moved - created.to_numpy().astype("datetime64[D]")
+    resolved = pd.to_datetime(tickets["resolved_date"], format="ISO8601")
+    tickets["created_date"] = (created + shift).dt.strftime("%Y-%m-%d %H:%M:%S")
+    tickets["resolved_date"] = (resolved + shift).dt.strftime("%Y-%m-%d %H:%M:%S")
+    tickets.insert(0, "customer_id", ticket_owner)
+    tickets.insert(
+        0,
+        "ticket_id",
+        [
+            f"TKT{i}"
+            for i in next_ids["customer_support"] + np.arange(len(ticket_owner))
+        ],
+    )
+
+    # Campaigns grow with the customer base
+    expected = profile["campaigns_per_customer"] * (
+        customer_ids[-1] - ID_START["customers"] + 1
+    )
+    n_campaigns = max(
+        round(expected)
+        - (next_ids["marketing_campaigns"] - ID_START["marketing_campaigns"]),
+        0,
+    )
+    campaigns = _sample_rows(profile["campaign_attributes"], n_campaigns, rng)
+    campaigns.insert(
+        0,
+        "campaign_id",
+        [f"CAMP{i}" for i in next_ids["marketing_campaigns"] + np.arange(n_campaigns)],
+    )
+
+    next_ids["customers"] += n_customers
+    next_ids["orders"] += n_orders
+    next_ids["website_sessions"] += len(visitor)
+    next_ids["customer_support"] += len(ticket_owner)
+    next_ids["marketing_campaigns"] += n_campaigns
+
+    frames = {
+        "customers": customers,
+        "orders": orders,
+        "order_items": order_items,
+        "website_sessions": sessions,
+        "customer_support": tickets,
+        "marketing_campaigns": campaigns,
+    }
+    return {table: frame[profile["columns"][table]] for table, frame in frames.items()}
+
+
+def _write_part(frame: pd.DataFrame, directory: Path, part: int, fmt: str) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-{part:05d}.{fmt}"
+    if fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def generate(
+    scale: float,
+    out_dir: str,
+    fmt: str = "parquet",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    seed: int = 0,
+    data_dir: str = None,
+    tables: list = None,
+) -> dict:
+    """
+    Generate scale times the sample data as partitioned files.
+
+    Existing output directories of the generated tables are replaced.
+
+    Args:
+        scale: Size relative to the sample (1 = 10,000 customers).
+        out_dir: Directory that receives one sub-directory per table.
+        fmt: "parquet" or "csv".
+        batch_size: Customers generated per part file; bounds memory use.
+        seed: Random seed; the same seed gives the same data.
+        data_dir: Directory holding the sample CSVs. If None, uses data/.
+        tables: Tables to write (see TABLES). If None, writes all.
+            Dependent tables are still generated to keep keys consistent.
+
+    Returns:
+        dict of table name -> number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}. Use one of {FORMATS}")
+    if scale <= 0:
+        raise ValueError(f"scale must be positive, got {scale}")
+    tables = TABLES if tables is None else tables
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables: {sorted(unknown)}. Known: {TABLES}")
+
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    out_dir = Path(out_dir)
+    for table in tables:
+        shutil.rmtree(out_dir / table, ignore_errors=True)
+
+    profile = fit_profile(data_dir)
+    pools = build_name_pools(seed)
+    rng = np.random.default_rng(seed)
+    next_ids = dict(ID_START)
+    counts = {table: 0 for table in tables}
+
+    for table in ("products", "categories"):
+        if table in tables:
+            frame = _read_sample(table, data_dir)
+            _write_part(frame, out_dir / table, 0, fmt)
+            counts[table] = len(frame)
+
+    total_customers = round(profile["sample_customers"] * scale)
+    for part, start in enumerate(range(0, total_customers, batch_size)):
+        size = min(batch_size, total_customers - start)
+        frames = generate_batch(profile, pools, rng, size, next_ids)
+        for table, frame in frames.items():
+            if table in tables:
+                _write_part(frame, out_dir / table, part, fmt)
+                counts[table] += len(frame)
+    return counts
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Generate scaled-up synthetic Cartly data"
+    )
+    parser.add_argument(
+        "--scale", type=float, default=10, help="Size relative to the sample"
+    )
+    parser.add_argument(
+        "--out", default=str(DATA_DIR / "synthetic"), help="Output directory"
+    )
+    parser.add_argument("--format", choices=FORMATS, default="parquet", dest="fmt")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--table", action="append", choices=TABLES, help="Only write this table"
+    )
+    args = parser.parse_args(argv)
+
+    counts = generate(
+        args.scale, args.out, args.fmt, args.batch_size, args.seed, tables=args.table
+    )
+    for table, rows in counts.items():
+        print(f"  {rows:>12,} {table}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
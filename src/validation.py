@@ -0,0 +1,770 @@
+"""
+Declarative, compiled data validation rules for the Cartly tables.
+
+Rules are plain dicts (or YAML/JSON files, or pandera schemas) such as
+
+    {"column": "total", "check": "range", "min": 0}
+    {"column": "email", "check": "regex", "pattern": "^[^@]+@[^@]+$"}
+    {"column": "customer_id", "check": "foreign_key", "table": "customers"}
+
+compile_rules() turns a rule list into a RuleSet once: regexes are
+compiled, allowed values become sets and every rule becomes a vectorized
+column check. Compiled rule sets are cached, so asking for the same rules
+again costs a dict lookup. Text checks run once per distinct value and are
+broadcast back to the rows, so repeated values (statuses, cities, emails)
+are checked once.
+
+A RuleSet holds no per-call state: validate() returns a ValidationReport
+and never mutates the rule set, so one RuleSet can be shared by any number
+of threads. validate(..., fail_fast=True) stops at the first rule that any
+row fails; RuleSet.check() raises ValidationError instead of reporting.
+
+Rule keys:
+    column      Column the rule applies to (missing columns are all-null).
+    check       One of CHECKS (see the check functions below).
+    code        Error code; defaults to "<column>_<check>".
+    message     Human-readable message; defaults to a generated one.
+    fill        Value used for missing cells before checking. Without it,
+                missing cells pass every check except not_null.
+    skip_empty  If true, empty strings pass (like missing cells).
+
+RULE_SETS holds the rules for every table in src/schemas.py plus
+"customer_records", which reproduces DataValidator in
+data/ai_generated_validator.py with the same error codes and messages.
+
+Usage:
+    python -m src.validation                      # every table in data/
+    python -m src.validation orders customers --fail-fast
+    python -m src.validation orders --rules my_rules.yaml
+
+Example:
+    >>> from src.validation import compile_rules, validate_tables
+    >>> report = compile_rules("orders").validate(load_orders())
+    >>> report.summary()
+    >>> reports = validate_tables()  # all tables, validated concurrently
+"""
+
+import argparse
+import functools
+import json
+import operator
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import instrumentation
+from .date_parsing import parse_column
+from .schemas import SCHEMAS, get_schema
+
+EMAIL_PATTERN = r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$"
+
+# Digits with the usual separators and extensions: +49(0)4332181960,
+# (663) 794-0265 x423
+PHONE_PATTERN = r"^\+?[0-9(][0-9 ().-]{6,}( ?x[0-9]+)?$"
+
+RULE_SETS = {
+    "orders": [
+        {"column": "order_id", "check": "not_null"},
+        {"column": "order_id", "check": "unique"},
+        {"column": "customer_id", "check": "foreign_key", "table": "customers"},
+        {"column": "order_date", "check": "date", "format": "%Y-%m-%d"},
+        {"column": "order_time", "check": "date", "format": "%H:%M:%S"},
+        {
+            "column": "status",
+            "check": "isin",
+            "values": [
+                "pending",
+                "processing",
+                "shipped",
+                "delivered",
+                "cancelled",
+                "returned",
+            ],
+        },
+        {"column": "subtotal", "check": "range", "min": 0},
+        {"column": "shipping", "check": "range", "min": 0},
+        {"column": "tax", "check": "range", "min": 0},
+        {"column": "total", "check": "range", "min": 0},
+        {"column": "items_count", "check": "range", "min": 1},
+    ],
+    "customers": [
+        {"column": "customer_id", "check": "not_null"},
+        {"column": "customer_id", "check": "unique"},
+        {
+            "column": "email",
+            "check": "regex",
+            "pattern": EMAIL_PATTERN,
+            "ignore_case": True,
+        },
+        {"column": "email", "check": "unique", "code": "email_duplicate"},
+        {"column": "phone", "check": "regex", "pattern": PHONE_PATTERN},
+        {"column": "age", "check": "range", "min": 0, "max": 120},
+        {"column": "gender", "check": "isin", "values": ["M", "F", "Other"]},
+        {"column": "signup_date", "check": "date", "format": "%Y-%m-%d"},
+        {
+            "column": "segment",
+            "check": "isin",
+            "values": ["New", "Active", "VIP", "At Risk", "Churned"],
+        },
+        {"column": "total_spent", "check": "range", "min": 0},
+    ],
+    "products": [
+        {"column": "id", "check": "not_null"},
+        {"column": "id", "check": "unique"},
+        {
+            "column": "category_id",
+            "check": "foreign_key",
+            "table": "categories",
+            "key": "id",
+        },
+        {"column": "base_price", "check": "range", "min": 0},
+        {"column": "cost", "check": "range", "min": 0},
+        {"column": "cost", "check": "compare", "op": "<=", "other": "base_price"},
+    ],
+    "categories": [
+        {"column": "id", "check": "not_null"},
+        {"column": "id", "check": "unique"},
+        {"column": "margin", "check": "range", "min": 0, "max": 1},
+    ],
+    "order_items": [
+        {"column": "order_item_id", "check": "unique"},
+        {"column": "order_id", "check": "foreign_key", "table": "orders"},
+        {
+            "column": "product_id",
+            "check": "foreign_key",
+            "table": "products",
+            "key": "id",
+        },
+        {"column": "quantity", "check": "range", "min": 1},
+        {"column": "unit_price", "check": "range", "min": 0},
+        {"column": "discount_percent", "check": "range", "min": 0, "max": 100},
+        {"column": "item_total", "check": "range", "min": 0},
+    ],
+    "website_sessions": [
+        {"column": "session_id", "check": "unique"},
+        {"column": "customer_id", "check": "foreign_key", "table": "customers"},
+        {"column": "session_hour", "check": "range", "min": 0, "max": 23},
+        {"column": "pages_viewed", "check": "range", "min": 1},
+        {"column": "time_on_site_seconds", "check": "range", "min": 0},
+    ],
+    "customer_support": [
+        {"column": "ticket_id", "check": "unique"},
+        {"column": "customer_id", "check": "foreign_key", "table": "customers"},
+        {
+            "column": "priority",
+            "check": "isin",
+            "values": ["Low", "Medium", "High", "Urgent"],
+        },
+        {
+            "column": "resolved_date",
+            "check": "compare",
+            "op": ">=",
+            "other": "created_date",
+        },
+        {"column": "satisfaction_score", "check": "range", "min": 1, "max": 5},
+    ],
+    "marketing_campaigns": [
+        {"column": "campaign_id", "check": "unique"},
+        {"column": "end_date", "check": "compare", "op": ">=", "other": "start_date"},
+        {"column": "budget", "check": "range", "min": 0},
+        {"column": "spend", "check": "range", "min": 0},
+        {"column": "impressions", "check": "range", "min": 0},
+        {"column": "clicks", "check": "range", "min": 0},
+        {"column": "conversions", "check": "range", "min": 0},
+    ],
+    # Same codes and messages as DataValidator in data/ai_generated_validator.py
+    "customer_records": [
+        {
+            "column": "name",
+            "check": "length",
+            "min": 1,
+            "fill": "",
+            "code": "name_required",
+            "message": "Name is required",
+        },
+        {
+            "column": "email",
+            "check": "regex",
+            "pattern": EMAIL_PATTERN,
+            "fill": "",
+            "code": "email_format",
+            "message": "Invalid email format",
+        },
+        {
+            "column": "age",
+            "check": "range",
+            "min": 0,
+            "code": "age_negative",
+            "message": "Age cannot be negative",
+        },
+        {
+            "column": "age",
+            "check": "range",
+            "max": 120,
+            "code": "age_too_high",
+            "message": "Age is unrealistically high",
+        },
+        {
+            "column": "phone",
+            "check": "digits",
+            "skip_empty": True,
+            "code": "phone_not_digits",
+            "message": "Phone must contain only digits",
+        },
+        {
+            "column": "phone",
+            "check": "length",
+            "min": 10,
+            "max": 10,
+            "skip_empty": True,
+            "code": "phone_length",
+            "message": "Phone must be exactly 10 digits",
+        },
+        {
+            "column": "total_spent",
+            "check": "type",
+            "type": "number",
+            "code": "total_spent_type",
+            "message": "Total spent must be a number",
+        },
+    ],
+}
+
+# check name -> compiler(rule) -> function(values, frame, references)
+# returning a bool array that is True where a row fails
+CHECKS = {}
+
+COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+RULE_KEYS = {"column", "check", "code", "message", "fill", "skip_empty"}
+
+
+class ValidationError(ValueError):
+    """Raised by RuleSet.check() when a frame fails a rule."""
+
+    def __init__(self, report: "ValidationReport"):
+        self.report = report
+        failed = report.summary()
+        failed = failed[failed["failures"] > 0]
+        details = ", ".join(f"{c} ({n} rows)" for c, n in failed["failures"].items())
+        super().__init__(f"Validation failed: {details}")
+
+
+def check(name: str):
+    """Register a rule compiler in CHECKS under a check name."""
+
+    def register(func):
+        CHECKS[name] = func
+        return func
+
+    return register
+
+
+def _per_value(values: pd.Series, test) -> np.ndarray:
+    """
+    Apply a test to each distinct value and broadcast it back to the rows.
+
+    test gets a Series of the distinct values as Python strings and returns
+    a bool Series (True = fails). Missing values are reported as passing.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    texts = pd.Series(np.asarray(uniques, dtype=object)).astype(
+        pd.StringDtype("python")
+    )
+    failed = np.append(test(texts).to_numpy(dtype=bool, na_value=False), False)
+    return failed[codes]
+
+
+@check("not_null")
+def _not_null(rule):
+    return lambda values, frame, references: values.isna().to_numpy()
+
+
+@check("unique")
+def _unique(rule):
+    # Every occurrence after the first fails
+    return lambda values, frame, references: (
+        values.duplicated(keep="first") & values.notna()
+    ).to_numpy()
+
+
+@check("isin")
+def _isin(rule):
+    allowed = frozenset(rule["values"])
+
+    def run(values, frame, references):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            bad = np.array([c not in allowed for c in values.cat.categories] + [False])
+            return bad[values.cat.codes.to_numpy()]
+        return (~values.isin(allowed) & values.notna()).to_numpy()
+
+    return run
+
+
+@check("range")
+def _range(rule):
+    low, high = rule.get("min"), rule.get("max")
+    inclusive = rule.get("inclusive", True)
+
+    def run(values, frame, references):
+        numbers = pd.to_numeric(values, errors="coerce")
+        # Values that are present but not numbers fail
+        failed = (numbers.isna() & values.notna()).to_numpy()
+        numbers = numbers.to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            if low is not None:
+                failed = failed | (numbers < low if inclusive else numbers <= low)
+            if high is not None:
+                failed = failed | (numbers > high if inclusive else numbers >= high)
+        return failed
+
+    return run
+
+
+@check("regex")
+def _regex(rule):
+    pattern = re.compile(
+        rule["pattern"], re.IGNORECASE if rule.get("ignore_case") else 0
+    )
+    return lambda values, frame, references: _per_value(
+        values, lambda texts: ~texts.str.match(pattern)
+    )
+
+
+@check("length")
+def _length(rule):
+    low, high = rule.get("min"), rule.get("max")
+
+    def test(texts):
+        lengths = texts.str.len()
+        failed = pd.Series(False, index=texts.index)
+        if low is not None:
+            failed |= lengths < low
+        if high is not None:
+            failed |= lengths > high
+        return failed
+
+    return lambda values, frame, references: _per_value(values, test)
+
+
+@check("digits")
+def _digits(rule):
+    return lambda values, frame, references: _per_value(
+        values, lambda texts: ~texts.str.isdigit()
+    )
+
+
+@check("date")
+def _date(rule):
+    fmt = rule["format"]
+
+    def run(values, frame, references):
+        parsed, _ = parse_column(values, fmt)
+        return (parsed.isna() & values.notna()).to_numpy()
+
+    return run
+
+
+@check("type")
+def _type(rule):
+    if rule["type"] != "number":
+        raise ValueError(f"Unsupported type check {rule['type']!r}; use 'number'")
+
+    def run(values, frame, references):
+        if pd.api.types.is_numeric_dtype(values):
+            return np.zeros(len(values), dtype=bool)
+        is_number = values.map(lambda value: isinstance(value, (int, float)))
+        return ~(is_number.astype(bool) | values.isna()).to_numpy()
+
+    return run
+
+
+@check("compare")
+def _compare(rule):
+    compare = COMPARISONS[rule["op"]]
+    other = rule["other"]
+
+    def run(values, frame, references):
+        right = frame[other] if other in frame.columns else pd.Series(np.nan)
+        with np.errstate(invalid="ignore"):
+            passed = compare(values, right.reindex(values.index))
+        passed = pd.Series(passed, index=values.index).fillna(False).astype(bool)
+        # Comparisons with a missing value on either side pass
+        return (~passed & values.notna() & right.notna()).to_numpy()
+
+    return run
+
+
+@check("foreign_key")
+def _foreign_key(rule):
+    table = rule["table"]
+    key = rule.get("key", rule["column"])
+
+    def run(values, frame, references):
+        if references is None or table not in references:
+            raise KeyError(
+                f"Rule {rule['code']} needs the '{table}' table; pass it in "
+                "references={'" + table + "': ...}"
+            )
+        known = pd.Index(references[table][key].dropna().unique())
+        return (~values.isin(known) & values.notna()).to_numpy()
+
+    return run
+
+
+class _Rule:
+    """One compiled rule: where to look and what to run."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.column = spec["column"]
+        self.check = spec["check"]
+        self.code = spec["code"]
+        self.message = spec["message"]
+        self.fill = spec.get("fill")
+        self.skip_empty = spec.get("skip_empty", False)
+        self.run = CHECKS[self.check](spec)
+
+    def failures(self, frame: pd.DataFrame, references: dict) -> np.ndarray:
+        if self.column in frame.columns:
+            values = frame[self.column]
+        else:
+            values = pd.Series(None, index=frame.index, dtype=object)
+        if self.fill is not None:
+            values = values.astype(object).where(values.notna(), self.fill)
+        failed = self.run(values, frame, references)
+        if self.skip_empty:
+            empty = (values.astype(object) == "").to_numpy(dtype=bool)
+            failed = failed & ~empty
+        return np.asarray(failed, dtype=bool)
+
+
+class ValidationReport:
+    """
+    Result of RuleSet.validate().
+
+    errors is a bool DataFrame with one column per evaluated rule code
+    (True where the row fails) and valid a bool Series, both aligned to the
+    validated frame's index. If validation stopped early (fail_fast),
+    stopped_at names the failing rule and later rules are not in errors.
+    """
+
+    def __init__(self, errors: pd.DataFrame, rules: list, stopped_at: str = None):
+        self.errors = errors
+        self.valid = ~errors.any(axis=1)
+        self.stopped_at = stopped_at
+        self._rules = rules
+
+    @property
+    def ok(self) -> bool:
+        """True if every row passed every evaluated rule."""
+        return bool(self.valid.all())
+
+    def summary(self) -> pd.DataFrame:
+        """Failures per rule: code, column, check, failures, message."""
+        rows = [
+            {
+                "code": rule.code,
+                "column": rule.column,
+                "check": rule.check,
+                "failures": int(self.errors[rule.code].sum()),
+                "message": rule.message,
+            }
+            for rule in self._rules
+        ]
+        columns = ["code", "column", "check", "failures", "message"]
+        return pd.DataFrame(rows, columns=columns).set_index("code")
+
+    def messages(self) -> pd.Series:
+        """Per-row lists of failure messages, in rule order."""
+        messages = np.array([rule.message for rule in self._rules], dtype=object)
+        flags = self.errors.to_numpy()
+        return pd.Series(
+            [list(messages[row]) for row in flags], index=self.errors.index
+        )
+
+
+class RuleSet:
+    """
+    A compiled, immutable list of rules; build it with compile_rules().
+
+    validate() and check() keep all per-call state in local variables, so a
+    RuleSet can be used from many threads at once.
+    """
+
+    def __init__(self, rules: tuple):
+        self.rules = tuple(rules)
+
+    @property
+    def codes(self) -> list:
+        return [rule.code for rule in self.rules]
+
+    @property
+    def references(self) -> set:
+        """Tables needed by foreign_key rules."""
+        return {r.spec["table"] for r in self.rules if r.check == "foreign_key"}
+
+    @instrumentation.traced("stage", name="validation.validate")
+    def validate(
+        self, df: pd.DataFrame, fail_fast: bool = False, references: dict = None
+    ) -> ValidationReport:
+        """
+        Validate every row of a DataFrame.
+
+        Args:
+            df: Frame to validate.
+            fail_fast: Stop after the first rule that any row fails.
+            references: Tables for foreign_key rules, {table name: frame}.
+
+        Returns:
+            ValidationReport.
+        """
+        flags = {}
+        evaluated = []
+        stopped_at = None
+        for rule in self.rules:
+            failed = rule.failures(df, references)
+            flags[rule.code] = failed
+            evaluated.append(rule)
+            if fail_fast and failed.any():
+                stopped_at = rule.code
+                break
+        errors = pd.DataFrame(
+            flags, index=df.index, columns=[r.code for r in evaluated]
+        )
+        return ValidationReport(errors.astype(bool), evaluated, stopped_at)
+
+    def check(self, df: pd.DataFrame, references: dict = None) -> pd.DataFrame:
+        """
+        Validate and raise on the first failing rule.
+
+        Returns:
+            df unchanged, so check() can be used inline in a pipeline.
+
+        Raises:
+            ValidationError: If any row fails a rule.
+        """
+        report = self.validate(df, fail_fast=True, references=references)
+        if not report.ok:
+            raise ValidationError(report)
+        return df
+
+
+def _normalize(rule: dict) -> dict:
+    """Validate a rule dict and fill in its code and message."""
+    rule = dict(rule)
+    if "column" not in rule or "check" not in rule:
+        raise ValueError(f"Rule needs 'column' and 'check': {rule}")
+    if rule["check"] not in CHECKS:
+        raise KeyError(f"Unknown check '{rule['check']}'. Available: {sorted(CHECKS)}")
+    if rule["check"] == "compare" and rule.get("op") not in COMPARISONS:
+        raise ValueError(f"compare op must be one of {list(COMPARISONS)}: {rule}")
+    rule.setdefault("code", f"{rule['column']}_{rule['check']}")
+    if "message" not in rule:
+        params = {k: v for k, v in rule.items() if k not in RULE_KEYS}
+        detail = f" {json.dumps(params, default=str)}" if params else ""
+        rule["message"] = f"{rule['column']} fails {rule['check']}{detail}"
+    return rule
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_cached(key: str) -> RuleSet:
+    rules = [_normalize(rule) for rule in json.loads(key)]
+    codes = [rule["code"] for rule in rules]
+    duplicated = sorted({code for code in codes if codes.count(code) > 1})
+    if duplicated:
+        raise ValueError(f"Rule codes must be unique; repeated: {duplicated}")
+    return RuleSet(_Rule(rule) for rule in rules)
+
+
+def load_rules(path) -> dict:
+    """
+    Read rule sets from a YAML or JSON file.
+
+    The file maps table names to lists of rule dicts, e.g.
+
+        orders:
+          - {column: total, check: range, min: 0}
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ImportError: If a YAML file is given and pyyaml is not installed.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Rules file not found: {path}")
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return json.loads(text)
+    try:
+        import yaml
+    except ImportError as error:
+        raise ImportError(
+            "YAML rules files require pyyaml; install it or use a .json file"
+        ) from error
+
+    return yaml.safe_load(text)
+
+
+# pandera check name -> (rule check, statistic -> rule key)
+_PANDERA_CHECKS = {
+    "greater_than_or_equal_to": ("range", {"min_value": "min"}),
+    "less_than_or_equal_to": ("range", {"max_value": "max"}),
+    "in_range": ("range", {"min_value": "min", "max_value": "max"}),
+    "isin": ("isin", {"allowed_values": "values"}),
+    "str_matches": ("regex", {"pattern": "pattern"}),
+    "str_length": ("length", {"min_value": "min", "max_value": "max"}),
+}
+
+
+def rules_from_pandera(schema) -> list:
+    """
+    Convert a pandera DataFrameSchema into rule dicts.
+
+    Supports nullable, unique and the built-in checks in _PANDERA_CHECKS
+    (inclusive ranges, isin, str_matches, str_length); other checks raise
+    ValueError, since they cannot be compiled to vectorized rules.
+    """
+    rules = []
+    for name, column in schema.columns.items():
+        if not column.nullable:
+            rules.append({"column": name, "check": "not_null"})
+        if column.unique:
+            rules.append({"column": name, "check": "unique"})
+        for position, pandera_check in enumerate(column.checks):
+            if pandera_check.name not in _PANDERA_CHECKS:
+                raise ValueError(
+                    f"Cannot compile pandera check '{pandera_check.name}' on "
+                    f"'{name}'. Supported: {sorted(_PANDERA_CHECKS)}"
+                )
+            kind, keys = _PANDERA_CHECKS[pandera_check.name]
+            stats = pandera_check.statistics
+            if stats.get("include_min") is False or stats.get("include_max") is False:
+                raise ValueError(f"Exclusive in_range on '{name}' is not supported")
+            rule = {"column": name, "check": kind}
+            rule.update({keys[k]: stats[k] for k in keys if stats.get(k) is not None})
+            rule["code"] = f"{name}_{pandera_check.name}_{position}"
+            if pandera_check.error:
+                rule["message"] = pandera_check.error
+            rules.append(rule)
+    return rules
+
+
+def compile_rules(rules) -> RuleSet:
+    """
+    Compile rules into a RuleSet, reusing a cached one when possible.
+
+    Args:
+        rules: A list of rule dicts, a name in RULE_SETS, or a pandera
+            DataFrameSchema.
+
+    Returns:
+        RuleSet.
+
+    Raises:
+        KeyError: If a rule set name or check name is unknown.
+        ValueError: If a rule is malformed.
+    """
+    if isinstance(rules, str):
+        if rules not in RULE_SETS:
+            raise KeyError(
+                f"Unknown rule set '{rules}'. Available: {sorted(RULE_SETS)}"
+            )
+        rules = RULE_SETS[rules]
+    elif hasattr(rules, "columns") and hasattr(rules, "validate"):
+        rules = rules_from_pandera(rules)
+    return _compile_cached(json.dumps(list(rules), sort_keys=True, default=str))
+
+
+@instrumentation.traced("stage")
+def validate_tables(
+    tables: list = None,
+    data_dir: str = None,
+    rules: dict = None,
+    fail_fast: bool = False,
+    workers: int = None,
+) -> dict:
+    """
+    Validate several tables in one pass, concurrently.
+
+    Tables (and the tables their foreign keys reference) are loaded once
+    with src.data_loader.load_all(); each table is then validated in its own
+    thread with a shared compiled RuleSet.
+
+    Args:
+        tables: Tables to validate. If None, every table with rules.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        rules: {table: rules} overriding RULE_SETS, e.g. from load_rules().
+        fail_fast: Passed to RuleSet.validate().
+        workers: Maximum number of concurrent validations.
+
+    Returns:
+        Dict of table name -> ValidationReport.
+    """
+    from .data_loader import load_all
+
+    rules = {**RULE_SETS, **(rules or {})}
+    if tables is None:
+        tables = [table for table in SCHEMAS if table in rules]
+    compiled = {}
+    for table in tables:
+        get_schema(table)
+        if table not in rules:
+            raise KeyError(f"No rules for table '{table}'. Available: {sorted(rules)}")
+        compiled[table] = compile_rules(rules[table])
+
+    needed = set(tables).union(*(ruleset.references for ruleset in compiled.values()))
+    data = load_all([t for t in SCHEMAS if t in needed], data_dir=data_dir)
+
+    with ThreadPoolExecutor(max_workers=workers or len(tables) or 1) as pool:
+        futures = {
+            table: pool.submit(
+                instrumentation.propagate(compiled[table].validate),
+                data[table],
+                fail_fast,
+                data.tables,
+            )
+            for table in tables
+        }
+        return {table: future.result() for table, future in futures.items()}
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate the Cartly tables")
+    parser.add_argument("tables", nargs="*", help="Tables to validate (default: all)")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    parser.add_argument("--rules", default=None, help="YAML or JSON rules file")
+    parser.add_argument("--fail-fast", action="store_true")
+    args = parser.parse_args(argv)
+
+    rules = load_rules(args.rules) if args.rules else None
+    reports = validate_tables(
+        args.tables or None, args.data_dir, rules, fail_fast=args.fail_fast
+    )
+    failed = False
+    for table, report in reports.items():
+        summary = report.summary()
+        bad = int((~report.valid).sum())
+        failed = failed or bad > 0
+        print(f"\n{table}: {bad} of {len(report.valid)} rows fail")
+        print(summary[summary["failures"] > 0].to_string())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+"""
+Persistent DuckDB warehouse built from the Cartly CSVs.
+
+Analysis queries should not pay for CSV parsing every time. This module
+builds a DuckDB database file (data/cartly.duckdb by default) with one typed
+table per CSV:
+
+- column types follow src/schemas.py, with real DATE/TIME/TIMESTAMP columns
+- customers.signup_date placeholders such as "invalid-date" become NULL
+- each table has a primary key and is stored sorted on its main filter
+  column (orders by order_date, customers by customer_id), so DuckDB's
+  min/max zone maps can skip row groups for date and ID filters
+
+Refreshing is incremental: the size and modification time of every source
+CSV is recorded in a metadata table, and only tables whose CSV changed are
+rebuilt.
+
+DataFrames are served through Arrow, and then given the same categorical
+and integer dtypes as the CSV loaders.
+
+Usage:
+    python -m src.warehouse            # build or refresh data/cartly.duckdb
+    python -m src.warehouse --force    # rebuild every table
+
+Example:
+    >>> from src.warehouse import build_warehouse, query
+    >>> build_warehouse()
+    >>> query("SELECT COUNT(*) AS n FROM orders WHERE order_date >= ?",
+    ...       ["2024-10-01"])
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from . import instrumentation
+from .schemas import SCHEMAS, get_schema
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_DB_PATH = DATA_DIR / "cartly.duckdb"
+
+META_TABLE = "_cartly_sources"
+
+DUCKDB_TYPES = {
+    "int8": "TINYINT",
+    "int16": "SMALLINT",
+    "int32": "INTEGER",
+    "Int32": "INTEGER",
+    "int64": "BIGINT",
+    "uint8": "UTINYINT",
+    "uint16": "USMALLINT",
+    "float32": "FLOAT",
+    "float64": "DOUBLE",
+    "bool": "BOOLEAN",
+    "str": "VARCHAR",
+    "category": "VARCHAR",
+}
+
+# Columns whose warehouse type differs from the CSV loader's dtype
+COLUMN_OVERRIDES = {
+    "orders": {"order_date": "DATE", "order_time": "TIME"},
+    "customers": {"signup_date": "DATE"},
+}
+
+# Columns where unparseable values are stored as NULL instead of failing
+LENIENT_COLUMNS = {
+    "customers": {"signup_date"},
+}
+
+PRIMARY_KEYS = {
+    "orders": "order_id",
+    "customers": "customer_id",
+    "products": "id",
+    "categories": "id",
+    "order_items": "order_item_id",
+    "website_sessions": "session_id",
+    "customer_support": "ticket_id",
+    "marketing_campaigns": "campaign_id",
+}
+
+# Per-copy ID offsets used by load_scaled(); "suffix" appends the copy number
+SCALE_OFFSETS = {
+    "products": {},
+    "categories": {},
+    "customers": {"customer_id": 20000},
+    "orders": {"order_id": 200000, "customer_id": 20000},
+    "order_items": {"order_item_id": "suffix", "order_id": 200000},
+}
+
+SORT_KEYS = {
+    "orders": ["order_date", "order_id"],
+    "customers": ["customer_id"],
+    "order_items": ["order_id"],
+    "website_sessions": ["session_date", "session_hour"],
+    "customer_support": ["created_date"],
+    "marketing_campaigns": ["start_date"],
+}
+
+
+def _duckdb():
+    """Import duckdb lazily so the rest of src works without it."""
+    import duckdb
+
+    return duckdb
+
+
+def column_types(table: str, csv_path: Path = None) -> dict:
+    """
+    Return the DuckDB column types for a table, in CSV column order.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        csv_path: CSV whose header gives the column order. If None, uses
+            the table's file in data/.
+
+    Returns:
+        Dict mapping column name to DuckDB type name.
+    """
+    schema = get_schema(table)
+    types = {column: DUCKDB_TYPES[dtype] for column, dtype in schema["dtype"].items()}
+    for column, date_format in schema["dates"].items():
+        types[column] = "TIMESTAMP" if "%H" in date_format else "DATE"
+    types.update(COLUMN_OVERRIDES.get(table, {}))
+
+    # Keep the physical column order of the CSV header
+    header = _csv_header(Path(csv_path) if csv_path else DATA_DIR / schema["file"])
+    if header:
+        types = {column: types[column] for column in header if column in types}
+    return types
+
+
+def _csv_header(path: Path) -> list:
+    """Read the header row of a CSV, or return [] if it does not exist."""
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return f.readline().strip().split(",")
+
+
+def connect(db_path: str = None, read_only: bool = False):
+    """
+    Open a connection to the warehouse database.
+
+    Args:
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        read_only: Open without write access, so several processes can query
+            the same file at once.
+
+    Returns:
+        duckdb.DuckDBPyConnection
+    """
+    db_path = Path(db_path) if db_path is not None else DEFAULT_DB_PATH
+    return _duckdb().connect(str(db_path), read_only=read_only)
+
+
+def _ensure_meta(conn) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            table_name VARCHAR PRIMARY KEY,
+            source_path VARCHAR,
+            size_bytes BIGINT,
+            mtime_ns BIGINT,
+            row_count BIGINT,
+            loaded_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+
+
+def _source_fingerprint(path: Path) -> tuple:
+    stat = path.stat()
+    return str(path.resolve()), stat.st_size, stat.st_mtime_ns
+
+
+def typed_select(
+    table: str, source: str, csv_path: Path = None, columns: list = None
+) -> str:
+    """
+    SELECT statement that casts every text column of a source to its type.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        source: SQL relation with all-VARCHAR columns named like the CSV
+            header, e.g. a read_csv() call or a registered DataFrame.
+        csv_path: CSV whose header gives the column order.
+        columns: Only select and cast these columns. If None, all of them.
+
+    Returns:
+        SQL text.
+    """
+    lenient = LENIENT_COLUMNS.get(table, set())
+    casts = []
+    for column, duck_type in column_types(table, csv_path).items():
+        if columns is not None and column not in columns:
+            continue
+        cast = "TRY_CAST" if column in lenient else "CAST"
+        casts.append(f'{cast}("{column}" AS {duck_type}) AS "{column}"')
+    return f"SELECT {', '.join(casts)} FROM {source}"
+
+
+def csv_source(path) -> str:
+    """DuckDB relation reading a CSV with every column as text."""
+    quoted = str(path).replace("'", "''")
+    return f"read_csv('{quoted}', header = true, all_varchar = true)"
+
+
+def _select_from_csv(table: str, path: Path) -> str:
+    """SELECT statement that reads a CSV as text and casts every column."""
+    return typed_select(table, csv_source(path), path)
+
+
+def create_table(conn, table: str, csv_path: Path = None) -> None:
+    """
+    Create an empty typed table with its primary key, replacing any old one.
+
+    Args:
+        conn: Open warehouse connection.
+        table: Table name registered in src/schemas.py.
+        csv_path: CSV whose header gives the column order.
+    """
+    columns = [
+        f'"{column}" {duck_type}'
+        for column, duck_type in column_types(table, csv_path).items()
+    ]
+    if table in PRIMARY_KEYS:
+        columns.append(f'PRIMARY KEY ("{PRIMARY_KEYS[table]}")')
+
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+
+
+def insert_from_csv(conn, table: str, path: Path, where: str = None) -> int:
+    """
+    Append rows from a CSV file to a warehouse table, in sort-key order.
+
+    Args:
+        conn: Open warehouse connection.
+        table: Table name registered in src/schemas.py.
+        path: CSV file to read.
+        where: Optional SQL predicate on the typed columns selecting which
+            rows to insert.
+
+    Returns:
+        Number of rows inserted.
+    """
+    select = f"SELECT * FROM ({_select_from_csv(table, Path(path))})"
+    if where:
+        select += f" WHERE {where}"
+    if table in SORT_KEYS:
+        select += " ORDER BY " + ", ".join(f'"{c}"' for c in SORT_KEYS[table])
+
+    before = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.execute(f"INSERT INTO {table} {select}")
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - before
+
+
+def record_source(conn, table: str, path: Path) -> None:
+    """Store the fingerprint of the CSV a table was last loaded from."""
+    _ensure_meta(conn)
+    source_path, size, mtime_ns = _source_fingerprint(Path(path))
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.execute(
+        f"INSERT OR REPLACE INTO {META_TABLE} "
+        "(table_name, source_path, size_bytes, mtime_ns, row_count, loaded_at) "
+        "VALUES (?, ?, ?, ?, ?, current_timestamp)",
+        [table, source_path, size, mtime_ns, rows],
+    )
+
+
+def is_stale(conn, table: str, path: Path) -> bool:
+    """
+    Check whether a table needs rebuilding from its CSV.
+
+    Args:
+        conn: Open warehouse connection.
+        table: Table name.
+        path: Current source CSV.
+
+    Returns:
+        True if the table is missing or its CSV changed since the last load.
+    """
+    _ensure_meta(conn)
+    row = conn.execute(
+        f"SELECT source_path, size_bytes, mtime_ns FROM {META_TABLE} "
+        "WHERE table_name = ?",
+        [table],
+    ).fetchone()
+    return row is None or tuple(row) != _source_fingerprint(Path(path))
+
+
+@instrumentation.traced("warehouse")
+def build_warehouse(
+    db_path: str = None, data_dir: str = None, tables: list = None, force: bool = False
+) -> dict:
+    """
+    Build or incrementally refresh the warehouse from the CSVs.
+
+    Args:
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        tables: Tables to build. If None, every table in src/schemas.py
+            whose CSV exists.
+        force: Rebuild tables even if their CSV is unchanged.
+
+    Returns:
+        Dict mapping table name to "built" or "fresh".
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    if tables is None:
+        tables = [t for t in SCHEMAS if (data_dir / SCHEMAS[t]["file"]).exists()]
+
+    actions = {}
+    conn = connect(db_path)
+    try:
+        for table in tables:
+            path = data_dir / get_schema(table)["file"]
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"{get_schema(table)['label']} file not found: {path}"
+                )
+
+            if not force and not is_stale(conn, table, path):
+                actions[table] = "fresh"
+                continue
+
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                create_table(conn, table, path)
+                insert_from_csv(conn, table, path)
+                record_source(conn, table, path)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            actions[table] = "built"
+    finally:
+        conn.close()
+
+    return actions
+
+
+def load_scaled(
+    conn, multiply: int = 1, data_dir: str = None, tables: list = None
+) -> None:
+    """
+    Load typed, ID-offset copies of the core tables into a connection.
+
+    Mirrors the 50x fixture in tests/conftest.py: every copy of customers,
+    orders and order_items gets its own ID range, so joins keep their
+    real cardinality instead of fanning out. Products and categories are
+    loaded once. Intended for timing queries at larger scale, usually on
+    an in-memory connection.
+
+    Args:
+        conn: DuckDB connection to create the tables in.
+        multiply: Number of copies of the scaled tables.
+        data_dir: Directory holding the CSV files. If None, uses data/.
+        tables: Subset of SCALE_OFFSETS tables to load. If None, loads all.
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    for table in tables or list(SCALE_OFFSETS):
+        path = data_dir / get_schema(table)["file"]
+        offsets = SCALE_OFFSETS[table]
+        columns = []
+        for column in column_types(table, path):
+            if column in offsets and isinstance(offsets[column], int):
+                columns.append(
+                    f'"{column}" + (s.i - 1) * {offsets[column]} AS "{column}"'
+                )
+            elif column in offsets:
+                columns.append(f'"{column}" || \'_\' || s.i AS "{column}"')
+            else:
+                columns.append(f'"{column}"')
+
+        copies = multiply if offsets else 1
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"""
+            CREATE TABLE {table} AS
+            SELECT {', '.join(columns)}
+            FROM ({_select_from_csv(table, path)}) t
+            CROSS JOIN generate_series(1, {copies}) s(i)
+        """)
+
+
+def to_frame(arrow_table, table: str = None) -> pd.DataFrame:
+    """
+    Convert an Arrow result to pandas with the CSV loaders' dtypes.
+
+    Args:
+        arrow_table: pyarrow.Table fetched from DuckDB.
+        table: Source table name, used to restore categorical and narrow
+            integer dtypes. If None, Arrow's default conversion is kept.
+
+    Returns:
+        DataFrame.
+    """
+    df = arrow_table.to_pandas(date_as_object=False)
+    if table is None:
+        return df
+
+    overrides = COLUMN_OVERRIDES.get(table, {})
+    dtypes = {
+        column: dtype
+        for column, dtype in get_schema(table)["dtype"].items()
+        if column in df.columns and column not in overrides
+    }
+    return df.astype(dtypes)
+
+
+def _fetch_arrow(result):
+    # to_arrow_table() replaced fetch_arrow_table() in newer DuckDB releases
+    fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+    return fetch()
+
+
+@instrumentation.traced("warehouse")
+def query(
+    sql: str, params: list = None, db_path: str = None, conn=None
+) -> pd.DataFrame:
+    """
+    Run a SQL query against the warehouse and return a DataFrame.
+
+    Args:
+        sql: SQL text, with ? placeholders for params.
+        params: Query parameters.
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        conn: Existing connection to use instead of opening one.
+
+    Returns:
+        Query result as a DataFrame.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path, read_only=True)
+    try:
+        return to_frame(_fetch_arrow(conn.execute(sql, params or [])))
+    finally:
+        if own_conn:
+            conn.close()
+
+
+@instrumentation.traced("warehouse")
+def fetch_table(
+    table: str, columns: list = None, where: str = None, db_path: str = None, conn=None
+) -> pd.DataFrame:
+    """
+    Read a warehouse table as a DataFrame typed like the CSV loaders.
+
+    Only the requested columns are read, and DuckDB applies the where
+    predicate before any data reaches pandas.
+
+    Args:
+        table: Table name registered in src/schemas.py.
+        columns: Columns to read. If None, reads all columns.
+        where: Optional SQL predicate, e.g. "order_date >= DATE '2024-10-01'".
+        db_path: Path to the .duckdb file. If None, uses data/cartly.duckdb.
+        conn: Existing connection to use instead of opening one.
+
+    Returns:
+        DataFrame.
+    """
+    get_schema(table)
+    select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+    sql = f"SELECT {select} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path, read_only=True)
+    try:
+        return to_frame(_fetch_arrow(conn.execute(sql)), table)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the Cartly DuckDB warehouse")
+    parser.add_argument("--db", default=None, help="Path to the .duckdb file")
+    parser.add_argument("--data-dir", default=None, help="Directory with the CSVs")
+    parser.add_argument("--table", action="append", help="Only build this table")
+    parser.add_argument("--force", action="store_true", help="Rebuild all tables")
+    args = parser.parse_args(argv)
+
+    actions = build_warehouse(args.db, args.data_dir, args.table, args.force)
+    for table, action in actions.items():
+        print(f"  {action:6s} {table}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
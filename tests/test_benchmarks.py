@@ -0,0 +1,119 @@
+"""Tests for the benchmark runner and regression check in src.benchmarks."""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("faker")
+
+from src import benchmarks  # noqa: E402
+
+
+def _result(name, seconds, scale=1):
+    return {"name": name, "scale": scale, "seconds": seconds}
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """Benchmark work directory; run_benchmarks() redirects the cache here."""
+    monkeypatch.setenv("CARTLY_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+class TestRegressionCheck:
+    """Verify baseline selection and threshold handling."""
+
+    def test_prefers_marked_baseline(self):
+        history = {"runs": [
+            {"baseline": True, "results": [_result("load", 1.0)]},
+            {"baseline": False, "results": [_result("load", 2.0)]},
+        ]}
+
+        assert benchmarks.find_baseline(history, "load", 1)["seconds"] == 1.0
+
+    def test_falls_back_to_latest_run(self):
+        history = {"runs": [
+            {"baseline": False, "results": [_result("load", 1.0)]},
+            {"baseline": False, "results": [_result("load", 2.0)]},
+        ]}
+
+        assert benchmarks.find_baseline(history, "load", 1)["seconds"] == 2.0
+        assert benchmarks.find_baseline(history, "load", 10) is None
+
+    def test_threshold(self):
+        history = {"runs": [{"baseline": True, "results": [
+            _result("fast", 1.0), _result("slow", 1.0)
+        ]}]}
+        results = [_result("fast", 1.1), _result("slow", 1.5), _result("new", 9.0)]
+
+        comparisons = benchmarks.compare(results, history, threshold=0.25)
+
+        assert {c["name"]: c["regressed"] for c in comparisons} == {
+            "fast": False,
+            "slow": True,
+        }
+
+    def test_history_round_trip(self, tmp_path):
+        path = tmp_path / "history.json"
+        history = benchmarks.load_history(path)
+
+        benchmarks.save_history(path, history, [_result("load", 1.0)], baseline=True)
+
+        saved = json.loads(path.read_text())
+        assert saved["runs"][0]["baseline"] is True
+        assert saved["runs"][0]["results"][0]["name"] == "load"
+
+
+class TestRunner:
+    """Verify benchmarks run against generated data."""
+
+    def test_prepare_data_single_files(self, work_dir):
+        data_dir = benchmarks.prepare_data(0.05, work_dir)
+
+        assert (data_dir / "orders.csv").exists()
+        header = (data_dir / "orders.csv").read_text().splitlines()[0]
+        assert (data_dir / "orders.csv").read_text().count(header) == 1
+
+    def test_run_benchmarks(self, work_dir):
+        results = benchmarks.run_benchmarks(
+            ["load_orders_csv", "validate_frame"], [0.05], repeat=1, work_dir=work_dir
+        )
+
+        assert [r["name"] for r in results] == ["load_orders_csv", "validate_frame"]
+        for result in results:
+            assert result["seconds"] > 0
+            assert result["rows"] > 0
+            assert result["scale"] == 0.05
+
+    def test_runs_are_isolated_from_the_caller(self, work_dir, monkeypatch):
+        monkeypatch.setenv("CARTLY_CACHE_DIR", "caller-cache")
+        ballast = b"x" * (400 * 1024 * 1024)  # resident in this process
+
+        (result,) = benchmarks.run_benchmarks(
+            ["load_orders_csv"], [0.05], repeat=1, work_dir=work_dir
+        )
+
+        assert result["peak_rss_mb"] < 350
+        assert os.environ["CARTLY_CACHE_DIR"] == "caller-cache"
+        del ballast
+
+    def test_main_fails_on_regression(self, work_dir, capsys):
+        history = work_dir / "history.json"
+        history.write_text(json.dumps({"runs": [{
+            "baseline": True,
+            "results": [_result("load_orders_csv", 1e-9, scale=0.05)],
+        }]}))
+
+        code = benchmarks.main([
+            "--only", "load_orders_csv", "--scale", "0.05", "--repeat", "1",
+            "--work-dir", str(work_dir), "--history", str(history),
+        ])
+
+        assert code == 1
+        assert "REGRESSION: load_orders_csv" in capsys.readouterr().out
+        assert len(json.loads(history.read_text())["runs"]) == 2
+
+    def test_unknown_benchmark(self, work_dir):
+        with pytest.raises(KeyError, match="Unknown benchmark"):
+            benchmarks.run_benchmark("nope", work_dir)
@@ -0,0 +1,132 @@
+"""Tests for the cohort engine in src.cohorts."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import cohorts
+from src.data_loader import load_customers, load_orders
+
+
+@pytest.fixture
+def customers():
+    """Two January customers, one February customer, one invalid signup."""
+    return pd.DataFrame({
+        "customer_id": [1, 2, 3, 4],
+        "signup_date": ["2024-01-05", "2024-01-20", "2024-02-01", "invalid-date"],
+        "segment": ["VIP", "New", "VIP", "VIP"],
+    })
+
+
+@pytest.fixture
+def orders():
+    return pd.DataFrame({
+        "customer_id": [1, 1, 1, 2, 3, 3, 4, 9, 2],
+        "order_date": [
+            "2024-01-06", "2024-01-30", "2024-03-02", "2024-02-10",
+            "2024-02-02", "2024-04-15", "2024-01-10", "2024-01-10", "2023-12-31",
+        ],
+        "total": [10.0, 20.0, 30.0, 5.0, 7.0, 8.0, 99.0, 99.0, 99.0],
+        "status": ["delivered"] * 8 + ["cancelled"],
+    })
+
+
+class TestCohortMatrices:
+    """Verify the matrices on a small hand-checked example."""
+
+    def test_monthly(self, customers, orders):
+        result = cohorts.cohort_matrices(customers, orders)
+
+        assert result["size"].tolist() == [2, 1]
+        assert list(result["active"].index.strftime("%Y-%m")) == ["2024-01", "2024-02"]
+        np.testing.assert_array_equal(
+            result["active"].to_numpy(), [[1, 1, 1], [1, 0, 1]]
+        )
+        np.testing.assert_array_equal(
+            result["orders"].to_numpy(), [[2, 1, 1], [1, 0, 1]]
+        )
+        np.testing.assert_allclose(
+            result["revenue"].to_numpy(), [[30, 5, 30], [7, 0, 8]]
+        )
+        np.testing.assert_allclose(
+            result["retention"].to_numpy(), [[0.5, 0.5, 0.5], [1, 0, 1]]
+        )
+        np.testing.assert_allclose(
+            result["revenue_per_customer"].to_numpy(), [[15, 17.5, 32.5], [7, 7, 15]]
+        )
+        # Customer 1 repeats in month 0, customer 3 in month 2
+        np.testing.assert_allclose(
+            result["repeat_rate"].to_numpy(), [[0.5, 0.5, 0.5], [0, 0, 1]]
+        )
+        # Unknown customer 9, invalid signup 4, order before signup
+        assert result["ignored_orders"] == 3
+
+    def test_filters_and_statuses(self, customers, orders):
+        result = cohorts.cohort_matrices(
+            customers, orders, filters={"segment": "VIP"}, statuses=["delivered"]
+        )
+
+        assert result["size"].tolist() == [1, 1]
+        assert result["orders"].to_numpy().sum() == 5
+
+    def test_weekly_with_max_periods(self, customers, orders):
+        result = cohorts.cohort_matrices(
+            customers, orders, granularity="week", max_periods=2
+        )
+
+        # Weeks start on Monday: 2024-01-01, 2024-01-15 and 2024-01-29
+        assert list(result["size"].index.strftime("%Y-%m-%d")) == [
+            "2024-01-01", "2024-01-15", "2024-01-29"
+        ]
+        assert result["active"].shape == (3, 2)
+        assert result["orders"].iloc[0, 0] == 1
+
+    def test_unknown_granularity(self, customers, orders):
+        with pytest.raises(ValueError, match="granularity"):
+            cohorts.cohort_matrices(customers, orders, granularity="day")
+
+    def test_matches_groupby_on_repo_data(self):
+        customers = load_customers(use_cache=False)
+        orders = load_orders(use_cache=False)
+
+        result = cohorts.cohort_matrices(customers, orders)
+
+        signup = pd.to_datetime(
+            customers["signup_date"], format="%Y-%m-%d", errors="coerce"
+        )
+        merged = orders.merge(
+            customers.assign(signup=signup).dropna(subset=["signup"]),
+            on="customer_id",
+        )
+        order_month = pd.to_datetime(merged["order_date"]).dt.to_period("M")
+        signup_month = merged["signup"].dt.to_period("M")
+        merged["period"] = (order_month - signup_month).map(lambda d: d.n)
+        merged["cohort"] = signup_month.dt.start_time
+        merged = merged[merged["period"] >= 0]
+        expected = (
+            merged.groupby(["cohort", "period"])["customer_id"].nunique().unstack()
+        )
+        expected = expected.reindex_like(result["active"]).fillna(0)
+        np.testing.assert_array_equal(result["active"].to_numpy(), expected.to_numpy())
+
+
+class TestWarehouse:
+    """The warehouse path must give the same matrices as pandas inputs."""
+
+    def test_same_as_pandas(self, tmp_path, data_path):
+        pytest.importorskip("duckdb")
+        from src.warehouse import build_warehouse
+
+        db_path = tmp_path / "cartly.duckdb"
+        build_warehouse(db_path, data_path, ["customers", "orders"])
+        options = {"filters": {"segment": ["VIP", "Active"]}, "statuses": ["delivered"]}
+
+        from_db = cohorts.cohort_matrices_from_warehouse(db_path=db_path, **options)
+        from_frames = cohorts.cohort_matrices(
+            load_customers(use_cache=False), load_orders(use_cache=False), **options
+        )
+
+        for name in cohorts.MATRICES:
+            pd.testing.assert_frame_equal(
+                from_db[name], from_frames[name], check_dtype=False
+            )
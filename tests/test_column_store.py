@@ -0,0 +1,133 @@
+"""Tests for the memory-mapped column store in src.column_store."""
+
+import multiprocessing
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import column_store
+from src.data_loader import load_columns, load_orders
+
+
+@pytest.fixture
+def cache_tmp(tmp_path, monkeypatch):
+    """Point the cache (and so the column stores) at a temporary directory."""
+    monkeypatch.setenv("CARTLY_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "id": np.arange(4, dtype=np.int64),
+        "qty": pd.array([1, None, 3, 4], dtype="Int32"),
+        "price": [1.5, 2.0, np.nan, 4.25],
+        "status": pd.Categorical(["a", "b", None, "a"]),
+        "flag": [True, False, True, False],
+        "day": pd.to_datetime(["2024-01-01", "2024-01-02", None, "2024-01-04"]),
+    })
+
+
+def _is_mapped(array) -> bool:
+    """True if the array is a view of a np.memmap."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def _sum_column(directory, column):
+    """Worker: open the store in another process and sum one column."""
+    return float(column_store.open_store(directory, [column])[column].sum())
+
+
+class TestStore:
+    """Verify writing, opening and memory mapping."""
+
+    def test_round_trip(self, tmp_path, frame):
+        directory = column_store.write_store(frame, tmp_path / "store", "t")
+
+        result = column_store.open_store(directory)
+
+        assert list(result.columns) == list(frame.columns)
+        for column in frame.columns:
+            assert result[column].equals(frame[column]), column
+        assert column_store.read_manifest(directory)["rows"] == len(frame)
+
+    def test_columns_are_memory_mapped(self, tmp_path, frame):
+        directory = column_store.write_store(frame, tmp_path / "store")
+
+        result = column_store.open_store(directory, ["price", "qty"])
+
+        assert _is_mapped(result["price"].to_numpy())
+        assert _is_mapped(result["qty"].array._data)
+        assert _is_mapped(result["qty"].array._mask)
+
+    def test_assignment_does_not_change_files(self, tmp_path, frame):
+        directory = column_store.write_store(frame, tmp_path / "store")
+
+        opened = column_store.open_store(directory)
+        opened.loc[0, "price"] = 99.0
+
+        assert opened.loc[0, "price"] == 99.0
+        assert column_store.open_store(directory).loc[0, "price"] == 1.5
+
+    def test_text_columns_rejected(self, tmp_path):
+        with pytest.raises(TypeError, match="name"):
+            column_store.write_store(
+                pd.DataFrame({"name": ["a", "b"]}), tmp_path / "store"
+            )
+
+    def test_missing_column(self, tmp_path, frame):
+        directory = column_store.write_store(frame, tmp_path / "store")
+
+        with pytest.raises(KeyError, match="nope"):
+            column_store.open_store(directory, ["id", "nope"])
+
+    def test_missing_store(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            column_store.open_store(tmp_path / "absent")
+
+    def test_shared_with_worker_process(self, tmp_path, frame):
+        directory = column_store.write_store(frame, tmp_path / "store")
+
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            total = pool.apply(_sum_column, (directory, "price"))
+
+        assert total == frame["price"].sum()
+
+
+class TestLoadColumns:
+    """load_columns() must match the CSV loader and follow CSV changes."""
+
+    def test_matches_load_orders(self, cache_tmp):
+        orders = load_orders(use_cache=False)
+
+        stored = load_columns("orders")
+
+        assert list(stored.columns) == column_store.HOT_COLUMNS["orders"]
+        for column in stored.columns:
+            assert stored[column].equals(orders[column]), column
+
+    def test_reuses_and_rebuilds(self, cache_tmp, data_path, tmp_path):
+        csv_path = tmp_path / "orders.csv"
+        shutil.copy(data_path / "orders.csv", csv_path)
+        load_columns("orders", data_path=csv_path)
+        stores = list((cache_tmp / "columns").iterdir())
+
+        load_columns("orders", ["total"], data_path=csv_path)
+        assert list((cache_tmp / "columns").iterdir()) == stores
+
+        lines = csv_path.read_text().splitlines(keepends=True)
+        csv_path.write_text("".join(lines[:11]))
+        assert len(load_columns("orders", data_path=csv_path)) == 10
+        assert len(list((cache_tmp / "columns").iterdir())) == 1
+
+    def test_clear_stores(self, cache_tmp):
+        load_columns("order_items", ["quantity"])
+
+        assert column_store.clear_stores() == 1
+        assert column_store.clear_stores() == 0
@@ -0,0 +1,154 @@
+"""Tests for the materialized revenue cubes in src.cubes."""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src import cubes, warehouse  # noqa: E402
+
+TABLES = ["orders", "order_items", "products", "categories", "customers"]
+
+# A new order on an existing day, with one item, plus an extra item for
+# order 100002 (placed 2024-05-19)
+NEW_ORDER = (
+    "200001,10005,2023-11-19,09:00:00,pending,UPI,100.0,0,18.0,118.0,1,Varanasi,India\n"
+)
+NEW_ITEMS = (
+    "200001-1,200001,P4003,1,100.0,0,100.0\n"
+    "100002-2,100002,P1001,1,599.0,0,599.0\n"
+)
+
+
+@pytest.fixture
+def data_copy(tmp_path, data_path):
+    """Writable copy of the CSVs used by these tests."""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for table in TABLES:
+        name = f"{table}.csv"
+        (directory / name).write_bytes((data_path / name).read_bytes())
+    return directory
+
+
+@pytest.fixture
+def db_path(tmp_path, data_copy):
+    """Warehouse with freshly built cubes."""
+    path = tmp_path / "cartly.duckdb"
+    cubes.update_cubes(path, data_copy)
+    return path
+
+
+def _cube(db_path, name):
+    frame = warehouse.query(f"SELECT * FROM {name}", db_path=db_path)
+    return frame.sort_values(list(cubes.CUBES[name]["dimensions"]), ignore_index=True)
+
+
+class TestRollup:
+    """Roll-ups must match the same aggregates computed from raw rows."""
+
+    def test_category_revenue(self, db_path):
+        expected = warehouse.query(
+            """
+            SELECT c.name AS category, SUM(i.item_total) AS revenue,
+                   COUNT(DISTINCT i.order_id) AS category_orders
+            FROM order_items i
+            JOIN products p ON p.id = i.product_id
+            JOIN categories c ON c.id = p.category_id
+            GROUP BY 1 ORDER BY 1
+            """,
+            db_path=db_path,
+        )
+
+        result = cubes.rollup(
+            ["category"], ["revenue", "category_orders"], db_path=db_path
+        )
+
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_monthly_orders_with_filter(self, db_path):
+        expected = warehouse.query(
+            """
+            SELECT date_trunc('month', order_date)::DATE AS month,
+                   COUNT(*) AS orders, AVG(total) AS aov
+            FROM orders
+            WHERE payment_method = 'UPI' AND order_date >= DATE '2024-01-01'
+            GROUP BY 1 ORDER BY 1
+            """,
+            db_path=db_path,
+        )
+
+        result = cubes.rollup(
+            ["month"], ["orders", "aov"], {"payment_method": "UPI"},
+            start="2024-01-01", db_path=db_path,
+        )
+
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_grand_totals(self, db_path):
+        result = cubes.rollup(measures=["orders", "margin"], db_path=db_path)
+
+        assert len(result) == 1
+        assert result.loc[0, "orders"] == 7076
+        assert result.loc[0, "margin"] > 0
+
+    def test_orders_by_category_rejected(self, db_path):
+        with pytest.raises(ValueError, match="category_orders"):
+            cubes.rollup(["category"], ["aov"], db_path=db_path)
+
+    def test_period_filter(self, db_path):
+        expected = warehouse.query(
+            """
+            SELECT payment_method, COUNT(*) AS orders
+            FROM orders
+            WHERE order_date >= DATE '2024-10-01' AND order_date < DATE '2024-12-01'
+            GROUP BY 1 ORDER BY 1
+            """,
+            db_path=db_path,
+        )
+
+        result = cubes.rollup(
+            ["payment_method"], ["orders"], {"month": ["2024-10", "2024-11-15"]},
+            db_path=db_path,
+        )
+
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_unknown_dimension(self, db_path):
+        with pytest.raises(KeyError, match="Unknown dimension 'colour'"):
+            cubes.rollup(["colour"], db_path=db_path)
+        with pytest.raises(KeyError, match="Unknown dimension 'colour'"):
+            cubes.rollup(["month"], filters={"colour": "red"}, db_path=db_path)
+
+    def test_unknown_measure(self, db_path):
+        with pytest.raises(KeyError, match="Unknown measure"):
+            cubes.rollup(["category"], ["profit"], db_path=db_path)
+
+
+class TestUpdate:
+    """Incremental updates must equal a full rebuild."""
+
+    def test_refreshes_only_affected_days(self, db_path, data_copy):
+        with open(data_copy / "orders.csv", "a") as f:
+            f.write(NEW_ORDER)
+        with open(data_copy / "order_items.csv", "a") as f:
+            f.write(NEW_ITEMS)
+
+        result = cubes.update_cubes(db_path, data_copy)
+
+        assert result == {"rebuilt": False, "days": 2}
+        refreshed = {name: _cube(db_path, name) for name in cubes.CUBES}
+        conn = warehouse.connect(db_path)
+        cubes.build_cubes(conn)
+        conn.close()
+        for name, frame in refreshed.items():
+            pd.testing.assert_frame_equal(frame, _cube(db_path, name))
+
+    def test_no_new_rows(self, db_path, data_copy):
+        assert cubes.update_cubes(db_path, data_copy) == {"rebuilt": False, "days": 0}
+
+    def test_changed_categories_rebuild(self, db_path, data_copy):
+        path = data_copy / "categories.csv"
+        path.write_text(path.read_text().replace("0.25", "0.3"))
+
+        assert cubes.update_cubes(db_path, data_copy)["rebuilt"] is True
@@ -0,0 +1,201 @@
+"""Tests for src.data_loader and its columnar cache."""
+
+import pytest
+import pandas as pd
+
+from src import cache
+from src import data_loader
+from src.data_loader import load_customers, load_products
+from src.schemas import SCHEMAS, get_schema
+
+
+@pytest.fixture
+def cache_tmp(tmp_path, monkeypatch):
+    """Point the columnar cache at a temporary directory."""
+    pytest.importorskip("pyarrow")
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("CARTLY_CACHE_DIR", str(directory))
+    monkeypatch.delenv("CARTLY_DISABLE_CACHE", raising=False)
+    return directory
+
+
+@pytest.fixture
+def products_copy(tmp_path, data_path):
+    """Writable copy of products.csv so tests can modify it."""
+    path = tmp_path / "products.csv"
+    path.write_bytes((data_path / "products.csv").read_bytes())
+    return path
+
+
+class TestColumnarCache:
+    """Verify cached loads match fresh parses and invalidate correctly."""
+
+    def test_second_load_reads_cache(self, cache_tmp, data_path):
+        """A second load must return the same frame from a cache file."""
+        first = load_customers(data_path / "customers.csv")
+        assert len(list(cache_tmp.glob("customers-*.arrow"))) == 1
+
+        second = load_customers(data_path / "customers.csv")
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_cache_matches_uncached_parse(self, cache_tmp, data_path):
+        """Cached dtypes and values must match a direct parse."""
+        load_customers(data_path / "customers.csv")
+        cached = load_customers(data_path / "customers.csv")
+        fresh = load_customers(data_path / "customers.csv", use_cache=False)
+        pd.testing.assert_frame_equal(cached, fresh)
+
+    def test_opt_out_writes_nothing(self, cache_tmp, data_path):
+        """use_cache=False must not touch the cache directory."""
+        load_products(data_path / "products.csv", use_cache=False)
+        assert not cache_tmp.exists() or not list(cache_tmp.iterdir())
+
+    def test_env_var_disables_cache(self, cache_tmp, data_path, monkeypatch):
+        """CARTLY_DISABLE_CACHE=1 must bypass the cache."""
+        monkeypatch.setenv("CARTLY_DISABLE_CACHE", "1")
+        load_products(data_path / "products.csv")
+        assert not cache_tmp.exists()
+
+    def test_modified_csv_is_reparsed(self, cache_tmp, products_copy):
+        """Changing the CSV must invalidate the stale entry."""
+        before = load_products(products_copy)
+
+        with products_copy.open("a") as f:
+            f.write("P9999,Test Product,CAT01,100,50\n")
+        after = load_products(products_copy)
+
+        assert len(after) == len(before) + 1
+        assert len(list(cache_tmp.glob("products-*.arrow"))) == 1
+
+    def test_clear_cache(self, cache_tmp, data_path, products_copy):
+        """clear_cache() must remove entries for one file or for all files."""
+        load_products(products_copy)
+        load_customers(data_path / "customers.csv")
+
+        assert cache.clear_cache(products_copy) == 1
+        assert list(cache_tmp.glob("products-*.arrow")) == []
+        assert cache.clear_cache() == 1
+
+
+class TestSchemas:
+    """Verify loaders apply the declared compact dtypes."""
+
+    @pytest.mark.parametrize("table", sorted(SCHEMAS))
+    def test_loader_applies_schema(self, table):
+        """Every registered table must load with its declared dtypes."""
+        loader = getattr(data_loader, f"load_{table}")
+        df = loader(use_cache=False)
+        schema = get_schema(table)
+
+        for column, dtype in schema["dtype"].items():
+            expected = pd.api.types.pandas_dtype(dtype)
+            assert df[column].dtype.name == expected.name, (
+                f"{table}.{column} loaded as {df[column].dtype}, expected {dtype}"
+            )
+        for column in schema["dates"]:
+            assert pd.api.types.is_datetime64_any_dtype(df[column])
+
+    def test_out_of_range_integers_stay_wide(self, tmp_path):
+        """Dirty values must not wrap around into plausible numbers."""
+        path = tmp_path / "order_items.csv"
+        path.write_text(
+            "order_item_id,order_id,product_id,quantity,unit_price,"
+            "discount_percent,item_total\n"
+            "1-1,1,P1,-1,9.5,0,9.5\n"
+            "1-2,1,P1,40000,9.5,0,9.5\n"
+        )
+
+        items = data_loader.load_order_items(path, use_cache=False)
+
+        assert items["quantity"].dtype == "int64"
+        assert items["quantity"].tolist() == [-1, 40000]
+        chunk = next(data_loader.iter_order_items(path))
+        assert chunk["quantity"].tolist() == [-1, 40000]
+
+    def test_flags_are_bool(self):
+        """Session flags must be real booleans, not strings."""
+        sessions = data_loader.load_website_sessions(use_cache=False)
+        assert sessions["bounced"].dtype == bool
+        assert sessions["converted"].dtype == bool
+
+    def test_schema_reduces_memory(self, data_path):
+        """Typed sessions must use far less memory than inferred dtypes."""
+        typed = data_loader.load_website_sessions(use_cache=False)
+        inferred = pd.read_csv(data_path / "website_sessions.csv")
+
+        typed_bytes = typed.memory_usage(deep=True).sum()
+        inferred_bytes = inferred.memory_usage(deep=True).sum()
+        assert typed_bytes < inferred_bytes / 2
+
+    def test_unknown_table(self):
+        """Unknown tables must raise a KeyError naming the known tables."""
+        with pytest.raises(KeyError, match="Known tables"):
+            get_schema("invoices")
+
+
+class TestChunkedLoaders:
+    """Verify chunked loaders match the eager loaders."""
+
+    def test_chunks_reassemble_to_eager_frame(self):
+        """Concatenated chunks must equal the eager load row for row."""
+        eager = data_loader.load_order_items(use_cache=False)
+        chunks = list(data_loader.iter_order_items(chunksize=5000))
+
+        assert [len(c) for c in chunks] == [5000, 5000, len(eager) - 10000]
+        combined = pd.concat(chunks, ignore_index=True)
+        combined["product_id"] = combined["product_id"].astype("category")
+        pd.testing.assert_frame_equal(combined, eager, check_categorical=False)
+
+    def test_chunks_use_schema_dtypes(self):
+        """Each chunk must carry the schema dtypes and parsed dates."""
+        chunk = next(data_loader.iter_website_sessions(chunksize=1000))
+        assert chunk["device"].dtype.name == "category"
+        assert chunk["customer_id"].dtype.name == "Int32"
+        assert pd.api.types.is_datetime64_any_dtype(chunk["session_date"])
+
+    def test_invalid_arguments_fail_eagerly(self, tmp_path):
+        """Bad paths and chunk sizes must raise before iteration starts."""
+        with pytest.raises(FileNotFoundError):
+            data_loader.iter_orders(tmp_path / "missing.csv")
+        with pytest.raises(ValueError):
+            data_loader.iter_orders(chunksize=0)
+
+
+class TestLoadAll:
+    """Verify the concurrent multi-table loader."""
+
+    def test_matches_individual_loaders(self):
+        """Every table must equal what its own loader returns."""
+        data = data_loader.load_all(use_cache=False)
+
+        assert set(data) == set(SCHEMAS)
+        for table in SCHEMAS:
+            expected = getattr(data_loader, f"load_{table}")(use_cache=False)
+            pd.testing.assert_frame_equal(data[table], expected)
+        assert set(data.timings) == set(SCHEMAS)
+
+    def test_subset_and_attribute_access(self):
+        data = data_loader.load_all(["orders", "products"], workers=2)
+        assert len(data) == 2
+        assert data.orders is data["orders"]
+        with pytest.raises(AttributeError):
+            data.customers
+
+    def test_process_executor(self):
+        data = data_loader.load_all(["categories"], executor="process")
+        assert len(data.categories) == 8
+
+    def test_custom_data_dir(self, tmp_path, data_path):
+        """Tables must be read from data_dir when given."""
+        (tmp_path / "categories.csv").write_bytes(
+            (data_path / "categories.csv").read_bytes()
+        )
+        data = data_loader.load_all(["categories"], data_dir=tmp_path)
+        assert len(data.categories) == 8
+
+        with pytest.raises(FileNotFoundError):
+            data_loader.load_all(["products"], data_dir=tmp_path)
+
+    def test_unknown_table(self):
+        with pytest.raises(KeyError):
+            data_loader.load_all(["orders", "invoices"])
@@ -0,0 +1,120 @@
+"""Tests for the fixed-layout date parser in src.date_parsing."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import date_parsing
+from src.data_loader import load_orders, load_website_sessions
+from src.schemas import integer_columns, narrow_integers, read_options
+
+VALUES = [
+    "2024-02-29",  # leap day
+    "2023-02-29",  # not a leap year
+    "2024-13-01",  # month out of range
+    "2024-1-01",  # wrong width
+    "2024-12-31 ",  # trailing space
+    "not a date",
+    None,
+    "2024-12-31",
+]
+
+
+class TestParseColumn:
+    """Verify strict parsing, NaT coercion and malformed counts."""
+
+    @pytest.mark.parametrize("dtype", ["str", "object", "category"])
+    def test_malformed_become_nat(self, dtype):
+        parsed, malformed = date_parsing.parse_column(
+            pd.Series(VALUES, dtype=dtype), "%Y-%m-%d"
+        )
+
+        expected = pd.to_datetime(
+            ["2024-02-29", None, None, None, None, None, None, "2024-12-31"]
+        ).as_unit("us")
+        np.testing.assert_array_equal(parsed.to_numpy(), expected.to_numpy())
+        assert malformed == 5
+
+    def test_matches_pandas_on_large_columns(self):
+        days = pd.date_range("2020-01-01", periods=50_000, freq="37min")
+        text = pd.Series(days.strftime("%Y-%m-%d %H:%M:%S"))
+
+        parsed, malformed = date_parsing.parse_column(text, "%Y-%m-%d %H:%M:%S")
+
+        expected = pd.to_datetime(text, format="%Y-%m-%d %H:%M:%S")
+        np.testing.assert_array_equal(parsed.to_numpy(), expected.to_numpy())
+        assert malformed == 0
+
+    def test_time_of_day(self):
+        parsed, malformed = date_parsing.parse_column(
+            pd.Series(["14:32:00", "24:00:00", "00:00:01"]), "%H:%M:%S"
+        )
+
+        assert parsed.iloc[0] == pd.Timedelta(hours=14, minutes=32)
+        assert pd.isna(parsed.iloc[1])
+        assert parsed.iloc[2] == pd.Timedelta(seconds=1)
+        assert malformed == 1
+
+    def test_unit(self):
+        parsed, _ = date_parsing.parse_column(
+            pd.Series(["2024-01-01"]), "%Y-%m-%d", unit="s"
+        )
+
+        assert parsed.dtype == "datetime64[s]"
+
+    def test_unsupported_directive(self):
+        with pytest.raises(ValueError, match="Unsupported directive"):
+            date_parsing.parse_column(pd.Series(["Jan"]), "%b")
+
+
+class TestParseTable:
+    """Verify table-level parsing and combined timestamp columns."""
+
+    def test_orders_datetime(self):
+        orders = load_orders(use_cache=False)
+
+        report = date_parsing.parse_table(orders, "orders")
+
+        assert report == {"order_date": 0, "order_time": 0}
+        first = orders.iloc[0]
+        assert first["order_datetime"] == pd.Timestamp("2023-11-19 14:32:00")
+        assert orders["order_datetime"].notna().all()
+
+    def test_session_start(self):
+        sessions = load_website_sessions(use_cache=False)
+
+        date_parsing.parse_table(sessions, "website_sessions")
+
+        offset = sessions["session_start"] - sessions["session_date"]
+        hours = offset.dt.seconds // 3600
+        assert (hours == sessions["session_hour"]).all()
+
+    def test_signup_date_report(self, data_path):
+        customers = pd.read_csv(data_path / "customers.csv")
+
+        report = date_parsing.parse_table(customers, "customers")
+
+        raw = pd.read_csv(data_path / "customers.csv")["signup_date"]
+        expected = pd.to_datetime(raw, format="%Y-%m-%d", errors="coerce")
+        assert report["signup_date"] == int((expected.isna() & raw.notna()).sum())
+        assert report["signup_date"] > 0
+
+    def test_unknown_table(self):
+        with pytest.raises(KeyError, match="No date columns"):
+            date_parsing.parse_table(pd.DataFrame(), "products")
+
+
+class TestLoaderIntegration:
+    """Loaders must give the same frames as read_csv with parse_dates."""
+
+    @pytest.mark.parametrize(
+        "table", ["website_sessions", "customer_support", "marketing_campaigns"]
+    )
+    def test_same_as_read_csv(self, data_path, table):
+        from src.data_loader import _load_table
+
+        loaded = _load_table(table, use_cache=False)
+
+        expected = pd.read_csv(data_path / f"{table}.csv", **read_options(table))
+        narrow_integers(expected, integer_columns(table))
+        pd.testing.assert_frame_equal(loaded, expected)
@@ -0,0 +1,143 @@
+"""Tests for fuzzy customer deduplication in src.dedup."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import dedup
+
+
+@pytest.fixture
+def customers():
+    """Customers with case, spacing, phone-format and accent variations."""
+    return pd.DataFrame({
+        "customer_id": [1, 2, 3, 4, 5, 6],
+        "name": [
+            "José García", "  garcia jose ", "Priya Sharma",
+            "PRIYA SHARMA", "Amit Singh", "Amit Singh",
+        ],
+        "email": [
+            "jose@example.com", "JOSE@example.com ", "priya@work.com",
+            "priya.sharma@home.com", "amit1@example.com", "amit2@example.com",
+        ],
+        "phone": [
+            None, "555-010-2000", "+91 80101 24571",
+            "080101-24571 x12", "1111111111", "2222222222",
+        ],
+        "city": ["Pune", "Pune", "Delhi", " delhi ", "Agra", "Agra"],
+        "total_orders": [1, 4, 2, 9, 3, 5],
+    })
+
+
+class TestNormalizers:
+    """Verify canonical forms of the comparison keys."""
+
+    def test_email(self):
+        emails = pd.Series([" J.Doe+news@GMAIL.com", "j.doe@example.com", "nope", None])
+
+        normalized = dedup.normalize_email(emails)
+
+        assert normalized.iloc[0] == "jdoe@gmail.com"
+        assert normalized.iloc[1] == "j.doe@example.com"
+        assert normalized.iloc[2:].isna().all()
+
+    def test_phone(self):
+        phones = pd.Series(["+91 80101 24571", "(080) 101-24571 ext. 9", "123", None])
+
+        normalized = dedup.normalize_phone(phones)
+
+        assert normalized.tolist()[:2] == ["8010124571", "8010124571"]
+        assert normalized.iloc[2:].isna().all()
+
+    def test_name(self):
+        names = pd.Series(["  José  García ", "garcia jose", "GARCÍA, José", ""])
+
+        normalized = dedup.normalize_name(names)
+
+        assert normalized.tolist()[:3] == ["garcia jose"] * 3
+        assert pd.isna(normalized.iloc[3])
+
+
+class TestFindDuplicates:
+    """Verify blocking, scoring and clustering."""
+
+    def test_fuzzy_matches(self, customers):
+        clusters = dedup.find_duplicates(customers)
+
+        assert clusters.tolist() == [0, 0, 2, 2, 4, 5]
+
+    def test_threshold(self, customers):
+        clusters = dedup.find_duplicates(customers, threshold=0.75)
+
+        # Only the exact email match scores above 0.75
+        assert clusters.tolist() == [0, 0, 2, 3, 4, 5]
+
+    def test_window_validation(self, customers):
+        with pytest.raises(ValueError, match="window"):
+            dedup.find_duplicates(customers, window=1)
+
+    def test_candidate_pairs_unique(self, customers):
+        keys = dedup.prepare_keys(customers)
+
+        left, right = dedup.candidate_pairs(keys, window=6)
+
+        pairs = list(zip(left.tolist(), right.tolist()))
+        assert len(pairs) == len(set(pairs))
+        assert (left < right).all()
+
+    def test_connected_components(self):
+        left = np.array([5, 1, 3])
+        right = np.array([6, 3, 5])
+
+        labels = dedup.connected_components(8, left, right)
+
+        assert labels.tolist() == [0, 1, 2, 1, 4, 1, 1, 7]
+
+    def test_marketing_raw(self, data_path):
+        raw = pd.read_csv(data_path / "marketing_customers_raw.csv")
+        columns = dedup.PRESETS["marketing_customers_raw"]["columns"]
+
+        clusters = dedup.find_duplicates(raw, columns)
+
+        emails = dedup.normalize_email(raw["email_address"]).dropna()
+        exact = emails.duplicated().sum()
+        assert dedup.duplicate_report(clusters)["duplicate_rows"] > exact
+
+
+class TestResolveClusters:
+    """Verify survivorship rules and coalescing."""
+
+    def test_task_1_2_sample(self):
+        df = pd.DataFrame({
+            "customer_id": [1001, 1002, 1003, 1004, 1005],
+            "name": ["Rahul Kumar", "Priya Sharma", "RAHUL KUMAR", "Priya Sharma",
+                     "Amit Singh"],
+            "email": ["rahul.kumar@email.com", "priya.sharma@email.com",
+                      "RAHUL.KUMAR@EMAIL.COM", "Priya.Sharma@Email.Com",
+                      "amit.singh@email.com"],
+            "total_orders": [5, 3, 6, 7, 2],
+        })
+
+        result = dedup.deduplicate(df, keep=[("total_orders", False)])
+
+        assert sorted(result["customer_id"]) == [1003, 1004, 1005]
+        assert result.dtypes.equals(df.dtypes)
+
+    def test_default_keeps_first(self, customers):
+        result = dedup.deduplicate(customers)
+
+        assert result["customer_id"].tolist() == [1, 3, 5, 6]
+
+    def test_coalesce(self, customers):
+        result = dedup.deduplicate(
+            customers, keep=[("customer_id", True)], coalesce=True
+        )
+
+        assert result.loc[0, "phone"] == "555-010-2000"
+        assert result.loc[0, "email"] == "jose@example.com"
+
+    def test_unknown_keep_column(self, customers):
+        clusters = dedup.find_duplicates(customers)
+
+        with pytest.raises(KeyError, match="Survivorship column"):
+            dedup.resolve_clusters(customers, clusters, keep=[("missing", False)])
@@ -0,0 +1,227 @@
+"""Tests for the customer feature store in src.feature_store."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_all
+from src.feature_store import FeatureStore, build_feature_store, main
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return load_all(["customers", "orders", "website_sessions", "customer_support"])
+
+
+@pytest.fixture(scope="module")
+def store(tables):
+    return FeatureStore.build(
+        tables["customers"],
+        tables["orders"],
+        tables["website_sessions"],
+        tables["customer_support"],
+    )
+
+
+def _order_times(orders):
+    clock = pd.to_timedelta(orders["order_time"].astype("str"))
+    return pd.to_datetime(orders["order_date"]) + clock
+
+
+class TestBuild:
+    """Built features equal pandas groupby results."""
+
+    def test_matches_groupby(self, store, tables):
+        orders = tables["orders"].dropna(subset=["customer_id"])
+        expected = orders.groupby("customer_id")["total"].agg(["count", "sum"])
+        features = store.lookup(expected.index)
+
+        assert len(store) == 10_000
+        np.testing.assert_array_equal(features["total_orders"], expected["count"])
+        np.testing.assert_allclose(features["total_spent"], expected["sum"])
+        np.testing.assert_allclose(
+            features["avg_order_value"], expected["sum"] / expected["count"]
+        )
+        last = _order_times(orders).groupby(orders["customer_id"]).max()
+        np.testing.assert_array_equal(
+            features["last_order_date"].to_numpy(), last.to_numpy()
+        )
+
+        sessions = tables["website_sessions"]
+        pages = sessions.groupby("customer_id")["pages_viewed"].sum()
+        np.testing.assert_allclose(
+            store.lookup(pages.index)["pages_viewed"], pages.to_numpy()
+        )
+
+    def test_customers_without_events(self, store, tables):
+        ordered = set(tables["orders"]["customer_id"].dropna())
+        quiet = next(c for c in tables["customers"]["customer_id"] if c not in ordered)
+
+        features = store.get(quiet)
+
+        assert features["total_orders"] == 0
+        assert features["avg_order_value"] == 0.0
+        assert pd.isna(features["first_order_date"])
+
+    def test_unknown_customer(self, store):
+        with pytest.raises(KeyError, match="Unknown customer_id"):
+            store.get(1)
+        with pytest.raises(KeyError, match="Unknown customer_ids"):
+            store.lookup([10001, 1])
+
+
+class TestAsOf:
+    """Point-in-time features only use events known at that moment."""
+
+    def test_frame_excludes_later_events(self, store, tables):
+        as_of = pd.Timestamp("2024-06-01")
+        orders = tables["orders"].dropna(subset=["customer_id"])
+        known = orders[_order_times(orders) <= as_of]
+        expected = known.groupby("customer_id")["total"].sum()
+
+        frame = store.to_frame(as_of=as_of)
+
+        np.testing.assert_allclose(
+            frame.loc[expected.index, "total_spent"], expected.to_numpy()
+        )
+        assert frame["last_order_date"].max() <= as_of
+        assert frame["last_session_date"].max() <= as_of
+
+    def test_sessions_use_their_hour(self, store, tables):
+        as_of = pd.Timestamp("2024-05-08 12:00")
+        sessions = tables["website_sessions"].dropna(subset=["customer_id"])
+        starts = sessions["session_date"] + pd.to_timedelta(
+            sessions["session_hour"].astype("float64"), unit="h"
+        )
+        expected = sessions[starts <= as_of].groupby("customer_id").size()
+
+        frame = store.to_frame(as_of=as_of)
+
+        np.testing.assert_array_equal(
+            frame.loc[expected.index, "sessions"], expected.to_numpy()
+        )
+        assert store.get(17288, as_of="2024-05-08 01:00")["sessions"] == 1
+        assert store.get(17288, as_of="2024-05-09")["sessions"] == 2
+
+    def test_ratings_wait_for_resolution(self, store, tables):
+        support = tables["customer_support"]
+        rated = support.dropna(subset=["satisfaction_score"])
+        ticket = rated.iloc[0]
+        created = ticket["created_date"]
+
+        # Known as a ticket when created, its score only once resolved
+        before = store.get(ticket["customer_id"], as_of=created)
+        after = store.get(ticket["customer_id"], as_of=ticket["resolved_date"])
+
+        assert after["rated_tickets"] - before["rated_tickets"] >= 1
+        assert before["last_ticket_date"] == created
+
+    def test_get_matches_frame(self, store):
+        frame = store.to_frame(as_of="2024-03-15")
+
+        for customer_id in (10005, 12345, 19999):
+            features = store.get(customer_id, as_of="2024-03-15")
+            expected = frame.loc[customer_id].to_dict()
+            assert features.keys() == expected.keys()
+            for name, value in features.items():
+                assert value == expected[name] or (
+                    pd.isna(value) and pd.isna(expected[name])
+                )
+
+
+class TestUpdate:
+    """Incremental updates end where a full rebuild would."""
+
+    def test_batches_equal_full_build(self, store, tables):
+        orders = tables["orders"]
+        support = tables["customer_support"]
+        half = len(orders) // 2
+        unresolved = support.assign(resolved_date=pd.NaT, satisfaction_score=np.nan)
+
+        partial = FeatureStore.build(
+            tables["customers"].iloc[:5000],
+            orders.iloc[:half],
+            tables["website_sessions"],
+            unresolved,
+        )
+        counts = partial.update(orders=orders.iloc[half:], customer_support=support)
+
+        assert counts["orders"]["replaced"] == 0
+        assert counts["tickets"]["replaced"] == len(support)
+        # Customers without any events stay out until they are passed in
+        assert len(partial) < len(store)
+        pd.testing.assert_frame_equal(
+            partial.to_frame(), store.lookup(partial.customer_ids)
+        )
+
+    def test_replaced_order(self, tables):
+        orders = tables["orders"].dropna(subset=["customer_id"])
+        customer_id = orders["customer_id"].value_counts().index[0]
+        mine = orders[orders["customer_id"] == customer_id]
+        store = FeatureStore.build(orders=orders)
+        before = store.get(customer_id)
+
+        # Correct the latest order's total and move it back a year
+        latest = mine.loc[[_order_times(mine).idxmax()]]
+        corrected = latest.assign(total=1.0, order_date="2020-01-01")
+        counts = store.update(orders=corrected)
+        after = store.get(customer_id)
+
+        assert counts["orders"] == {"inserted": 0, "replaced": 1}
+        assert after["total_orders"] == before["total_orders"]
+        assert after["total_spent"] == pytest.approx(
+            before["total_spent"] - latest["total"].iloc[0] + 1.0
+        )
+        assert after["first_order_date"].year == 2020
+        assert after["last_order_date"] < before["last_order_date"]
+
+    def test_new_customer(self, store):
+        store = FeatureStore(store.customer_ids[:10])
+        order = pd.DataFrame(
+            {
+                "order_id": [1],
+                "customer_id": [99999],
+                "order_date": ["2024-12-01"],
+                "order_time": ["10:00:00"],
+                "total": [50.0],
+            }
+        )
+
+        store.update(orders=order)
+
+        assert 99999 in store and len(store) == 11
+        assert store.get(99999)["last_order_date"] == pd.Timestamp("2024-12-01 10:00")
+
+
+class TestPersistence:
+    """Saved stores load back with the same features and events."""
+
+    def test_save_load(self, store, tmp_path):
+        path = store.save(tmp_path / "features.npz")
+        loaded = FeatureStore.load(path)
+
+        pd.testing.assert_frame_equal(loaded.to_frame(), store.to_frame())
+        pd.testing.assert_frame_equal(
+            loaded.to_frame(as_of="2024-06-01"), store.to_frame(as_of="2024-06-01")
+        )
+        with pytest.raises(FileNotFoundError, match="Feature store"):
+            FeatureStore.load(tmp_path / "missing.npz")
+
+    def test_update_after_load_replaces(self, store, tables, tmp_path):
+        loaded = FeatureStore.load(store.save(tmp_path / "features.npz"))
+        order = tables["orders"].dropna(subset=["customer_id"]).iloc[[0]]
+        ticket = tables["customer_support"].dropna(subset=["customer_id"]).iloc[[0]]
+        before = loaded.get(order["customer_id"].iloc[0])
+
+        counts = loaded.update(orders=order, customer_support=ticket)
+
+        assert counts["orders"] == {"inserted": 0, "replaced": 1}
+        assert counts["tickets"] == {"inserted": 0, "replaced": 1}
+        after = loaded.get(order["customer_id"].iloc[0])
+        assert after["total_orders"] == before["total_orders"]
+
+    def test_build_and_cli(self, capsys):
+        assert len(build_feature_store()) == 10_000
+
+        assert main(["10005", "--as-of", "2024-06-01"]) == 0
+        assert "total_spent" in capsys.readouterr().out
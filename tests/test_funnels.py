@@ -0,0 +1,119 @@
+"""Tests for session funnels and attribution in src.funnels."""
+
+import pandas as pd
+import pytest
+
+from src import funnels
+from src.data_loader import iter_website_sessions, load_orders, load_website_sessions
+
+
+@pytest.fixture
+def sessions():
+    """Sessions of customers 1 and 2 plus one anonymous session."""
+    return pd.DataFrame({
+        "customer_id": pd.array([1, 1, 1, 2, None, 2], dtype="Int32"),
+        "session_date": pd.to_datetime([
+            "2024-01-01", "2024-01-05", "2024-01-09", "2024-01-01",
+            "2024-01-05", "2024-02-01",
+        ]),
+        "session_hour": [10, 10, 10, 9, 10, 9],
+        "traffic_source": ["Email", "Social", "Direct", "Email", "Direct", "Social"],
+        "device": ["Mobile"] * 3 + ["Desktop"] * 3,
+        "landing_page": ["/"] * 6,
+        "bounced": [False, True, False, False, False, True],
+        "converted": [False, False, True, False, False, False],
+    })
+
+
+@pytest.fixture
+def orders():
+    return pd.DataFrame({
+        "customer_id": pd.array([1, 2, 3], dtype="Int32"),
+        "order_date": ["2024-01-06", "2024-01-20", "2024-01-06"],
+        "order_time": ["12:00:00", "12:00:00", "12:00:00"],
+        "total": [100.0, 50.0, 10.0],
+    })
+
+
+class TestAnalyzeSessions:
+    """Verify funnel stages and touch attribution."""
+
+    @pytest.mark.parametrize("chunk_rows", [6, 2, 1])
+    def test_attribution(self, sessions, orders, chunk_rows):
+        chunks = [
+            sessions.iloc[i:i + chunk_rows] for i in range(0, len(sessions), chunk_rows)
+        ]
+
+        result = funnels.analyze_sessions(chunks, orders)
+
+        attribution = result["attribution"]
+        # Order 1: sessions on Jan 1 (Email) and Jan 5 (Social) are in window
+        assert attribution.loc["Email", "first_touch_orders"] == 1
+        assert attribution.loc["Social", "last_touch_revenue"] == 100.0
+        # Orders 2 and 3 have no session in the 7 days before them
+        assert attribution.loc[funnels.UNATTRIBUTED, "last_touch_orders"] == 2
+        assert attribution["last_touch_orders"].sum() == len(orders)
+
+    def test_funnel_stages(self, sessions, orders):
+        result = funnels.analyze_sessions([sessions], orders)
+
+        funnel = result["funnels"]["traffic_source"]
+        assert funnel.loc["Email", "sessions"] == 2
+        assert funnel.loc["Email", "ordered"] == 1
+        assert funnel.loc["Social", "ordered"] == 1
+        # The anonymous Direct session cannot be matched to an order
+        assert funnel.loc["Direct", "ordered"] == 0
+        assert funnel.loc["Direct", "converted"] == 1
+        assert funnel.loc["Social", "engaged_rate"] == 0.0
+        assert result["sessions"] == 6
+
+    def test_window(self, sessions, orders):
+        result = funnels.analyze_sessions([sessions], orders, window="2D")
+
+        attribution = result["attribution"]
+        assert attribution.loc["Social", "first_touch_orders"] == 1
+        assert "Email" not in attribution.index
+
+
+class TestRepoData:
+    """Streaming must equal one big chunk and a brute-force join."""
+
+    def test_chunking_does_not_change_results(self):
+        orders = load_orders(use_cache=False)
+
+        streamed = funnels.analyze_sessions(
+            iter_website_sessions(chunksize=7_000), orders
+        )
+        sessions = load_website_sessions(use_cache=False)
+        whole = funnels.analyze_sessions([sessions], orders)
+
+        pd.testing.assert_frame_equal(streamed["attribution"], whole["attribution"])
+        for dimension, funnel in whole["funnels"].items():
+            pd.testing.assert_frame_equal(
+                streamed["funnels"][dimension].sort_index(), funnel.sort_index()
+            )
+
+    def test_last_touch_matches_brute_force(self):
+        orders = load_orders(use_cache=False)
+        sessions = load_website_sessions(use_cache=False)
+
+        result = funnels.analyze_sessions([sessions], orders)
+
+        sessions = sessions.dropna(subset=["customer_id"])
+        sessions["start"] = sessions["session_date"] + pd.to_timedelta(
+            sessions["session_hour"].astype(int), "h"
+        )
+        timestamps = orders["order_date"] + " " + orders["order_time"].astype(str)
+        orders = orders.assign(ts=pd.to_datetime(timestamps))
+        pairs = orders.merge(sessions, on="customer_id")
+        pairs = pairs[
+            (pairs["start"] <= pairs["ts"])
+            & (pairs["start"] >= pairs["ts"] - funnels.DEFAULT_WINDOW)
+        ]
+        last = pairs.sort_values("start").groupby("order_id").tail(1)
+        expected = last.groupby(last["traffic_source"].astype(str))["total"].sum()
+
+        actual = result["attribution"]["last_touch_revenue"].drop(funnels.UNATTRIBUTED)
+        pd.testing.assert_series_equal(
+            actual.sort_index(), expected.sort_index(), check_names=False
+        )
@@ -0,0 +1,141 @@
+"""Tests for append-only ingestion in src.incremental."""
+
+import datetime
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src import incremental, warehouse  # noqa: E402
+
+TABLES = ["customers", "orders", "order_items"]
+
+# order 100001 belongs to customer 10005; 10005 has three orders
+NEW_ORDERS = (
+    "200001,10005,2025-01-02,09:00:00,pending,UPI,100.0,0,18.0,118.0,1,Varanasi,India\n"
+    "100001,10005,2023-11-19,14:32:00,returned,Credit Card,0,0,0,0.0,1,Varanasi,India\n"
+)
+
+
+@pytest.fixture
+def data_copy(tmp_path, data_path):
+    """Writable copy of the CSVs used by these tests."""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for table in TABLES:
+        name = f"{table}.csv"
+        (directory / name).write_bytes((data_path / name).read_bytes())
+    return directory
+
+
+@pytest.fixture
+def db_path(tmp_path, data_copy):
+    """Warehouse built from the copied CSVs."""
+    path = tmp_path / "cartly.duckdb"
+    warehouse.build_warehouse(path, data_copy, TABLES)
+    return path
+
+
+def _customer(db_path, customer_id):
+    conn = warehouse.connect(db_path, read_only=True)
+    row = conn.execute(
+        "SELECT total_orders, total_spent, avg_order_value, last_order_date "
+        "FROM customers WHERE customer_id = ?",
+        [customer_id],
+    ).fetchone()
+    conn.close()
+    return row
+
+
+class TestRefresh:
+    """Verify offsets, upserts and aggregate maintenance."""
+
+    def test_fresh_warehouse_reads_nothing(self, db_path, data_copy):
+        results = incremental.refresh(db_path, data_copy)
+
+        assert results["orders"]["rows"] == 0
+        assert results["order_items"]["rows"] == 0
+        assert results["orders"]["high_water_id"] is None
+
+    def test_appended_rows_are_upserted(self, db_path, data_copy):
+        incremental.refresh(db_path, data_copy)
+        before = _customer(db_path, 10005)
+        with open(data_copy / "orders.csv", "a") as f:
+            f.write(NEW_ORDERS)
+
+        stats = incremental.refresh(db_path, data_copy, ["orders"])["orders"]
+
+        assert (stats["rows"], stats["inserted"], stats["replaced"]) == (2, 1, 1)
+        assert stats["high_water_id"] == 200001
+        assert stats["high_water_date"] == datetime.date(2025, 1, 2)
+        orders, spent, average, last = _customer(db_path, 10005)
+        assert orders == before[0] + 1
+        assert spent == pytest.approx(before[1] + 118.0 - 4368.17)
+        assert average == pytest.approx(round(spent / orders, 2))
+        assert last == datetime.date(2025, 1, 2)
+
+    def test_second_refresh_is_a_no_op(self, db_path, data_copy):
+        with open(data_copy / "orders.csv", "a") as f:
+            f.write(NEW_ORDERS)
+        incremental.refresh(db_path, data_copy, ["orders"])
+        after_first = _customer(db_path, 10005)
+
+        stats = incremental.refresh(db_path, data_copy, ["orders"])["orders"]
+
+        assert stats["rows"] == 0
+        assert _customer(db_path, 10005) == after_first
+        assert warehouse.build_warehouse(db_path, data_copy, ["orders"]) == {
+            "orders": "fresh"
+        }
+
+    def test_partial_line_waits(self, db_path, data_copy):
+        incremental.refresh(db_path, data_copy, ["orders"])
+        first, second = NEW_ORDERS.splitlines(keepends=True)
+        with open(data_copy / "orders.csv", "a") as f:
+            f.write(first + second[:20])
+
+        stats = incremental.refresh(db_path, data_copy, ["orders"])["orders"]
+        assert stats["rows"] == 1
+
+        with open(data_copy / "orders.csv", "a") as f:
+            f.write(second[20:])
+        stats = incremental.refresh(db_path, data_copy, ["orders"])["orders"]
+        assert stats["rows"] == 1
+
+    def test_incoming_files(self, db_path, data_copy):
+        incoming = data_copy / "incoming" / "order_items"
+        incoming.mkdir(parents=True)
+        header = (data_copy / "order_items.csv").read_text().splitlines()[0]
+        (incoming / "2025-01-02.csv").write_text(
+            header + "\n200001-1,200001,P4003,1,100.0,0,100.0\n"
+        )
+
+        stats = incremental.refresh(db_path, data_copy, ["order_items"])["order_items"]
+
+        assert (stats["files"], stats["inserted"]) == (1, 1)
+        assert stats["high_water_id"] == 200001
+
+    def test_rewritten_file_is_reread(self, db_path, data_copy):
+        incremental.refresh(db_path, data_copy, ["orders"])
+        before = _customer(db_path, 10005)
+        lines = (data_copy / "orders.csv").read_text().splitlines(keepends=True)
+        (data_copy / "orders.csv").write_text("".join(lines[:-10]))
+
+        stats = incremental.refresh(db_path, data_copy, ["orders"])["orders"]
+
+        assert stats["replaced"] == len(lines) - 11
+        assert stats["inserted"] == 0
+        # Counts and totals are unchanged; the CSV's last_order_date is stale
+        assert _customer(db_path, 10005)[:3] == before[:3]
+
+    def test_builds_missing_tables(self, tmp_path, data_copy):
+        db_path = tmp_path / "new.duckdb"
+
+        results = incremental.refresh(db_path, data_copy)
+
+        assert results["orders"]["inserted"] == 7076
+        assert results["order_items"]["inserted"] == 13586
+
+    def test_unknown_table(self, db_path, data_copy):
+        with pytest.raises(KeyError, match="No incremental ingestion"):
+            incremental.refresh(db_path, data_copy, ["customers"])
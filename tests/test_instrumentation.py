@@ -0,0 +1,208 @@
+"""Tests for the opt-in instrumentation layer in src.instrumentation."""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src import instrumentation
+from src.data_loader import iter_orders, load_all, load_orders
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """Record in memory with an empty cache; always disable afterwards."""
+    monkeypatch.setenv("CARTLY_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("CARTLY_DISABLE_CACHE", raising=False)
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+
+
+@instrumentation.traced("stage")
+def _drop_half(df):
+    return df.iloc[: len(df) // 2]
+
+
+@instrumentation.traced("stage")
+def _fail():
+    raise ValueError("boom")
+
+
+@instrumentation.traced("stage")
+def _wait(event):
+    event.wait()
+
+
+def _by_name(records):
+    return {record["name"]: record for record in records}
+
+
+class TestDisabled:
+    """Nothing is recorded or written unless enabled."""
+
+    def test_calls_pass_through(self):
+        assert not instrumentation.enabled()
+        df = pd.DataFrame({"a": range(4)})
+
+        assert len(_drop_half(df)) == 2
+        with instrumentation.span("ignored") as record:
+            record["rows_out"] = 5
+        instrumentation.add("bytes_read", 10)
+
+        assert instrumentation.records() == []
+        assert instrumentation.disable() == []
+
+
+class TestRecording:
+    """Verify the fields recorded for loaders and stages."""
+
+    def test_loader_records(self, recording, data_path):
+        load_orders()
+        load_orders()
+
+        loads = [
+            r
+            for r in instrumentation.records()
+            if r["name"] == "data_loader.load_orders"
+        ]
+        assert [r.get("cache_misses", 0) for r in loads] == [1, 0]
+        assert [r.get("cache_hits", 0) for r in loads] == [0, 1]
+        assert loads[0]["bytes_read"] == (data_path / "orders.csv").stat().st_size
+        assert loads[1]["rows_out"] == 7076
+        assert loads[0]["wall_s"] >= loads[0]["self_s"] >= 0
+        assert "cpu_s" in loads[0] and "peak_rss_delta_mb" in loads[0]
+
+    def test_nested_stage(self, recording):
+        with instrumentation.span("report") as record:
+            half = _drop_half(load_orders(use_cache=False))
+            record["rows_out"] = len(half)
+
+        records = _by_name(instrumentation.records())
+        stage = records["test_instrumentation._drop_half"]
+        assert (stage["rows_in"], stage["rows_out"]) == (7076, 3538)
+        assert stage["parent"] == "report"
+        assert stage["depth"] == 1
+        report = records["report"]
+        assert report["self_s"] < report["wall_s"]
+
+    def test_iterator_rows(self, recording):
+        chunks = sum(1 for _ in iter_orders(chunksize=1000))
+
+        record = _by_name(instrumentation.records())["data_loader.iter_table"]
+        assert chunks == 8
+        assert record["rows_out"] == 7076
+        assert record["bytes_read"] > 0
+
+    def test_iterator_excludes_consumer_work(self, recording):
+        for _ in iter_orders(chunksize=1000):
+            load_orders()
+            break
+
+        records = _by_name(instrumentation.records())
+        table = records["data_loader.iter_table"]
+        load = records["data_loader.load_orders"]
+        assert "error" not in table
+        assert (load["depth"], load.get("parent")) == (0, None)
+        assert table["wall_s"] < load["wall_s"]
+        assert instrumentation.summary().loc["data_loader.iter_table", "errors"] == 0
+
+    def test_worker_threads_nest_under_load_all(self, recording):
+        load_all(["orders", "customers", "products"], use_cache=False)
+
+        records = _by_name(instrumentation.records())
+        outer = records["data_loader.load_all"]
+        loads = [records[f"data_loader.load_{t}"] for t in ("orders", "customers")]
+        assert all(r["parent"] == "data_loader.load_all" for r in loads)
+        assert all(r["depth"] == 1 for r in loads)
+        longest = max(r["wall_s"] for r in loads)
+        assert 0 <= outer["self_s"] <= outer["wall_s"] - longest + 1e-6
+
+    def test_cpu_is_per_thread(self, recording):
+        done = threading.Event()
+
+        def spin():
+            stop = time.perf_counter() + 0.2
+            while time.perf_counter() < stop:
+                pass
+            done.set()
+
+        worker = threading.Thread(target=spin)
+        worker.start()
+        _wait(done)
+        worker.join()
+
+        record = _by_name(instrumentation.records())["test_instrumentation._wait"]
+        assert record["wall_s"] >= 0.15
+        assert record["cpu_s"] < 0.05
+
+    def test_errors_are_recorded(self, recording):
+        with pytest.raises(ValueError):
+            _fail()
+
+        table = instrumentation.summary()
+        assert table.loc["test_instrumentation._fail", "errors"] == 1
+
+    def test_summary(self, recording):
+        for _ in range(3):
+            _drop_half(pd.DataFrame({"a": range(10)}))
+
+        table = instrumentation.summary()
+
+        assert list(table.columns) == instrumentation.SUMMARY_COLUMNS
+        row = table.loc["test_instrumentation._drop_half"]
+        assert (row["calls"], row["rows_in"], row["rows_out"]) == (3, 30, 15)
+        assert "_drop_half" in instrumentation.format_summary(table)
+
+
+class TestOutputs:
+    """JSON lines and Chrome traces can be written and read back."""
+
+    def test_json_lines(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        instrumentation.enable(path)
+        _drop_half(pd.DataFrame({"a": range(4)}))
+        instrumentation.disable()
+
+        lines = path.read_text().splitlines()
+        assert json.loads(lines[0])["rows_out"] == 2
+        assert instrumentation.read_records(path)[0]["name"].endswith("_drop_half")
+
+    def test_chrome_trace(self, tmp_path, capsys):
+        path = tmp_path / "trace.json"
+        instrumentation.enable(path)
+        with instrumentation.span("outer"):
+            _drop_half(pd.DataFrame({"a": range(4)}))
+        instrumentation.disable()
+
+        events = json.loads(path.read_text())["traceEvents"]
+        assert {e["ph"] for e in events} == {"X"}
+        assert [e["name"] for e in events][-1] == "outer"
+        assert events[0]["args"]["rows_out"] == 2
+
+        assert instrumentation.main([str(path)]) == 0
+        assert "outer" in capsys.readouterr().out
+
+    def test_env_var(self, tmp_path, repo_root):
+        path = tmp_path / "trace.jsonl"
+        env = {**os.environ, "CARTLY_TRACE": str(path), "CARTLY_TRACE_SUMMARY": "1"}
+        env["CARTLY_CACHE_DIR"] = str(tmp_path / "cache")
+        code = "from src.data_loader import load_products; load_products()"
+
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=repo_root,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        records = instrumentation.read_records(path)
+        assert records[0]["name"] == "data_loader.load_products"
+        assert "data_loader.load_products" in result.stderr
@@ -0,0 +1,171 @@
+"""Tests for lazy queries with pushdown in src.lazy."""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src.data_loader import load_customers, load_orders  # noqa: E402
+from src.lazy import col, lit, scan, scan_warehouse  # noqa: E402
+
+
+def _october_india(frame):
+    return frame.filter(
+        col("order_date").between("2024-10-01", "2024-10-31"),
+        col("shipping_country") == "India",
+    )
+
+
+def _pandas_orders():
+    orders = load_orders(use_cache=False)
+    return orders.assign(order_date=pd.to_datetime(orders["order_date"]))
+
+
+class TestPushdown:
+    """Plans compile to SQL that reads only what they use."""
+
+    def test_projection_reaches_the_scan(self):
+        sql = _october_india(scan("orders")).select("order_id", "total").to_sql()
+
+        assert '"shipping_city"' not in sql
+        assert '"payment_method"' not in sql
+        assert "read_csv" in sql
+
+    def test_sql_text_predicate_reads_all_columns(self):
+        sql = scan("orders").filter("shipping_city = 'Mumbai'").select("total").to_sql()
+
+        assert '"shipping_city"' in sql
+
+    def test_literals_are_escaped(self):
+        expr = (col("last_name") == "O'Brien") | col("age").isin([30, 31])
+
+        assert expr.sql == "((\"last_name\" = 'O''Brien') OR (\"age\" IN (30, 31)))"
+        assert (col("email") == None).sql == '("email" IS NULL)'  # noqa: E711
+        assert (1 + col("tax")).sql == '(1 + "tax")'
+        assert lit(True).sql == "TRUE"
+
+    def test_expr_has_no_truth_value(self):
+        with pytest.raises(TypeError, match="&"):
+            if col("total") > 1:
+                pass
+
+    def test_unknown_names(self):
+        orders = scan("orders")
+
+        with pytest.raises(KeyError, match="nope"):
+            orders.filter(col("nope") > 1)
+        with pytest.raises(KeyError, match="nope"):
+            orders.select("total", "nope")
+        with pytest.raises(KeyError, match="Available"):
+            orders.groupby("status").agg(x=("total", "mode"))
+        with pytest.raises(KeyError, match="Available"):
+            orders.join(scan("customers"), on="customer_id", how="cross")
+
+
+class TestCollect:
+    """Results must equal loading the CSV and doing the same in pandas."""
+
+    def test_filter_and_select(self):
+        orders = _pandas_orders()
+        expected = orders[
+            orders["order_date"].between("2024-10-01", "2024-10-31")
+            & (orders["shipping_country"] == "India")
+        ]
+
+        result = _october_india(scan("orders")).select("total", "order_id").collect()
+
+        assert list(result.columns) == ["total", "order_id"]
+        assert result["order_id"].dtype == expected["order_id"].dtype
+        assert sorted(result["order_id"]) == sorted(expected["order_id"])
+
+    def test_join_groupby(self):
+        orders = _pandas_orders()
+        customers = load_customers(use_cache=False)
+        merged = orders.merge(customers[["customer_id", "segment"]], on="customer_id")
+        expected = merged.groupby("segment", observed=True).agg(
+            revenue=("total", "sum"),
+            orders=("order_id", "size"),
+            units=("items_count", "sum"),
+            buyers=("customer_id", "nunique"),
+        )
+
+        result = (
+            scan("orders")
+            .join(scan("customers").select("customer_id", "segment"), on="customer_id")
+            .groupby("segment")
+            .agg(
+                revenue=("total", "sum"),
+                orders=("order_id", "size"),
+                units=("items_count", "sum"),
+                buyers=("customer_id", "nunique"),
+            )
+            .collect()
+        )
+
+        assert isinstance(result["segment"].dtype, pd.CategoricalDtype)
+        assert result["units"].dtype == "int64"
+        result = result.set_index("segment")
+        pd.testing.assert_frame_equal(
+            result, expected, check_dtype=False, check_index_type=False
+        )
+
+    def test_outer_join_keeps_nullable_dtypes(self):
+        result = (
+            scan("orders")
+            .select("order_id", "customer_id", "items_count")
+            .join(
+                scan("customers").select("customer_id", "age"),
+                on="customer_id",
+                how="outer",
+            )
+            .collect()
+        )
+
+        # Customers without orders keep their key from the right side
+        no_orders = result[result["order_id"].isna()]
+        assert result["items_count"].dtype == "Int16"
+        assert len(no_orders) > 0
+        assert no_orders["customer_id"].notna().all()
+
+    def test_sort_and_limit(self):
+        result = (
+            scan("orders")
+            .groupby("status")
+            .agg(orders=("order_id", "size"))
+            .sort("orders", descending=True)
+            .head(2)
+        )
+
+        expected = load_orders(use_cache=False)["status"].value_counts().head(2)
+        assert result["orders"].tolist() == expected.tolist()
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="Orders"):
+            scan("orders", tmp_path / "orders.csv")
+
+    def test_quote_in_path(self, tmp_path, data_path):
+        path = tmp_path / "o'brien.csv"
+        path.write_bytes((data_path / "categories.csv").read_bytes())
+
+        result = scan("categories", path).collect()
+
+        assert len(result) == len(pd.read_csv(path))
+
+
+class TestWarehouse:
+    """A warehouse scan gives the same rows as a CSV scan."""
+
+    def test_same_as_csv(self, tmp_path, data_path):
+        from src.warehouse import build_warehouse
+
+        db_path = tmp_path / "cartly.duckdb"
+        build_warehouse(db_path, data_path, ["orders"])
+
+        def query(frame):
+            return _october_india(frame).select("order_id", "total").sort("order_id")
+
+        from_db = query(scan_warehouse("orders", db_path)).collect()
+        from_csv = query(scan("orders")).collect()
+
+        pd.testing.assert_frame_equal(from_db, from_csv)
+        assert "order_date" in query(scan_warehouse("orders", db_path)).explain()
@@ -0,0 +1,167 @@
+"""Tests for the async lookup service in src.lookup_service."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_customer_support, load_orders
+from src.lookup_service import HashIndex, LookupService, main
+
+
+def _run(coroutine_function, **options):
+    """Run coroutine_function(service) on a started LookupService."""
+
+    async def run():
+        async with LookupService(**options) as service:
+            return await coroutine_function(service)
+
+    return asyncio.run(run())
+
+
+def _assert_rows(rows, df, column, key):
+    expected = df[df[column] == key].reset_index(drop=True)
+    result = pd.DataFrame(rows, columns=df.columns).astype(df.dtypes.to_dict())
+    pd.testing.assert_frame_equal(result, expected)
+
+
+class TestHashIndex:
+    """Batch probes return the rows of each key, in table order."""
+
+    def test_positions(self):
+        values = pd.Series([5, 3, 5, None, 7, 5], dtype="Int32")
+        index = HashIndex(values)
+
+        positions, bounds = index.positions([5, 8, 7, 5])
+
+        assert len(index) == 3
+        assert bounds.tolist() == [0, 3, 3, 4, 7]
+        assert positions.tolist() == [0, 2, 5, 4, 0, 2, 5]
+        assert index.positions([])[0].tolist() == []
+
+
+class TestLookups:
+    """Indexed lookups equal filtering the loaded tables."""
+
+    def test_match_pandas(self):
+        orders = load_orders()
+        support = load_customer_support()
+
+        async def lookups(service):
+            return await asyncio.gather(
+                service.orders_for_customer(10005),
+                service.tickets_for_customer(17931),
+                service.order(100002),
+                service.ticket("TKT100000"),
+                service.customer(10001),
+                service.order(1),
+            )
+
+        by_customer, tickets, order, ticket, customer, missing = _run(lookups)
+
+        _assert_rows(by_customer, orders, "customer_id", 10005)
+        assert len(tickets) == 4
+        _assert_rows(tickets, support, "customer_id", 17931)
+        _assert_rows([order], orders, "order_id", 100002)
+        assert ticket["customer_id"] == 17931
+        assert customer["customer_id"] == 10001
+        assert missing is None
+
+    def test_concurrent_lookups_are_coalesced(self):
+        keys = [10005, 10006, 10005, 10007] * 50
+
+        async def lookups(service):
+            results = await service.lookup_many("orders", "customer_id", keys)
+            return results, service.stats()
+
+        results, stats = _run(lookups)
+
+        assert results[0] == results[2]
+        assert stats["lookups"] == 200
+        assert stats["coalesced"] == 197
+        assert stats["batches"] == 1
+        assert stats["p99_ms"] is not None
+
+    def test_max_batch(self):
+        async def lookups(service):
+            await service.lookup_many("orders", "order_id", range(100001, 100011))
+            return service.stats()
+
+        stats = _run(lookups, max_batch=4)
+
+        assert stats["batches"] == 3
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        async def lookups(service):
+            first = asyncio.ensure_future(service.order(100002))
+            second = asyncio.ensure_future(service.order(100002))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(first, second, return_exceptions=True)
+
+        first, second = _run(lookups, batch_window=0.01)
+
+        assert isinstance(first, asyncio.CancelledError)
+        assert second["order_id"] == 100002
+
+    def test_unknown_table(self):
+        async def lookups(service):
+            await service.lookup("products", "id", 1)
+
+        with pytest.raises(KeyError, match="Available"):
+            _run(lookups)
+
+
+class TestWarehouse:
+    """Other columns and SQL go through the pooled warehouse connections."""
+
+    def test_unindexed_column_and_query(self, tmp_path):
+        orders = load_orders()
+
+        async def lookups(service):
+            rows, totals = await asyncio.gather(
+                service.lookup("orders", "status", "cancelled"),
+                service.query(
+                    "SELECT COUNT(*) AS n, SUM(total) AS total FROM orders "
+                    "WHERE customer_id = ?",
+                    [10005],
+                ),
+            )
+            more = await asyncio.gather(
+                *(service.query("SELECT 1 AS one") for _ in range(8))
+            )
+            return rows, totals, more
+
+        rows, totals, more = _run(
+            lookups, db_path=tmp_path / "cartly.duckdb", pool_size=2
+        )
+
+        cancelled = orders[orders["status"] == "cancelled"]
+        assert sorted(r["order_id"] for r in rows) == sorted(cancelled["order_id"])
+        mine = orders[orders["customer_id"] == 10005]
+        assert totals["n"].iloc[0] == len(mine)
+        assert np.isclose(totals["total"].iloc[0], mine["total"].sum())
+        assert all(df["one"].iloc[0] == 1 for df in more)
+
+    def test_unknown_column_is_rejected(self):
+        async def lookups(service):
+            await service.lookup("orders", 'status" IS NOT NULL OR "status', "x")
+
+        with pytest.raises(KeyError, match="Unknown column"):
+            _run(lookups)
+
+    def test_query_needs_start(self):
+        with pytest.raises(RuntimeError, match="not started"):
+            asyncio.run(LookupService().query("SELECT 1"))
+
+
+class TestCli:
+    """The CLI prints rows for a key, or load test results."""
+
+    def test_lookup_and_bench(self, capsys):
+        assert main(["customer_support", "ticket_id", "TKT100000"]) == 0
+        assert "AGT018" in capsys.readouterr().out
+
+        assert main(["--bench", "500"]) == 0
+        assert "500 lookups" in capsys.readouterr().out
@@ -0,0 +1,210 @@
+"""Tests for the Hive-style partitioned layout in src.partitioning."""
+
+import shutil
+
+import pandas as pd
+import pytest
+
+from src import partitioning
+from src.data_loader import (
+    load_order_items,
+    load_orders,
+    load_partitioned,
+    load_website_sessions,
+)
+
+
+@pytest.fixture
+def cache_tmp(tmp_path, monkeypatch):
+    """Point the cache (and so the default layout root) at a temporary directory."""
+    monkeypatch.setenv("CARTLY_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture(scope="module")
+def root(tmp_path_factory):
+    """Layout of every partitioned table in data/, built once per module."""
+    return partitioning.build_partitions(root=tmp_path_factory.mktemp("layout"))
+
+
+def _sorted(df, key):
+    return df.sort_values(key, kind="stable").reset_index(drop=True)
+
+
+def _october(orders):
+    return orders[orders["order_date"].between("2024-10-01", "2024-10-31")]
+
+
+class TestLayout:
+    """The layout holds every row in Hive-style partitions."""
+
+    def test_directories_and_manifest(self, root):
+        manifest = partitioning.read_manifest("orders", root)
+
+        assert manifest["by"] == ["year_month", "shipping_country"]
+        assert sum(p["rows"] for p in manifest["partitions"]) == 7076
+        path = root / "orders" / "year_month=2024-10" / "shipping_country=India"
+        assert (path / "part-0.parquet").exists()
+        assert (root / "website_sessions" / "year_month=2024-10").is_dir()
+
+    def test_order_items_follow_their_orders(self, root):
+        orders = partitioning.read_manifest("orders", root)["partitions"]
+        items = partitioning.read_manifest("order_items", root)["partitions"]
+
+        assert {p["path"] for p in items} <= {p["path"] for p in orders}
+
+    def test_partition_stats(self, root):
+        stats = partitioning.partition_stats("orders", root)
+        october = stats[stats["year_month"] == "2024-10"]
+
+        assert october["order_date_min"].min() >= "2024-10-01"
+        assert october["order_date_max"].max() < "2024-11-01"
+        assert (stats["total_min"] <= stats["total_max"]).all()
+
+
+class TestRead:
+    """Pruned reads equal filtering the full table."""
+
+    def test_full_read_matches_loader(self, root):
+        for table, load, key in (
+            ("orders", load_orders, "order_id"),
+            ("order_items", load_order_items, "order_item_id"),
+            ("website_sessions", load_website_sessions, "session_id"),
+        ):
+            result = partitioning.read_partitions(table, root=root)
+            pd.testing.assert_frame_equal(
+                _sorted(result, key), _sorted(load(use_cache=False), key)
+            )
+
+    def test_one_month_reads_one_month(self, root):
+        manifest = partitioning.read_manifest("orders", root)
+        selected = partitioning.select_partitions(
+            manifest, "2024-10-01", "2024-10-31"
+        )
+
+        share = sum(p["bytes"] for p in selected) / sum(
+            p["bytes"] for p in manifest["partitions"]
+        )
+        assert share < 1 / 20
+        assert {p["values"]["year_month"] for p in selected} == {"2024-10"}
+
+        result = partitioning.read_partitions(
+            "orders", "2024-10-01", "2024-10-31", root=root
+        )
+        expected = _october(load_orders(use_cache=False))
+        pd.testing.assert_frame_equal(
+            _sorted(result, "order_id"), _sorted(expected, "order_id")
+        )
+
+    def test_day_range_and_countries(self, root):
+        orders = load_orders(use_cache=False)
+        expected = orders[
+            orders["order_date"].between("2024-10-10", "2024-11-05")
+            & orders["shipping_country"].isin(["India", "UK"])
+        ]
+
+        result = partitioning.read_partitions(
+            "orders",
+            "2024-10-10",
+            "2024-11-05",
+            countries=["India", "UK"],
+            columns=["order_id", "total"],
+            root=root,
+        )
+
+        assert list(result.columns) == ["order_id", "total"]
+        assert sorted(result["order_id"]) == sorted(expected["order_id"])
+
+    def test_co_partitioned_items(self, root):
+        orders = _october(load_orders(use_cache=False))
+        orders = orders[orders["shipping_country"] == "India"]
+        items = load_order_items(use_cache=False)
+        expected = items[items["order_id"].isin(orders["order_id"])]
+
+        result = partitioning.read_partitions(
+            "order_items", "2024-10-01", "2024-10-31", ["India"], root=root
+        )
+
+        pd.testing.assert_frame_equal(
+            _sorted(result, "order_item_id"), _sorted(expected, "order_item_id")
+        )
+
+    def test_sessions(self, root):
+        sessions = load_website_sessions(use_cache=False)
+        month = sessions["session_date"].dt.strftime("%Y-%m")
+        expected = sessions[month == "2024-10"]
+
+        result = partitioning.read_partitions(
+            "website_sessions", "2024-10-01", "2024-10-31", root=root
+        )
+
+        assert sorted(result["session_id"]) == sorted(expected["session_id"])
+        with pytest.raises(ValueError, match="country"):
+            partitioning.read_partitions(
+                "website_sessions", countries=["India"], root=root
+            )
+
+    def test_empty_range_keeps_dtypes(self, root):
+        result = partitioning.read_partitions(
+            "orders", "2030-01-01", "2030-01-31", root=root
+        )
+
+        assert len(result) == 0
+        assert result.dtypes.equals(load_orders().dtypes)
+
+    def test_errors(self, root, tmp_path):
+        with pytest.raises(KeyError, match="Available"):
+            partitioning.read_partitions("customers", root=root)
+        with pytest.raises(KeyError, match="nope"):
+            partitioning.read_partitions("orders", columns=["nope"], root=root)
+        with pytest.raises(FileNotFoundError, match="Partitions"):
+            partitioning.read_partitions("orders", root=tmp_path / "empty")
+
+
+class TestLoadPartitioned:
+    """load_partitioned() builds the layout once and rebuilds it when stale."""
+
+    def test_build_once_then_rebuild(self, cache_tmp, data_path, tmp_path):
+        data_dir = tmp_path / "data"
+        data_dir.mkdir()
+        shutil.copy(data_path / "orders.csv", data_dir / "orders.csv")
+
+        first = load_partitioned(
+            "orders", "2024-10-01", "2024-10-31", data_dir=data_dir
+        )
+        root = partitioning.default_root(data_dir)
+        manifest = root / "orders" / partitioning.MANIFEST
+        built = manifest.stat().st_mtime_ns
+        load_partitioned("orders", data_dir=data_dir)
+        assert manifest.stat().st_mtime_ns == built
+
+        orders = pd.read_csv(data_dir / "orders.csv")
+        orders.iloc[:100].to_csv(data_dir / "orders.csv", index=False)
+        second = load_partitioned("orders", data_dir=data_dir)
+
+        assert len(first) == 313
+        assert len(second) == 100
+
+    def test_month_only_layout(self, cache_tmp, tmp_path):
+        root = tmp_path / "layout"
+
+        result = load_partitioned(
+            "order_items",
+            "2024-10-01",
+            "2024-10-31",
+            ["India"],
+            root=root,
+            by_country=False,
+        )
+
+        assert partitioning.read_manifest("orders", root)["by"] == ["year_month"]
+        orders = _october(load_orders())
+        india = orders.loc[orders["shipping_country"] == "India", "order_id"]
+        items = load_order_items()
+        expected = items.loc[items["order_id"].isin(india), "order_item_id"]
+        assert sorted(result["order_item_id"]) == sorted(expected)
+
+    def test_cli(self, cache_tmp, tmp_path, capsys):
+        assert partitioning.main(["website_sessions", "--root", str(tmp_path)]) == 0
+        assert "website_sessions" in capsys.readouterr().out
+        assert (tmp_path / "website_sessions" / partitioning.MANIFEST).exists()
@@ -0,0 +1,170 @@
+"""Tests for the multi-process cleaning pipeline in src.pipeline."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipeline import (
+    Pipeline,
+    Stage,
+    _share,
+    _unshare,
+    byte_ranges,
+    clean_marketing_customers,
+    main,
+    marketing_pipeline,
+)
+
+
+@pytest.fixture
+def raw_path(data_path):
+    return data_path / "marketing_customers_raw.csv"
+
+
+@pytest.fixture(scope="module")
+def serial():
+    return clean_marketing_customers(workers=1)
+
+
+def add_length(df, column):
+    """Module-level custom stage, importable by worker processes."""
+    df[f"{column}_length"] = df[column].str.len()
+    return df
+
+
+class TestStages:
+    """Built-in stages clean one chunk."""
+
+    def test_marketing_columns(self, serial, raw_path):
+        raw = pd.read_csv(raw_path, dtype=str)
+
+        assert len(serial) == len(raw)
+        assert "notes" not in serial.columns
+        assert serial["full_name"].iloc[0] == "Isaac Bakshi"
+        assert serial["phone_number"].dropna().str.fullmatch(r"\d{7,10}").all()
+        assert serial["date_joined"].isna().sum() == 14  # "invalid-date"
+        assert serial["age"].max() <= 120 and serial["age"].min() >= 0
+        assert set(serial["lead_source"].cat.categories) >= {"Webinar", "Facebook"}
+        assert serial["utm_medium"].isna().sum() == raw["utm_medium"].isna().sum()
+        assert serial["utm_campaign"].iloc[0] == 113
+        assert serial["is_subscribed"].sum() == (raw["is_subscribed"] == "True").sum()
+
+    def test_map_and_trim(self):
+        df = pd.DataFrame(
+            {"source": ["cpc", "tv", None], "name": ["  a   b ", " ", "c"]}
+        )
+        pipeline = Pipeline(
+            [
+                Stage("map", column="source", mapping={"cpc": "Paid"}),
+                Stage("trim", columns=["name"]),
+            ]
+        )
+
+        result = pipeline.run_chunk(df)
+
+        assert result["source"].tolist()[:2] == ["Paid", "other"]
+        assert pd.isna(result["source"].iloc[2])
+        assert result["name"].tolist()[0] == "a b" and pd.isna(result["name"][1])
+        assert df["name"].iloc[0] == "  a   b "  # input unchanged
+
+    def test_unknown_stage(self):
+        with pytest.raises(KeyError, match="Available"):
+            Stage("nope")
+
+
+class TestParallel:
+    """Process-pool runs equal the single-process result, in order."""
+
+    def test_workers_and_chunk_sizes_agree(self, serial, raw_path):
+        parallel = clean_marketing_customers(
+            raw_path, workers=2, chunk_bytes=50_000, max_pending=3
+        )
+
+        pd.testing.assert_frame_equal(parallel, serial)
+
+    def test_byte_ranges_cover_the_file(self, raw_path):
+        ranges = list(byte_ranges(raw_path, 100_000))
+        size = raw_path.stat().st_size
+
+        assert ranges[0][2] == len(ranges[0][1])
+        assert ranges[-1][3] == size
+        assert all(a[3] == b[2] for a, b in zip(ranges, ranges[1:]))
+        with pytest.raises(ValueError, match="positive"):
+            list(byte_ranges(raw_path, 0))
+
+    def test_map_with_backpressure(self, raw_path):
+        raw = pd.read_csv(raw_path, dtype=str)
+        pulled = []
+
+        def chunks():
+            for start in range(0, len(raw), 1000):
+                pulled.append(start)
+                yield raw.iloc[start : start + 1000]
+
+        pipeline = marketing_pipeline().then(add_length, column="email_address")
+        results = pipeline.map(chunks(), workers=2, max_pending=2)
+        first = next(results)
+        assert len(pulled) <= 2
+
+        result = pd.concat([first, *results])
+        assert result.index.equals(raw.index)
+        expected = raw["email_address"].str.len()
+        pd.testing.assert_series_equal(
+            result["email_address_length"], expected, check_names=False
+        )
+
+    def test_shared_memory_round_trip(self):
+        df = pd.DataFrame(
+            {
+                "flag": [True, False, True],
+                "count": pd.array([1, None, 3], dtype="Int16"),
+                "score": [0.5, np.nan, 2.0],
+                "when": pd.to_datetime(["2024-01-01", None, "2024-03-01"]),
+                "ok": pd.array([True, None, False], dtype="boolean"),
+                "name": ["a", None, "c"],
+            },
+            index=[10, 11, 12],
+        )
+
+        payload = _share(df)
+
+        assert list(payload[2].columns) == ["name"]
+        pd.testing.assert_frame_equal(_unshare(payload), df)
+
+
+class TestCleanFile:
+    """clean_file() writes the cleaned feed; the CLI wraps it."""
+
+    def test_clean_file_and_cli(self, raw_path, tmp_path, capsys):
+        output = tmp_path / "out" / "clean.csv"
+
+        summary = marketing_pipeline().clean_file(
+            raw_path, output, workers=1, chunk_bytes=300_000
+        )
+        written = pd.read_csv(output)
+
+        assert summary["rows"] == len(written) == 10_000
+        assert summary["chunks"] == 4
+        assert "notes" not in written.columns
+        assert not list(output.parent.glob(".*.tmp"))
+
+        assert main([str(raw_path), "-o", str(output), "--workers", "1"]) == 0
+        assert "10,000 rows" in capsys.readouterr().out
+
+    def test_header_only_file(self, raw_path, tmp_path, serial):
+        path = tmp_path / "feed.csv"
+        with open(raw_path, "rb") as f:
+            path.write_bytes(f.readline())
+
+        result = marketing_pipeline().read_clean(path, workers=2)
+        summary = marketing_pipeline().clean_file(path, tmp_path / "out.csv")
+
+        assert result.empty
+        assert result.dtypes.equals(serial.dtypes)
+        assert summary["rows"] == summary["chunks"] == 0
+        written = pd.read_csv(tmp_path / "out.csv")
+        assert list(written.columns) == list(serial.columns)
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="CSV"):
+            list(marketing_pipeline().iter_file(tmp_path / "feed.csv"))
@@ -0,0 +1,113 @@
+"""Tests for the streaming data quality profiler in src.profiler."""
+
+import pandas as pd
+import pytest
+
+from src.data_loader import iter_orders
+from src.profiler import (
+    infer_types,
+    main,
+    merge_profiles,
+    pattern_signature,
+    profile_chunks,
+    profile_file,
+    profile_files,
+)
+
+
+@pytest.fixture
+def raw_path(data_path):
+    return data_path / "marketing_customers_raw.csv"
+
+
+class TestHelpers:
+    """Value-level type inference and pattern signatures."""
+
+    def test_infer_types(self):
+        values = pd.Series(["True", "42", "-3.5", "2024-01-05", "F", "camp_1"])
+
+        assert infer_types(values).tolist() == [
+            "boolean", "integer", "float", "date", "string", "string",
+        ]
+
+    def test_pattern_signature(self):
+        values = pd.Series(["  Isaac Bakshi  ", "+49(0)4332181960", "Bremervörde"])
+
+        assert pattern_signature(values).tolist() == [" Aa Aa ", "+9(9)9", "Aa"]
+
+
+class TestProfile:
+    """Profiles must match exact pandas statistics."""
+
+    def test_marketing_raw(self, raw_path):
+        raw = pd.read_csv(raw_path, dtype=str)
+
+        table = profile_file(raw_path, chunksize=1000).to_frame()
+
+        pd.testing.assert_series_equal(
+            table["null_rate"], raw.isna().mean(), check_names=False
+        )
+        assert table.loc["is_subscribed", "type"] == "boolean"
+        assert table.loc["date_joined", "type"] == "date"
+        assert table.loc["date_joined", "type_confidence"] == pytest.approx(0.9986)
+        assert table.loc["age", "min"] == -1 and table.loc["age", "max"] == 999
+        names = raw["full_name"].dropna()
+        padded = names.str.strip() != names
+        assert table.loc["full_name", "padded"] == padded.sum()
+        assert table.loc["notes", "top_values"][0] == ("do not contact", 1492)
+
+        exact = raw["email_address"].nunique()
+        assert abs(table.loc["email_address", "distinct"] - exact) / exact < 0.03
+        median = pd.to_numeric(raw["age"]).median()
+        assert abs(table.loc["age", "p50"] - median) <= 1
+
+    def test_chunking_does_not_change_counts(self, raw_path):
+        columns = ["nulls", "type", "distinct", "padded", "min", "max"]
+
+        small = profile_file(raw_path, chunksize=700).to_frame()
+        whole = profile_file(raw_path, chunksize=20_000).to_frame()
+
+        pd.testing.assert_frame_equal(small[columns], whole[columns])
+        # Counts of values below the Misra-Gries threshold depend on chunking
+        assert small.loc["country", "top_values"] == whole.loc["country", "top_values"]
+
+    def test_typed_chunks(self):
+        table = profile_chunks(iter_orders(chunksize=2000)).to_frame()
+
+        assert table.loc["items_count", "type"] == "integer"
+        assert table.loc["total", "min"] < 0
+        assert table.loc["status", "distinct"] == 6
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="CSV"):
+            profile_file(tmp_path / "feed.csv")
+
+
+class TestMerge:
+    """Profiles of parts of a feed merge into the profile of the whole."""
+
+    def test_parts_merge_to_whole(self, raw_path, tmp_path):
+        raw = pd.read_csv(raw_path, dtype=str)
+        raw.iloc[:4000].to_csv(tmp_path / "part1.csv", index=False)
+        part2 = raw.iloc[4000:].drop(columns="notes")
+        part2.to_csv(tmp_path / "part2.csv", index=False)
+
+        parts = profile_files(
+            [tmp_path / "part1.csv", tmp_path / "part2.csv"], executor="thread"
+        )
+        merged = merge_profiles(parts.values()).to_frame()
+        whole = profile_file(raw_path).to_frame()
+
+        notes_nulls = raw["notes"].iloc[:4000].isna().sum() + len(part2)
+        assert merged.loc["notes", "nulls"] == notes_nulls
+        columns = ["nulls", "type", "distinct", "padded", "min", "max"]
+        pd.testing.assert_frame_equal(
+            merged.drop(index="notes")[columns], whole.drop(index="notes")[columns]
+        )
+
+    def test_process_pool_and_cli(self, raw_path, capsys):
+        profiles = profile_files([raw_path], workers=1)
+        assert profiles[str(raw_path)].rows == 10_000
+
+        assert main([str(raw_path), "--top", "1"]) == 0
+        assert "10,000 rows" in capsys.readouterr().out
@@ -0,0 +1,193 @@
+"""Tests for the query result cache in src.query_cache."""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.query_cache import (
+    DASHBOARD_QUERIES,
+    QueryCache,
+    cached,
+    cached_load,
+    cached_query,
+    main,
+    normalize_sql,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def data_dir(data_path, tmp_path):
+    """Copy of the orders CSV that tests may rewrite."""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    shutil.copy(data_path / "orders.csv", directory / "orders.csv")
+    return directory
+
+
+def _frame(rows):
+    return pd.DataFrame({"x": range(rows)})
+
+
+def _rewrite_first_rows(path, rows):
+    """Keep only the first rows of a CSV, with a new modification time."""
+    pd.read_csv(path).iloc[:rows].to_csv(path, index=False)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestQueryCache:
+    """LRU eviction by size, TTL expiry and counters."""
+
+    def test_lru_eviction_by_bytes(self):
+        size = _frame(100).memory_usage(deep=True).sum()
+        cache = QueryCache(max_bytes=int(size * 2.5))
+
+        cache.put("a", _frame(100))
+        cache.put("b", _frame(100))
+        assert cache.get("a") is not None  # a is now more recent than b
+        cache.put("c", _frame(100))
+
+        assert "a" in cache and "c" in cache and "b" not in cache
+        assert cache.stats()["evictions"] == 1
+        assert cache.nbytes <= cache.max_bytes
+        assert cache.put("huge", _frame(10_000)) is False
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = QueryCache(ttl=10, clock=clock)
+        cache.put("a", 1)
+        cache.put("b", 2, ttl=60)
+
+        clock.now = 11
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_results_are_copies(self):
+        cache = QueryCache()
+        cache.put("a", _frame(3))
+
+        result = cache.get("a")
+        result["x"] = -1
+
+        assert cache.get("a")["x"].tolist() == [0, 1, 2]
+
+    def test_changed_source_drops_its_entries(self):
+        cache = QueryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        assert cache.get_or_compute("k1", compute, {"orders.csv": [1, 1]}) == 1
+        assert cache.get_or_compute("k1", compute, {"orders.csv": [1, 1]}) == 1
+        assert cache.get_or_compute("k2", compute, {"orders.csv": [1, 2]}) == 2
+
+        assert "k1" not in cache
+        assert cache.stats()["invalidations"] == 1
+
+
+class TestNormalize:
+    """Equivalent SQL texts share a key."""
+
+    def test_whitespace_and_case(self):
+        first = normalize_sql("select  SUM(total)\nFROM orders o join customers c "
+                              "on c.customer_id = o.customer_id")
+        second = normalize_sql("SELECT SUM(total) FROM orders AS o JOIN customers "
+                               "AS c ON c.customer_id = o.customer_id")
+
+        assert first == second
+        assert first[1] == ("customers", "orders")
+        assert normalize_sql(DASHBOARD_QUERIES["campaign_roas"])[1] == (
+            "marketing_campaigns",
+        )
+
+
+class TestCachedQuery:
+    """SQL results are reused until the source CSV changes."""
+
+    def test_hit_then_invalidated(self, data_dir, tmp_path):
+        cache = QueryCache()
+        db_path = tmp_path / "cartly.duckdb"
+        sql = "SELECT COUNT(*) AS n FROM orders"
+
+        first = cached_query(sql, db_path=db_path, data_dir=data_dir, cache=cache)
+        again = cached_query(
+            "select count(*) as n from orders", db_path=db_path,
+            data_dir=data_dir, cache=cache,
+        )
+        assert first["n"].iloc[0] == again["n"].iloc[0] == 7076
+        assert cache.stats()["hits"] == 1
+
+        _rewrite_first_rows(data_dir / "orders.csv", 100)
+        changed = cached_query(sql, db_path=db_path, data_dir=data_dir, cache=cache)
+
+        assert changed["n"].iloc[0] == 100
+        stats = cache.stats()
+        assert (stats["misses"], stats["invalidations"], stats["entries"]) == (2, 1, 1)
+
+    def test_parameters_are_part_of_the_key(self, data_dir, tmp_path):
+        cache = QueryCache()
+        sql = "SELECT COUNT(*) AS n FROM orders WHERE total > ?"
+        options = {"db_path": tmp_path / "cartly.duckdb", "data_dir": data_dir}
+
+        low = cached_query(sql, [0], cache=cache, **options)
+        high = cached_query(sql, [5000], cache=cache, **options)
+
+        assert low["n"].iloc[0] > high["n"].iloc[0]
+        assert cache.stats()["misses"] == 2
+
+
+class TestCachedPandas:
+    """Pandas functions and loaders are cached per arguments and sources."""
+
+    def test_decorator(self, data_dir):
+        cache = QueryCache()
+        calls = []
+
+        @cached(tables=["orders"], cache=cache)
+        def revenue(country, data_dir=None):
+            calls.append(country)
+            orders = pd.read_csv(data_dir / "orders.csv")
+            return orders.loc[orders["shipping_country"] == country, "total"].sum()
+
+        india = revenue("India", data_dir=data_dir)
+        assert revenue("India", data_dir=data_dir) == india
+        revenue("UK", data_dir=data_dir)
+        assert calls == ["India", "UK"]
+
+        _rewrite_first_rows(data_dir / "orders.csv", 100)
+        assert revenue("India", data_dir=data_dir) < india
+        assert revenue.uncached("India", data_dir=data_dir) < india
+
+    def test_cached_load(self, data_dir):
+        cache = QueryCache()
+
+        first = cached_load("orders", data_dir=data_dir, cache=cache)
+        second = cached_load("orders", data_dir=data_dir, cache=cache)
+
+        pd.testing.assert_frame_equal(first, second)
+        assert cache.stats()["hits"] == 1
+        with pytest.raises(KeyError):
+            cached_load("nope", cache=cache)
+
+    def test_cli(self, tmp_path, capsys):
+        args = ["revenue_by_day", "--repeat", "2", "--db", str(tmp_path / "w.duckdb")]
+
+        assert main(args) == 0
+
+        assert "hits 1, misses 1" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+"""Tests for the SQL rewriter and plan comparison in src.query_optimizer."""
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+
+from src import query_optimizer  # noqa: E402
+from src.warehouse import load_scaled  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def conn():
+    """In-memory warehouse with two ID-offset copies of the sample data."""
+    connection = duckdb.connect()
+    load_scaled(connection, multiply=2)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def slow_query(repo_root):
+    return (repo_root / "data" / "slow_query.sql").read_text()
+
+
+class TestRules:
+    """Verify each rewrite rule produces equivalent SQL."""
+
+    def test_sargable_dates(self, conn):
+        sql = "SELECT order_id FROM orders WHERE DATE(order_date) <= DATE('2023-06-30')"
+        rewrite = query_optimizer.optimize_query(sql, conn, ["sargable_dates"])
+
+        assert rewrite["applied"] == ["sargable_dates"]
+        assert "DATE(order_date)" not in rewrite["sql"]
+        assert query_optimizer.results_match(conn, sql, rewrite["sql"])
+
+    def test_sargable_dates_equality(self, conn):
+        sql = "SELECT COUNT(*) FROM orders WHERE DATE(order_date) = DATE('2023-03-15')"
+        rewrite = query_optimizer.optimize_query(sql, conn, ["sargable_dates"])
+
+        assert query_optimizer.results_match(conn, sql, rewrite["sql"])
+
+    def test_sargable_dates_skips_text_columns(self, conn):
+        sql = "SELECT name FROM categories WHERE DATE(name) >= DATE('2023-01-01')"
+        rewrite = query_optimizer.optimize_query(sql, conn, ["sargable_dates"])
+
+        assert rewrite["applied"] == []
+
+    def test_preaggregate_keeps_customers_without_orders(self, conn):
+        sql = """
+            SELECT c.customer_id,
+                   (SELECT COUNT(*) FROM orders o
+                    WHERE o.customer_id = c.customer_id) AS n_orders
+            FROM customers c
+        """
+        rewrite = query_optimizer.optimize_query(sql, conn, ["preaggregate"])
+
+        assert rewrite["applied"] == ["preaggregate"]
+        assert "LEFT JOIN" in rewrite["sql"]
+        assert query_optimizer.results_match(conn, sql, rewrite["sql"])
+
+    def test_semi_joins(self, conn):
+        sql = """
+            SELECT * FROM products p
+            WHERE p.category_id IN (SELECT cat.id FROM categories cat
+                                    WHERE cat.name LIKE '%Electronics%')
+        """
+        rewrite = query_optimizer.optimize_query(sql, conn, ["semi_joins"])
+
+        assert "SEMI JOIN" in rewrite["sql"]
+        assert " IN (" not in rewrite["sql"]
+        assert query_optimizer.results_match(conn, sql, rewrite["sql"])
+
+    def test_prune_projection(self, conn):
+        rewrite = query_optimizer.optimize_query(
+            "SELECT * FROM customers c", conn, columns=["customer_id", "email"]
+        )
+
+        assert conn.execute(rewrite["sql"]).df().columns.tolist() == [
+            "customer_id",
+            "email",
+        ]
+
+    def test_unknown_rule(self):
+        with pytest.raises(ValueError, match="Unknown rules"):
+            query_optimizer.optimize_query("SELECT 1", rules=["nope"])
+
+
+class TestSlowQuery:
+    """Verify the full rewrite of data/slow_query.sql."""
+
+    def test_all_rules_preserve_results(self, conn, slow_query):
+        rewrite = query_optimizer.optimize_query(slow_query, conn)
+
+        assert set(rewrite["applied"]) == {
+            "sargable_dates",
+            "preaggregate",
+            "semi_joins",
+        }
+        assert query_optimizer.results_match(conn, slow_query, rewrite["sql"])
+
+    def test_benchmark_report(self, conn, slow_query):
+        report = query_optimizer.benchmark_rewrite(
+            conn, slow_query, columns=["customer_id", "email"], repeat=1
+        )
+
+        assert report["identical"]
+        assert report["original_seconds"] > 0
+        assert "SEQ_SCAN" in report["plan_diff"].index
+        assert "Results match:   yes" in query_optimizer.format_report(report)
+
+    def test_explain_analyze(self, conn):
+        plan = query_optimizer.explain_analyze(conn, "SELECT COUNT(*) FROM orders")
+
+        assert list(plan.columns) == ["operator", "depth", "rows", "seconds"]
+        assert "SEQ_SCAN" in set(plan["operator"])
@@ -0,0 +1,144 @@
+"""Tests for the constant-memory chunk reducers in src.streaming."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import iter_website_sessions, load_website_sessions
+from src.streaming import (
+    HyperLogLog,
+    QuantileSketch,
+    TopK,
+    count_rows,
+    distinct_count,
+    distinct_sketch,
+    sum_by_day,
+)
+
+
+@pytest.fixture
+def order_chunks():
+    """Three small order chunks spanning overlapping days."""
+    frame = pd.DataFrame({
+        "order_date": pd.to_datetime([
+            "2024-10-01", "2024-10-01", "2024-10-02",
+            "2024-10-02", "2024-10-03", None,
+        ]),
+        "customer_id": [1, 2, 2, 3, 1, 4],
+        "total": [100.0, 50.0, 25.0, 10.0, 5.0, 999.0],
+    })
+    return [frame.iloc[0:2], frame.iloc[2:4], frame.iloc[4:6]]
+
+
+class TestReducers:
+    """Verify streaming reducers agree with in-memory pandas."""
+
+    def test_count_rows(self, order_chunks):
+        assert count_rows(order_chunks) == 6
+
+    def test_sum_by_day_merges_across_chunks(self, order_chunks):
+        """Days split over chunks must be summed once; NaT rows dropped."""
+        daily = sum_by_day(order_chunks)
+        assert daily.to_dict() == {
+            pd.Timestamp("2024-10-01"): 150.0,
+            pd.Timestamp("2024-10-02"): 35.0,
+            pd.Timestamp("2024-10-03"): 5.0,
+        }
+
+    def test_sum_by_day_on_sessions(self):
+        """Streaming sums over the sessions file must match an eager groupby."""
+        eager = load_website_sessions(use_cache=False)
+        expected = eager.groupby("session_date")["pages_viewed"].sum()
+
+        daily = sum_by_day(
+            iter_website_sessions(chunksize=7000), "session_date", "pages_viewed"
+        )
+        np.testing.assert_allclose(daily.to_numpy(), expected.to_numpy())
+
+    def test_distinct_count_is_close(self):
+        """HyperLogLog estimate must be within 3% of the exact count."""
+        eager = load_website_sessions(use_cache=False)
+        exact = eager["customer_id"].nunique()
+
+        estimate = distinct_count(iter_website_sessions(chunksize=7000), "customer_id")
+        assert abs(estimate - exact) / exact < 0.03
+
+
+class TestHyperLogLog:
+    """Verify sketch accuracy and merge semantics."""
+
+    def test_large_cardinality(self):
+        sketch = HyperLogLog()
+        sketch.add(np.arange(500_000))
+        assert abs(sketch.count() - 500_000) / 500_000 < 0.03
+
+    def test_merge_equals_union(self, order_chunks):
+        """Merging per-chunk sketches must equal one sketch over all chunks."""
+        merged = HyperLogLog()
+        for chunk in order_chunks:
+            partial = distinct_sketch([chunk], "customer_id")
+            merged.merge(partial)
+
+        combined = distinct_sketch(order_chunks, "customer_id")
+        assert np.array_equal(merged.registers, combined.registers)
+        assert round(merged.count()) == 4
+
+    def test_merge_rejects_different_precision(self):
+        with pytest.raises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class TestQuantileSketch:
+    """Verify quantile accuracy, bounded size and merge semantics."""
+
+    def test_quantiles_are_close(self):
+        values = np.random.default_rng(0).normal(size=200_000)
+        sketch = QuantileSketch()
+        for chunk in np.array_split(values, 20):
+            sketch.add(chunk)
+
+        estimates = sketch.quantiles([0.1, 0.5, 0.9])
+        ranks = [np.mean(values <= estimate) for estimate in estimates]
+        assert np.allclose(ranks, [0.1, 0.5, 0.9], atol=0.02)
+        assert sketch.quantile(0) == values.min()
+        assert sketch.quantile(1) == values.max()
+        assert sum(len(level) for level in sketch.levels) < 4 * sketch.k
+
+    def test_merge_equals_union(self):
+        low, high = QuantileSketch(), QuantileSketch()
+        low.add(np.arange(0, 50_000))
+        high.add(pd.Series(np.arange(50_000, 100_000)))
+
+        merged = low.merge(high)
+
+        assert merged.count == 100_000
+        assert abs(merged.quantile(0.5) - 50_000) < 2_000
+
+    def test_empty_and_invalid(self):
+        sketch = QuantileSketch()
+        sketch.add(pd.Series(["x", None, np.inf]))
+        assert sketch.count == 0
+        assert np.isnan(sketch.quantile(0.5))
+        with pytest.raises(ValueError):
+            QuantileSketch(16).merge(QuantileSketch(32))
+
+
+class TestTopK:
+    """Verify the frequent-items guarantee and merging."""
+
+    def test_heavy_hitters_survive(self):
+        values = pd.Series(["a"] * 500 + ["b"] * 300 + [f"x{i}" for i in range(1000)])
+        top = TopK(capacity=10)
+        for chunk in np.array_split(values.sample(frac=1, random_state=0), 7):
+            top.add(chunk)
+
+        assert list(top.top(2).index) == ["a", "b"]
+        assert len(top.counts) <= 10
+        assert 500 - top.error <= top.counts["a"] <= 500
+
+    def test_merge(self):
+        left, right = TopK(5), TopK(5)
+        left.add(["a", "a", "b"])
+        right.add(["a", "c", None])
+
+        assert left.merge(right).top(1).to_dict() == {"a": 3}
@@ -0,0 +1,140 @@
+"""Tests for the synthetic data generator in src.synthetic."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("faker")
+
+from src import synthetic  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    """0.2x of the sample written as several Parquet parts."""
+    out_dir = tmp_path_factory.mktemp("synthetic")
+    counts = synthetic.generate(0.2, out_dir, batch_size=700, seed=7)
+    tables = {table: pd.read_parquet(out_dir / table) for table in synthetic.TABLES}
+    return out_dir, counts, tables
+
+
+class TestGenerate:
+    """Verify sizes, partitioning and determinism."""
+
+    def test_row_counts(self, generated):
+        out_dir, counts, tables = generated
+
+        assert counts["customers"] == 2000
+        assert counts["marketing_campaigns"] == 40
+        for table, frame in tables.items():
+            assert len(frame) == counts[table]
+
+    def test_partitioned_output(self, generated):
+        out_dir, _, _ = generated
+
+        parts = sorted(p.name for p in (out_dir / "customers").iterdir())
+        assert parts == [f"part-{i:05d}.parquet" for i in range(3)]
+
+    def test_columns_match_sample(self, generated, data_path):
+        _, _, tables = generated
+
+        for table, frame in tables.items():
+            sample = pd.read_csv(data_path / f"{table}.csv", nrows=1)
+            assert list(frame.columns) == list(sample.columns)
+
+    def test_same_seed_same_data(self, tmp_path):
+        first = synthetic.generate(0.05, tmp_path / "a", "csv", seed=3)
+        second = synthetic.generate(0.05, tmp_path / "b", "csv", seed=3)
+
+        assert first == second
+        for table in ("customers", "order_items"):
+            a = (tmp_path / "a" / table / "part-00000.csv").read_text()
+            b = (tmp_path / "b" / table / "part-00000.csv").read_text()
+            assert a == b
+
+    def test_invalid_arguments(self, tmp_path):
+        with pytest.raises(ValueError, match="format"):
+            synthetic.generate(1, tmp_path, fmt="json")
+        with pytest.raises(ValueError, match="Unknown tables"):
+            synthetic.generate(1, tmp_path, tables=["nope"])
+
+
+class TestIntegrity:
+    """Verify foreign keys and derived amounts are consistent."""
+
+    def test_primary_keys_unique(self, generated):
+        _, _, tables = generated
+
+        assert tables["customers"]["customer_id"].is_unique
+        assert tables["customers"]["email"].is_unique
+        assert tables["orders"]["order_id"].is_unique
+        assert tables["order_items"]["order_item_id"].is_unique
+        assert tables["website_sessions"]["session_id"].is_unique
+        assert tables["customer_support"]["ticket_id"].is_unique
+
+    def test_foreign_keys(self, generated):
+        _, _, tables = generated
+        customers = set(tables["customers"]["customer_id"])
+
+        assert set(tables["orders"]["customer_id"]) <= customers
+        assert set(tables["customer_support"]["customer_id"]) <= customers
+        assert set(tables["website_sessions"]["customer_id"].dropna()) <= customers
+        assert set(tables["order_items"]["order_id"]) == set(
+            tables["orders"]["order_id"]
+        )
+        assert set(tables["order_items"]["product_id"]) <= set(tables["products"]["id"])
+
+    def test_order_amounts_add_up(self, generated):
+        _, _, tables = generated
+        orders = tables["orders"].set_index("order_id")
+        items = tables["order_items"].groupby("order_id")
+
+        np.testing.assert_allclose(
+            items["item_total"].sum().reindex(orders.index),
+            orders["subtotal"],
+            atol=0.01,
+        )
+        assert (items.size().reindex(orders.index) == orders["items_count"]).all()
+        np.testing.assert_allclose(
+            orders["subtotal"] + orders["shipping"] + orders["tax"],
+            orders["total"],
+            atol=0.01,
+        )
+
+    def test_customer_summaries(self, generated):
+        _, _, tables = generated
+        customers = tables["customers"].set_index("customer_id")
+        orders = tables["orders"].groupby("customer_id")
+
+        counts = orders.size().reindex(customers.index, fill_value=0)
+        assert (counts == customers["total_orders"]).all()
+        assert (
+            orders["order_date"].min()
+            >= customers["signup_date"].loc[orders.size().index]
+        ).all()
+
+    def test_event_dates_within_sample_range(self, generated, data_path):
+        _, _, tables = generated
+        signup = pd.to_datetime(
+            tables["customers"].set_index("customer_id")["signup_date"]
+        )
+        sample_end = pd.to_datetime(
+            pd.read_csv(data_path / "orders.csv")["order_date"]
+        ).max()
+
+        orders = tables["orders"]
+        order_dates = pd.to_datetime(orders["order_date"])
+        assert order_dates.max() <= sample_end
+        assert (order_dates >= orders["customer_id"].map(signup)).all()
+
+        sessions = tables["website_sessions"].dropna(subset=["customer_id"])
+        session_dates = pd.to_datetime(sessions["session_date"])
+        late = session_dates < sessions["customer_id"].map(signup)
+        assert late.mean() < 0.01
+
+        tickets = tables["customer_support"]
+        created = pd.to_datetime(tickets["created_date"])
+        hours = (pd.to_datetime(tickets["resolved_date"]) - created).dt.total_seconds()
+        np.testing.assert_allclose(
+            (hours / 3600).dropna(), tickets["resolution_hours"][hours.notna()]
+        )
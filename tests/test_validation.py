@@ -0,0 +1,197 @@
+"""Tests for the compiled rule engine in src.validation."""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.data_loader import load_customers, load_orders
+from src.validation import (
+    CHECKS,
+    ValidationError,
+    compile_rules,
+    load_rules,
+    main,
+    validate_tables,
+)
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "data"))
+
+from ai_generated_validator import validate_frame  # noqa: E402
+
+MARKETING_COLUMNS = {
+    "full_name": "name",
+    "email_address": "email",
+    "phone_number": "phone",
+}
+
+
+def _assert_matches_validator(df):
+    expected = validate_frame(df)
+
+    report = compile_rules("customer_records").validate(df)
+
+    pd.testing.assert_frame_equal(report.errors, expected["errors"])
+    pd.testing.assert_series_equal(report.valid, expected["valid"])
+
+
+class TestCompile:
+    """Rule sets compile once and reject malformed rules."""
+
+    def test_compiled_rule_sets_are_cached(self):
+        rules = [{"column": "total", "check": "range", "min": 0}]
+
+        assert compile_rules(rules) is compile_rules([dict(rules[0])])
+        assert compile_rules("orders") is compile_rules("orders")
+
+    def test_bad_rules(self):
+        with pytest.raises(KeyError, match="Available"):
+            compile_rules([{"column": "total", "check": "positive"}])
+        with pytest.raises(KeyError, match="Available"):
+            compile_rules("invoices")
+        with pytest.raises(ValueError, match="unique"):
+            compile_rules([{"column": "a", "check": "not_null"}] * 2)
+        assert "foreign_key" in CHECKS
+
+    def test_pandera_schema(self):
+        pa = pytest.importorskip("pandera.pandas")
+        schema = pa.DataFrameSchema(
+            {
+                "age": pa.Column(float, pa.Check.in_range(0, 120), nullable=True),
+                "email": pa.Column(str, pa.Check.str_matches(r"^\S+@\S+$")),
+                "status": pa.Column(str, pa.Check.isin(["new", "done"]), unique=True),
+            }
+        )
+        df = pd.DataFrame(
+            {
+                "age": [30.0, None, 999.0],
+                "email": ["a@x.com", "nope", None],
+                "status": ["new", "done", "new"],
+            }
+        )
+
+        report = compile_rules(schema).validate(df)
+
+        assert report.valid.tolist() == [True, False, False]
+        assert report.errors["age_in_range_0"].tolist() == [False, False, True]
+        assert report.errors["email_not_null"].tolist() == [False, False, True]
+        assert report.errors["status_unique"].tolist() == [False, False, True]
+
+    def test_load_rules(self, tmp_path):
+        path = tmp_path / "rules.yaml"
+        path.write_text(
+            "orders:\n"
+            "  - {column: total, check: range, min: 0, code: negative_total}\n"
+        )
+
+        rules = load_rules(path)
+        report = compile_rules(rules["orders"]).validate(load_orders())
+
+        assert report.summary().loc["negative_total", "failures"] == 41
+        with pytest.raises(FileNotFoundError, match="Rules"):
+            load_rules(tmp_path / "missing.yaml")
+
+    def test_yaml_rules_without_pyyaml(self, tmp_path, monkeypatch):
+        path = tmp_path / "rules.yaml"
+        path.write_text("orders: []\n")
+        monkeypatch.setitem(sys.modules, "yaml", None)
+
+        with pytest.raises(ImportError, match="pyyaml"):
+            load_rules(path)
+
+
+class TestValidate:
+    """Checks give the expected verdicts on the sample data."""
+
+    def test_matches_data_validator(self, data_path):
+        customers = pd.read_csv(data_path / "customers.csv")
+        customers["name"] = customers["first_name"] + " " + customers["last_name"]
+        _assert_matches_validator(customers)
+
+    def test_marketing_raw_matches_data_validator(self, data_path):
+        raw = pd.read_csv(data_path / "marketing_customers_raw.csv")
+        _assert_matches_validator(raw.rename(columns=MARKETING_COLUMNS))
+
+    def test_edge_cases_match_data_validator(self):
+        df = pd.DataFrame(
+            {
+                "name": ["Asha", "", None, "Ravi", "Meera"],
+                "email": ["asha@x.com", "Bad@X.com", "no-at-sign", None, "m@x.io"],
+                "age": [30, -1, 121, None, 120],
+                "phone": ["9876543210", "98-765", "", None, "12345678901"],
+                "total_spent": [10.5, 0, 3, None, "99"],
+            }
+        )
+        _assert_matches_validator(df)
+
+    def test_messages(self):
+        df = pd.DataFrame({"name": [""], "email": ["a@x.com"], "age": [-1]})
+
+        messages = compile_rules("customer_records").validate(df).messages()
+
+        assert messages.iloc[0] == ["Name is required", "Age cannot be negative"]
+
+    def test_fail_fast(self):
+        orders = load_orders()
+        references = {"customers": load_customers()}
+        ruleset = compile_rules("orders")
+
+        report = ruleset.validate(orders, fail_fast=True, references=references)
+
+        assert report.stopped_at == "total_range"
+        assert report.errors.columns[-1] == "total_range"
+        with pytest.raises(ValidationError, match="total_range"):
+            ruleset.check(orders, references)
+        clean = orders[orders["total"] >= 0]
+        assert ruleset.check(clean, references) is clean
+
+    def test_foreign_keys_need_references(self):
+        orders = load_orders()
+        customers = load_customers()
+        ruleset = compile_rules("orders")
+
+        with pytest.raises(KeyError, match="customers"):
+            ruleset.validate(orders)
+        report = ruleset.validate(
+            orders.iloc[:10], references={"customers": customers.iloc[:0]}
+        )
+        assert report.errors["customer_id_foreign_key"].all()
+
+    def test_shared_between_threads(self):
+        customers = load_customers()
+        ruleset = compile_rules("customers")
+        expected = ruleset.validate(customers).errors
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            reports = list(pool.map(ruleset.validate, [customers] * 8))
+
+        for report in reports:
+            pd.testing.assert_frame_equal(report.errors, expected)
+
+
+class TestValidateTables:
+    """All tables are validated in one pass."""
+
+    def test_sample_data(self):
+        reports = validate_tables()
+
+        failures = {
+            table: report.summary()["failures"].loc[lambda s: s > 0].to_dict()
+            for table, report in reports.items()
+        }
+        assert failures["orders"] == {"total_range": 41}
+        assert failures["order_items"] == {"quantity_range": 83}
+        assert failures["customers"]["age_range"] == 33
+        assert failures["customers"]["signup_date_date"] == 14
+        assert failures["products"] == {}
+
+    def test_unknown_table(self):
+        with pytest.raises(KeyError):
+            validate_tables(["invoices"])
+
+    def test_cli(self, capsys):
+        assert main(["products", "categories"]) == 0
+        assert main(["orders", "--fail-fast"]) == 1
+        assert "total_range" in capsys.readouterr().out
@@ -0,0 +1,111 @@
+"""Tests for the vectorized batch mode of data/ai_generated_validator.py."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "data"))
+
+from ai_generated_validator import (  # noqa: E402
+    ERROR_MESSAGES,
+    RECORD_FIELDS,
+    DataValidator,
+    error_lists,
+    validate_customer,
+    validate_frame,
+)
+
+MARKETING_COLUMNS = {
+    "name": "full_name",
+    "email": "email_address",
+    "phone": "phone_number",
+}
+
+
+def _records(df, columns=None):
+    """Build the per-record dicts validate() would see for each row."""
+    mapping = {field: field for field in RECORD_FIELDS}
+    mapping.update(columns or {})
+    records = []
+    for row in df.to_dict("records"):
+        records.append({
+            field: row[column]
+            for field, column in mapping.items()
+            if column in row and pd.notna(row[column])
+        })
+    return records
+
+
+def _assert_same_verdicts(df, columns=None):
+    result = validate_frame(df, columns=columns)
+    messages = error_lists(result["errors"])
+
+    for i, record in enumerate(_records(df, columns)):
+        expected = validate_customer(record)
+        assert result["valid"].iloc[i] == expected["valid"], f"Row {i}: {record}"
+        assert messages.iloc[i] == expected["errors"], f"Row {i}: {record}"
+
+
+class TestValidateFrame:
+    """validate_frame() must agree with validate() row for row."""
+
+    def test_edge_cases_match_per_record(self):
+        df = pd.DataFrame({
+            "name": ["Asha", "", None, "Ravi", "Meera"],
+            "email": ["asha@x.com", "Bad@X.com", "no-at-sign", None, "m@x.io"],
+            "age": [30, -1, 121, None, 120],
+            "phone": ["9876543210", "98-765", "", None, "12345678901"],
+            "total_spent": [10.5, 0, 3, None, 99],
+        })
+        _assert_same_verdicts(df)
+
+    def test_customers_csv_matches_per_record(self, data_path):
+        customers = pd.read_csv(data_path / "customers.csv")
+        customers["name"] = customers["first_name"] + " " + customers["last_name"]
+        _assert_same_verdicts(customers)
+
+    def test_marketing_raw_with_column_mapping(self, data_path):
+        raw = pd.read_csv(data_path / "marketing_customers_raw.csv")
+        _assert_same_verdicts(raw, MARKETING_COLUMNS)
+
+    def test_non_numeric_total_spent(self):
+        """Object columns must apply the per-record isinstance check."""
+        df = pd.DataFrame({
+            "name": ["A", "B"],
+            "email": ["a@x.com", "b@x.com"],
+            "total_spent": [100, "100"],
+        })
+        result = validate_frame(df)
+        assert result["valid"].tolist() == [True, False]
+        assert result["errors"]["total_spent_type"].tolist() == [False, True]
+
+    def test_error_matrix_shape(self):
+        """Error matrix must have one bool column per error code."""
+        result = validate_frame(pd.DataFrame({"name": ["A"], "email": ["a@x.com"]}))
+        assert list(result["errors"].columns) == list(ERROR_MESSAGES)
+        assert result["errors"].dtypes.eq(bool).all()
+
+    def test_does_not_touch_validator_state(self):
+        """Batch validation must leave self.errors alone."""
+        validator = DataValidator()
+        validator.validate({"name": ""})
+        before = list(validator.errors)
+
+        validator.validate_frame(pd.DataFrame({"name": ["x"]}))
+        assert validator.errors == before
+
+    def test_empty_frame(self):
+        result = validate_frame(pd.DataFrame(columns=RECORD_FIELDS))
+        assert len(result["valid"]) == 0
+        assert result["errors"].shape == (0, len(ERROR_MESSAGES))
+
+
+@pytest.mark.parametrize("record", [
+    {"name": "A", "email": "a@x.com", "age": 20, "phone": "", "total_spent": 1.0},
+    {"name": "", "email": "A@X.COM", "age": 200, "phone": "12ab", "total_spent": "x"},
+])
+def test_single_row_frame_matches_record(record):
+    """A one-row frame must give the same result as the record itself."""
+    _assert_same_verdicts(pd.DataFrame([record]))
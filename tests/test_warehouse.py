@@ -0,0 +1,125 @@
+"""Tests for the persistent DuckDB warehouse in src.warehouse."""
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src import warehouse  # noqa: E402
+from src.data_loader import load_customers, load_from_warehouse  # noqa: E402
+
+TABLES = ["orders", "customers", "categories"]
+
+
+@pytest.fixture
+def data_copy(tmp_path, data_path):
+    """Writable copy of the CSVs used by these tests."""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for table in TABLES:
+        name = f"{table}.csv"
+        (directory / name).write_bytes((data_path / name).read_bytes())
+    return directory
+
+
+@pytest.fixture
+def db_path(tmp_path, data_copy):
+    """Warehouse built from the copied CSVs."""
+    path = tmp_path / "cartly.duckdb"
+    warehouse.build_warehouse(path, data_copy, TABLES)
+    return path
+
+
+class TestBuild:
+    """Verify typed tables, keys and incremental refresh."""
+
+    def test_column_types(self, db_path):
+        conn = warehouse.connect(db_path, read_only=True)
+        types = dict(conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'orders'"
+        ).fetchall())
+        conn.close()
+
+        assert types["order_date"] == "DATE"
+        assert types["order_time"] == "TIME"
+        assert types["order_id"] == "INTEGER"
+
+    def test_invalid_signup_dates_become_null(self, db_path):
+        customers = load_from_warehouse("customers", db_path=db_path)
+        raw = load_customers(use_cache=False)
+
+        invalid = (raw["signup_date"] == "invalid-date").sum()
+        assert customers["signup_date"].isna().sum() == invalid
+        assert pd.api.types.is_datetime64_any_dtype(customers["signup_date"])
+
+    def test_primary_key_rejects_duplicates(self, db_path):
+        conn = warehouse.connect(db_path)
+        with pytest.raises(Exception, match="(?i)constraint"):
+            conn.execute("INSERT INTO categories VALUES ('CAT01', 'Dup', 0.1)")
+        conn.close()
+
+    def test_refresh_only_rebuilds_changed_tables(self, db_path, data_copy):
+        assert set(warehouse.build_warehouse(db_path, data_copy, TABLES).values()) == {
+            "fresh"
+        }
+
+        path = data_copy / "categories.csv"
+        categories = pd.read_csv(path)
+        categories.loc[len(categories)] = ["CAT99", "Test", 0.1]
+        categories.to_csv(path, index=False)
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+        actions = warehouse.build_warehouse(db_path, data_copy, TABLES)
+        assert actions == {"orders": "fresh", "customers": "fresh", "categories": "built"}
+        assert len(load_from_warehouse("categories", db_path=db_path)) == 9
+
+    def test_quote_in_data_dir(self, tmp_path, data_path):
+        directory = tmp_path / "o'brien"
+        directory.mkdir()
+        (directory / "categories.csv").write_bytes(
+            (data_path / "categories.csv").read_bytes()
+        )
+        path = tmp_path / "quoted.duckdb"
+
+        warehouse.build_warehouse(path, directory, ["categories"])
+
+        assert len(load_from_warehouse("categories", db_path=path)) == 8
+
+
+class TestServing:
+    """Verify DataFrames served from the warehouse."""
+
+    def test_matches_csv_loader_dtypes(self, db_path):
+        """Shared columns must come back with the loader's dtypes."""
+        served = load_from_warehouse("customers", db_path=db_path)
+        loaded = load_customers(use_cache=False)
+
+        for column in ["customer_id", "segment", "is_subscribed", "total_orders"]:
+            assert served[column].dtype.name == loaded[column].dtype.name
+        assert len(served) == len(loaded)
+
+    def test_projection_and_filter(self, db_path):
+        october = load_from_warehouse(
+            "orders",
+            columns=["order_id", "order_date"],
+            where="order_date BETWEEN DATE '2024-10-01' AND DATE '2024-10-31'",
+            db_path=db_path,
+        )
+        assert list(october.columns) == ["order_id", "order_date"]
+        assert october["order_date"].dt.month.eq(10).all()
+        assert len(october) > 0
+
+    def test_orders_sorted_by_date(self, db_path):
+        orders = load_from_warehouse("orders", ["order_date"], db_path=db_path)
+        assert orders["order_date"].is_monotonic_increasing
+
+    def test_query_with_params(self, db_path):
+        result = warehouse.query(
+            "SELECT COUNT(*) AS n FROM orders WHERE shipping_country = ?",
+            ["India"],
+            db_path=db_path,
+        )
+        assert result["n"].iloc[0] > 0